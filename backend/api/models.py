@@ -1,5 +1,6 @@
 from pydantic import BaseModel, Field
-from typing import Optional
+from typing import Annotated, Dict, List, Literal, Optional, Union
+from core.config import settings
 
 class GenerateRequest(BaseModel):
     prompt: str = Field(..., max_length=1000, description="The natural language CAD instruction.")
@@ -8,10 +9,108 @@ class RefineRequest(BaseModel):
     original_code: str = Field(..., description="The previous Python code.")
     instruction: str = Field(..., max_length=1000, description="The natural language refinement instruction.")
 
+class LodInfo(BaseModel):
+    level: int = Field(description="0 is the coarsest level")
+    url: str
+    tolerance: float = Field(description="Tessellation deflection used, in mm")
+    triangles: int
+
+class MeshStatsInfo(BaseModel):
+    format: str = Field(description="binary or ascii")
+    triangles: int
+    bbox_min: Optional[List[float]] = Field(default=None, description="Bounding box corner, in mm; unset for an empty mesh")
+    bbox_max: Optional[List[float]] = None
+    size: Optional[List[float]] = Field(default=None, description="Bounding box extents along X, Y, Z")
+    surface_area: float = Field(description="In mm²")
+    volume: float = Field(description="Signed volume in mm³; negative when the triangles face inward")
+    degenerate_triangles: int = Field(description="Zero-area triangles: repeated vertices, needles, collinear slivers")
+    boundary_edges: int = Field(description="Edges used by a single triangle (holes)")
+    non_manifold_edges: int = Field(description="Edges shared by more than two triangles")
+    misoriented_edges: int = Field(description="Edges whose two triangles run them in the same direction (flipped normals)")
+    edge_passes: int = Field(description="Passes over the mesh the bounded-memory edge check took")
+    watertight: bool
+    consistently_oriented: bool
+    analysis_ms: float
+
+class ReusedPrefixInfo(BaseModel):
+    statements: int = Field(description="Top-level statements restored from the checkpoint instead of executed")
+    total_statements: int
+    checkpoint: str = Field(description="Short id of the checkpoint resumed from")
+
+class CostInfo(BaseModel):
+    score: float = Field(description="Weighted estimate of OpenCASCADE work, in boolean-operation units")
+    booleans: int
+    fillet_edges: int
+    features: int = Field(description="Extrusions, revolutions, lofts, sweeps, offsets")
+    primitives: int
+    max_loop_trips: int
+    unknown_loops: int = Field(description="Loops whose trip count could not be determined statically")
+
+class CandidateInfo(BaseModel):
+    candidate: int
+    provider: str = Field(description="ollama, or openai for the fallback after every local candidate failed")
+    temperature: float
+    seed: Optional[int] = None
+    outcome: str = Field(description="won, failed, duplicate, cancelled, or finished (succeeded after the winner)")
+    llm_seconds: Optional[float] = Field(default=None, description="Seconds from the start of the race until the code arrived")
+    prefill_ms: Optional[float] = Field(default=None, description="Prompt evaluation time reported by Ollama")
+    ttft_ms: Optional[float] = Field(default=None, description="Time to first token")
+    seconds: Optional[float] = Field(default=None, description="Seconds from the start of the race until the candidate finished")
+    error: Optional[str] = None
+
+class LLMTimingInfo(BaseModel):
+    provider: str = Field(description="ollama or openai")
+    model: str
+    prompt_tokens: Optional[int] = Field(default=None, description="Prompt tokens evaluated; with Ollama, a prefix reused from the KV cache is not counted")
+    cached_prompt_tokens: Optional[int] = Field(default=None, description="Prompt tokens served from OpenAI's prompt cache")
+    completion_tokens: Optional[int] = None
+    load_ms: Optional[float] = Field(default=None, description="Model load time; near zero while the model stays loaded")
+    prefill_ms: Optional[float] = Field(default=None, description="Prompt evaluation (prefill) time")
+    generation_ms: Optional[float] = Field(default=None, description="Token generation time")
+    ttft_ms: Optional[float] = Field(default=None, description="Time to first token: measured when streaming, load + prefill otherwise")
+    total_ms: float = Field(description="Wall time of the LLM call")
+
 class GenerationResponse(BaseModel):
     status: str = Field(default="success")
     stl_url: str = Field(description="URL to download the generated STL file")
+    model_id: Optional[str] = Field(default=None, description="Id for /api/models/{id}/export and other per-model endpoints")
     code: str = Field(description="The validated Python script used to generate the shape")
+    lods: List[LodInfo] = Field(default_factory=list, description="Level-of-detail meshes, coarse to fine; the last one is stl_url")
+    mesh: Optional[MeshStatsInfo] = Field(default=None, description="Analysis of the STL at stl_url; unset when MESH_ANALYSIS_ENABLED is off")
+    cost: Optional[CostInfo] = Field(default=None, description="Static cost estimate of the script")
+    reused_prefix: Optional[ReusedPrefixInfo] = Field(default=None, description="Set when execution resumed from a checkpoint of an earlier script")
+    batched_loops: int = Field(default=0, description="Boolean accumulator loops executed as a single batched boolean")
+    candidates: Optional[List[CandidateInfo]] = Field(default=None, description="Per-candidate metrics when speculative generation is on")
+    llm: Optional[LLMTimingInfo] = Field(default=None, description="Timings of the LLM call that produced the code; unset when it came from the LLM cache")
+    coalesced: Optional[str] = Field(default=None, description="'generation' or 'execution' when the result was shared with an identical request already in flight")
+
+class BatchGenerateRequest(BaseModel):
+    prompts: Optional[List[str]] = Field(default=None, max_length=settings.BATCH_MAX_ITEMS, description="Explicit list of prompts.")
+    template: Optional[str] = Field(default=None, max_length=1000, description="Prompt template with {name} placeholders, e.g. 'bracket {length}mm long'.")
+    parameters: Optional[Dict[str, Annotated[List[Union[int, float, str]], Field(max_length=settings.BATCH_MAX_ITEMS)]]] = Field(
+        default=None, description="Values per placeholder; every combination is generated."
+    )
+
+# Formats /api/models/{id}/export converts to (services.exporter.EXPORT_FORMATS)
+ExportFormat = Literal["step", "brep", "obj", "glb", "3mf"]
+
+class JobRequest(BaseModel):
+    kind: Literal["generate", "refine"] = Field(default="generate", description="Which pipeline to run.")
+    prompt: Optional[str] = Field(default=None, max_length=1000, description="Instruction for 'generate' jobs.")
+    original_code: Optional[str] = Field(default=None, description="Previous code for 'refine' jobs.")
+    instruction: Optional[str] = Field(default=None, max_length=1000, description="Instruction for 'refine' jobs.")
+
+class JobStatusResponse(BaseModel):
+    job_id: str
+    kind: str
+    status: str = Field(description="queued, running, succeeded, failed or cancelled")
+    stage: Optional[str] = Field(default=None, description="Last pipeline stage reached")
+    created_at: float
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    queue_wait: Optional[float] = Field(default=None, description="Seconds spent in the job queue")
+    result: Optional[GenerationResponse] = None
+    error: Optional[dict] = None
 
 class SystemStatusResponse(BaseModel):
     status: str = Field(description="Overall system status (ok/error/warning)")
@@ -20,3 +119,19 @@ class SystemStatusResponse(BaseModel):
     freecad_executable: Optional[str]
     rag_status: dict
     output_dir_writable: bool
+    geometry_cache: Optional[dict] = None
+    llm_cache: Optional[dict] = None
+    http_pools: Optional[dict] = None
+    scheduler: Optional[dict] = None
+    jobs: Optional[dict] = None
+    warmup: Optional[dict] = None
+    storage: Optional[dict] = None
+    checkpoints: Optional[dict] = None
+    speculative: Optional[dict] = None
+    dry_run: Optional[dict] = None
+    llm_timing: Optional[dict] = None
+    coalescing: Optional[dict] = None
+    circuit_breakers: Optional[dict] = None
+    health: Optional[dict] = None
+    exports: Optional[dict] = None
+    mesh_analysis: Optional[dict] = None
@@ -1,15 +1,41 @@
 import os
+import ast
+import json
+import asyncio
+import math
+import hashlib
+import itertools
+from typing import Awaitable, Callable, List, Optional, Tuple
 from fastapi import APIRouter, Request, HTTPException
-from fastapi.responses import FileResponse
+from fastapi.responses import FileResponse, JSONResponse, PlainTextResponse, StreamingResponse
 from pydantic import ValidationError as PydanticValidationError
 
-from api.models import GenerateRequest, RefineRequest, GenerationResponse, SystemStatusResponse
+from api.models import (
+    GenerateRequest, RefineRequest, GenerationResponse, SystemStatusResponse, JobRequest, JobStatusResponse,
+    BatchGenerateRequest, CandidateInfo, LLMTimingInfo, ExportFormat, MeshStatsInfo
+)
 from services.llm import llm_service
-from services.validator import validate_code
+from services.validator import estimate_cost, validate_script
+from services.optimizer import batch_booleans
+from services.dry_run import dry_runner
 from services.executor import executor
+from services.geometry_cache import geometry_cache, canonical_key, model_file
+from services.llm_cache import llm_cache
 from services.rag import rag_service
+from services.rag_ingest import rag_ingestor
+from services.scheduler import scheduler
+from services.jobs import job_manager
+from services.warmup import warmup
+from services.health import health_supervisor
+from services.storage import output_storage
+from services.checkpoints import checkpoint_store
+from services.coalescing import SingleFlight, execution_flights, generation_flights
+from services.exporter import EXPORT_FORMATS, model_exporter
+from services.mesh_analysis import analyze_stl, mesh_analyzer
 from core.config import settings
 from core.logger import setup_logger
+from core.metrics import metrics
+from core.errors import CopilotException, ExecutionError, ValidationError, build_error_response
 
 logger = setup_logger("cad_copilot.routes")
 router = APIRouter()
@@ -185,16 +211,37 @@ keyway = Part.makeBox(4, 20, 40, Vector(-2, -10, 40))
 final_shape = body.cut(keyway)
 """
 
+@router.get("/live")
+async def liveness():
+    """Liveness probe: the process is up and serving. Never touches backends."""
+    return {"status": "alive"}
+
+@router.get("/ready")
+async def readiness():
+    """Readiness probe: 503 until background warmup has finished, with per-component state."""
+    report = warmup.get_status()
+    return JSONResponse(status_code=200 if report["ready"] else 503, content=report)
+
+@router.get("/metrics", response_class=PlainTextResponse)
+async def get_metrics():
+    """Prometheus metrics: stage latencies, queue waits, LLM attempts and fallbacks, cache hits."""
+    if not settings.METRICS_ENABLED:
+        raise HTTPException(status_code=404, detail="Metrics are disabled (METRICS_ENABLED=false).")
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
 @router.get("/status", response_model=SystemStatusResponse)
 async def get_status():
-    """Health check endpoint to verify component availability."""
-    ollama_ok = await llm_service.check_health()
+    """
+    Health check endpoint to verify component availability. Ollama's reachability
+    comes from the health supervisor's last background probe.
+    """
+    ollama_ok = (await health_supervisor.get("ollama"))["ok"]
     freecad_ok = settings.FREECAD_PATH is not None and os.path.exists(settings.FREECAD_PATH)
     
     # Check if we can write to output dir
     output_writable = os.access(settings.OUTPUT_DIR, os.W_OK)
     
-    rag_status = rag_service.check_health()
+    rag_status = {**rag_service.check_health(), "ingest": rag_ingestor.status}
     
     overall = "ok"
     if not ollama_ok or not freecad_ok or not output_writable:
@@ -208,47 +255,416 @@ async def get_status():
         freecad_available=freecad_ok,
         freecad_executable=settings.FREECAD_PATH,
         rag_status=rag_status,
-        output_dir_writable=output_writable
+        output_dir_writable=output_writable,
+        geometry_cache=geometry_cache.get_stats(),
+        llm_cache=llm_cache.get_stats(),
+        http_pools=llm_service.get_pool_stats(),
+        scheduler=scheduler.get_stats(),
+        jobs=job_manager.get_stats(),
+        checkpoints=checkpoint_store.get_stats(),
+        speculative=llm_service.get_speculative_stats(),
+        dry_run=dry_runner.get_stats(),
+        llm_timing=llm_service.get_timing_stats(),
+        coalescing={"generation": generation_flights.get_stats(), "execution": execution_flights.get_stats()},
+        circuit_breakers=llm_service.get_breaker_stats(),
+        health=health_supervisor.get_stats(),
+        exports=model_exporter.get_stats(),
+        mesh_analysis=mesh_analyzer.get_stats(),
+        storage=output_storage.get_stats(),
+        warmup=warmup.get_status()
     )
 
-@router.post("/generate", response_model=GenerationResponse)
-async def generate_model(request: GenerateRequest, http_request: Request):
+# Optional async callback used by the streaming endpoints to report pipeline stages
+EmitFn = Optional[Callable[[str, dict], Awaitable[None]]]
+
+async def _emit(emit: EmitFn, event: str, data: Optional[dict] = None):
+    if emit is not None:
+        await emit(event, data or {})
+
+async def _call_llm(prompt: str, system_prompt: str, emit: EmitFn, timing: dict) -> str:
+    """
+    Calls the LLM, streaming tokens as `token` events when a stream is attached.
+    `timing` receives the call's prefill and time-to-first-token figures.
+    """
+    async with scheduler.stage("llm"):
+        with metrics.timed("llm"):
+            if emit is None:
+                return await llm_service.generate_code(prompt, system_prompt, timing)
+
+            async def on_token(fragment: str):
+                await emit("token", {"text": fragment})
+
+            return await llm_service.stream_code(prompt, system_prompt, on_token, timing)
+
+async def _execute_optimized(code: str) -> Tuple[str, Optional[dict], int]:
+    """Runs the script with boolean accumulator loops batched, or as written if that fails."""
+    optimized_code, batched_loops = batch_booleans(code) if settings.BOOLEAN_BATCHING else (code, 0)
+    if not batched_loops:
+        return (*await executor.execute_script(code), 0)
+    try:
+        return (*await executor.execute_script(optimized_code), batched_loops)
+    except ExecutionError as e:
+        logger.warning(f"Optimized script failed ({e.message}); running the original")
+        return (*await executor.execute_script(code), 0)
+
+def _model_id(stl_relpath: str) -> str:
+    """The id /api/models/{id}/... take: the STL's file stem (an execution id or a geometry cache key)."""
+    return os.path.basename(stl_relpath).split(".", 1)[0]
+
+async def _validate_and_execute(raw_code: str, emit: EmitFn = None) -> GenerationResponse:
+    """
+    Validates and executes LLM output, serving identical scripts from the geometry cache.
+    A cache hit skips both validation and FreeCAD: only scripts that already passed
+    both are ever stored under their AST key.
+    """
+    key = canonical_key(raw_code)
+    cached_stl = geometry_cache.lookup(key)
+    if geometry_cache.enabled:
+        metrics.cache_lookups.inc(cache="geometry", result="hit" if cached_stl else "miss")
+    if cached_stl:
+        logger.info(f"Geometry cache hit ({key[:12]})")
+        code = raw_code.strip().replace('\r\n', '\n')
+        cost = estimate_cost(ast.parse(code)).to_dict()
+        await _emit(emit, "validated", {"cached": True, "cost": cost})
+        return GenerationResponse(
+            status="success", stl_url=f"/outputs/{cached_stl}", model_id=_model_id(cached_stl), code=code,
+            lods=executor.describe_lods(cached_stl), mesh=mesh_analyzer.describe(cached_stl), cost=cost
+        )
+
+    # The same script already running for another request is awaited, not run again
+    return await _coalesce(execution_flights, key, lambda: _execute_fresh(key, raw_code, emit), emit)
+
+async def _execute_fresh(key: Optional[str], raw_code: str, emit: EmitFn) -> GenerationResponse:
+    """Validation, dry run and FreeCAD execution of a script the geometry cache does not hold."""
+    # Validate code and estimate its cost (will raise CopilotException if failed, caught by handler)
+    validated_code, script_cost = validate_script(raw_code)
+    cost = script_cost.to_dict()
+
+    # Misspelled API calls, wrong arities or a missing final_shape fail here in milliseconds, not in FreeCAD
+    with metrics.timed("dry_run"):
+        dry_run = await dry_runner.check(validated_code)
+    await _emit(emit, "validated", {"cached": False, "cost": cost, "dry_run": dry_run.to_dict()})
+
+    # Execute FreeCAD; expensive scripts queue separately so they cannot starve cheap ones
+    stage = scheduler.executor_stage_for(script_cost.score)
+    async with scheduler.stage(stage):
+        await _emit(emit, "executing", {"queue": stage})
+        stl_filename, reused_prefix, batched_loops = await _execute_optimized(validated_code)
+    stl_filename = await geometry_cache.store(key, stl_filename) or stl_filename
+
+    # Build URL (relative path — Vite proxy routes /outputs to this server)
+    stl_url = f"/outputs/{stl_filename}"
+
+    return GenerationResponse(
+        status="success", stl_url=stl_url, model_id=_model_id(stl_filename), code=validated_code,
+        lods=executor.describe_lods(stl_filename), mesh=mesh_analyzer.describe(stl_filename), cost=cost,
+        reused_prefix=reused_prefix, batched_loops=batched_loops
+    )
+
+def _flight_key(*parts: str) -> str:
+    return hashlib.sha256("\x00".join(parts).encode("utf-8")).hexdigest()
+
+async def _coalesce(flights: SingleFlight, key: Optional[str], work: Callable[[], Awaitable[GenerationResponse]], emit: EmitFn) -> GenerationResponse:
+    """
+    Runs `work` through a single-flight table. Callers that joined another request's
+    flight get a `coalesced` event instead of that request's stage events.
+    """
+    async def on_join():
+        await _emit(emit, "coalesced", {"stage": flights.name})
+
+    response, shared = await flights.run(key, work, on_join)
+    # Every caller gets its own copy: callers go on to set per-request fields such as `llm`
+    response = response.model_copy(deep=True)
+    if shared:
+        response.coalesced = flights.name
+    return response
+
+async def _generate_and_execute(prompt: str, system_prompt: str, emit: EmitFn) -> Tuple[GenerationResponse, str]:
+    """
+    LLM call, validation and execution. With SPECULATIVE_CANDIDATES > 1 several
+    candidates race through the pipeline and the first valid STL wins; their
+    stage events carry a `candidate` index and progress arrives as `candidate`
+    events. Returns the response and the LLM code it was built from.
+    """
+    if llm_service.speculative_candidates <= 1:
+        timing: dict = {}
+        raw_code = await _call_llm(prompt, system_prompt, emit, timing)
+        await _emit(emit, "code_complete", {"code": raw_code, "cached": None, "llm": timing or None})
+        response = await _validate_and_execute(raw_code, emit)
+        response.llm = LLMTimingInfo(**timing) if timing else None
+        return response, raw_code
+
+    async def accept(index: int, code: str) -> GenerationResponse:
+        async def tagged(event: str, data: dict):
+            await emit(event, {**data, "candidate": index})
+        return await _validate_and_execute(code, tagged if emit is not None else None)
+
+    async def on_event(index: int, event: str, data: dict):
+        await _emit(emit, "candidate", {"candidate": index, "event": event, **data})
+
+    response, raw_code, rows, timing = await llm_service.race_candidates(
+        prompt, system_prompt, accept, slot=lambda: scheduler.stage("llm"), on_event=on_event
+    )
+    await _emit(emit, "code_complete", {"code": raw_code, "cached": None, "llm": timing or None})
+    response.candidates = [CandidateInfo(**row) for row in rows]
+    response.llm = LLMTimingInfo(**timing) if timing else None
+    return response, raw_code
+
+async def _run_generate(request: GenerateRequest, emit: EmitFn = None) -> GenerationResponse:
     logger.info(f"Generating new model. Prompt: {request.prompt[:50]}...")
     
     # 1. Retrieve RAG context
-    context = rag_service.retrieve_context(request.prompt)
+    context = await rag_service.retrieve_context(request.prompt)
     prompt_with_context = request.prompt + context
+    await _emit(emit, "rag_done", {"context_chars": len(context)})
     
-    # 2. Call LLM
-    raw_code = await llm_service.generate_code(prompt_with_context, SYSTEM_PROMPT)
-    
-    # 3. Validate code (will raise CopilotException if failed, caught by handler)
-    validated_code = validate_code(raw_code)
-    
-    # 4. Execute FreeCAD
-    stl_filename = await executor.execute_script(validated_code)
+    model = llm_service.primary.model
+
+    async def generate() -> GenerationResponse:
+        # 2. Call LLM (or reuse code from an identical / near-identical earlier prompt)
+        raw_code, cache_tier = await llm_cache.get(request.prompt, context, SYSTEM_PROMPT, model)
+        if llm_cache.enabled:
+            metrics.cache_lookups.inc(cache="llm", result=cache_tier or "miss")
+        if raw_code is None:
+            # 3. Validate and execute (or reuse cached geometry)
+            response, raw_code = await _generate_and_execute(prompt_with_context, SYSTEM_PROMPT, emit)
+        else:
+            logger.info(f"LLM cache hit ({cache_tier})")
+            await _emit(emit, "code_complete", {"code": raw_code, "cached": cache_tier})
+            response = await _validate_and_execute(raw_code, emit)
+
+        # 4. Only code that validated and executed successfully is cached
+        await llm_cache.put(request.prompt, context, SYSTEM_PROMPT, model, raw_code)
+        return response
+
+    # Identical prompts already in flight (client retries, demo rooms) share that generation
+    key = _flight_key("generate", model, SYSTEM_PROMPT, " ".join(request.prompt.split()), context)
+    return await _coalesce(generation_flights, key, generate, emit)
+
+async def _run_refine(request: RefineRequest, emit: EmitFn = None) -> GenerationResponse:
+    logger.info("Refining existing model.")
     
-    # 5. Build URL (relative path — Vite proxy routes /outputs to this server)
-    stl_url = f"/outputs/{stl_filename}"
+    # The previous code goes in the user message: the system prompt stays identical
+    # to /generate's, so the model's cached prefix is reused
+    refine_prompt = (
+        f"Here is the PREVIOUS CODE you must modify based on the new instruction:\n```python\n{request.original_code}\n```"
+        f"\n\nInstruction: {request.instruction}"
+    )
     
-    return GenerationResponse(status="success", stl_url=stl_url, code=validated_code)
+    async def refine() -> GenerationResponse:
+        # LLM, then validate and execute (or reuse cached geometry)
+        response, _ = await _generate_and_execute(refine_prompt, SYSTEM_PROMPT, emit)
+        return response
+
+    key = _flight_key("refine", llm_service.primary.model, SYSTEM_PROMPT, refine_prompt)
+    return await _coalesce(generation_flights, key, refine, emit)
+
+def _sse(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+def _stream_pipeline(run: Callable[[EmitFn], Awaitable[Optional[GenerationResponse]]], final_event: Optional[str] = "stl_ready") -> StreamingResponse:
+    """
+    Runs a pipeline in a background task and relays its stage events as Server-Sent Events.
+    The final event is `final_event` (the usual GenerationResponse) or `error` (the usual error body).
+    """
+    queue: asyncio.Queue = asyncio.Queue()
+
+    async def emit(event: str, data: dict):
+        await queue.put(_sse(event, data))
+
+    async def runner():
+        try:
+            response = await run(emit)
+            if final_event and response is not None:
+                await emit(final_event, response.model_dump())
+        except CopilotException as exc:
+            logger.error(f"[{exc.error_type.upper()}] {exc.message} | Details: {exc.details}")
+            await emit("error", build_error_response(exc).model_dump())
+        except Exception as exc:
+            logger.critical(f"Unhandled Exception in stream: {str(exc)}", exc_info=True)
+            await emit("error", build_error_response(exc).model_dump())
+        finally:
+            await queue.put(None)
+
+    async def event_stream():
+        task = asyncio.create_task(runner())
+        try:
+            # Flush headers and a first byte immediately
+            yield ": stream open\n\n"
+            while True:
+                item = await queue.get()
+                if item is None:
+                    break
+                yield item
+        finally:
+            # Client went away before the pipeline finished
+            if not task.done():
+                task.cancel()
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+@router.post("/generate", response_model=GenerationResponse)
+async def generate_model(request: GenerateRequest, http_request: Request):
+    return await _run_generate(request)
 
 @router.post("/refine", response_model=GenerationResponse)
 async def refine_model(request: RefineRequest, http_request: Request):
-    logger.info("Refining existing model.")
-    
-    refine_system_prompt = SYSTEM_PROMPT + f"\n\nHere is the PREVIOUS CODE you must modify based on the new instruction:\n```python\n{request.original_code}\n```"
-    
-    # LLM
-    raw_code = await llm_service.generate_code(request.instruction, refine_system_prompt)
-    
-    # Validate
-    validated_code = validate_code(raw_code)
-    
-    # Execute
-    stl_filename = await executor.execute_script(validated_code)
-    
-    # URL (relative path — Vite proxy routes /outputs to this server)
-    stl_url = f"/outputs/{stl_filename}"
-    
-    return GenerationResponse(status="success", stl_url=stl_url, code=validated_code)
+    return await _run_refine(request)
+
+@router.post("/generate/stream")
+async def generate_model_stream(request: GenerateRequest):
+    """
+    Streams LLM tokens and stage events (rag_done, code_complete, validated, executing, stl_ready).
+    A request that joins an identical one already in flight gets `coalesced` instead of its stage events.
+    """
+    return _stream_pipeline(lambda emit: _run_generate(request, emit))
+
+@router.post("/refine/stream")
+async def refine_model_stream(request: RefineRequest):
+    """Streams LLM tokens and stage events (code_complete, validated, executing, stl_ready)."""
+    return _stream_pipeline(lambda emit: _run_refine(request, emit))
+
+def _expand_batch(request: BatchGenerateRequest) -> List[str]:
+    """Turns an explicit prompt list or a template + parameter grid into prompts."""
+    prompts = list(request.prompts or [])
+    params = request.parameters or {}
+    # Counted before expanding: a large grid must not be built just to be rejected
+    count = len(prompts) + (math.prod(len(values) for values in params.values()) if request.template else 0)
+    if count > settings.BATCH_MAX_ITEMS:
+        raise ValidationError(f"Batch exceeds the maximum of {settings.BATCH_MAX_ITEMS} items.", details=f"Got {count} items.")
+    if request.template:
+        names = sorted(params)
+        for values in itertools.product(*(params[name] for name in names)):
+            try:
+                prompts.append(request.template.format(**dict(zip(names, values))))
+            except (KeyError, IndexError, ValueError) as e:
+                raise ValidationError("Batch template could not be filled from the parameters.", details=str(e))
+
+    if not prompts:
+        raise ValidationError("Batch needs 'prompts' or a 'template'.")
+    for prompt in prompts:
+        if not prompt.strip() or len(prompt) > 1000:
+            raise ValidationError("Every batch prompt must be non-empty and at most 1000 characters.", details=prompt[:100])
+    return prompts
+
+@router.post("/generate/batch")
+async def generate_batch(request: BatchGenerateRequest):
+    """
+    Generates many prompts in one call and streams one `item` event per prompt as it
+    finishes, then `batch_done`. Duplicate prompts share a single RAG lookup, LLM call
+    and execution. A failing item is reported in its event and never aborts the batch.
+    """
+    prompts = _expand_batch(request)
+
+    async def run(emit: EmitFn) -> None:
+        indices = {}
+        for index, prompt in enumerate(prompts):
+            indices.setdefault(prompt, []).append(index)
+        await emit("batch_started", {"items": len(prompts), "distinct": len(indices)})
+
+        # Bound in-flight pipelines so a big batch waits here instead of filling the stage queues
+        limiter = asyncio.Semaphore(max(1, settings.BATCH_CONCURRENCY))
+        counts = {"succeeded": 0, "failed": 0}
+
+        async def run_one(prompt: str):
+            async with limiter:
+                try:
+                    response = await _run_generate(GenerateRequest(prompt=prompt))
+                    payload = {"status": "success", "result": response.model_dump()}
+                except Exception as exc:
+                    if not isinstance(exc, CopilotException):
+                        logger.error(f"Batch item failed unexpectedly: {exc}", exc_info=True)
+                    payload = {"status": "error", "error": build_error_response(exc).error.model_dump()}
+            for index in indices[prompt]:
+                counts["succeeded" if payload["status"] == "success" else "failed"] += 1
+                await emit("item", {"index": index, "prompt": prompt, **payload})
+
+        await asyncio.gather(*(run_one(prompt) for prompt in indices))
+        await emit("batch_done", {"items": len(prompts), **counts})
+
+    return _stream_pipeline(run, final_event=None)
+
+@router.get("/models/{model_id}/export")
+async def export_model(model_id: str, format: ExportFormat = "step"):
+    """
+    Downloads a generated model as STEP, BREP, OBJ, GLB or 3MF. The first request per
+    format converts the model's saved BRep in the FreeCAD worker pool; later ones get
+    the stored file. The LLM and the script never run again.
+    """
+    exported = await model_exporter.export(model_id, format)
+    if exported is None:
+        raise HTTPException(status_code=404, detail="Model not found, expired, or generated without a saved BRep")
+    path, reused = exported
+    return FileResponse(
+        path, media_type=EXPORT_FORMATS[format], filename=f"model-{model_id[:8]}.{format}",
+        headers={"X-Export-Cache": "hit" if reused else "miss"},
+    )
+
+@router.get("/models/{model_id}/stats", response_model=MeshStatsInfo)
+async def model_stats(model_id: str):
+    """
+    Triangle count, bounding box, area, volume and watertightness of a generated model's
+    STL. Served from the report stored at generation time; models generated with
+    MESH_ANALYSIS_ENABLED off are analyzed now.
+    """
+    stl_path = model_file(model_id, "stl")
+    if stl_path is None:
+        raise HTTPException(status_code=404, detail="Model not found or expired")
+    report = mesh_analyzer.load(stl_path)
+    if report is None:
+        try:
+            report = await asyncio.to_thread(analyze_stl, stl_path)
+        except FileNotFoundError:
+            raise HTTPException(status_code=404, detail="Model not found or expired")
+    return report
+
+def _job_response(job) -> JobStatusResponse:
+    return JobStatusResponse(**job.to_dict())
+
+@router.post("/jobs", response_model=JobStatusResponse, status_code=202)
+async def create_job(request: JobRequest):
+    """Queues a generate/refine pipeline and returns its job id immediately."""
+    if request.kind == "generate":
+        if not request.prompt:
+            raise ValidationError("'prompt' is required for generate jobs.")
+        pipeline_request = GenerateRequest(prompt=request.prompt)
+        run = lambda emit: _run_generate(pipeline_request, emit)
+    else:
+        if not request.instruction or request.original_code is None:
+            raise ValidationError("'original_code' and 'instruction' are required for refine jobs.")
+        pipeline_request = RefineRequest(original_code=request.original_code, instruction=request.instruction)
+        run = lambda emit: _run_refine(pipeline_request, emit)
+
+    job = await job_manager.submit(request.kind, run)
+    return _job_response(job)
+
+@router.get("/jobs/{job_id}", response_model=JobStatusResponse)
+async def get_job(job_id: str):
+    job = job_manager.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return _job_response(job)
+
+@router.delete("/jobs/{job_id}", response_model=JobStatusResponse)
+async def cancel_job(job_id: str):
+    """Cancels a queued or running job. Finished jobs are returned unchanged."""
+    job = job_manager.cancel(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return _job_response(job)
+
+@router.post("/admin/rag/reindex", status_code=202)
+async def reindex_rag(full: bool = False):
+    """Starts a background re-index of RAG_DOCS_DIR (only changed chunks unless `full`)."""
+    if not rag_service.initialized:
+        raise HTTPException(status_code=503, detail="RAG is disabled or not initialized")
+    started = rag_ingestor.start_background(rag_service.collection, full=full)
+    return {"started": started, **rag_ingestor.status}
+
+@router.get("/admin/rag/status")
+async def rag_ingest_status():
+    return rag_ingestor.status
@@ -0,0 +1,57 @@
+import stat
+import mimetypes
+from starlette.datastructures import Headers
+from starlette.responses import FileResponse, Response
+from starlette.staticfiles import NotModifiedResponse, StaticFiles
+from starlette.types import Scope
+from services.storage import output_storage
+
+# Not registered by default on every platform; without it STLs are served as text/plain
+mimetypes.add_type("model/stl", ".stl")
+
+# Preferred order when the client accepts several encodings
+PRECOMPRESSED = (("br", ".br"), ("gzip", ".gz"))
+
+
+class PrecompressedStaticFiles(StaticFiles):
+    """
+    StaticFiles that serves `<file>.br` / `<file>.gz` written next to `<file>`
+    at generation time, with the matching Content-Encoding, when the client accepts it.
+    Every successful hit counts as an access in OutputStorage, which keeps models
+    that are still being viewed from expiring.
+    """
+
+    def file_response(self, full_path, stat_result, scope: Scope, status_code: int = 200) -> Response:
+        # Conditional headers are evaluated in get_response, against the variant actually served
+        return FileResponse(full_path, status_code=status_code, stat_result=stat_result)
+
+    async def get_response(self, path: str, scope: Scope) -> Response:
+        response = await super().get_response(path, scope)
+        if response.status_code != 200 or not isinstance(response, FileResponse):
+            return response
+        output_storage.touch_path(path)
+
+        request_headers = Headers(scope=scope)
+        accepted = {
+            token.split(";")[0].strip().lower()
+            for token in request_headers.get("accept-encoding", "").split(",")
+        }
+        for encoding, suffix in PRECOMPRESSED:
+            if encoding not in accepted:
+                continue
+            full_path, stat_result = self.lookup_path(path + suffix)
+            if stat_result is None or not stat.S_ISREG(stat_result.st_mode):
+                continue
+            response = FileResponse(
+                full_path,
+                stat_result=stat_result,
+                media_type=response.media_type,
+                headers={"Content-Encoding": encoding},
+            )
+            break
+
+        response.headers["Vary"] = "Accept-Encoding"
+        # Each variant has its own ETag and Last-Modified; a cached gzip body must not validate identity
+        if self.is_not_modified(response.headers, request_headers):
+            return NotModifiedResponse(response.headers)
+        return response
@@ -0,0 +1,72 @@
+import re
+import time
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.routing import Mount
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from core.config import settings
+from core.metrics import RequestTrace, bind_trace, metrics, new_trace_id, unbind_trace
+
+# Client-supplied ids are echoed into headers and logs: keep them short and plain
+_TRACE_ID_RE = re.compile(r"^[A-Za-z0-9._-]{1,64}$")
+
+
+def route_label(scope: Scope) -> str:
+    """
+    The matched route as a template (`/api/jobs/{job_id}`), never the raw path:
+    ids in metric labels would create a new series per request.
+    """
+    params = scope.get("path_params") or {}
+    path = scope["path"]
+    if "route" not in scope and not params:
+        # Mounts (the /outputs static files) do not always leave their match in this scope
+        for route in getattr(scope.get("app"), "routes", []):
+            if isinstance(route, Mount) and path.startswith(route.path + "/"):
+                return f"{route.path}/{{path}}"
+        return "unmatched"
+    for name, value in params.items():
+        head, separator, tail = path.rpartition(str(value))
+        if separator:
+            path = f"{head}{{{name}}}{tail}"
+    return path
+
+
+class TracingMiddleware:
+    """
+    Gives every HTTP request a trace id (the client's `X-Request-ID` if it is
+    sane, a fresh one otherwise) that log lines and timed pipeline stages pick up.
+    The response carries the id in `X-Request-ID` and the stage timings collected
+    until its headers were sent in `Server-Timing`. Streaming responses send their
+    headers before the pipeline runs, so theirs only show the time to open the stream.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        requested = Headers(scope=scope).get("x-request-id", "")
+        trace = RequestTrace(requested if _TRACE_ID_RE.match(requested) else new_trace_id())
+        token = bind_trace(trace)
+        started = time.perf_counter()
+        status = 500
+
+        async def send_with_headers(message: Message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                headers = MutableHeaders(scope=message)
+                headers.append("X-Request-ID", trace.trace_id)
+                if settings.METRICS_ENABLED:
+                    headers.append("Server-Timing", trace.server_timing())
+                    metrics.http_seconds.observe(time.perf_counter() - started, method=scope["method"], route=route_label(scope))
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_headers)
+        finally:
+            unbind_trace(token)
+            if settings.METRICS_ENABLED:
+                metrics.http_requests.inc(method=scope["method"], route=route_label(scope), status=str(status))
@@ -13,6 +13,30 @@ class Settings(BaseSettings):
     LLM_MODEL: str = Field(default="mistral", description="Ollama model to use for generation")
     LLM_TIMEOUT: int = Field(default=180, description="Timeout in seconds for LLM requests")
     LLM_RETRIES: int = Field(default=2, description="Number of retries for transient LLM errors")
+    OLLAMA_KEEP_ALIVE: str = Field(default="30m", description="How long Ollama keeps the model (and its cached prompt prefix) loaded after a request, e.g. 30m; -1m keeps it forever")
+    OLLAMA_NUM_CTX: int = Field(default=8192, description="Ollama context window in tokens; must hold the system prompt plus RAG context and previous code (0 = server default)")
+    SPECULATIVE_CANDIDATES: int = Field(default=1, description="LLM candidates generated in parallel per request; the first that validates and executes wins (1 = off)")
+    SPECULATIVE_TEMPERATURES: str = Field(default="0.1,0.4,0.7", description="Comma-separated sampling temperatures assigned to the candidates in turn")
+    LLM_BREAKER_ENABLED: bool = Field(default=True, description="Stop calling an LLM backend whose recent calls mostly failed or were slow, and use the other one")
+    LLM_BREAKER_WINDOW: int = Field(default=20, description="Most recent calls per backend that the circuit breaker's error and slow-call rates cover")
+    LLM_BREAKER_MIN_CALLS: int = Field(default=5, description="Calls in the window before the circuit breaker may open")
+    LLM_BREAKER_ERROR_RATE: float = Field(default=0.5, description="Failed-call share of the window that opens the circuit")
+    LLM_BREAKER_SLOW_CALL_SECONDS: float = Field(default=90.0, description="Calls taking at least this long count as slow (0 = ignore latency)")
+    LLM_BREAKER_SLOW_CALL_RATE: float = Field(default=0.8, description="Slow-call share of the window that opens the circuit")
+    LLM_BREAKER_OPEN_SECONDS: float = Field(default=30.0, description="Seconds an open circuit rejects calls before letting a trial call through")
+    HEALTH_CHECK_INTERVAL: float = Field(default=15.0, description="Seconds between background backend probes cached for /api/status (0 = probe on every call)")
+
+    LLM_CACHE_ENABLED: bool = Field(default=True, description="Cache LLM code for repeated /generate prompts")
+    LLM_CACHE_MAX_ENTRIES: int = Field(default=256, description="Maximum number of cached LLM responses (LRU)")
+    LLM_CACHE_TTL: int = Field(default=3600, description="Seconds before a cached LLM response expires")
+    LLM_CACHE_SIMILARITY: float = Field(default=0.95, description="Cosine similarity for semantic cache hits (>1 disables the semantic tier)")
+
+    # Shared HTTP client pools (Ollama / OpenAI)
+    HTTP_MAX_CONNECTIONS: int = Field(default=20, description="Maximum open connections per LLM backend")
+    HTTP_MAX_KEEPALIVE: int = Field(default=10, description="Maximum idle keep-alive connections per LLM backend")
+    HTTP_KEEPALIVE_EXPIRY: float = Field(default=30.0, description="Seconds an idle keep-alive connection is kept")
+    HTTP_CONNECT_TIMEOUT: float = Field(default=5.0, description="Connect timeout in seconds for LLM backends")
+    HTTP2_ENABLED: bool = Field(default=False, description="Use HTTP/2 for LLM backends (requires the 'h2' package)")
 
     # OpenAI Fallback (used when local Ollama fails)
     OPENAI_API_KEY: Optional[str] = Field(default=None, description="OpenAI API key for GPT-4o fallback")
@@ -21,16 +45,65 @@ class Settings(BaseSettings):
     # FreeCAD
     FREECAD_PATH: Optional[str] = Field(default=None, description="Path to FreeCADCmd executable")
     FREECAD_TIMEOUT: int = Field(default=30, description="Timeout in seconds for FreeCAD execution")
+    STL_BINARY: bool = Field(default=True, description="Write binary STL instead of FreeCAD's ASCII exportStl")
+    STL_MESH_TOLERANCE: float = Field(default=0.01, description="Lower bound (mm) on the tessellation deflection of any LOD")
+    STL_LOD_LEVELS: str = Field(default="0.01,0.002,0.0005", description="Comma-separated LOD deflections as fractions of the BoundBox diagonal, coarse to fine")
+    STL_LOD_TRIANGLE_BUDGETS: str = Field(default="20000,200000,1000000", description="Comma-separated triangle budgets per LOD level")
+    SAVE_BREP: bool = Field(default=True, description="Also save each model's exact BRep so /api/models/{id}/export can convert it without re-running the script")
+    MESH_ANALYSIS_ENABLED: bool = Field(default=True, description="Analyze every generated STL (area, volume, watertightness) and reject meshes without triangles")
+    MESH_ANALYSIS_MAX_EDGES_PER_PASS: int = Field(default=1000000, description="Edges the watertightness check holds in memory at once; larger meshes take several passes")
+    STL_PRECOMPRESS: str = Field(default="gzip,br", description="Comma-separated encodings to precompress STLs with (gzip, br); empty disables")
+    FREECAD_POOL_SIZE: int = Field(default=2, description="Number of warm FreeCADCmd worker processes (0 = one process per request)")
+    FREECAD_WORKER_MAX_JOBS: int = Field(default=50, description="Recycle a FreeCAD worker after this many jobs")
     OUTPUT_DIR: str = Field(default="outputs", description="Directory to store generated scripts and STLs")
+    OUTPUT_TTL: int = Field(default=3600, description="Seconds after its last access before a generated model is deleted")
+    OUTPUT_MAX_BYTES: int = Field(default=2 * 1024 * 1024 * 1024, description="Total size of generated outputs before least recently used models are evicted")
+    OUTPUT_SWEEP_INTERVAL: int = Field(default=300, description="Seconds between sweeps for expired outputs")
+    GEOMETRY_CACHE_ENABLED: bool = Field(default=True, description="Reuse STLs for scripts with an identical AST")
+    GEOMETRY_CACHE_MAX_BYTES: int = Field(default=512 * 1024 * 1024, description="Maximum total size of cached geometry artifacts")
+    DRY_RUN_ENABLED: bool = Field(default=True, description="Run validated scripts against a mock FreeCAD/Part API before FreeCAD and reject certain failures")
+    DRY_RUN_MAX_ITERATIONS: int = Field(default=100000, description="Loop iterations after which a dry run stops as inconclusive")
+    DRY_RUN_TIMEOUT: float = Field(default=0.5, description="Seconds after which a dry run stops as inconclusive")
+    DRY_RUN_WORKERS: int = Field(default=2, description="Warm worker processes dry runs execute in, isolated from the server process")
+    BOOLEAN_BATCHING: bool = Field(default=True, description="Rewrite loops of acc = acc.cut(tool) / acc.fuse(tool) into one batched boolean")
+    BOOLEAN_BATCHING_VERIFY: bool = Field(default=True, description="Check batched booleans against the volumes and bounding boxes of their operands and apply the tools one by one if the result is implausible (false = volume sanity check only)")
+    BOOLEAN_BATCHING_TOLERANCE: float = Field(default=1e-6, description="Relative tolerance of the batched boolean checks")
+    CHECKPOINTS_ENABLED: bool = Field(default=True, description="Save intermediate namespaces so scripts sharing a statement prefix resume from it")
+    CHECKPOINTS_PER_SCRIPT: int = Field(default=3, description="Checkpoints saved per execution, at the deepest top-level statement boundaries")
+    CHECKPOINT_MAX_BYTES: int = Field(default=256 * 1024 * 1024, description="Maximum total size of stored checkpoints")
     MAX_SCRIPT_LENGTH: int = Field(default=2000, description="Maximum allowed lines for generated Python script")
 
+    # Scheduling / backpressure
+    LLM_MAX_CONCURRENCY: int = Field(default=2, description="Maximum concurrent LLM calls")
+    EXECUTOR_MAX_CONCURRENCY: int = Field(default=0, description="Maximum concurrent FreeCAD runs of cheap scripts (0 = the pool workers not reserved for heavy scripts)")
+    COST_HEAVY_THRESHOLD: float = Field(default=100.0, description="Estimated script cost from which execution goes to the separate heavy queue")
+    COST_REJECT_THRESHOLD: float = Field(default=2000.0, description="Estimated script cost above which scripts are rejected before execution (0 = never)")
+    HEAVY_EXECUTOR_MAX_CONCURRENCY: int = Field(default=1, description="Maximum concurrent FreeCAD runs of heavy scripts; this many pool workers are reserved for them")
+    STAGE_MAX_WAITING: int = Field(default=32, description="Requests allowed to wait per stage before answering 429")
+    JOBS_MAX_QUEUED: int = Field(default=100, description="Maximum queued jobs before POST /api/jobs answers 429")
+    JOBS_WORKERS: int = Field(default=4, description="Jobs processed concurrently by the job queue")
+    BATCH_MAX_ITEMS: int = Field(default=200, description="Maximum prompts per /api/generate/batch call")
+    BATCH_CONCURRENCY: int = Field(default=4, description="Distinct batch prompts processed in parallel")
+    JOBS_RESULT_TTL: int = Field(default=3600, description="Seconds finished job results are kept")
+    COALESCING_ENABLED: bool = Field(default=True, description="Let identical concurrent generations and executions share one in-flight run")
+
+    # Startup
+    WARMUP_PRELOAD_LLM: bool = Field(default=True, description="Ask Ollama to load LLM_MODEL into memory during background warmup")
+
     # RAG
     ENABLE_RAG: bool = Field(default=True, description="Enable RAG context injection")
     CHROMA_DB_DIR: str = Field(default="./chroma_db", description="Directory for ChromaDB persistence")
     RAG_DOCS_DIR: str = Field(default="./rag_docs", description="Directory containing source markdown docs for RAG")
+    RAG_INGEST_ON_STARTUP: bool = Field(default=True, description="Index new/changed docs from RAG_DOCS_DIR in the background at startup")
+    RAG_EMBED_BATCH_SIZE: int = Field(default=32, description="Chunks embedded per batch during RAG ingestion")
+    RAG_QUERY_CACHE_SIZE: int = Field(default=1024, description="Query embeddings kept in the in-memory LRU")
 
     # Security / Logging
     LOG_LEVEL: str = Field(default="INFO", description="Logging level (DEBUG, INFO, WARNING, ERROR)")
+    LOG_TRACE_IDS: bool = Field(default=False, description="Prefix log lines with the id of the request they belong to")
+
+    # Metrics
+    METRICS_ENABLED: bool = Field(default=True, description="Serve Prometheus metrics at /api/metrics and add Server-Timing headers")
 
     model_config = SettingsConfigDict(env_file=".env", env_file_encoding="utf-8", extra="ignore")
 
@@ -43,11 +43,24 @@ class LLMError(CopilotException):
     def __init__(self, message: str, details: Optional[str] = None):
         super().__init__("llm_error", message, "ERR_LLM", 502, details)
 
-async def copilot_exception_handler(request: Request, exc: CopilotException):
-    logger.error(f"[{exc.error_type.upper()}] {exc.message} | Details: {exc.details}")
-    return JSONResponse(
-        status_code=exc.status_code,
-        content=ErrorResponse(
+class CircuitOpenError(LLMError):
+    """Raised without contacting an LLM backend whose circuit breaker is open."""
+    def __init__(self, message: str, retry_after: int = 5, details: Optional[str] = None):
+        super().__init__(message, details)
+        self.status_code = 503
+        self.retry_after = retry_after
+        self.headers = {"Retry-After": str(retry_after)}
+
+class QueueFullError(CopilotException):
+    def __init__(self, message: str, retry_after: int = 5, details: Optional[str] = None):
+        super().__init__("queue_full", message, "ERR_QUEUE_FULL", 429, details)
+        self.retry_after = retry_after
+        self.headers = {"Retry-After": str(retry_after)}
+
+def build_error_response(exc: Exception) -> ErrorResponse:
+    """Serializes any exception into the standard error body (also used for streamed errors)."""
+    if isinstance(exc, CopilotException):
+        return ErrorResponse(
             status="error",
             code=exc.code,
             error=ErrorDetail(
@@ -55,20 +68,28 @@ async def copilot_exception_handler(request: Request, exc: CopilotException):
                 message=exc.message,
                 details=exc.details
             )
-        ).model_dump()
+        )
+    return ErrorResponse(
+        status="error",
+        code="ERR_INTERNAL",
+        error=ErrorDetail(
+            type="internal_error",
+            message="An unexpected server error occurred.",
+            details=str(exc)  # Expose for debugging
+        )
+    )
+
+async def copilot_exception_handler(request: Request, exc: CopilotException):
+    logger.error(f"[{exc.error_type.upper()}] {exc.message} | Details: {exc.details}")
+    return JSONResponse(
+        status_code=exc.status_code,
+        content=build_error_response(exc).model_dump(),
+        headers=getattr(exc, "headers", None)
     )
 
 async def generic_exception_handler(request: Request, exc: Exception):
     logger.critical(f"Unhandled Exception: {str(exc)}", exc_info=True)
     return JSONResponse(
         status_code=500,
-        content=ErrorResponse(
-            status="error",
-            code="ERR_INTERNAL",
-            error=ErrorDetail(
-                type="internal_error",
-                message="An unexpected server error occurred.",
-                details=str(exc)  # Expose for debugging
-            )
-        ).model_dump()
+        content=build_error_response(exc).model_dump()
     )
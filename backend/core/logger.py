@@ -1,6 +1,16 @@
 import logging
 import sys
 from .config import settings
+from .metrics import current_trace_id
+
+
+class TraceIdFilter(logging.Filter):
+    """Adds the current request's trace id (or `-`) to each record."""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.trace_id = current_trace_id()
+        return True
+
 
 def setup_logger(name: str) -> logging.Logger:
     """Configure and return a structured logger."""
@@ -15,10 +25,12 @@ def setup_logger(name: str) -> logging.Logger:
         handler.setLevel(level)
 
         # Structured formatting
-        formatter = logging.Formatter(
-            '%(asctime)s - [%(levelname)s] - %(name)s - %(message)s',
-            datefmt='%Y-%m-%d %H:%M:%S'
-        )
+        if settings.LOG_TRACE_IDS:
+            handler.addFilter(TraceIdFilter())
+            log_format = '%(asctime)s - [%(levelname)s] - [%(trace_id)s] - %(name)s - %(message)s'
+        else:
+            log_format = '%(asctime)s - [%(levelname)s] - %(name)s - %(message)s'
+        formatter = logging.Formatter(log_format, datefmt='%Y-%m-%d %H:%M:%S')
         handler.setFormatter(formatter)
         logger.addHandler(handler)
 
@@ -0,0 +1,184 @@
+import time
+import uuid
+import contextlib
+import contextvars
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+# Seconds; covers cache hits (milliseconds) up to slow LLM calls and FreeCAD runs
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0)
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_value(value: float) -> str:
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+
+class Counter:
+    def __init__(self, name: str, documentation: str, labels: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labels = tuple(labels)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1.0, **labels: str):
+        key = tuple(str(labels.get(name, "")) for name in self.labels)
+        self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels: str) -> float:
+        return self._values.get(tuple(str(labels.get(name, "")) for name in self.labels), 0.0)
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} counter"]
+        for key, value in sorted(self._values.items()):
+            lines.append(f"{self.name}{_format_labels(self.labels, key)} {_format_value(value)}")
+        return lines
+
+
+class Histogram:
+    def __init__(self, name: str, documentation: str, labels: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labels = tuple(labels)
+        self.buckets = tuple(sorted(buckets))
+        # Per label set: [count per bucket (not cumulative), sum, count]
+        self._series: Dict[Tuple[str, ...], list] = {}
+
+    def observe(self, value: float, **labels: str):
+        key = tuple(str(labels.get(name, "")) for name in self.labels)
+        series = self._series.get(key)
+        if series is None:
+            series = self._series[key] = [[0] * len(self.buckets), 0.0, 0]
+        for index, bound in enumerate(self.buckets):
+            if value <= bound:
+                series[0][index] += 1
+                break
+        series[1] += value
+        series[2] += 1
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        for key, (counts, total, count) in sorted(self._series.items()):
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                labels = _format_labels(self.labels, key, f'le="{_format_value(bound)}"')
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            inf = _format_labels(self.labels, key, 'le="+Inf"')
+            lines.append(f"{self.name}_bucket{inf} {count}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labels, key)} {_format_value(round(total, 6))}")
+            lines.append(f"{self.name}_count{_format_labels(self.labels, key)} {count}")
+        return lines
+
+
+class RequestTrace:
+    """Stage timings of one HTTP request, for its Server-Timing header and log lines."""
+
+    def __init__(self, trace_id: str):
+        self.trace_id = trace_id
+        self.started = time.perf_counter()
+        self.stages: Dict[str, float] = {}
+
+    def add(self, stage: str, seconds: float):
+        # Repeated stages (retries, speculative candidates) are summed
+        self.stages[stage] = self.stages.get(stage, 0.0) + seconds
+
+    def server_timing(self) -> str:
+        entries = [f"{stage};dur={seconds * 1000:.1f}" for stage, seconds in self.stages.items()]
+        entries.append(f"total;dur={(time.perf_counter() - self.started) * 1000:.1f}")
+        return ", ".join(entries)
+
+
+_current_trace: contextvars.ContextVar[Optional[RequestTrace]] = contextvars.ContextVar("cad_copilot_trace", default=None)
+
+
+def new_trace_id() -> str:
+    return uuid.uuid4().hex[:16]
+
+
+def bind_trace(trace: RequestTrace) -> contextvars.Token:
+    """Makes `trace` the current request's trace; tasks created from here on inherit it."""
+    return _current_trace.set(trace)
+
+
+def unbind_trace(token: contextvars.Token):
+    _current_trace.reset(token)
+
+
+def current_trace() -> Optional[RequestTrace]:
+    return _current_trace.get()
+
+
+def current_trace_id() -> str:
+    trace = _current_trace.get()
+    return trace.trace_id if trace is not None else "-"
+
+
+class Metrics:
+    """
+    Process-wide Prometheus counters and histograms, rendered by /api/metrics in
+    the text exposition format. Everything runs on the event loop (or in threads
+    that only increment), so there is no locking.
+    """
+
+    def __init__(self):
+        self.http_requests = Counter("cad_copilot_http_requests_total", "HTTP requests by route and status.", ("method", "route", "status"))
+        self.http_seconds = Histogram("cad_copilot_http_request_seconds", "Time until the response headers were sent.", ("method", "route"))
+        self.stage_seconds = Histogram("cad_copilot_stage_seconds", "Duration of one pipeline stage.", ("stage",))
+        self.queue_wait_seconds = Histogram("cad_copilot_queue_wait_seconds", "Time spent waiting for a scheduler slot or a FreeCAD pool worker.", ("stage",))
+        self.llm_attempts = Counter("cad_copilot_llm_attempts_total", "LLM HTTP calls, retries included.", ("provider",))
+        self.llm_errors = Counter("cad_copilot_llm_errors_total", "LLM calls that failed after all retries.", ("provider",))
+        self.llm_fallbacks = Counter("cad_copilot_llm_fallbacks_total", "Requests answered by the OpenAI fallback after Ollama failed.")
+        self.llm_ttft_seconds = Histogram("cad_copilot_llm_ttft_seconds", "LLM time to first token.", ("provider",))
+        self.llm_short_circuits = Counter("cad_copilot_llm_short_circuits_total", "LLM calls rejected by an open circuit breaker without contacting the backend.", ("provider",))
+        self.circuit_transitions = Counter("cad_copilot_circuit_transitions_total", "Circuit breaker state changes by backend and new state.", ("provider", "state"))
+        self.cache_lookups = Counter("cad_copilot_cache_lookups_total", "LLM and geometry cache lookups by result.", ("cache", "result"))
+        self.coalesced_requests = Counter("cad_copilot_coalesced_requests_total", "Requests that joined an identical in-flight generation or execution.", ("stage",))
+        self.coalesce_takeovers = Counter("cad_copilot_coalesce_takeovers_total", "Coalesced requests that re-ran the work after their leader was cancelled.", ("stage",))
+        self._all = [
+            self.http_requests, self.http_seconds, self.stage_seconds, self.queue_wait_seconds, self.llm_attempts,
+            self.llm_errors, self.llm_fallbacks, self.llm_ttft_seconds, self.llm_short_circuits, self.circuit_transitions,
+            self.cache_lookups, self.coalesced_requests, self.coalesce_takeovers,
+        ]
+
+    @contextlib.contextmanager
+    def timed(self, stage: str) -> Iterator[None]:
+        """
+        Times a block (or, as a decorator, a sync function) as one pipeline stage:
+        observed in `cad_copilot_stage_seconds` and added to the request's trace.
+        """
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe_stage(stage, time.perf_counter() - started)
+
+    def observe_stage(self, stage: str, seconds: float):
+        self.stage_seconds.observe(seconds, stage=stage)
+        trace = _current_trace.get()
+        if trace is not None:
+            trace.add(stage, seconds)
+
+    def observe_queue_wait(self, stage: str, seconds: float):
+        self.queue_wait_seconds.observe(seconds, stage=stage)
+        trace = _current_trace.get()
+        if trace is not None:
+            trace.add(f"{stage}_wait", seconds)
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._all:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+metrics = Metrics()
@@ -1,7 +1,5 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.staticfiles import StaticFiles
-import uvicorn
 import os
 import contextlib
 import sys
@@ -13,17 +11,82 @@ if sys.platform == "win32":
 from core.config import settings
 from core.logger import setup_logger
 from core.errors import CopilotException, copilot_exception_handler, generic_exception_handler
-from api.routes import router
+from api.routes import router, SYSTEM_PROMPT
+from api.static_files import PrecompressedStaticFiles
+from api.tracing import TracingMiddleware
 from services.rag import rag_service
+from services.rag_ingest import rag_ingestor
+from services.executor import executor
+from services.llm import llm_service
+from services.jobs import job_manager
+from services.storage import output_storage
+from services.geometry_cache import geometry_cache
+from services.warmup import warmup
+from services.health import health_supervisor
+from services.dry_run import dry_runner
 
 logger = setup_logger("cad_copilot.main")
 
+async def _warm_rag():
+    # Importing chromadb, opening the collection and loading the ONNX model take seconds
+    await asyncio.to_thread(rag_service.initialize)
+    if not rag_service.initialized:
+        raise RuntimeError("RAG index failed to initialize")
+    if settings.RAG_INGEST_ON_STARTUP:
+        rag_ingestor.start_background(rag_service.collection)
+    await asyncio.to_thread(rag_service.warm_embeddings)
+    return f"{rag_service.check_health()['document_count']} documents"
+
+async def _warm_llm():
+    # Prefilling the system prompt leaves it in Ollama's KV cache for the first request
+    await llm_service.preload(SYSTEM_PROMPT)
+    return f"model '{llm_service.primary.model}' loaded, system prompt prefilled"
+
+async def _warm_executor():
+    await executor.start()
+    stats = executor.get_pool_stats()
+    return f"{stats['size']} warm workers" if stats else "worker pool disabled"
+
+async def _warm_dry_run():
+    await dry_runner.start()
+    return f"{dry_runner.workers} dry-run workers"
+
 @contextlib.asynccontextmanager
 async def lifespan(app: FastAPI):
     logger.info("Starting CAD Copilot Backend...")
-    rag_service.initialize()
+    await llm_service.start()
+    await job_manager.start()
+    await output_storage.start()
+
+    # Slow initialization runs in the background; /api/ready reports progress
+    if settings.ENABLE_RAG:
+        warmup.add("rag", _warm_rag)
+    else:
+        warmup.disable("rag", "ENABLE_RAG is false")
+    if settings.WARMUP_PRELOAD_LLM:
+        warmup.add("llm", _warm_llm)
+    else:
+        warmup.disable("llm", "WARMUP_PRELOAD_LLM is false")
+    warmup.add("executor", _warm_executor)
+    if settings.DRY_RUN_ENABLED:
+        warmup.add("dry_run", _warm_dry_run)
+    else:
+        warmup.disable("dry_run", "DRY_RUN_ENABLED is false")
+    warmup.start()
+
+    # /api/status reads cached probe results; failed probes also open Ollama's circuit
+    health_supervisor.add("ollama", llm_service.primary.check_health, llm_service.primary.breaker)
+    await health_supervisor.start()
     yield
     logger.info("Shutting down CAD Copilot Backend...")
+    await health_supervisor.shutdown()
+    await warmup.shutdown()
+    await output_storage.shutdown()
+    await job_manager.shutdown()
+    await geometry_cache.shutdown()
+    await executor.shutdown()
+    await dry_runner.shutdown()
+    await llm_service.close()
 
 app = FastAPI(title="AI CAD Copilot API", version="1.0.0", lifespan=lifespan)
 
@@ -36,6 +99,9 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Outermost: trace ids and Server-Timing cover everything below, CORS included
+app.add_middleware(TracingMiddleware)
+
 # Exception Handlers
 app.add_exception_handler(CopilotException, copilot_exception_handler)
 app.add_exception_handler(Exception, generic_exception_handler)
@@ -46,13 +112,15 @@ app.include_router(router, prefix="/api")
 # Serve output files securely
 # Ensure the directory exists before mounting
 os.makedirs(settings.OUTPUT_DIR, exist_ok=True)
-app.mount("/outputs", StaticFiles(directory=settings.OUTPUT_DIR), name="outputs")
+app.mount("/outputs", PrecompressedStaticFiles(directory=settings.OUTPUT_DIR), name="outputs")
 
 if __name__ == "__main__":
+    import uvicorn
+
     uvicorn.run(
         "main:app",
         host=settings.API_HOST,
         port=settings.API_PORT,
         reload=True,
-        reload_excludes=["outputs/*", "chroma_db/*", "*.stl", "*.pyc"],
+        reload_excludes=["outputs/*", "outputs/*/*", "chroma_db/*", "*.stl", "*.stl.gz", "*.stl.br", "*.pyc"],
     )
@@ -0,0 +1,241 @@
+import os
+import ast
+import hashlib
+from collections import OrderedDict
+from typing import List, Optional
+from core.config import settings
+from core.logger import setup_logger
+
+logger = setup_logger("cad_copilot.checkpoints")
+
+# Bump when the checkpoint file format or the prelude below changes
+CHECKPOINT_FORMAT_VERSION = 2
+
+# Prepended to scripts that save or restore checkpoints. A checkpoint is the
+# script's module namespace after a top-level statement, pickled with every
+# Part.Shape replaced by its BRep text. Modules, functions and classes (including
+# the helpers below) are not stored: the prefix's import/def/class statements
+# are re-run on restore. The modules the helpers need live only in their closure,
+# so the script's globals gain nothing but the two functions, whose `_cad_` names
+# validate_script reserves.
+CHECKPOINT_PRELUDE = """
+def _cad_checkpoint_helpers():
+    import io
+    import os
+    import types
+    import pickle
+    import Part
+
+    class CadPickler(pickle.Pickler):
+        def persistent_id(self, obj):
+            if isinstance(obj, Part.Shape):
+                return ('brep', type(obj).__name__, obj.exportBrepToString())
+            return None
+
+    class CadUnpickler(pickle.Unpickler):
+        def persistent_load(self, pid):
+            _, type_name, brep = pid
+            shape = Part.Shape()
+            shape.importBrepFromString(brep)
+            # Restore the concrete subclass (Solid, Face, ...) where Part can rewrap it
+            if type_name != 'Shape' and hasattr(Part, type_name):
+                try:
+                    shape = getattr(Part, type_name)(shape)
+                except Exception:
+                    pass
+            return shape
+
+    def checkpoint(path, namespace):
+        state = {{}}
+        for name, value in namespace.items():
+            if name.startswith('__'):
+                continue
+            if isinstance(value, (types.ModuleType, types.FunctionType, type)):
+                continue
+            state[name] = value
+        buffer = io.BytesIO()
+        try:
+            CadPickler(buffer, protocol={protocol}).dump(state)
+        except Exception as error:
+            # Unpicklable state (documents, generators, ...): run on without this checkpoint
+            print('checkpoint skipped: %s' % error)
+            return
+        with open(path + '.tmp', 'wb') as checkpoint_file:
+            checkpoint_file.write(buffer.getvalue())
+        os.replace(path + '.tmp', path)
+
+    def restore(path, namespace):
+        with open(path, 'rb') as checkpoint_file:
+            namespace.update(CadUnpickler(checkpoint_file).load())
+
+    return checkpoint, restore
+
+_cad_checkpoint, _cad_restore = _cad_checkpoint_helpers()
+del _cad_checkpoint_helpers
+
+"""
+
+_DEFINITIONS = (ast.Import, ast.ImportFrom, ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)
+
+
+class ExecutionPlan:
+    """How one script runs: from the start or resumed after `resume_at` statements."""
+
+    def __init__(self, statements: List[ast.stmt], hashes: List[str]):
+        self.statements = statements
+        self.hashes = hashes  # hashes[i] identifies the prefix statements[:i + 1]
+        self.resume_at = 0
+        self.save_at: List[int] = []  # Save after statements[:i] for each i
+
+    @property
+    def resumed(self) -> bool:
+        return self.resume_at > 0
+
+    def describe(self) -> Optional[dict]:
+        if not self.resumed:
+            return None
+        return {
+            "statements": self.resume_at,
+            "total_statements": len(self.statements),
+            "checkpoint": self.hashes[self.resume_at - 1][:12],
+        }
+
+
+class CheckpointStore:
+    """
+    Byte-bounded LRU of namespace checkpoints under `<OUTPUT_DIR>/checkpoints/`.
+
+    Checkpoints are keyed by a hash chain over the script's top-level statements
+    (their AST, so formatting and comments do not matter). Any later script that
+    starts with the same statements, typically a refinement that only changes the
+    tail, resumes from the deepest stored prefix and runs just the suffix.
+    """
+
+    def __init__(self):
+        self.enabled = settings.CHECKPOINTS_ENABLED
+        self.max_bytes = settings.CHECKPOINT_MAX_BYTES
+        self.per_script = max(0, settings.CHECKPOINTS_PER_SCRIPT)
+        self.directory = os.path.join(settings.OUTPUT_DIR, "checkpoints")
+        self._entries: "OrderedDict[str, int]" = OrderedDict()
+        self._bytes = 0
+        self.stats = {"resumed": 0, "statements_skipped": 0, "saved": 0, "evictions": 0, "invalidated": 0}
+        if self.enabled:
+            os.makedirs(self.directory, exist_ok=True)
+            self._load()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, f"{key}.pkl")
+
+    def _load(self):
+        # Oldest first, so the LRU order survives restarts approximately
+        files = []
+        for entry in os.scandir(self.directory):
+            if entry.name.endswith(".pkl") and entry.is_file():
+                st = entry.stat()
+                files.append((st.st_mtime, entry.name[:-len(".pkl")], st.st_size))
+        for _, key, size in sorted(files):
+            self._entries[key] = size
+            self._bytes += size
+        self._evict()
+
+    def plan(self, code: str, allow_resume: bool = True) -> Optional[ExecutionPlan]:
+        """Returns None when the script should just run as-is."""
+        if not self.enabled:
+            return None
+        try:
+            tree = ast.parse(code)
+        except SyntaxError:
+            return None
+        statements = tree.body
+        if len(statements) < 2:
+            return None
+
+        hashes, digest = [], f"v{CHECKPOINT_FORMAT_VERSION}"
+        for statement in statements:
+            digest = hashlib.sha256(f"{digest}\n{ast.dump(statement)}".encode("utf-8")).hexdigest()
+            hashes.append(digest)
+
+        plan = ExecutionPlan(statements, hashes)
+        if allow_resume:
+            # Deepest stored prefix that still leaves statements to run
+            for index in range(len(statements) - 1, 0, -1):
+                if hashes[index - 1] in self._entries and os.path.exists(self._path(hashes[index - 1])):
+                    plan.resume_at = index
+                    self._entries.move_to_end(hashes[index - 1])
+                    break
+
+        # Save the deepest boundaries of the part that actually runs: refinements
+        # usually keep everything but the last few statements
+        candidates = [
+            index for index in range(len(statements) - 1, plan.resume_at, -1)
+            if not isinstance(statements[index - 1], _DEFINITIONS) and hashes[index - 1] not in self._entries
+        ]
+        plan.save_at = sorted(candidates[:self.per_script])
+        if not plan.resumed and not plan.save_at:
+            return None
+        return plan
+
+    def render(self, plan: ExecutionPlan) -> str:
+        """Builds the script body (without the export snippet) for a plan."""
+        lines = [CHECKPOINT_PRELUDE.format(protocol=4)]
+        if plan.resumed:
+            definitions = [s for s in plan.statements[:plan.resume_at] if isinstance(s, _DEFINITIONS)]
+            lines.extend(ast.unparse(s) for s in definitions)
+            lines.append(f"_cad_restore({self._path(plan.hashes[plan.resume_at - 1]).replace(chr(92), '/')!r}, globals())")
+        for index in range(plan.resume_at, len(plan.statements)):
+            lines.append(ast.unparse(plan.statements[index]))
+            if index + 1 in plan.save_at:
+                lines.append(f"_cad_checkpoint({self._path(plan.hashes[index]).replace(chr(92), '/')!r}, globals())")
+        return "\n".join(lines) + "\n"
+
+    def commit(self, plan: ExecutionPlan):
+        """Indexes the checkpoints a successful run wrote and records reuse."""
+        if plan.resumed:
+            self.stats["resumed"] += 1
+            self.stats["statements_skipped"] += plan.resume_at
+        for index in plan.save_at:
+            key = plan.hashes[index - 1]
+            try:
+                size = os.path.getsize(self._path(key))
+            except OSError:
+                continue  # Skipped inside FreeCAD (unpicklable namespace)
+            self._bytes += size - self._entries.get(key, 0)
+            self._entries[key] = size
+            self._entries.move_to_end(key)
+            self.stats["saved"] += 1
+        self._evict()
+
+    def invalidate(self, plan: ExecutionPlan):
+        """Drops the checkpoint a failed resumed run started from."""
+        if plan.resumed:
+            self._drop(plan.hashes[plan.resume_at - 1])
+            self.stats["invalidated"] += 1
+
+    def _drop(self, key: str):
+        size = self._entries.pop(key, None)
+        if size is None:
+            return
+        self._bytes -= size
+        try:
+            os.remove(self._path(key))
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            logger.warning(f"Failed to delete checkpoint {key[:12]}: {e}")
+
+    def _evict(self):
+        while self._bytes > self.max_bytes and self._entries:
+            self._drop(next(iter(self._entries)))
+            self.stats["evictions"] += 1
+
+    def get_stats(self) -> dict:
+        return {
+            "enabled": self.enabled,
+            "entries": len(self._entries),
+            "bytes": self._bytes,
+            "max_bytes": self.max_bytes,
+            **self.stats,
+        }
+
+
+checkpoint_store = CheckpointStore()
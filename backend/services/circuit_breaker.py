@@ -0,0 +1,154 @@
+import math
+import time
+import contextlib
+from collections import deque
+from typing import Deque, Iterator, Optional, Tuple
+from core.config import settings
+from core.errors import CircuitOpenError
+from core.logger import setup_logger
+from core.metrics import metrics
+
+logger = setup_logger("cad_copilot.circuit_breaker")
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitBreaker:
+    """
+    Circuit breaker over the outcomes of one LLM backend's most recent calls.
+
+    - closed: calls go through. Once the window holds LLM_BREAKER_MIN_CALLS outcomes,
+      an error rate or slow-call rate at or above its threshold opens the circuit.
+    - open: calls fail at once with CircuitOpenError, so callers move on to the other
+      backend instead of sitting through retries and read timeouts.
+    - half_open: after LLM_BREAKER_OPEN_SECONDS, or earlier when a health probe
+      succeeds, one trial call goes through. Success closes the circuit; failure
+      (or a slow call) opens it again.
+
+    Every HTTP attempt is one call, retries included. Cancelled calls are not counted.
+    """
+
+    def __init__(self, provider: str):
+        self.provider = provider
+        self.enabled = settings.LLM_BREAKER_ENABLED
+        self.min_calls = max(1, settings.LLM_BREAKER_MIN_CALLS)
+        self.error_rate = settings.LLM_BREAKER_ERROR_RATE
+        self.slow_call_seconds = settings.LLM_BREAKER_SLOW_CALL_SECONDS
+        self.slow_call_rate = settings.LLM_BREAKER_SLOW_CALL_RATE
+        self.open_seconds = settings.LLM_BREAKER_OPEN_SECONDS
+        self.state = CLOSED
+        self.reason: Optional[str] = None
+        # (failed, slow) per call, newest last
+        self._window: Deque[Tuple[bool, bool]] = deque(maxlen=max(self.min_calls, settings.LLM_BREAKER_WINDOW))
+        self._opened_at = 0.0
+        self._trial_running = False
+        self.stats = {"opened": 0, "short_circuited": 0}
+
+    def retry_after(self) -> float:
+        """Seconds until an open circuit lets a trial call through."""
+        if self.state != OPEN:
+            return 0.0
+        return max(0.0, self._opened_at + self.open_seconds - time.monotonic())
+
+    def allow(self) -> bool:
+        if not self.enabled or self.state == CLOSED:
+            return True
+        if self.state == OPEN and self.retry_after() <= 0:
+            self._transition(HALF_OPEN, "cool-down elapsed")
+        if self.state == HALF_OPEN and not self._trial_running:
+            self._trial_running = True
+            return True
+        return False
+
+    @contextlib.contextmanager
+    def guard(self) -> Iterator[None]:
+        """
+        Wraps one call to the backend: raises CircuitOpenError without running the
+        block while the circuit is open, and records the block's outcome otherwise.
+        """
+        if not self.allow():
+            self.stats["short_circuited"] += 1
+            metrics.llm_short_circuits.inc(provider=self.provider)
+            raise CircuitOpenError(
+                f"LLM backend '{self.provider}' is unavailable (circuit open).",
+                retry_after=math.ceil(self.retry_after()) or 1,
+                details=self.reason,
+            )
+        trial = self.state == HALF_OPEN
+        started = time.monotonic()
+        try:
+            yield
+        except Exception as e:
+            self._record(True, False, trial, f"{type(e).__name__}: {e}")
+            raise
+        except BaseException:
+            # Cancelled (a losing speculative candidate, a client that went away)
+            if trial:
+                self._trial_running = False
+            raise
+        else:
+            elapsed = time.monotonic() - started
+            slow = 0 < self.slow_call_seconds <= elapsed
+            self._record(False, slow, trial, f"call took {elapsed:.1f}s")
+
+    def _record(self, failed: bool, slow: bool, trial: bool, detail: str):
+        if trial:
+            self._trial_running = False
+            if failed or slow:
+                self._open(f"trial call failed ({detail})")
+            else:
+                self._window.clear()
+                self._transition(CLOSED, "trial call succeeded")
+            return
+        if self.state != CLOSED:
+            # Started before the circuit opened; the trial call decides from here
+            return
+
+        self._window.append((failed, slow))
+        calls = len(self._window)
+        if calls < self.min_calls:
+            return
+        failures = sum(f for f, _ in self._window) / calls
+        slow_calls = sum(s for _, s in self._window) / calls
+        if failures >= self.error_rate:
+            self._open(f"{failures:.0%} of the last {calls} calls failed, last: {detail}")
+        elif self.slow_call_seconds > 0 and slow_calls >= self.slow_call_rate:
+            self._open(f"{slow_calls:.0%} of the last {calls} calls took over {self.slow_call_seconds:g}s")
+
+    def _open(self, reason: str):
+        self._opened_at = time.monotonic()
+        self._window.clear()
+        self.stats["opened"] += 1
+        self._transition(OPEN, reason)
+
+    def _transition(self, state: str, reason: str):
+        self.state = state
+        self.reason = reason if state != CLOSED else None
+        metrics.circuit_transitions.inc(provider=self.provider, state=state)
+        log = logger.info if state == CLOSED else logger.warning
+        log(f"Circuit for '{self.provider}' is now {state}: {reason}")
+
+    def probe_succeeded(self):
+        """A health probe reached the backend: an open circuit may try a call now."""
+        if self.enabled and self.state == OPEN:
+            self._transition(HALF_OPEN, "health probe succeeded")
+
+    def probe_failed(self, detail: str):
+        """A health probe could not reach the backend: stop sending it requests."""
+        if self.enabled and self.state == CLOSED:
+            self._open(f"health probe failed: {detail}")
+
+    def get_stats(self) -> dict:
+        calls = len(self._window)
+        return {
+            "enabled": self.enabled,
+            "state": self.state,
+            "reason": self.reason,
+            "retry_after": round(self.retry_after(), 1),
+            "window_calls": calls,
+            "error_rate": round(sum(f for f, _ in self._window) / calls, 3) if calls else 0.0,
+            "slow_call_rate": round(sum(s for _, s in self._window) / calls, 3) if calls else 0.0,
+            **self.stats,
+        }
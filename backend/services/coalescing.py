@@ -0,0 +1,104 @@
+import time
+import asyncio
+from typing import Awaitable, Callable, Dict, Optional, Tuple, TypeVar
+from core.config import settings
+from core.logger import setup_logger
+from core.metrics import current_trace, metrics
+
+logger = setup_logger("cad_copilot.coalescing")
+
+T = TypeVar("T")
+
+
+class _LeaderCancelled(Exception):
+    """Set on a flight whose leader went away; its followers retry and one of them takes over."""
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent calls that share a key: the first caller (the leader)
+    runs the work, callers arriving while it is in flight await the same result
+    or exception instead of repeating the LLM call or FreeCAD run.
+
+    Followers wait on a shielded future, so a follower going away never affects
+    the others. If the leader is cancelled (client disconnect, cancelled job),
+    its followers wake up and the first of them re-runs the work as the new leader.
+    Nothing is kept once a flight lands: later requests go to the caches.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self.enabled = settings.COALESCING_ENABLED
+        self._flights: Dict[str, asyncio.Future] = {}
+        self.stats = {"leaders": 0, "coalesced": 0, "takeovers": 0}
+
+    async def run(
+        self,
+        key: Optional[str],
+        work: Callable[[], Awaitable[T]],
+        on_join: Optional[Callable[[], Awaitable[None]]] = None,
+    ) -> Tuple[T, bool]:
+        """
+        Returns (result, shared); `shared` is True when the result came from another
+        caller's flight. `on_join` is awaited once if this call joins a flight.
+        A None key (or COALESCING_ENABLED=false) runs the work uncoalesced.
+        """
+        if not self.enabled or key is None:
+            return await work(), False
+
+        joined_at: Optional[float] = None
+        while key in self._flights:
+            flight = self._flights[key]
+            if joined_at is None:
+                joined_at = time.perf_counter()
+                self.stats["coalesced"] += 1
+                metrics.coalesced_requests.inc(stage=self.name)
+                logger.info(f"Joined in-flight {self.name} ({key[:12]})")
+                if on_join is not None:
+                    await on_join()
+            try:
+                result = await asyncio.shield(flight)
+            except _LeaderCancelled:
+                continue
+            self._trace_wait(joined_at)
+            return result, True
+
+        if joined_at is not None:
+            self.stats["takeovers"] += 1
+            metrics.coalesce_takeovers.inc(stage=self.name)
+            logger.info(f"Leader of {self.name} ({key[:12]}) went away; taking over")
+            self._trace_wait(joined_at)
+
+        self.stats["leaders"] += 1
+        flight = asyncio.get_running_loop().create_future()
+        self._flights[key] = flight
+        try:
+            result = await work()
+        except Exception as exc:
+            flight.set_exception(exc)
+            raise
+        except BaseException:
+            flight.set_exception(_LeaderCancelled())
+            raise
+        else:
+            flight.set_result(result)
+            return result, False
+        finally:
+            if self._flights.get(key) is flight:
+                del self._flights[key]
+            if flight.done() and not flight.cancelled():
+                # Marks the exception retrieved: a flight nobody joined must not log a warning
+                flight.exception()
+
+    def _trace_wait(self, joined_at: float):
+        trace = current_trace()
+        if trace is not None:
+            trace.add(f"{self.name}_coalesced", time.perf_counter() - joined_at)
+
+    def get_stats(self) -> dict:
+        return {"enabled": self.enabled, "in_flight": len(self._flights), **self.stats}
+
+
+# One flight table per pipeline level: whole generations, and executions of a canonical script
+generation_flights = SingleFlight("generation")
+execution_flights = SingleFlight("execution")
@@ -0,0 +1,1509 @@
+import os
+import ast
+import sys
+import json
+import math
+import time
+import uuid
+import types
+import asyncio
+import builtins
+import tempfile
+import subprocess
+import difflib
+import operator
+import importlib
+from typing import Dict, List, Optional, Tuple
+from core.config import settings
+from core.logger import setup_logger
+from core.errors import ValidationError
+from services.validator import BANNED_BUILTINS
+
+logger = setup_logger("cad_copilot.dry_run")
+
+SCRIPT_FILENAME = "<dry-run>"
+CONFUSION = 1e-7  # OpenCASCADE's Precision::Confusion()
+MISSPELLING_CUTOFF = 0.85
+
+# Real modules scripts may import. Each run gets a private view exposing only these
+# public, non-module names, so no reference leads back to os, sys or the server.
+# Anything else (Draft, Mesh, numpy, other attributes, ...) ends the dry run as inconclusive.
+REAL_MODULES = {
+    "math": (
+        "acos", "acosh", "asin", "asinh", "atan", "atan2", "atanh", "cbrt", "ceil", "comb", "copysign", "cos",
+        "cosh", "degrees", "dist", "e", "erf", "erfc", "exp", "exp2", "expm1", "fabs", "factorial", "floor",
+        "fmod", "frexp", "fsum", "gamma", "gcd", "hypot", "inf", "isclose", "isfinite", "isinf", "isnan",
+        "isqrt", "lcm", "ldexp", "lgamma", "log", "log10", "log1p", "log2", "modf", "nan", "nextafter", "perm",
+        "pi", "pow", "prod", "radians", "remainder", "sin", "sinh", "sqrt", "tan", "tanh", "tau", "trunc", "ulp",
+    ),
+    "cmath": (
+        "acos", "asin", "atan", "cos", "e", "exp", "inf", "infj", "isclose", "isfinite", "isinf", "isnan",
+        "log", "log10", "nan", "nanj", "phase", "pi", "polar", "rect", "sin", "sqrt", "tan", "tau",
+    ),
+    "functools": ("cache", "cmp_to_key", "lru_cache", "partial", "reduce", "total_ordering", "wraps"),
+    "collections": ("ChainMap", "Counter", "OrderedDict", "defaultdict", "deque", "namedtuple"),
+    "random": (
+        "Random", "choice", "choices", "gauss", "normalvariate", "randint", "random", "randrange", "sample",
+        "seed", "shuffle", "triangular", "uniform",
+    ),
+    "statistics": (
+        "fmean", "harmonic_mean", "mean", "median", "median_high", "median_low", "mode", "pstdev",
+        "pvariance", "stdev", "variance",
+    ),
+    "decimal": ("Decimal", "ROUND_CEILING", "ROUND_DOWN", "ROUND_FLOOR", "ROUND_HALF_EVEN", "ROUND_HALF_UP", "ROUND_UP"),
+    "fractions": ("Fraction",),
+    "copy": ("copy", "deepcopy"),
+    # No attrgetter / methodcaller: they read attributes by string, past the AST checks
+    "operator": (
+        "abs", "add", "floordiv", "itemgetter", "mod", "mul", "neg", "pos", "pow", "sub", "truediv",
+    ),
+    "numbers": ("Complex", "Integral", "Number", "Rational", "Real"),
+    # No get_type_hints / ForwardRef: they evaluate strings
+    "typing": (
+        "Any", "Callable", "Dict", "FrozenSet", "Iterable", "List", "NamedTuple", "Optional", "Sequence", "Set",
+        "Tuple", "Union",
+    ),
+    # No Formatter: get_field() resolves attribute paths given as strings
+    "string": (
+        "ascii_letters", "ascii_lowercase", "ascii_uppercase", "capwords", "digits", "hexdigits", "octdigits",
+        "printable", "punctuation", "whitespace",
+    ),
+    "enum": ("Enum", "Flag", "IntEnum", "IntFlag", "auto", "unique"),
+    "dataclasses": ("asdict", "astuple", "dataclass", "field", "fields", "replace"),
+}
+
+# Attribute prefixes that reach frames, code objects and through them any module's globals
+# (e.g. a generator's gi_frame.f_globals); scripts using them are not dry-run
+INTROSPECTION_PREFIXES = ("_", "gi_", "cr_", "ag_", "f_", "tb_", "co_")
+
+# Removed on top of the validator's banned builtins: interactive, allocation-heavy or infinite-iterator builtins
+UNSAFE_BUILTINS = set(BANNED_BUILTINS) | {"input", "breakpoint", "help", "exit", "quit", "iter", "bytes", "bytearray"}
+
+PASSED = "passed"
+FAILED = "failed"
+INCONCLUSIVE = "inconclusive"
+SKIPPED = "skipped"
+
+
+class _Inconclusive(BaseException):
+    """
+    The script left the modelled API surface (or its resource caps); nothing can be
+    concluded. A BaseException so `except Exception` in the script cannot swallow it.
+    """
+
+
+class OCCError(Exception):
+    """Stands in for Part.OCCError: OpenCASCADE refused the operation."""
+
+
+def _fail(exc_type, message: str) -> Exception:
+    """An error the real FreeCAD would raise as well: always fails the dry run."""
+    error = exc_type(message)
+    error.dry_run_definite = True
+    return error
+
+
+def _args(name: str, args: tuple, kwargs: dict, required: int, optional: int = 0) -> tuple:
+    """Positional arity check; keyword arguments are not modelled (FreeCAD's support varies)."""
+    if kwargs:
+        raise _Inconclusive(f"{name}() with keyword arguments is not modelled")
+    if not required <= len(args) <= required + optional:
+        expected = f"{required}" if not optional else f"{required} to {required + optional}"
+        raise _fail(TypeError, f"{name}() takes {expected} arguments ({len(args)} given)")
+    return args + (None,) * (required + optional - len(args))
+
+
+def _number(name: str, value, positive: bool = False, allow_zero: bool = False) -> float:
+    if isinstance(value, (str, bytes)) or value is None:
+        raise _fail(TypeError, f"{name} must be a number, not {type(value).__name__}")
+    try:
+        number = float(value)
+    except (TypeError, ValueError):
+        raise _fail(TypeError, f"{name} must be a number, not {type(value).__name__}")
+    if not math.isfinite(number):
+        raise _fail(OCCError, f"{name} is not finite ({number})")
+    if positive and (number < -CONFUSION if allow_zero else number <= CONFUSION):
+        raise _fail(OCCError, f"{name} must be {'non-negative' if allow_zero else 'positive'}, got {number:g}")
+    return number
+
+
+def _vector(name: str, value, default=None) -> "Vector":
+    if value is None and default is not None:
+        return default
+    if isinstance(value, Vector):
+        return value
+    if isinstance(value, (tuple, list)) and len(value) == 3:
+        return Vector(*(_number(name, v) for v in value))
+    raise _fail(TypeError, f"{name} must be a Vector, not {type(value).__name__}")
+
+
+def _missing(owner: str, name: str, known: set):
+    """Attribute outside the model: a near-miss of a real name is a typo, anything else is unknown."""
+    if name.startswith("__"):
+        return AttributeError(name)
+    if name in known:
+        return _Inconclusive(f"{owner}.{name} is not modelled")
+    match = difflib.get_close_matches(name, known, n=1, cutoff=MISSPELLING_CUTOFF)
+    if match:
+        return _fail(AttributeError, f"'{owner}' has no attribute '{name}' (did you mean '{match[0]}'?)")
+    return _Inconclusive(f"{owner}.{name} is not a known attribute")
+
+
+# FreeCAD.Vector
+
+VECTOR_KNOWN = {
+    "x", "y", "z", "Length", "add", "sub", "multiply", "scale", "dot", "cross", "normalize", "negative",
+    "getAngle", "distanceToPoint", "distanceToLine", "distanceToLineSegment", "distanceToPlane",
+    "projectToLine", "projectToPlane", "isEqual", "isOnLineSegment", "isParallel", "isNormal", "Angle",
+}
+
+
+class Vector:
+    __slots__ = ("x", "y", "z")
+
+    def __init__(self, *args, **kwargs):
+        if kwargs:
+            raise _Inconclusive("Vector() with keyword arguments is not modelled")
+        if len(args) == 1 and isinstance(args[0], (Vector, tuple, list)):
+            args = tuple(_vector("Vector()", args[0]))
+        if len(args) > 3:
+            raise _fail(TypeError, f"Vector() takes at most 3 arguments ({len(args)} given)")
+        coords = [_number("Vector() coordinate", v) for v in args] + [0.0] * (3 - len(args))
+        object.__setattr__(self, "x", coords[0])
+        object.__setattr__(self, "y", coords[1])
+        object.__setattr__(self, "z", coords[2])
+
+    def __getattr__(self, name):
+        raise _missing("Vector", name, VECTOR_KNOWN)
+
+    def __setattr__(self, name, value):
+        if name not in ("x", "y", "z"):
+            raise _missing("Vector", name, VECTOR_KNOWN)
+        object.__setattr__(self, name, _number(f"Vector.{name}", value))
+
+    def __iter__(self):
+        return iter((self.x, self.y, self.z))
+
+    def __len__(self):
+        return 3
+
+    def __getitem__(self, index):
+        return (self.x, self.y, self.z)[index]
+
+    def __add__(self, other):
+        other = _vector("Vector +", other)
+        return Vector(self.x + other.x, self.y + other.y, self.z + other.z)
+
+    def __sub__(self, other):
+        other = _vector("Vector -", other)
+        return Vector(self.x - other.x, self.y - other.y, self.z - other.z)
+
+    def __mul__(self, other):
+        if isinstance(other, Vector):
+            return self.dot(other)
+        k = _number("Vector * factor", other)
+        return Vector(self.x * k, self.y * k, self.z * k)
+
+    __rmul__ = __mul__
+
+    def __truediv__(self, other):
+        k = _number("Vector / divisor", other)
+        if k == 0:
+            raise _fail(ZeroDivisionError, "Vector division by zero")
+        return Vector(self.x / k, self.y / k, self.z / k)
+
+    def __neg__(self):
+        return Vector(-self.x, -self.y, -self.z)
+
+    def __pos__(self):
+        return Vector(self.x, self.y, self.z)
+
+    def __eq__(self, other):
+        return isinstance(other, Vector) and self.isEqual(other, CONFUSION)
+
+    def __hash__(self):
+        raise _Inconclusive("hashing vectors is not modelled")
+
+    def __repr__(self):
+        return f"Vector ({self.x}, {self.y}, {self.z})"
+
+    @property
+    def Length(self):
+        return math.sqrt(self.x ** 2 + self.y ** 2 + self.z ** 2)
+
+    def add(self, other):
+        return self + other
+
+    def sub(self, other):
+        return self - other
+
+    def multiply(self, k):
+        scaled = self * _number("Vector.multiply()", k)
+        self.x, self.y, self.z = scaled.x, scaled.y, scaled.z
+        return self
+
+    def scale(self, *args, **kwargs):
+        kx, ky, kz = (_number("Vector.scale()", v) for v in _args("Vector.scale", args, kwargs, 3))
+        self.x, self.y, self.z = self.x * kx, self.y * ky, self.z * kz
+        return self
+
+    def dot(self, other):
+        other = _vector("Vector.dot()", other)
+        return self.x * other.x + self.y * other.y + self.z * other.z
+
+    def cross(self, other):
+        o = _vector("Vector.cross()", other)
+        return Vector(self.y * o.z - self.z * o.y, self.z * o.x - self.x * o.z, self.x * o.y - self.y * o.x)
+
+    def normalize(self):
+        length = self.Length
+        if length <= CONFUSION:
+            raise _fail(OCCError, "Cannot normalize null vector")
+        self.x, self.y, self.z = self.x / length, self.y / length, self.z / length
+        return self
+
+    def negative(self):
+        return -self
+
+    def getAngle(self, other):
+        other = _vector("Vector.getAngle()", other)
+        denominator = self.Length * other.Length
+        if denominator <= CONFUSION:
+            return math.inf
+        return math.acos(max(-1.0, min(1.0, self.dot(other) / denominator)))
+
+    def distanceToPoint(self, other):
+        return (self - _vector("Vector.distanceToPoint()", other)).Length
+
+    def isEqual(self, other, tolerance=0.0):
+        other = _vector("Vector.isEqual()", other)
+        return (self - other).Length <= _number("tolerance", tolerance)
+
+
+# Bounding boxes
+
+BOUNDBOX_KNOWN = {
+    "XMin", "YMin", "ZMin", "XMax", "YMax", "ZMax", "XLength", "YLength", "ZLength", "Center",
+    "DiagonalLength", "isInside", "isValid", "add", "enlarge", "intersect", "isIntersection", "getPoint",
+    "getEdge", "move", "scale", "transformed", "closestPoint", "getIntersectionPoint", "united",
+    "intersected", "isCutPlane", "setVoid",
+}
+
+
+class BoundBox:
+    """Axis-aligned box; scripts only ever see tight ones (see Shape.BoundBox)."""
+
+    def __init__(self, xmin, ymin, zmin, xmax, ymax, zmax):
+        self.XMin, self.YMin, self.ZMin = xmin, ymin, zmin
+        self.XMax, self.YMax, self.ZMax = xmax, ymax, zmax
+
+    def __getattr__(self, name):
+        raise _missing("BoundBox", name, BOUNDBOX_KNOWN)
+
+    @classmethod
+    def of_points(cls, points: List[Vector]) -> "BoundBox":
+        xs, ys, zs = zip(*((p.x, p.y, p.z) for p in points))
+        return cls(min(xs), min(ys), min(zs), max(xs), max(ys), max(zs))
+
+    def corners(self) -> List[Vector]:
+        return [Vector(x, y, z) for x in (self.XMin, self.XMax) for y in (self.YMin, self.YMax) for z in (self.ZMin, self.ZMax)]
+
+    @property
+    def XLength(self):
+        return self.XMax - self.XMin
+
+    @property
+    def YLength(self):
+        return self.YMax - self.YMin
+
+    @property
+    def ZLength(self):
+        return self.ZMax - self.ZMin
+
+    @property
+    def Center(self):
+        return Vector((self.XMin + self.XMax) / 2, (self.YMin + self.YMax) / 2, (self.ZMin + self.ZMax) / 2)
+
+    @property
+    def DiagonalLength(self):
+        return math.sqrt(self.XLength ** 2 + self.YLength ** 2 + self.ZLength ** 2)
+
+    def united(self, other: "BoundBox") -> "BoundBox":
+        return BoundBox(
+            min(self.XMin, other.XMin), min(self.YMin, other.YMin), min(self.ZMin, other.ZMin),
+            max(self.XMax, other.XMax), max(self.YMax, other.YMax), max(self.ZMax, other.ZMax),
+        )
+
+    def intersected(self, other: "BoundBox") -> Optional["BoundBox"]:
+        box = BoundBox(
+            max(self.XMin, other.XMin), max(self.YMin, other.YMin), max(self.ZMin, other.ZMin),
+            min(self.XMax, other.XMax), min(self.YMax, other.YMax), min(self.ZMax, other.ZMax),
+        )
+        if box.XLength < -CONFUSION or box.YLength < -CONFUSION or box.ZLength < -CONFUSION:
+            return None
+        return box
+
+    def moved(self, v: Vector) -> "BoundBox":
+        return BoundBox(self.XMin + v.x, self.YMin + v.y, self.ZMin + v.z, self.XMax + v.x, self.YMax + v.y, self.ZMax + v.z)
+
+
+def _rotate_point(p: Vector, center: Vector, axis: Vector, degrees: float) -> Vector:
+    """Rodrigues' rotation of p about the axis through center."""
+    k = Vector(*axis).normalize()
+    v = p - center
+    angle = math.radians(degrees)
+    cos, sin = math.cos(angle), math.sin(angle)
+    rotated = v * cos + k.cross(v) * sin + k * (k.dot(v) * (1 - cos))
+    return rotated + center
+
+
+def _axis_box(base: Vector, direction: Vector, radius: float, height: float) -> BoundBox:
+    """Exact box of a cylinder of the given radius along `direction` from `base`."""
+    d = Vector(*direction).normalize()
+    top = base + d * height
+    extents = [radius * math.sqrt(max(0.0, 1 - c * c)) for c in d]
+    lows = [min(a, b) - e for a, b, e in zip(base, top, extents)]
+    highs = [max(a, b) + e for a, b, e in zip(base, top, extents)]
+    return BoundBox(*lows, *highs)
+
+
+# Placement / Rotation: carried around, not interpreted
+
+class Rotation:
+    def __init__(self, *args, **kwargs):
+        if kwargs:
+            raise _Inconclusive("Rotation() with keyword arguments is not modelled")
+        self.identity = not args
+        self.args = args
+
+    def __getattr__(self, name):
+        raise _missing("Rotation", name, {"Angle", "Axis", "Q", "multiply", "multVec", "inverted", "toEuler", "getYawPitchRoll", "isIdentity", "isNull"})
+
+
+class Placement:
+    def __init__(self, *args, **kwargs):
+        if kwargs:
+            raise _Inconclusive("Placement() with keyword arguments is not modelled")
+        self.Base = _vector("Placement base", args[0]) if args else Vector()
+        self.Rotation = args[1] if len(args) == 2 and isinstance(args[1], Rotation) else Rotation(*args[1:])
+
+    def __getattr__(self, name):
+        raise _missing("Placement", name, {"Base", "Rotation", "Matrix", "multiply", "multVec", "inverse", "move", "rotate", "isIdentity", "toMatrix"})
+
+
+# Part shapes
+
+SHAPE_KNOWN = {
+    # Modelled
+    "fuse", "cut", "common", "translate", "rotate", "scale", "mirror", "copy", "makeFillet", "makeChamfer",
+    "extrude", "revolve", "removeSplitter", "isNull", "isValid", "isClosed", "Edges", "Faces", "Vertexes",
+    "Wires", "Shells", "Solids", "BoundBox", "ShapeType", "Volume", "Area", "Length", "Placement", "Point",
+    "X", "Y", "Z", "toShape",
+    # Real but not modelled
+    "section", "slice", "slices", "multiFuse", "generalFuse", "oldFuse", "transformShape", "transformGeometry",
+    "transformed", "translated", "rotated", "scaled", "mirrored", "makeThickness", "makeOffsetShape",
+    "makeOffset2D", "makeOffset", "makeEvolved", "makeWires", "makePipe", "makePipeShell", "check", "fix",
+    "fixTolerance", "limitTolerance", "tessellate", "exportStl", "exportStep", "exportBrep", "exportIges",
+    "exportBrepToString", "importBrepFromString", "read", "distToShape", "childShapes", "ancestorsOfType",
+    "cleaned", "complement", "countElement", "defeaturing", "getElement", "hashCode", "isInside", "isSame",
+    "isEqual", "isPartner", "makeParallelProjection", "makePerspectiveProjection", "nullify", "project",
+    "proximity", "reverse", "reversed", "sewShape", "inTolerance", "globalTolerance", "overTolerance",
+    "getTolerance", "findPlane", "findSubShape", "CompSolids", "Compounds", "SubShapes", "Matrix",
+    "Orientation", "Tolerance", "Mass", "MatrixOfInertia", "PrincipalProperties", "StaticMoments",
+    "CenterOfMass", "CenterOfGravity", "Surface", "Curve", "OuterWire", "OuterShell", "ParameterRange",
+    "normalAt", "valueAt", "tangentAt", "curvatureAt", "derivative1At", "discretize", "approximate",
+    "firstVertex", "lastVertex", "FirstParameter", "LastParameter", "Closed", "Degenerated", "split",
+    "cutHoles", "validate", "getMomentOfInertia", "getRadiusOfGyration", "offsetFaces", "add", "fixWire",
+    "Content", "MemSize", "Module", "TypeId", "Tag", "Continuity",
+}
+
+# Primitive topology: (edges, faces, vertexes)
+BOX_TOPOLOGY = (12, 6, 8)
+CYLINDER_TOPOLOGY = (3, 3, 2)
+SPHERE_TOPOLOGY = (3, 1, 2)
+
+
+class _UnknownSubShapes(list):
+    """Sub-shapes of a shape whose exact topology is unknown: indexing works, counting and iterating do not."""
+
+    def __init__(self, make):
+        super().__init__()
+        self._make = make
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            raise _Inconclusive("slicing sub-shapes of a non-primitive shape is not modelled")
+        return self._make()
+
+    def __len__(self):
+        raise _Inconclusive("sub-shape count of a non-primitive shape is not modelled")
+
+    def __iter__(self):
+        raise _Inconclusive("iterating sub-shapes of a non-primitive shape is not modelled")
+
+    def __bool__(self):
+        return True
+
+
+class Shape:
+    """
+    Tracks what the dry run can know about a shape: its type, a bounding box that
+    contains it (`tight` when it is the exact box), the exact topology and volume
+    of untouched primitives, whether it is null or certainly empty, and for edges
+    and wires their end points.
+    """
+
+    def __init__(self, *args, **kwargs):
+        # Called by scripts only (Part.Shape(), Part.Wire(edges), ...); the model builds shapes with _new()
+        self._setup(**self._build(args, kwargs)._state())
+
+    def _setup(self, bbox: Optional[BoundBox] = None, tight: bool = True, topology=None, volume=None,
+               null: bool = False, empty: bool = False, ends=None, closed: Optional[bool] = None, lengths=None):
+        self._bbox, self._tight = bbox, tight and bbox is not None
+        self._topology, self._volume, self._lengths = topology, volume, lengths
+        self._null, self._empty = null, empty
+        self._ends, self._closed = ends, closed
+
+    def _state(self) -> dict:
+        return {
+            "bbox": self._bbox, "tight": self._tight, "topology": self._topology, "volume": self._volume,
+            "null": self._null, "empty": self._empty, "ends": self._ends, "closed": self._closed, "lengths": self._lengths,
+        }
+
+    @classmethod
+    def _build(cls, args: tuple, kwargs: dict) -> "Shape":
+        if args or kwargs:
+            raise _Inconclusive(f"Part.{cls.__name__}() with arguments is not modelled")
+        return _new(cls, null=True)
+
+    def __getattr__(self, name):
+        raise _missing(f"Part.{type(self).__name__}", name, SHAPE_KNOWN)
+
+    def __setattr__(self, name, value):
+        if name.startswith("_"):
+            object.__setattr__(self, name, value)
+        elif name == "Placement":
+            if not isinstance(value, Placement):
+                raise _fail(TypeError, f"Placement must be a FreeCAD.Placement, not {type(value).__name__}")
+            if not value.Rotation.identity:
+                raise _Inconclusive("rotated placements are not modelled")
+            self._require_not_null("Placement")
+            self._bbox = self._bbox.moved(value.Base) if self._bbox else None
+        else:
+            raise _missing(f"Part.{type(self).__name__}", name, SHAPE_KNOWN)
+
+    def __repr__(self):
+        return f"<{type(self).__name__} object>"
+
+    def _derive(self, cls=None, bbox=None, tight=False, **state) -> "Shape":
+        return _new(cls or type(self), bbox=bbox, tight=tight, **state)
+
+    def _require_not_null(self, operation: str):
+        if self._null:
+            raise _fail(OCCError, f"{operation}: the shape is null")
+
+    def _operand(self, name: str, value) -> List["Shape"]:
+        shapes = list(value) if isinstance(value, (list, tuple)) else [value]
+        for shape in shapes:
+            if not isinstance(shape, Shape):
+                raise _fail(TypeError, f"{name}() expects a shape or a list of shapes, got {type(shape).__name__}")
+            shape._require_not_null(name)
+        return shapes
+
+    # Properties
+
+    @property
+    def ShapeType(self):
+        return type(self).__name__
+
+    @property
+    def BoundBox(self):
+        if self._null:
+            raise _fail(OCCError, "BoundBox of a null shape")
+        if not self._tight:
+            raise _Inconclusive("the exact bounding box of this shape is not modelled")
+        return BoundBox(*(getattr(self._bbox, k) for k in ("XMin", "YMin", "ZMin", "XMax", "YMax", "ZMax")))
+
+    @property
+    def Volume(self):
+        if self._volume is None:
+            raise _Inconclusive("the volume of this shape is not modelled")
+        return self._volume
+
+    def _subshapes(self, index: int, cls):
+        if self._topology is None:
+            return _UnknownSubShapes(lambda: _new(cls, bbox=self._bbox, tight=False))
+        if cls is Edge and self._lengths:
+            return [_new(Edge, bbox=self._bbox, tight=False, lengths=[length]) for length in self._lengths]
+        return [_new(cls, bbox=self._bbox, tight=False) for _ in range(self._topology[index])]
+
+    @property
+    def Edges(self):
+        return self._subshapes(0, Edge)
+
+    @property
+    def Faces(self):
+        return self._subshapes(1, Face)
+
+    @property
+    def Vertexes(self):
+        return self._subshapes(2, Vertex)
+
+    @property
+    def Length(self):
+        if self._lengths is None:
+            raise _Inconclusive("the length of this shape is not modelled")
+        return sum(self._lengths)
+
+    @property
+    def Placement(self):
+        return Placement()
+
+    def isNull(self):
+        return self._null
+
+    def isValid(self):
+        return not self._null
+
+    def isClosed(self):
+        if self._closed is None:
+            raise _Inconclusive("closedness of this shape is not modelled")
+        return self._closed
+
+    # Booleans
+
+    def _boolean(self, name: str, args: tuple, kwargs: dict) -> "Shape":
+        tools = self._operand(name, _args(f"Shape.{name}", args, kwargs, 1, 1)[0])
+        self._require_not_null(name)
+        boxes = [tool._bbox for tool in tools]
+        cls = Solid if isinstance(self, Solid) else type(self)
+        if self._bbox is None or any(box is None for box in boxes):
+            return self._derive(cls)
+        if name == "fuse":
+            bbox = self._bbox
+            for box in boxes:
+                bbox = bbox.united(box)
+            tight = self._tight and all(tool._tight for tool in tools)
+            return self._derive(cls, bbox, tight, empty=self._empty and all(tool._empty for tool in tools))
+        if name == "cut":
+            return self._derive(cls, self._bbox, False, empty=self._empty)
+        bbox = self._bbox
+        for box in boxes:
+            bbox = bbox.intersected(box) if bbox is not None else None
+        # Boxes that contain the shapes do not overlap, so neither do the shapes
+        return self._derive(Compound if bbox is None else cls, bbox or self._bbox, False, empty=bbox is None or self._empty)
+
+    def fuse(self, *args, **kwargs):
+        return self._boolean("fuse", args, kwargs)
+
+    def cut(self, *args, **kwargs):
+        return self._boolean("cut", args, kwargs)
+
+    def common(self, *args, **kwargs):
+        return self._boolean("common", args, kwargs)
+
+    # Transformations (in place)
+
+    def translate(self, *args, **kwargs):
+        v = _vector("Shape.translate()", _args("Shape.translate", args, kwargs, 1)[0])
+        self._require_not_null("translate")
+        if self._bbox is not None:
+            self._bbox = self._bbox.moved(v)
+        if self._ends is not None:
+            self._ends = tuple(p + v for p in self._ends)
+        return self
+
+    def rotate(self, *args, **kwargs):
+        center, axis, angle = _args("Shape.rotate", args, kwargs, 3)
+        center, axis = _vector("Shape.rotate() center", center), _vector("Shape.rotate() axis", axis)
+        angle = _number("Shape.rotate() angle", angle)
+        if axis.Length <= CONFUSION:
+            raise _fail(OCCError, "Shape.rotate(): the rotation axis is a null vector")
+        self._require_not_null("rotate")
+        if self._bbox is not None:
+            # The rotated corners contain the rotated shape; the box is no longer exact
+            self._bbox = BoundBox.of_points([_rotate_point(p, center, axis, angle) for p in self._bbox.corners()])
+            aligned = sum(abs(c) > CONFUSION for c in axis) == 1
+            self._tight = self._tight and aligned and angle % 90 == 0
+        if self._ends is not None:
+            self._ends = tuple(_rotate_point(p, center, axis, angle) for p in self._ends)
+        return self
+
+    def scale(self, *args, **kwargs):
+        factor, base = _args("Shape.scale", args, kwargs, 1, 1)
+        factor = _number("Shape.scale() factor", factor, positive=True)
+        base = _vector("Shape.scale() base", base, Vector())
+        self._require_not_null("scale")
+        if self._bbox is not None:
+            self._bbox = BoundBox.of_points([base + (p - base) * factor for p in self._bbox.corners()])
+        self._volume = self._volume * factor ** 3 if self._volume is not None else None
+        self._lengths = [length * factor for length in self._lengths] if self._lengths else self._lengths
+        self._ends = tuple(base + (p - base) * factor for p in self._ends) if self._ends else self._ends
+        return self
+
+    def mirror(self, *args, **kwargs):
+        base, normal = _args("Shape.mirror", args, kwargs, 2)
+        base, normal = _vector("Shape.mirror() base", base), _vector("Shape.mirror() normal", normal)
+        if normal.Length <= CONFUSION:
+            raise _fail(OCCError, "Shape.mirror(): the plane normal is a null vector")
+        self._require_not_null("mirror")
+        n = Vector(*normal).normalize()
+        reflect = lambda p: p - n * (2 * (p - base).dot(n))  # noqa: E731
+        bbox = BoundBox.of_points([reflect(p) for p in self._bbox.corners()]) if self._bbox else None
+        return self._derive(bbox=bbox, tight=False, volume=self._volume)
+
+    def copy(self, *args, **kwargs):
+        _args("Shape.copy", args, kwargs, 0, 2)
+        return self._derive(bbox=self._bbox, tight=self._tight, topology=self._topology, volume=self._volume,
+                            null=self._null, empty=self._empty, ends=self._ends, closed=self._closed, lengths=self._lengths)
+
+    def removeSplitter(self, *args, **kwargs):
+        _args("Shape.removeSplitter", args, kwargs, 0)
+        self._require_not_null("removeSplitter")
+        return self._derive(bbox=self._bbox, tight=self._tight, volume=self._volume, empty=self._empty)
+
+    # Features
+
+    def _edge_operation(self, name: str, args: tuple, kwargs: dict) -> "Shape":
+        values = _args(f"Shape.{name}", args, kwargs, 2, 1)
+        size, edges = (values[0], values[1]) if values[2] is None else (values[0], values[2])
+        size = _number(f"Shape.{name}() size", size, positive=True)
+        if values[2] is not None:
+            _number(f"Shape.{name}() size", values[1], positive=True)
+        if not isinstance(edges, (list, tuple)):
+            raise _fail(TypeError, f"Shape.{name}() expects a list of edges, got {type(edges).__name__}")
+        if not edges:
+            raise _fail(OCCError, f"Shape.{name}(): the list of edges is empty")
+        if not isinstance(edges, _UnknownSubShapes) and not all(isinstance(e, Edge) for e in edges):
+            raise _fail(TypeError, f"Shape.{name}() expects a list of edges")
+        self._require_not_null(name)
+        if isinstance(self, (Face, Wire, Edge, Vertex)):
+            raise _fail(OCCError, f"Shape.{name}() needs a solid, not a {type(self).__name__}")
+        if self._topology == BOX_TOPOLOGY and self._lengths and len(edges) == BOX_TOPOLOGY[0]:
+            # Rounding every edge of a box needs a radius below half its thinnest side
+            thinnest = min(self._lengths)
+            if size >= thinnest / 2 - CONFUSION:
+                raise _fail(OCCError, f"Shape.{name}(): size {size:g} is too large for a box whose thinnest side is {thinnest:g}")
+        return self._derive(Solid if isinstance(self, Solid) else type(self), self._bbox, False)
+
+    def makeFillet(self, *args, **kwargs):
+        return self._edge_operation("makeFillet", args, kwargs)
+
+    def makeChamfer(self, *args, **kwargs):
+        return self._edge_operation("makeChamfer", args, kwargs)
+
+    def extrude(self, *args, **kwargs):
+        v = _vector("Shape.extrude()", _args("Shape.extrude", args, kwargs, 1)[0])
+        if v.Length <= CONFUSION:
+            raise _fail(OCCError, "Shape.extrude(): the extrusion vector is a null vector")
+        self._require_not_null("extrude")
+        if isinstance(self, Wire) and self._closed is False:
+            cls = Shell
+        else:
+            cls = {Face: Solid, Wire: Shell, Edge: Face, Vertex: Edge}.get(type(self), Compound)
+        bbox = self._bbox.united(self._bbox.moved(v)) if self._bbox else None
+        return self._derive(cls, bbox, self._tight)
+
+    def revolve(self, *args, **kwargs):
+        base, axis, angle = _args("Shape.revolve", args, kwargs, 0, 3)
+        base, axis = _vector("Shape.revolve() base", base, Vector()), _vector("Shape.revolve() axis", axis, Vector(0, 0, 1))
+        _number("Shape.revolve() angle", angle if angle is not None else 360)
+        if axis.Length <= CONFUSION:
+            raise _fail(OCCError, "Shape.revolve(): the axis is a null vector")
+        self._require_not_null("revolve")
+        cls = {Face: Solid, Wire: Shell, Edge: Face, Vertex: Edge}.get(type(self), Compound)
+        bbox = None
+        if self._bbox is not None:
+            # Every point stays within the largest distance of the box from the base point
+            r = max((p - base).Length for p in self._bbox.corners())
+            bbox = BoundBox(base.x - r, base.y - r, base.z - r, base.x + r, base.y + r, base.z + r)
+        return self._derive(cls, bbox, False)
+
+
+class Solid(Shape):
+    @classmethod
+    def _build(cls, args, kwargs):
+        shape = _args("Part.Solid", args, kwargs, 0, 1)[0]
+        return _new(Solid, null=True) if shape is None else makeSolid(shape)
+
+
+class Shell(Shape):
+    pass
+
+
+class Face(Shape):
+    @classmethod
+    def _build(cls, args, kwargs):
+        return _make_face(*args, **kwargs)
+
+
+class Wire(Shape):
+    @classmethod
+    def _build(cls, args, kwargs):
+        return _make_wire(*args, **kwargs)
+
+
+class Edge(Shape):
+    pass
+
+
+class Vertex(Shape):
+    @classmethod
+    def _build(cls, args, kwargs):
+        point = _vector("Part.Vertex()", _args("Part.Vertex", args, kwargs, 1)[0])
+        return _new(Vertex, bbox=BoundBox.of_points([point]), ends=(point, point))
+
+    @property
+    def Point(self):
+        if not self._tight:
+            raise _Inconclusive("the position of this vertex is not modelled")
+        return Vector(self._bbox.XMin, self._bbox.YMin, self._bbox.ZMin)
+
+    @property
+    def X(self):
+        return self.Point.x
+
+    @property
+    def Y(self):
+        return self.Point.y
+
+    @property
+    def Z(self):
+        return self.Point.z
+
+
+class Compound(Shape):
+    @classmethod
+    def _build(cls, args, kwargs):
+        return makeCompound(*args, **kwargs)
+
+
+def _new(cls, **state) -> Shape:
+    """Creates a shape from the model's side, bypassing the script-facing constructor."""
+    shape = object.__new__(cls)
+    shape._setup(**state)
+    return shape
+
+
+class LineSegment:
+    def __init__(self, *args, **kwargs):
+        start, end = _args("Part.LineSegment", args, kwargs, 2)
+        self.start, self.end = _vector("Part.LineSegment() start", start), _vector("Part.LineSegment() end", end)
+
+    def __getattr__(self, name):
+        raise _missing("Part.LineSegment", name, {"toShape", "StartPoint", "EndPoint", "length", "value", "parameter", "Direction"})
+
+    def toShape(self, *args, **kwargs):
+        _args("LineSegment.toShape", args, kwargs, 0, 2)
+        return _line_edge(self.start, self.end)
+
+
+def _line_edge(start: Vector, end: Vector) -> Edge:
+    length = (end - start).Length
+    if length <= CONFUSION:
+        raise _fail(OCCError, "Part.makeLine(): start and end points coincide")
+    return _new(Edge, bbox=BoundBox.of_points([start, end]), ends=(start, end), closed=False, lengths=[length], topology=(1, 0, 2))
+
+
+def _chain_closed(edges: List[Shape]) -> Optional[bool]:
+    """Closedness of edges joined in the given order, or None when that cannot be told."""
+    if len(edges) == 1 and edges[0]._closed is not None:
+        return edges[0]._closed
+    if any(e._ends is None for e in edges):
+        return None
+    for previous, current in zip(edges, edges[1:]):
+        if not (previous._ends[1] == current._ends[0]):
+            return None  # Out of order or reversed: BRepBuilderAPI_MakeWire may or may not connect them
+    return edges[-1]._ends[1] == edges[0]._ends[0]
+
+
+# Part module functions
+
+def _placed(name: str, pnt, direction) -> Tuple[Vector, Vector]:
+    pnt = _vector(f"{name}() position", pnt, Vector())
+    direction = _vector(f"{name}() direction", direction, Vector(0, 0, 1))
+    if direction.Length <= CONFUSION:
+        raise _fail(OCCError, f"{name}(): the direction is a null vector")
+    return pnt, direction
+
+
+def _z_aligned(direction: Vector) -> bool:
+    return abs(direction.x) <= CONFUSION and abs(direction.y) <= CONFUSION and direction.z > 0
+
+
+def makeBox(*args, **kwargs):
+    length, width, height, pnt, direction = _args("Part.makeBox", args, kwargs, 3, 2)
+    dims = [_number(f"Part.makeBox() {n}", v, positive=True) for n, v in zip(("length", "width", "height"), (length, width, height))]
+    pnt, direction = _placed("Part.makeBox", pnt, direction)
+    bbox = BoundBox(pnt.x, pnt.y, pnt.z, pnt.x + dims[0], pnt.y + dims[1], pnt.z + dims[2]) if _z_aligned(direction) else None
+    lengths = [dims[0]] * 4 + [dims[1]] * 4 + [dims[2]] * 4
+    return _new(Solid, bbox=bbox, topology=BOX_TOPOLOGY, volume=dims[0] * dims[1] * dims[2], lengths=lengths)
+
+
+def makeCylinder(*args, **kwargs):
+    radius, height, pnt, direction, angle = _args("Part.makeCylinder", args, kwargs, 2, 3)
+    radius = _number("Part.makeCylinder() radius", radius, positive=True)
+    height = _number("Part.makeCylinder() height", height, positive=True)
+    pnt, direction = _placed("Part.makeCylinder", pnt, direction)
+    full = angle is None or _number("Part.makeCylinder() angle", angle) >= 360
+    return _new(Solid, bbox=_axis_box(pnt, direction, radius, height), tight=full,
+                 topology=CYLINDER_TOPOLOGY if full else None,
+                 volume=math.pi * radius ** 2 * height if full else None)
+
+
+def makeCone(*args, **kwargs):
+    r1, r2, height, pnt, direction, angle = _args("Part.makeCone", args, kwargs, 3, 3)
+    r1 = _number("Part.makeCone() radius1", r1, positive=True, allow_zero=True)
+    r2 = _number("Part.makeCone() radius2", r2, positive=True, allow_zero=True)
+    height = _number("Part.makeCone() height", height, positive=True)
+    if abs(r1 - r2) <= CONFUSION:
+        raise _fail(OCCError, "Part.makeCone(): both radii are equal (use makeCylinder)")
+    pnt, direction = _placed("Part.makeCone", pnt, direction)
+    full = angle is None or _number("Part.makeCone() angle", angle) >= 360
+    return _new(Solid, bbox=_axis_box(pnt, direction, max(r1, r2), height), tight=False,
+                 volume=math.pi * height * (r1 * r1 + r1 * r2 + r2 * r2) / 3 if full else None)
+
+
+def makeSphere(*args, **kwargs):
+    radius, pnt, direction, a1, a2, a3 = _args("Part.makeSphere", args, kwargs, 1, 5)
+    radius = _number("Part.makeSphere() radius", radius, positive=True)
+    pnt, _ = _placed("Part.makeSphere", pnt, direction)
+    full = a1 is None and a2 is None and a3 is None
+    bbox = BoundBox(pnt.x - radius, pnt.y - radius, pnt.z - radius, pnt.x + radius, pnt.y + radius, pnt.z + radius)
+    return _new(Solid, bbox=bbox, tight=full, topology=SPHERE_TOPOLOGY if full else None,
+                 volume=4 / 3 * math.pi * radius ** 3 if full else None)
+
+
+def makeTorus(*args, **kwargs):
+    r1, r2, pnt, direction, *_ = _args("Part.makeTorus", args, kwargs, 2, 5)
+    r1 = _number("Part.makeTorus() radius1", r1, positive=True)
+    r2 = _number("Part.makeTorus() radius2", r2, positive=True)
+    pnt, direction = _placed("Part.makeTorus", pnt, direction)
+    r = r1 + r2
+    return _new(Solid, bbox=BoundBox(pnt.x - r, pnt.y - r, pnt.z - r, pnt.x + r, pnt.y + r, pnt.z + r), tight=False)
+
+
+def makeWedge(*args, **kwargs):
+    values = _args("Part.makeWedge", args, kwargs, 10, 2)
+    xmin, ymin, zmin, z2min, x2min, xmax, ymax, zmax, z2max, x2max = (_number("Part.makeWedge() bound", v) for v in values[:10])
+    if xmax - xmin <= CONFUSION or ymax - ymin <= CONFUSION or zmax - zmin <= CONFUSION:
+        raise _fail(OCCError, "Part.makeWedge(): the bounds are empty")
+    pnt, direction = _placed("Part.makeWedge", values[10], values[11])
+    bbox = BoundBox(xmin, ymin, zmin, xmax, ymax, zmax).moved(pnt) if _z_aligned(direction) else None
+    return _new(Solid, bbox=bbox, tight=False)
+
+
+def makeLine(*args, **kwargs):
+    start, end = _args("Part.makeLine", args, kwargs, 2)
+    return _line_edge(_vector("Part.makeLine() start", start), _vector("Part.makeLine() end", end))
+
+
+def makePolygon(*args, **kwargs):
+    points, closed = _args("Part.makePolygon", args, kwargs, 1, 1)
+    if not isinstance(points, (list, tuple)):
+        raise _fail(TypeError, f"Part.makePolygon() expects a list of points, got {type(points).__name__}")
+    points = [_vector("Part.makePolygon() point", p) for p in points]
+    if len(points) < 2:
+        raise _fail(OCCError, "Part.makePolygon() needs at least two points")
+    if closed:
+        points.append(points[0])
+    edges = [_line_edge(a, b) for a, b in zip(points, points[1:])]
+    return _new(Wire, bbox=BoundBox.of_points(points), ends=(points[0], points[-1]), closed=_chain_closed(edges),
+                lengths=[e.Length for e in edges])
+
+
+def makeCircle(*args, **kwargs):
+    radius, pnt, direction, a1, a2 = _args("Part.makeCircle", args, kwargs, 1, 4)
+    radius = _number("Part.makeCircle() radius", radius, positive=True)
+    pnt, direction = _placed("Part.makeCircle", pnt, direction)
+    full = a1 is None and a2 is None
+    return _new(Edge, bbox=_axis_box(pnt, direction, radius, 0.0), tight=full, closed=True if full else None,
+                lengths=[2 * math.pi * radius] if full else None)
+
+
+def makePlane(*args, **kwargs):
+    length, width, pnt, direction, _ = _args("Part.makePlane", args, kwargs, 2, 3)
+    length = _number("Part.makePlane() length", length, positive=True)
+    width = _number("Part.makePlane() width", width, positive=True)
+    pnt, direction = _placed("Part.makePlane", pnt, direction)
+    bbox = BoundBox(pnt.x, pnt.y, pnt.z, pnt.x + length, pnt.y + width, pnt.z) if _z_aligned(direction) else None
+    return _new(Face, bbox=bbox, closed=False)
+
+
+def makeHelix(*args, **kwargs):
+    pitch, height, radius, *_ = _args("Part.makeHelix", args, kwargs, 3, 3)
+    _number("Part.makeHelix() pitch", pitch, positive=True)
+    height = _number("Part.makeHelix() height", height, positive=True)
+    radius = _number("Part.makeHelix() radius", radius, positive=True)
+    return _new(Wire, bbox=BoundBox(-radius, -radius, 0, radius, radius, height), tight=False, closed=False)
+
+
+def makeLoft(*args, **kwargs):
+    profiles, solid, *_ = _args("Part.makeLoft", args, kwargs, 1, 4)
+    if not isinstance(profiles, (list, tuple)) or len(profiles) < 2:
+        raise _fail(OCCError, "Part.makeLoft() needs a list of at least two profiles")
+    shapes = Shape._operand(_new(Shape), "Part.makeLoft", profiles)
+    boxes = [s._bbox for s in shapes]
+    bbox = None
+    if all(box is not None for box in boxes):
+        bbox = boxes[0]
+        for box in boxes[1:]:
+            bbox = bbox.united(box)
+    return _new(Solid if solid else Shell, bbox=bbox, tight=False)
+
+
+def _compound_of(cls, name: str, shapes) -> Shape:
+    if not isinstance(shapes, (list, tuple)):
+        raise _fail(TypeError, f"{name}() expects a list of shapes, got {type(shapes).__name__}")
+    shapes = Shape._operand(_new(Shape), name, shapes)
+    boxes = [s._bbox for s in shapes]
+    if not shapes or any(box is None for box in boxes):
+        return _new(cls, bbox=None, tight=False, empty=not shapes)
+    bbox = boxes[0]
+    for box in boxes[1:]:
+        bbox = bbox.united(box)
+    return _new(cls, bbox=bbox, tight=all(s._tight for s in shapes))
+
+
+def makeCompound(*args, **kwargs):
+    return _compound_of(Compound, "Part.makeCompound", _args("Part.makeCompound", args, kwargs, 1)[0])
+
+
+def makeShell(*args, **kwargs):
+    return _compound_of(Shell, "Part.makeShell", _args("Part.makeShell", args, kwargs, 1)[0])
+
+
+def makeSolid(*args, **kwargs):
+    shape = _args("Part.makeSolid", args, kwargs, 1)[0]
+    if not isinstance(shape, Shape):
+        raise _fail(TypeError, f"Part.makeSolid() expects a shape, got {type(shape).__name__}")
+    shape._require_not_null("Part.makeSolid")
+    return _new(Solid, bbox=shape._bbox, tight=False)
+
+
+def _make_wire(*args, **kwargs):
+    edges = _args("Part.Wire", args, kwargs, 0, 1)[0]
+    if edges is None:
+        return _new(Wire, null=True)
+    edges = list(edges) if isinstance(edges, (list, tuple)) else [edges]
+    if not edges:
+        raise _fail(OCCError, "Part.Wire(): the list of edges is empty")
+    for edge in edges:
+        if not isinstance(edge, (Edge, Wire)):
+            raise _fail(TypeError, f"Part.Wire() expects edges, got {type(edge).__name__}")
+        edge._require_not_null("Part.Wire")
+    wire = _compound_of(Wire, "Part.Wire", edges)
+    closed = _chain_closed(edges)
+    wire._closed = closed
+    if closed is not None and all(e._ends is not None for e in edges):
+        wire._ends = (edges[0]._ends[0], edges[-1]._ends[1])
+    if all(e._lengths for e in edges):
+        wire._lengths = [length for e in edges for length in e._lengths]
+    return wire
+
+
+def _make_face(*args, **kwargs):
+    wires = _args("Part.Face", args, kwargs, 0, 1)[0]
+    if wires is None:
+        return _new(Face, null=True)
+    wires = list(wires) if isinstance(wires, (list, tuple)) else [wires]
+    if not wires or not all(isinstance(w, (Wire, Edge)) for w in wires):
+        raise _Inconclusive("Part.Face() from anything but wires is not modelled")
+    for wire in wires:
+        wire._require_not_null("Part.Face")
+        if wire._closed is False:
+            raise _fail(OCCError, "Part.Face(): the wire is not closed")
+    face = _compound_of(Face, "Part.Face", wires)
+    face._closed = None
+    return face
+
+
+PART_MODELLED = {
+    "makeBox": makeBox, "makeCylinder": makeCylinder, "makeCone": makeCone, "makeSphere": makeSphere,
+    "makeTorus": makeTorus, "makeWedge": makeWedge, "makeLine": makeLine, "makePolygon": makePolygon,
+    "makeCircle": makeCircle, "makePlane": makePlane, "makeHelix": makeHelix, "makeLoft": makeLoft,
+    "makeCompound": makeCompound, "makeShell": makeShell, "makeSolid": makeSolid,
+    "Shape": Shape, "Solid": Solid, "Shell": Shell, "Face": Face, "Wire": Wire, "Edge": Edge,
+    "Vertex": Vertex, "Compound": Compound, "LineSegment": LineSegment, "OCCError": OCCError,
+}
+PART_KNOWN = set(PART_MODELLED) | {
+    "makeLongHelix", "makeThread", "makeRevolution", "makeRuledSurface", "makeTube", "makeSweepSurface",
+    "makeSplitShape", "makeWireString", "makeFilledFace", "makeFace", "makeRegularPolygon", "show", "read",
+    "insert", "export", "getSortedClusters", "sortEdges", "cast_to_shape", "exportUnits", "setStaticValue",
+    "CompSolid", "Line", "Circle", "ArcOfCircle", "Arc", "ArcOfEllipse", "ArcOfParabola",
+    "ArcOfHyperbola", "Ellipse", "Parabola", "Hyperbola", "BSplineCurve", "BezierCurve", "BSplineSurface",
+    "BezierSurface", "Plane", "Cylinder", "Sphere", "Cone", "Toroid", "Point", "Polygon", "OffsetCurve",
+    "OffsetSurface", "SurfaceOfExtrusion", "SurfaceOfRevolution", "RectangularTrimmedSurface",
+    "PlateSurface", "Geometry", "GeometryExtension", "Feature", "Part2DObject", "BOPTools", "CompoundTools",
+    "JoinFeatures", "BRepFeat", "BRepOffsetAPI", "Geom2d", "ShapeFix", "ShapeUpgrade", "GeomPlate",
+    "ChFi2d", "Precision", "HLRBRep",
+}
+
+FREECAD_MODELLED = {"Vector": Vector, "Placement": Placement, "Rotation": Rotation}
+FREECAD_KNOWN = set(FREECAD_MODELLED) | {
+    "Base", "Matrix", "BoundBox", "Units", "Console", "newDocument", "ActiveDocument", "activeDocument",
+    "getDocument", "openDocument", "closeDocument", "setActiveDocument", "listDocuments", "Version",
+    "ParamGet", "GuiUp", "Gui", "DocumentObject", "Document", "Qt", "Axis", "Quantity", "Unit", "Material",
+    "getUserAppDataDir", "getHomePath", "getResourceDir", "ConfigGet", "ConfigSet", "loadFile", "Vector2d",
+}
+
+
+class _MockModule(types.ModuleType):
+    def __init__(self, name: str, members: dict, known: set):
+        super().__init__(name)
+        self.__dict__.update(members)
+        self.__dict__["_known"] = known
+
+    def __getattr__(self, name):
+        raise _missing(f"module {self.__name__}", name, self.__dict__["_known"])
+
+
+_REAL_MEMBERS: Dict[str, Tuple[dict, set]] = {}
+
+
+def _real_module_members(name: str) -> Tuple[dict, set]:
+    """The allowlisted members of a real module, and all its public names (for typo detection)."""
+    if name not in _REAL_MEMBERS:
+        real = importlib.import_module(name)
+        members = {
+            attr: getattr(real, attr) for attr in REAL_MODULES[name]
+            if hasattr(real, attr) and not isinstance(getattr(real, attr), types.ModuleType)
+        }
+        _REAL_MEMBERS[name] = (members, {attr for attr in dir(real) if not attr.startswith("_")})
+    return _REAL_MEMBERS[name]
+
+
+# Resource caps, injected by _Instrument
+
+class _Budget:
+    def __init__(self, max_iterations: int, timeout: float):
+        self.max_iterations = max_iterations
+        self.deadline = time.perf_counter() + timeout
+        self.ticks = 0
+
+    def tick(self):
+        self.ticks += 1
+        if self.ticks > self.max_iterations:
+            raise _Inconclusive(f"more than {self.max_iterations} loop iterations")
+        if not self.ticks % 256 and time.perf_counter() > self.deadline:
+            raise _Inconclusive("dry run time budget exceeded")
+
+    def iterate(self, iterable):
+        for item in iterable:
+            self.tick()
+            yield item
+
+    def range(self, *args):
+        r = range(*args)
+        try:
+            size = len(r)
+        except OverflowError:
+            size = None
+        if size is None or size > self.max_iterations:
+            raise _Inconclusive(f"range() of more than {self.max_iterations} items")
+        return r
+
+    def binop(self, op: str, left, right):
+        if op == "Pow" and isinstance(left, int) and isinstance(right, int) and right > 0 and abs(left) > 1:
+            if right * math.log2(abs(left)) > 4096:
+                raise _Inconclusive("integer power too large to model")
+        if op == "LShift" and isinstance(right, int) and right > 4096:
+            raise _Inconclusive("shift too large to model")
+        if op == "Mult":
+            for sequence, count in ((left, right), (right, left)):
+                if isinstance(sequence, (str, bytes, list, tuple)) and isinstance(count, int):
+                    if len(sequence) * count > self.max_iterations:
+                        raise _Inconclusive("sequence repetition too large to model")
+        return _BINOPS[op](left, right)
+
+
+_BINOPS = {"Mult": operator.mul, "Pow": operator.pow, "LShift": operator.lshift}
+
+
+class _Instrument(ast.NodeTransformer):
+    """Routes loops, comprehensions, function bodies and size-amplifying operators through _Budget."""
+
+    def _call(self, name: str, args: list) -> ast.Call:
+        return ast.Call(func=ast.Name(name, ast.Load()), args=args, keywords=[])
+
+    def visit_For(self, node):
+        self.generic_visit(node)
+        node.iter = self._call("_dry_iter", [node.iter])
+        return node
+
+    def visit_comprehension(self, node):
+        self.generic_visit(node)
+        node.iter = self._call("_dry_iter", [node.iter])
+        return node
+
+    def visit_While(self, node):
+        self.generic_visit(node)
+        node.body.insert(0, ast.Expr(self._call("_dry_tick", [])))
+        return node
+
+    def visit_FunctionDef(self, node):
+        self.generic_visit(node)
+        node.body.insert(0, ast.Expr(self._call("_dry_tick", [])))
+        return node
+
+    def visit_BinOp(self, node):
+        self.generic_visit(node)
+        op = type(node.op).__name__
+        if op in _BINOPS:
+            return self._call("_dry_binop", [ast.Constant(op), node.left, node.right])
+        return node
+
+    def visit_AugAssign(self, node):
+        self.generic_visit(node)
+        op = type(node.op).__name__
+        if op in _BINOPS and isinstance(node.target, ast.Name):
+            value = self._call("_dry_binop", [ast.Constant(op), ast.Name(node.target.id, ast.Load()), node.value])
+            return ast.Assign(targets=[node.target], value=value)
+        return node
+
+
+def _reaches_internals(tree: ast.AST) -> bool:
+    """Private, dunder or introspection attributes, dunder names, or the injected _dry_* hooks."""
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Attribute) and node.attr.startswith(INTROSPECTION_PREFIXES):
+            return True
+        if isinstance(node, ast.Name) and (
+            (node.id.startswith("__") and node.id != "__name__") or node.id.startswith("_dry_")
+        ):
+            return True
+    return False
+
+
+def _has_star_import(tree: ast.AST) -> bool:
+    return any(isinstance(n, ast.ImportFrom) and any(a.name == "*" for a in n.names) for n in ast.walk(tree))
+
+
+class DryRunResult:
+    def __init__(self, status: str, seconds: float, message: Optional[str] = None, line: Optional[int] = None,
+                 shape_type: Optional[str] = None):
+        self.status = status
+        self.seconds = seconds
+        self.message = message
+        self.line = line
+        self.shape_type = shape_type
+
+    @property
+    def failed(self) -> bool:
+        return self.status == FAILED
+
+    def to_dict(self) -> dict:
+        return {
+            "status": self.status,
+            "ms": round(self.seconds * 1000, 3),
+            "message": self.message,
+            "line": self.line,
+            "shape_type": self.shape_type,
+        }
+
+
+WORKER_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "dry_run_worker.py")
+WORKER_MARKER = "@@DRY_RUN_WORKER@@ "
+# Seconds a worker may overrun DRY_RUN_TIMEOUT (a long C call the budget cannot interrupt) before it is killed
+WORKER_GRACE = 2.0
+# Jobs before a worker is replaced, so state a script left behind in the mock classes does not last
+WORKER_MAX_JOBS = 500
+# Only what the interpreter needs to start; no API keys or other server configuration
+_WORKER_ENV_KEYS = ("PATH", "SYSTEMROOT", "TEMP", "TMP", "TMPDIR", "LANG", "LC_ALL")
+
+
+class DryRunProcess:
+    """One `python -I dry_run_worker.py` process with a stripped environment."""
+
+    def __init__(self):
+        self.process: Optional[subprocess.Popen] = None
+        self.jobs_done = 0
+
+    @property
+    def alive(self) -> bool:
+        return self.process is not None and self.process.poll() is None
+
+    def _read_reply(self) -> Optional[dict]:
+        """Blocks until the next protocol line. Returns None if the worker exited."""
+        while True:
+            line = self.process.stdout.readline()
+            if not line:
+                return None
+            if line.startswith(WORKER_MARKER):
+                return json.loads(line[len(WORKER_MARKER):])
+
+    def start(self):
+        self.process = subprocess.Popen(
+            [sys.executable, "-I", WORKER_SCRIPT],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+            text=True,
+            encoding="utf-8",
+            errors="replace",
+            bufsize=1,
+            cwd=tempfile.gettempdir(),
+            env={key: os.environ[key] for key in _WORKER_ENV_KEYS if key in os.environ},
+        )
+        reply = self._read_reply()
+        if not reply or not reply.get("ready"):
+            self.kill()
+            raise RuntimeError("dry-run worker failed to start")
+
+    def run(self, job: dict) -> Optional[dict]:
+        """Sends one job and blocks for its result; None if the worker died."""
+        self.process.stdin.write(json.dumps(job) + "\n")
+        self.process.stdin.flush()
+        reply = self._read_reply()
+        self.jobs_done += 1
+        return reply
+
+    def kill(self):
+        if self.process is None:
+            return
+        try:
+            if self.process.poll() is None:
+                self.process.kill()
+            self.process.wait(timeout=5)
+        except Exception as e:
+            logger.warning(f"Failed to kill dry-run worker: {e}")
+        finally:
+            for stream in (self.process.stdin, self.process.stdout):
+                try:
+                    stream.close()
+                except Exception:
+                    pass
+
+
+class DryRunner:
+    """
+    Runs validated scripts against a pure-Python model of the FreeCAD / Part /
+    Vector API that the system prompt documents, before they reach FreeCAD.
+
+    The model checks arities, argument types and obviously invalid dimensions,
+    tracks shape types, bounding boxes and primitive topology, and flags typos of
+    real API names. It only fails a script on errors the real FreeCAD would hit
+    too; as soon as a script leaves the modelled surface (unknown modules or
+    attributes, resource caps) the run stops as `inconclusive` and the script
+    goes to FreeCAD as before.
+
+    `check` never executes the script in the server process: it sends it to one of
+    DRY_RUN_WORKERS warm child processes, started with `-I`, an empty environment
+    and a temporary working directory, where `run` executes it. Inside the worker
+    only allowlisted members of a few real modules are importable, private, dunder
+    and frame/code attributes are refused, dangerous builtins are removed, and loop
+    iterations, sequence sizes and wall time are capped.
+    """
+
+    def __init__(self):
+        self.enabled = settings.DRY_RUN_ENABLED
+        self.max_iterations = settings.DRY_RUN_MAX_ITERATIONS
+        self.timeout = settings.DRY_RUN_TIMEOUT
+        self.workers = max(1, settings.DRY_RUN_WORKERS)
+        self._idle: asyncio.Queue = asyncio.Queue()
+        for _ in range(self.workers):
+            self._idle.put_nowait(None)  # Spawned on first use or by start()
+        self._processes: List[DryRunProcess] = []
+        self.stats = {"runs": 0, PASSED: 0, FAILED: 0, INCONCLUSIVE: 0, "total_ms": 0.0, "max_ms": 0.0,
+                      "worker_restarts": 0}
+        self._builtins = {k: v for k, v in vars(builtins).items() if k not in UNSAFE_BUILTINS}
+        self._builtins["print"] = lambda *args, **kwargs: None
+
+    def _importer(self, modules: Dict[str, types.ModuleType]):
+        """`__import__` for one run, resolving against that run's own module table."""
+
+        def _import(name, globals=None, locals=None, fromlist=(), level=0):
+            if level:
+                raise _Inconclusive("relative imports are not modelled")
+            root = name.split(".")[0]
+            if root == "FreeCAD":
+                if name == "FreeCAD.Base":
+                    return modules["FreeCAD.Base"] if fromlist else modules["FreeCAD"]
+                if name != "FreeCAD":
+                    raise _Inconclusive(f"import of {name} is not modelled")
+                return modules["FreeCAD"]
+            if name == "Part":
+                return modules["Part"]
+            if name in REAL_MODULES:
+                if name not in modules:
+                    members, known = _real_module_members(name)
+                    modules[name] = _MockModule(name, dict(members), known)
+                return modules[name]
+            raise _Inconclusive(f"import of {name} is not modelled")
+
+        return _import
+
+    def _fresh_modules(self) -> Dict[str, types.ModuleType]:
+        base = _MockModule("FreeCAD.Base", dict(FREECAD_MODELLED), FREECAD_KNOWN)
+        freecad = _MockModule("FreeCAD", {**FREECAD_MODELLED, "Base": base}, FREECAD_KNOWN)
+        part = _MockModule("Part", dict(PART_MODELLED), PART_KNOWN)
+        return {"FreeCAD": freecad, "FreeCAD.Base": base, "Part": part}
+
+    def run(self, code: str) -> DryRunResult:
+        started = time.perf_counter()
+        try:
+            tree = ast.parse(code)
+        except SyntaxError as e:
+            return DryRunResult(FAILED, time.perf_counter() - started, f"SyntaxError: {e.msg}", e.lineno)
+        if _reaches_internals(tree):
+            return DryRunResult(INCONCLUSIVE, time.perf_counter() - started, "script uses private or introspection names")
+
+        tree = ast.fix_missing_locations(_Instrument().visit(tree))
+        budget = _Budget(self.max_iterations, self.timeout)
+        # Per run: concurrent runs must not share (or clear) each other's modules
+        script_builtins = dict(self._builtins, __import__=self._importer(self._fresh_modules()), range=budget.range)
+        namespace = {
+            "__name__": "__main__",
+            "__builtins__": script_builtins,
+            "_dry_iter": budget.iterate,
+            "_dry_tick": budget.tick,
+            "_dry_binop": budget.binop,
+        }
+        try:
+            exec(compile(tree, SCRIPT_FILENAME, "exec"), namespace)
+        except _Inconclusive as e:
+            return DryRunResult(INCONCLUSIVE, time.perf_counter() - started, str(e), _script_line(e))
+        except (RecursionError, MemoryError) as e:
+            return DryRunResult(INCONCLUSIVE, time.perf_counter() - started, type(e).__name__)
+        except Exception as e:
+            definite = getattr(e, "dry_run_definite", False)
+            if isinstance(e, NameError) and not definite:
+                name = getattr(e, "name", None)
+                definite = not _has_star_import(tree) and not hasattr(builtins, name or "")
+            elif not definite:
+                # Raised by plain Python in the script itself, not from inside the model
+                definite = _innermost_filename(e) == SCRIPT_FILENAME
+            status = FAILED if definite else INCONCLUSIVE
+            return DryRunResult(status, time.perf_counter() - started, f"{type(e).__name__}: {e}", _script_line(e))
+
+        elapsed = time.perf_counter() - started
+        if "final_shape" not in namespace:
+            return DryRunResult(FAILED, elapsed, "final_shape is never assigned")
+        final_shape = namespace["final_shape"]
+        if not isinstance(final_shape, Shape):
+            return DryRunResult(FAILED, elapsed, f"final_shape must be a Part.Shape, not {type(final_shape).__name__}")
+        if final_shape._null:
+            return DryRunResult(FAILED, elapsed, "final_shape is a null shape", shape_type=final_shape.ShapeType)
+        if final_shape._empty:
+            return DryRunResult(FAILED, elapsed, "final_shape is empty (common of shapes that do not overlap)",
+                                shape_type=final_shape.ShapeType)
+        return DryRunResult(PASSED, elapsed, shape_type=final_shape.ShapeType)
+
+    def _record(self, result: DryRunResult):
+        ms = result.seconds * 1000
+        self.stats["runs"] += 1
+        self.stats[result.status] += 1
+        self.stats["total_ms"] += ms
+        self.stats["max_ms"] = max(self.stats["max_ms"], ms)
+
+    async def start(self):
+        """Spawns the workers ahead of the first request. Blocking work runs in threads."""
+        if not self.enabled:
+            return
+        spawned = []
+        while not self._idle.empty():
+            process = self._idle.get_nowait()
+            if process is None:
+                process = DryRunProcess()
+                await asyncio.to_thread(process.start)
+                self._processes.append(process)
+            spawned.append(process)
+        for process in spawned:
+            self._idle.put_nowait(process)
+
+    async def shutdown(self):
+        for process in list(self._processes):
+            await asyncio.to_thread(process.kill)
+        self._processes.clear()
+
+    def _retire(self, process: DryRunProcess):
+        process.kill()
+        if process in self._processes:
+            self._processes.remove(process)
+        self.stats["worker_restarts"] += 1
+
+    async def _run_isolated(self, code: str) -> DryRunResult:
+        """Runs the script in a worker process; any worker trouble makes the run inconclusive."""
+        process = await self._idle.get()
+        try:
+            if process is None or not process.alive:
+                if process is not None:
+                    self._retire(process)
+                process = DryRunProcess()
+                try:
+                    await asyncio.to_thread(process.start)
+                except Exception as e:
+                    process = None
+                    return DryRunResult(INCONCLUSIVE, 0.0, f"dry-run worker unavailable: {e}")
+                self._processes.append(process)
+
+            job = {"id": str(uuid.uuid4()), "code": code, "max_iterations": self.max_iterations, "timeout": self.timeout}
+            try:
+                reply = await asyncio.wait_for(asyncio.to_thread(process.run, job), timeout=self.timeout + WORKER_GRACE)
+            except asyncio.TimeoutError:
+                self._retire(process)
+                process = None
+                return DryRunResult(INCONCLUSIVE, self.timeout + WORKER_GRACE, "dry-run worker did not finish in time")
+            if reply is None:
+                self._retire(process)
+                process = None
+                return DryRunResult(INCONCLUSIVE, 0.0, "dry-run worker exited")
+            if process.jobs_done >= WORKER_MAX_JOBS:
+                self._retire(process)
+                process = None
+            reply.pop("id", None)
+            return DryRunResult(**reply)
+        except BaseException:
+            # Cancelled or the pipe broke: the blocked thread cannot be interrupted, kill the worker
+            if process is not None:
+                self._retire(process)
+                process = None
+            raise
+        finally:
+            self._idle.put_nowait(process)
+
+    async def check(self, code: str) -> DryRunResult:
+        """Dry-runs a validated script; raises ValidationError if it would certainly fail in FreeCAD."""
+        if not self.enabled:
+            return DryRunResult(SKIPPED, 0.0)
+        result = await self._run_isolated(code)
+        self._record(result)
+        if result.failed:
+            where = f" (line {result.line})" if result.line else ""
+            logger.info(f"Dry run rejected script in {result.seconds * 1000:.1f} ms: {result.message}{where}")
+            raise ValidationError("Script failed a dry run against the FreeCAD API.", details=f"{result.message}{where}")
+        if result.status == INCONCLUSIVE:
+            logger.debug(f"Dry run inconclusive: {result.message}")
+        return result
+
+    def get_stats(self) -> dict:
+        runs = self.stats["runs"]
+        return {
+            "enabled": self.enabled,
+            "workers": self.workers,
+            "workers_alive": sum(1 for p in self._processes if p.alive),
+            **{k: v for k, v in self.stats.items() if k != "total_ms"},
+            "max_ms": round(self.stats["max_ms"], 3),
+            "avg_ms": round(self.stats["total_ms"] / runs, 3) if runs else 0.0,
+        }
+
+
+def _innermost_filename(error: BaseException) -> Optional[str]:
+    tb = error.__traceback__
+    filename = None
+    while tb is not None:
+        filename = tb.tb_frame.f_code.co_filename
+        tb = tb.tb_next
+    return filename
+
+
+def _script_line(error: BaseException) -> Optional[int]:
+    """Line of the deepest script frame in the traceback."""
+    tb, line = error.__traceback__, None
+    while tb is not None:
+        if tb.tb_frame.f_code.co_filename == SCRIPT_FILENAME:
+            line = tb.tb_lineno
+        tb = tb.tb_next
+    return line
+
+
+dry_runner = DryRunner()
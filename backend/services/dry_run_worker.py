@@ -0,0 +1,55 @@
+"""
+Long-lived dry-run worker loop.
+
+This file is NOT imported by the backend. DryRunner launches it as
+`python -I dry_run_worker.py` with a stripped environment, so scripts from the LLM
+are never executed inside the API server process. Jobs arrive as one JSON object
+per line on stdin. Each result is written as a single marker-prefixed JSON line
+on stdout, so log output never confuses the parent.
+"""
+import os
+import sys
+import json
+
+# -I leaves the script's directory off sys.path; the worker imports from backend/
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+MARKER = "@@DRY_RUN_WORKER@@ "
+
+
+def _reply(payload):
+    sys.__stdout__.write(MARKER + json.dumps(payload) + "\n")
+    sys.__stdout__.flush()
+
+
+def main():
+    from services.dry_run import DryRunner
+
+    runner = DryRunner()
+    _reply({"ready": True})
+
+    stdin = sys.__stdin__
+    while True:
+        line = stdin.readline()
+        if not line:
+            break  # Parent closed the pipe
+        try:
+            job = json.loads(line)
+        except ValueError:
+            continue
+        if job.get("cmd") == "shutdown":
+            break
+        runner.max_iterations = job["max_iterations"]
+        runner.timeout = job["timeout"]
+        result = runner.run(job["code"])
+        _reply({
+            "id": job["id"],
+            "status": result.status,
+            "seconds": result.seconds,
+            "message": result.message,
+            "line": result.line,
+            "shape_type": result.shape_type,
+        })
+
+
+main()
@@ -1,87 +1,288 @@
 import os
+import gzip
+import json
 import asyncio
-import uuid
-import time
 import subprocess
-from typing import Tuple
+from typing import Optional, Tuple
 from core.config import settings
 from core.logger import setup_logger
 from core.errors import ExecutionError, TimeoutError
+from core.metrics import metrics
+from services.worker_pool import FreeCADWorkerPool, build_command
+from services.scheduler import current_stage, scheduler
+from services.storage import output_storage
+from services.checkpoints import ExecutionPlan, checkpoint_store
+from services.mesh_analysis import mesh_analyzer
 
 logger = setup_logger("cad_copilot.executor")
 
+# Appended to every script. Writes `final_shape` as compact binary STLs
+# (FreeCAD's Shape.exportStl only writes ASCII, which is several times larger).
+# One mesh is written per level of detail, coarse to fine, in a single run:
+# each level's deflection is a fraction of the BoundBox diagonal, coarsened
+# further while the mesh exceeds that level's triangle budget. The finest level
+# is `<id>.stl`, coarser ones `<id>.lod<N>.stl`, described by `<id>.lods.json`.
+# With SAVE_BREP the exact shape is also saved as `<id>.brep`, which
+# /api/models/{id}/export converts to other formats without re-running the script.
+EXPORT_TEMPLATE = """
+
+def _cad_write_stl(path, points, facets):
+    import struct
+    coords = [(p.x, p.y, p.z) for p in points]
+    pack = struct.Struct('<12fH').pack
+    chunks = [b'CAD Copilot binary STL'.ljust(80, b' '), struct.pack('<I', len(facets))]
+    for i, j, k in facets:
+        a, b, c = coords[i], coords[j], coords[k]
+        ux, uy, uz = b[0] - a[0], b[1] - a[1], b[2] - a[2]
+        vx, vy, vz = c[0] - a[0], c[1] - a[1], c[2] - a[2]
+        nx, ny, nz = uy * vz - uz * vy, uz * vx - ux * vz, ux * vy - uy * vx
+        length = (nx * nx + ny * ny + nz * nz) ** 0.5 or 1.0
+        chunks.append(pack(nx / length, ny / length, nz / length, *a, *b, *c, 0))
+    with open(path, 'wb') as stl_file:
+        stl_file.write(b''.join(chunks))
+
+def _cad_export_stl(shape, path, levels, budgets, min_tolerance, binary):
+    if not binary:
+        shape.exportStl(path)
+        return
+    import json
+    diagonal = shape.BoundBox.DiagonalLength or 1.0
+    stem = path[:-len('.stl')]
+    lods = []
+    for index, (relative, budget) in enumerate(zip(levels, budgets)):
+        tolerance = max(relative * diagonal, min_tolerance)
+        # Tessellate a copy: FreeCAD keeps the finest triangulation on a shape
+        points, facets = shape.copy().tessellate(tolerance)
+        for _ in range(8):
+            if len(facets) <= budget:
+                break
+            tolerance *= 2
+            points, facets = shape.copy().tessellate(tolerance)
+        suffix = 'stl' if index == len(levels) - 1 else 'lod%d.stl' % index
+        _cad_write_stl(stem + '.' + suffix, points, facets)
+        lods.append({{'level': index, 'suffix': suffix, 'tolerance': tolerance, 'triangles': len(facets)}})
+    with open(stem + '.lods.json', 'w') as lods_file:
+        json.dump(lods, lods_file)
+
+if 'final_shape' in locals() and final_shape is not None:
+    _cad_export_stl(final_shape, {path!r}, {levels!r}, {budgets!r}, {min_tolerance!r}, {binary!r})
+    if {brep_path!r}:
+        final_shape.exportBrep({brep_path!r})
+"""
+
+
+def _parse_floats(value: str) -> list:
+    return [float(v) for v in value.split(",") if v.strip()]
+
+
+def _write_precompressed(stl_path: str, encodings: list) -> list:
+    """Writes `<file>.gz` / `<file>.br` next to the STL for the /outputs static mount."""
+    with open(stl_path, "rb") as f:
+        data = f.read()
+
+    written = []
+    for encoding in encodings:
+        if encoding == "gzip":
+            with open(stl_path + ".gz", "wb") as f:
+                f.write(gzip.compress(data, compresslevel=6))
+            written.append("gzip")
+        elif encoding == "br":
+            try:
+                import brotli
+            except ImportError:
+                continue  # Optional dependency
+            with open(stl_path + ".br", "wb") as f:
+                f.write(brotli.compress(data, quality=5))
+            written.append("br")
+    return written
+
 class FreeCADExecutor:
     def __init__(self):
         self.output_dir = settings.OUTPUT_DIR
+        self.pool: Optional[FreeCADWorkerPool] = None
 
-    async def _cleanup_old_files(self):
-        logger.debug("Cleaning up old files...")
-        now = time.time()
-        for filename in os.listdir(self.output_dir):
-            file_path = os.path.join(self.output_dir, filename)
-            if os.path.isfile(file_path):
-                # Delete files older than 1 hour
-                if os.stat(file_path).st_mtime < now - 3600:
-                    try:
-                        os.remove(file_path)
-                    except Exception as e:
-                        logger.warning(f"Failed to delete old file {file_path}: {e}")
+    def _resolve_executable(self) -> Optional[str]:
+        executable = settings.FREECAD_PATH
+        if executable:
+            executable = executable.strip("'\"")
+        return executable
+
+    async def start(self):
+        """Starts the warm FreeCAD worker pool if enabled and FreeCAD is configured."""
+        executable = self._resolve_executable()
+        if settings.FREECAD_POOL_SIZE <= 0:
+            logger.info("FreeCAD worker pool disabled; using one process per request.")
+            return
+        if not executable or not os.path.exists(executable):
+            logger.warning("FreeCAD executable not found; worker pool not started.")
+            return
+        self.pool = FreeCADWorkerPool(
+            executable,
+            lanes=scheduler.worker_lanes,
+            max_jobs=settings.FREECAD_WORKER_MAX_JOBS,
+            timeout=settings.FREECAD_TIMEOUT,
+        )
+        await self.pool.start()
+
+    async def shutdown(self):
+        if self.pool:
+            await self.pool.shutdown()
+            self.pool = None
+
+    def get_pool_stats(self) -> Optional[dict]:
+        return self.pool.get_stats() if self.pool else None
 
-    async def execute_script(self, code: str) -> str:
+    async def execute_script(self, code: str) -> Tuple[str, Optional[dict]]:
         """
         Executes the validated Python script in FreeCADCmd.
-        Returns the filename of the generated STL.
+        Returns the path of the generated STL relative to OUTPUT_DIR and, when
+        execution resumed from a checkpoint, a description of the reused prefix.
         """
-        executable = settings.FREECAD_PATH
-        if executable:
-            executable = executable.strip("'\"")
+        executable = self._resolve_executable()
 
         if not executable or not os.path.exists(executable):
             raise ExecutionError(f"FreeCAD executable path is not configured or not found: {executable}")
 
-        # Trigger cleanup asynchronously
-        asyncio.create_task(self._cleanup_old_files())
+        plan = checkpoint_store.plan(code)
+        try:
+            stl_relpath = await self._execute(executable, code, plan)
+        except ExecutionError:
+            if plan is None or not plan.resumed:
+                raise
+            # The checkpoint may not restore faithfully; never fail a script because of it
+            logger.warning("Execution resumed from a checkpoint failed; retrying from the start")
+            checkpoint_store.invalidate(plan)
+            plan = checkpoint_store.plan(code, allow_resume=False)
+            stl_relpath = await self._execute(executable, code, plan)
+
+        if plan is not None:
+            checkpoint_store.commit(plan)
+            if plan.resumed:
+                logger.info(f"Reused {plan.resume_at}/{len(plan.statements)} statements from a checkpoint")
+        return stl_relpath, plan.describe() if plan is not None else None
+
+    async def _execute(self, executable: str, code: str, plan: Optional[ExecutionPlan]) -> str:
+        task_id, directory = output_storage.new_artifact()
+        script_path = os.path.join(directory, f"{task_id}.py")
+        stl_path = os.path.join(directory, f"{task_id}.stl")
 
-        task_id = str(uuid.uuid4())
-        script_path = os.path.join(self.output_dir, f"{task_id}.py")
-        stl_path = os.path.join(self.output_dir, f"{task_id}.stl")
-        
         # Inject standard export logic at the end of the script to ensure uniformity
         # The prompt will be instructed to create a variable named `final_shape`
-        export_snippet = f"\n\nif 'final_shape' in locals() and final_shape is not None:\n    final_shape.exportStl('{stl_path.replace(chr(92), '/')}')\n"
-        final_code = code + export_snippet
+        levels = _parse_floats(settings.STL_LOD_LEVELS) or [0.001]
+        budgets = [int(b) for b in _parse_floats(settings.STL_LOD_TRIANGLE_BUDGETS)]
+        budgets += [budgets[-1] if budgets else 2_000_000] * (len(levels) - len(budgets))
+        export_snippet = EXPORT_TEMPLATE.format(
+            path=stl_path.replace(chr(92), '/'),
+            levels=levels,
+            budgets=budgets,
+            min_tolerance=settings.STL_MESH_TOLERANCE,
+            binary=settings.STL_BINARY,
+            brep_path=os.path.join(directory, f"{task_id}.brep").replace(chr(92), '/') if settings.SAVE_BREP else "",
+        )
+        body = checkpoint_store.render(plan) if plan is not None else code
+        final_code = body + export_snippet
 
-        with open(script_path, "w", encoding="utf-8") as f:
+        with metrics.timed("script_write"), open(script_path, "w", encoding="utf-8") as f:
             f.write(final_code)
 
         logger.info(f"Executing FreeCAD script: {script_path}")
 
+        try:
+            with metrics.timed("freecad"):
+                await self.run_script(script_path, executable)
+            return await self._finalize_output(task_id, stl_path)
+
+        finally:
+            # Failed runs are indexed too: the script is kept for debugging until it expires
+            await output_storage.register(task_id)
+
+    async def run_script(self, script_path: str, executable: Optional[str] = None):
+        """Runs a script file in a warm worker, or in a one-shot FreeCADCmd process without a pool."""
+        if self.pool:
+            # Heavy scripts run on the workers reserved for the heavy lane
+            await self.pool.execute(script_path, lane=current_stage())
+            return
+
+        executable = executable or self._resolve_executable()
+        if not executable or not os.path.exists(executable):
+            raise ExecutionError(f"FreeCAD executable path is not configured or not found: {executable}")
         try:
             # We use asyncio.to_thread with subprocess.run to avoid Windows Event Loop NotImplementedErrors
             process = await asyncio.to_thread(
                 subprocess.run,
-                [executable, script_path],
+                build_command(executable, script_path),
                 capture_output=True,
                 text=True,
                 timeout=settings.FREECAD_TIMEOUT
             )
+        except subprocess.TimeoutExpired:
+            raise TimeoutError(f"FreeCAD execution exceeded {settings.FREECAD_TIMEOUT} seconds.")
 
-            if process.returncode != 0:
-                err_msg = process.stderr.strip() if process.stderr else process.stdout.strip()
-                logger.error(f"FreeCAD execution failed. Code: {process.returncode}. Error: {err_msg}")
-                raise ExecutionError("FreeCAD script execution failed.", details=err_msg)
+        if process.returncode != 0:
+            err_msg = process.stderr.strip() if process.stderr else process.stdout.strip()
+            logger.error(f"FreeCAD execution failed. Code: {process.returncode}. Error: {err_msg}")
+            raise ExecutionError("FreeCAD script execution failed.", details=err_msg)
 
-            # Verification: Check if STL was actually created and has size
-            if not os.path.exists(stl_path):
-                raise ExecutionError("FreeCAD execution succeeded, but no STL file was generated.", details="Ensure 'final_shape' exists.")
-            
-            if os.path.getsize(stl_path) < 100: # Less than 100 bytes is likely empty or invalid
-                 raise ExecutionError("Generated STL file is too small or invalid.")
+    @metrics.timed("stl_check")
+    def _verify_output(self, task_id: str, stl_path: str) -> str:
+        # Verification: Check if STL was actually created and has size
+        if not os.path.exists(stl_path):
+            raise ExecutionError("FreeCAD execution succeeded, but no STL file was generated.", details="Ensure 'final_shape' exists.")
 
-            logger.info(f"Successfully generated STL: {stl_path}")
-            return f"{task_id}.stl"
+        if mesh_analyzer.enabled:
+            # Parses the mesh itself: catches empty exports and stores the report for the response
+            try:
+                report = mesh_analyzer.analyze(stl_path)
+            except Exception as e:
+                raise ExecutionError("Generated STL file could not be read.", details=str(e))
+            if report["triangles"] == 0:
+                raise ExecutionError("Generated STL file contains no triangles.", details="Ensure 'final_shape' is a non-empty solid.")
+        elif os.path.getsize(stl_path) < 100: # Less than 100 bytes is likely empty or invalid
+             raise ExecutionError("Generated STL file is too small or invalid.")
 
-        finally:
-             pass # We can keep the python script for debugging if needed, or remove it.
+        logger.info(f"Successfully generated STL: {stl_path}")
+        return output_storage.relpath(task_id, "stl")
+
+    async def _finalize_output(self, task_id: str, stl_path: str) -> str:
+        # Mesh analysis is vectorized but still CPU-bound on large meshes: off the event loop
+        filename = await asyncio.to_thread(self._verify_output, task_id, stl_path)
+        encodings = [e.strip() for e in settings.STL_PRECOMPRESS.split(",") if e.strip()]
+        if encodings:
+            directory = os.path.dirname(stl_path)
+            mesh_paths = [os.path.join(directory, f"{task_id}.{lod['suffix']}") for lod in self._read_lods(stl_path)]
+            with metrics.timed("precompress"):
+                for path in mesh_paths or [stl_path]:
+                    try:
+                        await asyncio.to_thread(_write_precompressed, path, encodings)
+                    except Exception as e:
+                        logger.warning(f"Failed to precompress {path}: {e}")
+        return filename
+
+    def _read_lods(self, stl_path: str) -> list:
+        lods_path = stl_path[:-len(".stl")] + ".lods.json"
+        try:
+            with open(lods_path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return []
+
+    def describe_lods(self, stl_relpath: str) -> list:
+        """
+        Returns the level-of-detail meshes (coarse to fine) for an STL under OUTPUT_DIR,
+        as dicts with `level`, `url`, `tolerance` and `triangles`.
+        """
+        stl_path = os.path.join(self.output_dir, stl_relpath)
+        directory, name = os.path.split(stl_relpath.replace(chr(92), '/'))
+        stem = name[:-len(".stl")]
+        prefix = f"/outputs/{directory}/" if directory else "/outputs/"
+        return [
+            {
+                "level": lod["level"],
+                "url": f"{prefix}{stem}.{lod['suffix']}",
+                "tolerance": lod["tolerance"],
+                "triangles": lod["triangles"],
+            }
+            for lod in self._read_lods(stl_path)
+        ]
 
 executor = FreeCADExecutor()
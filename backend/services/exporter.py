@@ -0,0 +1,190 @@
+import os
+import contextlib
+from typing import Optional, Tuple
+from core.config import settings
+from core.logger import setup_logger
+from core.errors import ExecutionError
+from core.metrics import metrics
+from services.executor import executor
+from services.storage import output_storage
+from services.geometry_cache import geometry_cache, model_file
+from services.scheduler import scheduler
+from services.coalescing import SingleFlight
+
+logger = setup_logger("cad_copilot.exporter")
+
+# Format -> media type. `brep` is the saved file itself; the others are converted from it.
+EXPORT_FORMATS = {
+    "step": "model/step",
+    "brep": "application/octet-stream",
+    "obj": "model/obj",
+    "glb": "model/gltf-binary",
+    "3mf": "model/3mf",
+}
+
+# Runs inside FreeCADCmd. Reads the saved BRep and writes one format: STEP through
+# OCCT, mesh formats from a tessellation as fine as the finest STL level of detail.
+CONVERT_TEMPLATE = """
+import Part
+
+def _cad_mesh(shape, relative, min_tolerance):
+    diagonal = shape.BoundBox.DiagonalLength or 1.0
+    points, facets = shape.tessellate(max(relative * diagonal, min_tolerance))
+    if not facets:
+        raise ValueError('Shape produced no triangles')
+    return [(p.x, p.y, p.z) for p in points], facets
+
+def _cad_write_obj(path, coords, facets):
+    lines = ['# CAD Copilot export']
+    lines.extend('v %r %r %r' % c for c in coords)
+    lines.extend('f %d %d %d' % (i + 1, j + 1, k + 1) for i, j, k in facets)
+    with open(path, 'w') as obj_file:
+        obj_file.write('\\n'.join(lines) + '\\n')
+
+def _cad_write_glb(path, coords, facets):
+    import json
+    import struct
+    positions = b''.join(struct.pack('<3f', *c) for c in coords)
+    indices = b''.join(struct.pack('<3I', *f) for f in facets)
+    gltf = {{
+        'asset': {{'version': '2.0', 'generator': 'CAD Copilot'}},
+        'scene': 0,
+        'scenes': [{{'nodes': [0]}}],
+        # glTF is metres and Y-up; the model is millimetres and Z-up
+        'nodes': [{{'mesh': 0, 'scale': [0.001, 0.001, 0.001], 'rotation': [-0.7071068, 0.0, 0.0, 0.7071068]}}],
+        'meshes': [{{'primitives': [{{'attributes': {{'POSITION': 0}}, 'indices': 1, 'mode': 4}}]}}],
+        'buffers': [{{'byteLength': len(positions) + len(indices)}}],
+        'bufferViews': [
+            {{'buffer': 0, 'byteOffset': 0, 'byteLength': len(positions), 'target': 34962}},
+            {{'buffer': 0, 'byteOffset': len(positions), 'byteLength': len(indices), 'target': 34963}},
+        ],
+        'accessors': [
+            {{'bufferView': 0, 'componentType': 5126, 'count': len(coords), 'type': 'VEC3',
+              'min': [min(c[i] for c in coords) for i in range(3)], 'max': [max(c[i] for c in coords) for i in range(3)]}},
+            {{'bufferView': 1, 'componentType': 5125, 'count': 3 * len(facets), 'type': 'SCALAR'}},
+        ],
+    }}
+    document = json.dumps(gltf, separators=(',', ':')).encode('utf-8')
+    document += b' ' * (-len(document) % 4)
+    binary = positions + indices
+    with open(path, 'wb') as glb_file:
+        glb_file.write(struct.pack('<3I', 0x46546C67, 2, 28 + len(document) + len(binary)))
+        glb_file.write(struct.pack('<2I', len(document), 0x4E4F534A) + document)
+        glb_file.write(struct.pack('<2I', len(binary), 0x004E4942) + binary)
+
+def _cad_write_3mf(path, coords, facets):
+    import zipfile
+    model = (
+        '<?xml version="1.0" encoding="UTF-8"?>'
+        '<model unit="millimeter" xml:lang="en-US" xmlns="http://schemas.microsoft.com/3dmanufacturing/core/2015/02">'
+        '<resources><object id="1" type="model"><mesh><vertices>'
+        + ''.join('<vertex x="%r" y="%r" z="%r"/>' % c for c in coords)
+        + '</vertices><triangles>'
+        + ''.join('<triangle v1="%d" v2="%d" v3="%d"/>' % tuple(f) for f in facets)
+        + '</triangles></mesh></object></resources><build><item objectid="1"/></build></model>'
+    )
+    content_types = (
+        '<?xml version="1.0" encoding="UTF-8"?>'
+        '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+        '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+        '<Default Extension="model" ContentType="application/vnd.ms-package.3dmanufacturing-3dmodel+xml"/>'
+        '</Types>'
+    )
+    relationships = (
+        '<?xml version="1.0" encoding="UTF-8"?>'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Target="/3D/3dmodel.model" Id="rel0" Type="http://schemas.microsoft.com/3dmanufacturing/2013/01/3dmodel"/>'
+        '</Relationships>'
+    )
+    with zipfile.ZipFile(path, 'w', zipfile.ZIP_DEFLATED) as archive:
+        archive.writestr('[Content_Types].xml', content_types)
+        archive.writestr('_rels/.rels', relationships)
+        archive.writestr('3D/3dmodel.model', model)
+
+_cad_shape = Part.Shape()
+_cad_shape.read({source!r})
+if {fmt!r} == 'step':
+    _cad_shape.exportStep({target!r})
+else:
+    _cad_coords, _cad_facets = _cad_mesh(_cad_shape, {relative!r}, {min_tolerance!r})
+    {{'obj': _cad_write_obj, 'glb': _cad_write_glb, '3mf': _cad_write_3mf}}[{fmt!r}]({target!r}, _cad_coords, _cad_facets)
+"""
+
+
+class ModelExporter:
+    """
+    Converts generated models to other formats on demand, from the BRep the executor
+    saved next to the STL (SAVE_BREP). A conversion runs once per model and format in
+    the FreeCAD worker pool and is kept on disk next to the model, so it expires or is
+    evicted together with it. The LLM and the user's script never run again.
+    """
+
+    def __init__(self):
+        self._flights = SingleFlight("export")
+        self.stats = {"conversions": 0, "reused": 0, "failures": 0}
+
+    async def export(self, model_id: str, fmt: str) -> Optional[Tuple[str, bool]]:
+        """
+        Returns (path of the exported file, whether it already existed), or None if the
+        model is unknown or was generated without a BRep. Raises ExecutionError if
+        the conversion fails.
+        """
+        brep_path = model_file(model_id, "brep")
+        if brep_path is None:
+            return None
+        directory = os.path.dirname(brep_path)
+        if fmt == "brep":
+            return brep_path, True
+
+        target = os.path.join(directory, f"{model_id}.{fmt}")
+        if os.path.exists(target):
+            self.stats["reused"] += 1
+            output_storage.touch(model_id)
+            return target, True
+
+        # Concurrent requests for the same conversion share one FreeCAD run
+        await self._flights.run(f"{model_id}.{fmt}", lambda: self._convert(model_id, brep_path, target, fmt))
+        return target, False
+
+    async def _convert(self, model_id: str, brep_path: str, target: str, fmt: str):
+        script_path = f"{target}.py"
+        partial = f"{target}.part"
+        levels = [float(v) for v in settings.STL_LOD_LEVELS.split(",") if v.strip()] or [0.001]
+        script = CONVERT_TEMPLATE.format(
+            source=brep_path.replace(chr(92), '/'),
+            target=partial.replace(chr(92), '/'),
+            fmt=fmt,
+            relative=levels[-1],
+            min_tolerance=settings.STL_MESH_TOLERANCE,
+        )
+        logger.info(f"Exporting model {model_id} as {fmt}")
+        try:
+            with output_storage.pin(model_id):
+                with open(script_path, "w", encoding="utf-8") as f:
+                    f.write(script)
+                async with scheduler.stage("executor"):
+                    with metrics.timed("export"):
+                        await executor.run_script(script_path)
+                if not os.path.exists(partial):
+                    raise ExecutionError(f"FreeCAD finished, but no {fmt} file was written.")
+                # Written under a temporary name: a failed run never leaves a truncated export behind
+                os.replace(partial, target)
+        except Exception:
+            self.stats["failures"] += 1
+            raise
+        finally:
+            for leftover in (script_path, partial):
+                with contextlib.suppress(FileNotFoundError):
+                    os.remove(leftover)
+
+        self.stats["conversions"] += 1
+        if geometry_cache.path(model_id, "brep") == brep_path:
+            geometry_cache.add_file(model_id, os.path.basename(target))
+        else:
+            await output_storage.refresh(model_id)
+
+    def get_stats(self) -> dict:
+        return {"formats": sorted(EXPORT_FORMATS), **self.stats, "in_flight": self._flights.get_stats()["in_flight"]}
+
+
+model_exporter = ModelExporter()
@@ -0,0 +1,63 @@
+"""
+Long-lived FreeCAD worker loop.
+
+This file is NOT imported by the backend. It is launched as
+`FreeCADCmd freecad_worker.py` by the worker pool and keeps `FreeCAD` and `Part`
+imported across jobs. Jobs arrive as one JSON object per line on stdin and the
+result of each job is written as a single marker-prefixed JSON line on stdout,
+so banner output or stray prints from scripts never confuse the parent.
+"""
+import json
+import sys
+import traceback
+
+MARKER = "@@CAD_WORKER@@ "
+
+
+def _reply(payload):
+    sys.__stdout__.write(MARKER + json.dumps(payload) + "\n")
+    sys.__stdout__.flush()
+
+
+def _run_job(job):
+    script_path = job["script_path"]
+    with open(script_path, "r", encoding="utf-8") as f:
+        source = f.read()
+
+    # Each job gets a fresh module namespace so no state leaks between scripts
+    namespace = {"__name__": "__main__", "__file__": script_path}
+    try:
+        exec(compile(source, script_path, "exec"), namespace)
+        return {"id": job.get("id"), "ok": True}
+    except BaseException as e:  # SystemExit from a script must not kill the worker
+        if isinstance(e, KeyboardInterrupt):
+            raise
+        return {"id": job.get("id"), "ok": False, "error": traceback.format_exc()}
+
+
+def main():
+    # Pay the import cost once per worker, not once per job
+    import FreeCAD  # noqa: F401
+    import Part  # noqa: F401
+
+    _reply({"ready": True})
+
+    stdin = sys.__stdin__
+    while True:
+        line = stdin.readline()
+        if not line:
+            break  # Parent closed the pipe
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            job = json.loads(line)
+        except ValueError:
+            _reply({"id": None, "ok": False, "error": f"Malformed job line: {line[:200]}"})
+            continue
+        if job.get("cmd") == "shutdown":
+            break
+        _reply(_run_job(job))
+
+
+main()
@@ -0,0 +1,238 @@
+import os
+import re
+import ast
+import json
+import shutil
+import asyncio
+import hashlib
+import contextlib
+from collections import OrderedDict
+from typing import List, Optional
+from core.config import settings
+from core.logger import setup_logger
+from services.storage import output_storage
+
+logger = setup_logger("cad_copilot.geometry_cache")
+
+# Bump when the executor's output format changes so stale artifacts are not served
+CACHE_FORMAT_VERSION = 3
+INDEX_FILE = "index.json"
+
+
+def canonical_key(code: str) -> Optional[str]:
+    """
+    Returns a content hash of the script's AST, so scripts that differ only in
+    whitespace, comments or quoting share a key. Returns None if the code does not parse.
+    """
+    try:
+        tree = ast.parse(code.strip().replace('\r\n', '\n'))
+    except SyntaxError:
+        return None
+    # Export settings change the artifact, so they are part of the key too
+    export_settings = (settings.STL_BINARY, settings.STL_MESH_TOLERANCE, settings.STL_LOD_LEVELS, settings.STL_LOD_TRIANGLE_BUDGETS, settings.SAVE_BREP)
+    material = f"v{CACHE_FORMAT_VERSION}|{export_settings}\n{ast.dump(tree)}"
+    return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+
+class GeometryCache:
+    """
+    Content-addressed, byte-bounded LRU cache of executor artifacts.
+
+    Artifacts are copied into `<OUTPUT_DIR>/cache/` as `<key><suffix>` (e.g. `<key>.stl`)
+    so they are served by the existing /outputs mount and are not subject to
+    OutputStorage expiry. The LRU index is persisted as JSON when entries are
+    stored or evicted; the recency order changed by hits is written with them,
+    or on shutdown.
+    """
+
+    def __init__(self):
+        self.enabled = settings.GEOMETRY_CACHE_ENABLED
+        self.max_bytes = settings.GEOMETRY_CACHE_MAX_BYTES
+        self.cache_dir = os.path.join(settings.OUTPUT_DIR, "cache")
+        self._entries: "OrderedDict[str, dict]" = OrderedDict()
+        self._bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._dirty = False
+        if self.enabled:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            self._load_index()
+
+    def _index_path(self) -> str:
+        return os.path.join(self.cache_dir, INDEX_FILE)
+
+    def _load_index(self):
+        try:
+            with open(self._index_path(), "r", encoding="utf-8") as f:
+                entries = json.load(f)
+        except FileNotFoundError:
+            return
+        except Exception as e:
+            logger.warning(f"Geometry cache index is unreadable, starting empty: {e}")
+            return
+
+        # Stored least- to most-recently used; drop entries whose files vanished
+        for entry in entries:
+            paths = [os.path.join(self.cache_dir, name) for name in entry.get("files", [])]
+            if paths and all(os.path.exists(p) for p in paths):
+                self._entries[entry["key"]] = entry
+                self._bytes += entry["bytes"]
+        logger.info(f"Geometry cache loaded {len(self._entries)} entries ({self._bytes} bytes)")
+
+    def _save_index(self):
+        tmp_path = self._index_path() + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(list(self._entries.values()), f)
+        os.replace(tmp_path, self._index_path())
+
+    def _persist(self):
+        try:
+            self._save_index()
+            self._dirty = False
+        except Exception as e:
+            logger.warning(f"Failed to persist geometry cache index: {e}")
+
+    def lookup(self, key: Optional[str]) -> Optional[str]:
+        """Returns the cached STL path relative to OUTPUT_DIR, or None on a miss."""
+        if not self.enabled or key is None:
+            return None
+
+        entry = self._entries.get(key)
+        if entry is None or not os.path.exists(os.path.join(self.cache_dir, entry["stl"])):
+            if entry is not None:
+                self._drop(key)
+            self.misses += 1
+            return None
+
+        # Only the recency order changed: written with the next store, eviction or shutdown
+        self._entries.move_to_end(key)
+        self._dirty = True
+        self.hits += 1
+        return f"cache/{entry['stl']}"
+
+    def _copy_artifacts(self, key: str, sources: List[str]) -> dict:
+        files = []
+        total = 0
+        stl_name = None
+        for source in sources:
+            suffix = os.path.basename(source).partition(".")[2]
+            if suffix == "py":
+                continue
+            target = f"{key}.{suffix}"
+            shutil.copyfile(source, os.path.join(self.cache_dir, target))
+            files.append(target)
+            total += os.path.getsize(os.path.join(self.cache_dir, target))
+            if suffix == "stl":
+                stl_name = target
+        return {"key": key, "stl": stl_name, "files": files, "bytes": total}
+
+    async def store(self, key: Optional[str], stl_relpath: str) -> Optional[str]:
+        """
+        Copies the artifacts of a finished execution into the cache.
+        Returns the cached STL path relative to OUTPUT_DIR, or None if not cached.
+        """
+        if not self.enabled or key is None:
+            return None
+
+        task_id = os.path.basename(stl_relpath).split(".", 1)[0]
+        try:
+            with output_storage.pin(task_id):
+                entry = await asyncio.to_thread(self._copy_artifacts, key, output_storage.files(task_id))
+        except Exception as e:
+            logger.warning(f"Failed to store geometry in cache: {e}")
+            return None
+        if entry["stl"] is None or entry["bytes"] > self.max_bytes:
+            return None
+
+        if key in self._entries:
+            self._bytes -= self._entries[key]["bytes"]
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        self._bytes += entry["bytes"]
+        self._evict()
+        self._persist()
+        return f"cache/{entry['stl']}"
+
+    def path(self, key: str, suffix: str) -> Optional[str]:
+        """Absolute path of a cached entry's `<key>.<suffix>` file, or None if it has none."""
+        entry = self._entries.get(key) if self.enabled else None
+        if entry is None or f"{key}.{suffix}" not in entry["files"]:
+            return None
+        return os.path.join(self.cache_dir, f"{key}.{suffix}")
+
+    def add_file(self, key: str, name: str) -> bool:
+        """
+        Accounts a file written into the cache directory after `store` (an on-demand
+        export) to its entry, so it is evicted with it. Deletes the file if the entry is gone.
+        """
+        path = os.path.join(self.cache_dir, name)
+        entry = self._entries.get(key)
+        if entry is None:
+            with contextlib.suppress(FileNotFoundError):
+                os.remove(path)
+            return False
+        if name not in entry["files"]:
+            entry["files"].append(name)
+            size = os.path.getsize(path)
+            entry["bytes"] += size
+            self._bytes += size
+            self._evict()
+            self._persist()
+        return key in self._entries
+
+    def _drop(self, key: str):
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        self._dirty = True
+        self._bytes -= entry["bytes"]
+        for name in entry["files"]:
+            try:
+                os.remove(os.path.join(self.cache_dir, name))
+            except FileNotFoundError:
+                pass
+            except Exception as e:
+                logger.warning(f"Failed to delete cached file {name}: {e}")
+
+    def _evict(self):
+        while self._bytes > self.max_bytes and self._entries:
+            oldest = next(iter(self._entries))
+            self._drop(oldest)
+            self.evictions += 1
+
+    async def shutdown(self):
+        """Writes recency changes from hits since the last store."""
+        if self.enabled and self._dirty:
+            await asyncio.to_thread(self._persist)
+
+    def get_stats(self) -> dict:
+        return {
+            "enabled": self.enabled,
+            "entries": len(self._entries),
+            "bytes": self._bytes,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
+
+
+geometry_cache = GeometryCache()
+
+# Model ids are execution ids (uuid4) or geometry cache keys (sha256 hex)
+_MODEL_ID_RE = re.compile(r"^[0-9a-fA-F-]{32,64}$")
+
+
+def model_file(model_id: str, suffix: str) -> Optional[str]:
+    """
+    Absolute path of a generated model's `<id>.<suffix>` file, or None if there is none.
+    A model id is the stem of its `stl_url`: an execution id in OutputStorage, or a
+    key in the geometry cache when the model was served from there.
+    """
+    if not _MODEL_ID_RE.match(model_id):
+        return None
+    path = output_storage.path(model_id, suffix)
+    if path in output_storage.files(model_id):
+        return path
+    return geometry_cache.path(model_id, suffix)
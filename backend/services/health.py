@@ -0,0 +1,84 @@
+import time
+import asyncio
+from typing import Awaitable, Callable, Dict, Optional, Tuple
+from core.config import settings
+from core.logger import setup_logger
+from services.circuit_breaker import CircuitBreaker
+
+logger = setup_logger("cad_copilot.health")
+
+# A probe returns whether the backend answered; raising counts as unreachable
+ProbeFn = Callable[[], Awaitable[bool]]
+
+
+class HealthSupervisor:
+    """
+    Probes backends in the background every HEALTH_CHECK_INTERVAL seconds and keeps
+    the last result, so /api/status (polled by the frontend) answers without an HTTP
+    round trip. Results also feed each backend's circuit breaker: a failed probe
+    opens a closed circuit, a successful one lets an open circuit try a call early.
+    """
+
+    def __init__(self):
+        self.interval = settings.HEALTH_CHECK_INTERVAL
+        self._probes: Dict[str, Tuple[ProbeFn, Optional[CircuitBreaker]]] = {}
+        self.results: Dict[str, dict] = {}
+        self._task: Optional[asyncio.Task] = None
+
+    def add(self, name: str, probe: ProbeFn, breaker: Optional[CircuitBreaker] = None):
+        self._probes[name] = (probe, breaker)
+
+    async def start(self):
+        if self.interval > 0 and self._probes:
+            self._task = asyncio.create_task(self._loop())
+
+    async def shutdown(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def _loop(self):
+        while True:
+            await asyncio.gather(*(self.check(name) for name in self._probes))
+            await asyncio.sleep(self.interval)
+
+    async def check(self, name: str) -> dict:
+        probe, breaker = self._probes[name]
+        started = time.monotonic()
+        error = None
+        try:
+            ok = bool(await probe())
+        except Exception as e:
+            ok, error = False, str(e)
+        result = {
+            "ok": ok,
+            "latency_ms": round((time.monotonic() - started) * 1000, 1),
+            "checked_at": time.time(),
+            "error": error,
+        }
+        previous = self.results.get(name)
+        if previous is not None and previous["ok"] != ok:
+            log = logger.info if ok else logger.warning
+            log(f"Backend '{name}' is {'reachable again' if ok else 'unreachable'}")
+        self.results[name] = result
+
+        if breaker is not None:
+            if ok:
+                breaker.probe_succeeded()
+            else:
+                breaker.probe_failed(error or "unreachable")
+        return result
+
+    async def get(self, name: str) -> dict:
+        """The cached result; probes now if there is none yet or background probing is off."""
+        result = self.results.get(name)
+        if result is None or self._task is None:
+            result = await self.check(name)
+        return result
+
+    def get_stats(self) -> dict:
+        return {"interval": self.interval, "running": self._task is not None, "probes": self.results}
+
+
+health_supervisor = HealthSupervisor()
@@ -0,0 +1,55 @@
+import httpx
+from core.config import settings
+from core.logger import setup_logger
+
+logger = setup_logger("cad_copilot.http_clients")
+
+
+def _http2_available() -> bool:
+    try:
+        import h2  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+
+def build_async_client(read_timeout: float, base_url: str = "") -> httpx.AsyncClient:
+    """
+    Builds an application-lifetime AsyncClient with keep-alive pooling.
+    Connect and read timeouts are separate so a dead backend fails fast while
+    slow generations are still allowed the full read timeout.
+    """
+    http2 = settings.HTTP2_ENABLED
+    if http2 and not _http2_available():
+        logger.warning("HTTP2_ENABLED is set but the 'h2' package is not installed; using HTTP/1.1.")
+        http2 = False
+
+    return httpx.AsyncClient(
+        base_url=base_url,
+        http2=http2,
+        limits=httpx.Limits(
+            max_connections=settings.HTTP_MAX_CONNECTIONS,
+            max_keepalive_connections=settings.HTTP_MAX_KEEPALIVE,
+            keepalive_expiry=settings.HTTP_KEEPALIVE_EXPIRY,
+        ),
+        timeout=httpx.Timeout(read_timeout, connect=settings.HTTP_CONNECT_TIMEOUT),
+    )
+
+
+def pool_stats(client: httpx.AsyncClient) -> dict:
+    """Best-effort connection pool statistics (httpcore exposes no public API for this)."""
+    stats = {"open": not client.is_closed, "connections": 0, "idle": 0, "active": 0}
+    pool = getattr(getattr(client, "_transport", None), "_pool", None)
+    connections = getattr(pool, "connections", None)
+    if connections is None:
+        return stats
+    try:
+        for conn in list(connections):
+            stats["connections"] += 1
+            if conn.is_idle():
+                stats["idle"] += 1
+            else:
+                stats["active"] += 1
+    except Exception:
+        pass
+    return stats
@@ -0,0 +1,200 @@
+import math
+import time
+import uuid
+import asyncio
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+from core.config import settings
+from core.logger import setup_logger
+from core.errors import CopilotException, QueueFullError, build_error_response
+
+logger = setup_logger("cad_copilot.jobs")
+
+# A job body receives an emit(event, data) callback and returns a pydantic model
+JobRunner = Callable[[Callable[[str, dict], Awaitable[None]]], Awaitable[Any]]
+
+QUEUED = "queued"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+CANCELLED = "cancelled"
+FINISHED_STATES = {SUCCEEDED, FAILED, CANCELLED}
+
+
+class Job:
+    def __init__(self, kind: str, run: JobRunner):
+        self.id = str(uuid.uuid4())
+        self.kind = kind
+        self.run = run
+        self.status = QUEUED
+        self.stage: Optional[str] = None
+        self.result: Optional[dict] = None
+        self.error: Optional[dict] = None
+        self.created_at = time.time()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self.task: Optional[asyncio.Task] = None
+
+    @property
+    def queue_wait(self) -> Optional[float]:
+        if self.started_at is None:
+            return None
+        return self.started_at - self.created_at
+
+    def to_dict(self) -> dict:
+        return {
+            "job_id": self.id,
+            "kind": self.kind,
+            "status": self.status,
+            "stage": self.stage,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "queue_wait": self.queue_wait,
+            "result": self.result,
+            "error": self.error,
+        }
+
+
+class JobManager:
+    """
+    In-memory job queue behind /api/jobs. A fixed set of worker tasks pulls jobs
+    from a bounded queue; the LLM/executor stage limits in services.scheduler
+    still apply inside each job. Finished jobs are kept for JOBS_RESULT_TTL seconds.
+    """
+
+    def __init__(self):
+        self.max_queued = settings.JOBS_MAX_QUEUED
+        self.worker_count = max(1, settings.JOBS_WORKERS)
+        self.result_ttl = settings.JOBS_RESULT_TTL
+        self._queue: Optional[asyncio.Queue] = None
+        self._jobs: "OrderedDict[str, Job]" = OrderedDict()
+        self._workers: List[asyncio.Task] = []
+        self._stopping = False  # Tells workers that a cancellation is a shutdown, not a cancelled job
+        self.stats = {"submitted": 0, "rejected": 0, "succeeded": 0, "failed": 0, "cancelled": 0}
+        self._total_wait = 0.0
+        self._total_run = 0.0
+        self._started = 0
+
+    async def start(self):
+        if self._workers:
+            return
+        self._queue = asyncio.Queue()
+        self._stopping = False
+        self._workers = [asyncio.create_task(self._worker_loop(i)) for i in range(self.worker_count)]
+        logger.info(f"Job manager started with {self.worker_count} workers")
+
+    async def shutdown(self):
+        self._stopping = True
+        for task in self._workers:
+            task.cancel()
+        for job in self._jobs.values():
+            if job.task is not None and not job.task.done():
+                job.task.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+
+    def _prune(self):
+        cutoff = time.time() - self.result_ttl
+        expired = [jid for jid, job in self._jobs.items()
+                   if job.status in FINISHED_STATES and job.finished_at and job.finished_at < cutoff]
+        for jid in expired:
+            del self._jobs[jid]
+
+    def _retry_after(self) -> int:
+        avg_run = self._total_run / self._started if self._started else 30.0
+        return max(1, math.ceil(self.depth / self.worker_count * avg_run))
+
+    @property
+    def depth(self) -> int:
+        return self._queue.qsize() if self._queue is not None else 0
+
+    async def submit(self, kind: str, run: JobRunner) -> Job:
+        if self._queue is None:
+            await self.start()
+        self._prune()
+        if self.depth >= self.max_queued:
+            self.stats["rejected"] += 1
+            raise QueueFullError("Job queue is full. Try again later.", retry_after=self._retry_after())
+
+        job = Job(kind, run)
+        self._jobs[job.id] = job
+        self._queue.put_nowait(job)
+        self.stats["submitted"] += 1
+        logger.info(f"Queued {kind} job {job.id} (depth {self.depth})")
+        return job
+
+    def get(self, job_id: str) -> Optional[Job]:
+        return self._jobs.get(job_id)
+
+    def cancel(self, job_id: str) -> Optional[Job]:
+        job = self._jobs.get(job_id)
+        if job is None or job.status in FINISHED_STATES:
+            return job
+        if job.task is not None:
+            job.task.cancel()  # Running: the worker records the cancellation
+        else:
+            self._finish(job, CANCELLED)  # Still queued: the worker skips it
+        return job
+
+    def _finish(self, job: Job, status: str):
+        job.status = status
+        job.finished_at = time.time()
+        self.stats[status] += 1
+
+    async def _execute(self, job: Job):
+        async def emit(event: str, data: dict):
+            if event != "token":
+                job.stage = event
+
+        try:
+            response = await job.run(emit)
+            job.result = response.model_dump() if hasattr(response, "model_dump") else response
+            self._finish(job, SUCCEEDED)
+        except CopilotException as exc:
+            logger.error(f"Job {job.id} failed: [{exc.error_type.upper()}] {exc.message}")
+            job.error = build_error_response(exc).error.model_dump()
+            self._finish(job, FAILED)
+        except Exception as exc:
+            logger.critical(f"Job {job.id} crashed: {exc}", exc_info=True)
+            job.error = build_error_response(exc).error.model_dump()
+            self._finish(job, FAILED)
+
+    async def _worker_loop(self, index: int):
+        while True:
+            job = await self._queue.get()
+            if job.status != QUEUED:
+                continue  # Cancelled while queued
+
+            job.status = RUNNING
+            job.started_at = time.time()
+            self._started += 1
+            self._total_wait += job.queue_wait
+            job.task = asyncio.create_task(self._execute(job))
+            try:
+                await job.task
+            except asyncio.CancelledError:
+                if job.status not in FINISHED_STATES:
+                    self._finish(job, CANCELLED)
+                # Re-raise only if this worker itself is being shut down
+                if self._stopping or not job.task.cancelled():
+                    raise
+            finally:
+                self._total_run += time.time() - job.started_at
+                job.task = None
+
+    def get_stats(self) -> dict:
+        counts: Dict[str, int] = {}
+        for job in self._jobs.values():
+            counts[job.status] = counts.get(job.status, 0) + 1
+        return {
+            "depth": self.depth,
+            "max_queued": self.max_queued,
+            "workers": self.worker_count,
+            "running": counts.get(RUNNING, 0),
+            "avg_queue_wait": round(self._total_wait / self._started, 4) if self._started else 0.0,
+            **self.stats,
+        }
+
+
+job_manager = JobManager()
@@ -1,12 +1,33 @@
 import httpx
 import re
+import json
+import time
+import asyncio
+from typing import Any, AsyncContextManager, Awaitable, Callable, Dict, List, Optional, Tuple
 from core.config import settings
 from core.logger import setup_logger
-from core.errors import LLMError
+from core.errors import CircuitOpenError, LLMError
+from core.metrics import metrics
+from services.http_clients import build_async_client, pool_stats
+from services.circuit_breaker import CircuitBreaker
 
 logger = setup_logger("cad_copilot.llm")
 
+# Async callback receiving each generated text fragment as it streams in
+TokenCallback = Callable[[str], Awaitable[None]]
 
+# Validates and executes one candidate's code; raising rejects the candidate
+CandidateFn = Callable[[int, str], Awaitable[Any]]
+
+# Receives (candidate index, event, data) as a speculative race progresses
+CandidateEventFn = Callable[[int, str, dict], Awaitable[None]]
+
+
+class _DuplicateCandidate(Exception):
+    """A candidate produced the same code as an earlier one, which is already being tried."""
+
+
+@metrics.timed("extract")
 def _extract_python_code(response_text: str) -> str:
     """Extracts python code from LLM response. Handles markdown fences and raw code."""
     # Try to find all code blocks (with or without language tag)
@@ -45,35 +66,132 @@ class OllamaService:
         self.model = settings.LLM_MODEL
         self.timeout = settings.LLM_TIMEOUT
         self.retries = settings.LLM_RETRIES
+        self.keep_alive = settings.OLLAMA_KEEP_ALIVE
+        self.num_ctx = settings.OLLAMA_NUM_CTX
+        self.breaker = CircuitBreaker("ollama")
+        self._client: Optional[httpx.AsyncClient] = None
+        self.requests = 0
+        self.timing_totals = {"calls": 0, "prompt_tokens": 0, "load_ms": 0.0, "prefill_ms": 0.0, "ttft_ms": 0.0}
+        self.last_timing: Optional[dict] = None
+
+    def _get_client(self) -> httpx.AsyncClient:
+        # Normally created in the app lifespan; created on first use otherwise
+        if self._client is None or self._client.is_closed:
+            self._client = build_async_client(self.timeout)
+        return self._client
+
+    async def start(self):
+        self._get_client()
+
+    async def close(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    def get_pool_stats(self) -> dict:
+        if self._client is None:
+            return {"open": False, "requests": self.requests}
+        return {**pool_stats(self._client), "requests": self.requests}
+
+    def get_timing_stats(self) -> dict:
+        calls = self.timing_totals["calls"]
+        averages = {
+            f"avg_{name}": round(self.timing_totals[name] / calls, 1) if calls else None
+            for name in ("prompt_tokens", "load_ms", "prefill_ms", "ttft_ms")
+        }
+        return {"keep_alive": self.keep_alive, "num_ctx": self.num_ctx, "calls": calls, **averages, "last": self.last_timing}
 
     async def check_health(self) -> bool:
         try:
-             async with httpx.AsyncClient(timeout=5) as client:
-                 res = await client.get(f"{self.base_url}")
-                 return res.status_code == 200
+             res = await self._get_client().get(f"{self.base_url}", timeout=5)
+             return res.status_code == 200
         except Exception:
              return False
 
-    async def generate_code(self, prompt: str, system_prompt: str) -> str:
-        payload = {
+    async def preload(self, system_prompt: Optional[str] = None):
+        """
+        Asks Ollama to load the model and keep it loaded for OLLAMA_KEEP_ALIVE. Given
+        the system prompt, also prefills it (one generated token), so the first real
+        request already finds that prefix in the KV cache.
+        """
+        if system_prompt:
+            payload = self._build_payload("", system_prompt, stream=False, options={"num_predict": 1})
+        else:
+            payload = {"model": self.model, "messages": [], "keep_alive": self.keep_alive, "options": self._options()}
+        self.requests += 1
+        response = await self._get_client().post(f"{self.base_url}/api/chat", json=payload)
+        response.raise_for_status()
+
+    def _options(self, options: Optional[dict] = None) -> dict:
+        # num_ctx must not vary between calls: a different context size reloads the model
+        base = {"temperature": 0.1, "num_ctx": self.num_ctx} if self.num_ctx > 0 else {"temperature": 0.1}
+        return {**base, **(options or {})}
+
+    def _build_payload(self, prompt: str, system_prompt: str, stream: bool, options: Optional[dict] = None) -> dict:
+        # The system message comes first and is the same bytes on every call, so Ollama
+        # reuses its KV cache and only prefills the request-specific user message
+        return {
+            "model": self.model,
+            "messages": [
+                {"role": "system", "content": system_prompt},
+                {"role": "user", "content": f"User Request: {prompt}\n\nPlease output ONLY valid FreeCAD Python code."},
+            ],
+            "stream": stream,
+            "keep_alive": self.keep_alive,
+            "options": self._options(options),
+        }
+
+    def _record_timing(self, data: dict, started: float, first_token: Optional[float]) -> dict:
+        """Per-call timings from Ollama's final message (its durations are in nanoseconds)."""
+        load_ms = data.get("load_duration", 0) / 1e6
+        prefill_ms = data.get("prompt_eval_duration", 0) / 1e6
+        # Nothing arrives early without streaming; server-side load + prefill is the equivalent
+        ttft_ms = (first_token - started) * 1000 if first_token is not None else load_ms + prefill_ms
+        timing = {
+            "provider": "ollama",
             "model": self.model,
-            "prompt": f"{system_prompt}\n\nUser Request: {prompt}\n\nPlease output ONLY valid FreeCAD Python code.",
-            "stream": False,
-            "options": {
-                "temperature": 0.1
-            }
+            "prompt_tokens": data.get("prompt_eval_count", 0),
+            "completion_tokens": data.get("eval_count", 0),
+            "load_ms": round(load_ms, 1),
+            "prefill_ms": round(prefill_ms, 1),
+            "generation_ms": round(data.get("eval_duration", 0) / 1e6, 1),
+            "ttft_ms": round(ttft_ms, 1),
+            "total_ms": round((time.monotonic() - started) * 1000, 1),
         }
+        self.timing_totals["calls"] += 1
+        for name in ("prompt_tokens", "load_ms", "prefill_ms", "ttft_ms"):
+            self.timing_totals[name] += timing[name]
+        self.last_timing = timing
+        metrics.llm_ttft_seconds.observe(ttft_ms / 1000, provider="ollama")
+        return timing
+
+    async def generate_code(
+        self, prompt: str, system_prompt: str, options: Optional[dict] = None, timing: Optional[dict] = None
+    ) -> str:
+        """
+        `options` overrides Ollama sampling options (temperature, seed, ...). If
+        `timing` is given, it receives the call's prefill and time-to-first-token figures.
+        """
+        payload = self._build_payload(prompt, system_prompt, stream=False, options=options)
 
         for attempt in range(self.retries + 1):
             try:
                 logger.info(f"Contacting local LLM '{self.model}' (Attempt {attempt + 1}/{self.retries + 1})")
-                async with httpx.AsyncClient(timeout=self.timeout) as client:
-                     response = await client.post(f"{self.base_url}/api/generate", json=payload)
-                     response.raise_for_status()
-                     data = response.json()
-                     raw_response = data.get("response", "")
-                     return _extract_python_code(raw_response)
+                self.requests += 1
+                metrics.llm_attempts.inc(provider="ollama")
+                started = time.monotonic()
+                with self.breaker.guard():
+                    response = await self._get_client().post(f"{self.base_url}/api/chat", json=payload)
+                    response.raise_for_status()
+                    data = response.json()
+                raw_response = data.get("message", {}).get("content", "")
+                recorded = self._record_timing(data, started, None)
+                if timing is not None:
+                    timing.update(recorded)
+                return _extract_python_code(raw_response)
             
+            except LLMError:
+                raise
             except httpx.ReadTimeout:
                 logger.warning(f"Local LLM request timed out (Attempt {attempt + 1})")
                 if attempt == self.retries:
@@ -86,6 +204,59 @@ class OllamaService:
                 logger.error(f"Unexpected local LLM error: {e}", exc_info=True)
                 raise LLMError("Unexpected error during local LLM generation.", details=str(e))
 
+    async def stream_code(
+        self, prompt: str, system_prompt: str, on_token: TokenCallback, timing: Optional[dict] = None
+    ) -> str:
+        """
+        Same as generate_code, but uses Ollama's streaming mode and forwards each
+        fragment to `on_token` as it arrives. Retries only happen before the first
+        fragment; once output has been streamed a failure is final.
+        """
+        payload = self._build_payload(prompt, system_prompt, stream=True)
+
+        for attempt in range(self.retries + 1):
+            chunks = []
+            try:
+                logger.info(f"Streaming from local LLM '{self.model}' (Attempt {attempt + 1}/{self.retries + 1})")
+                self.requests += 1
+                metrics.llm_attempts.inc(provider="ollama")
+                started, first_token, data = time.monotonic(), None, {}
+                with self.breaker.guard():
+                    async with self._get_client().stream("POST", f"{self.base_url}/api/chat", json=payload) as response:
+                        response.raise_for_status()
+                        async for line in response.aiter_lines():
+                            if not line.strip():
+                                continue
+                            data = json.loads(line)
+                            if data.get("error"):
+                                raise LLMError("Local LLM reported an error.", details=data["error"])
+                            fragment = data.get("message", {}).get("content", "")
+                            if fragment:
+                                if first_token is None:
+                                    first_token = time.monotonic()
+                                chunks.append(fragment)
+                                await on_token(fragment)
+                            if data.get("done"):
+                                break
+                recorded = self._record_timing(data, started, first_token)
+                if timing is not None:
+                    timing.update(recorded)
+                return _extract_python_code("".join(chunks))
+
+            except LLMError:
+                raise
+            except httpx.ReadTimeout:
+                logger.warning(f"Local LLM stream timed out (Attempt {attempt + 1})")
+                if chunks or attempt == self.retries:
+                    raise LLMError(f"Local LLM request timed out after {attempt + 1} attempts.")
+            except httpx.HTTPError as e:
+                logger.warning(f"Local LLM HTTP error: {e} (Attempt {attempt + 1})")
+                if chunks or attempt == self.retries:
+                    raise LLMError("Failed to communicate with local LLM.", details=str(e))
+            except Exception as e:
+                logger.error(f"Unexpected local LLM error: {e}", exc_info=True)
+                raise LLMError("Unexpected error during local LLM generation.", details=str(e))
+
 
 class OpenAIFallbackService:
     """Fallback LLM service using OpenAI GPT-4o API."""
@@ -94,35 +265,138 @@ class OpenAIFallbackService:
         self.api_key = settings.OPENAI_API_KEY
         self.model = settings.OPENAI_MODEL
         self.available = bool(self.api_key)
+        self.breaker = CircuitBreaker("openai")
+        self._client = None
+        self._http_client: Optional[httpx.AsyncClient] = None
+        self.requests = 0
 
-    async def generate_code(self, prompt: str, system_prompt: str) -> str:
+    def _ensure_client(self):
         if not self.available:
             raise LLMError("OpenAI fallback is not configured. Set OPENAI_API_KEY in .env")
 
-        try:
-            from openai import AsyncOpenAI
-        except ImportError:
-            raise LLMError("openai package is not installed. Run: pip install openai")
+        if self._client is None:
+            try:
+                from openai import AsyncOpenAI
+            except ImportError:
+                raise LLMError("openai package is not installed. Run: pip install openai")
+
+            # One pooled client for the app lifetime instead of one per call
+            self._http_client = build_async_client(settings.LLM_TIMEOUT)
+            self._client = AsyncOpenAI(api_key=self.api_key, http_client=self._http_client)
+        return self._client
+
+    def _get_client(self):
+        client = self._ensure_client()
+        self.requests += 1
+        metrics.llm_attempts.inc(provider="openai")
+        return client
+
+    async def start(self):
+        if self.available:
+            try:
+                self._ensure_client()
+            except LLMError as e:
+                logger.warning(f"OpenAI fallback client not created: {e.message}")
+
+    async def close(self):
+        if self._client is not None:
+            await self._client.close()
+            self._client = None
+            self._http_client = None
+
+    def get_pool_stats(self) -> dict:
+        if self._http_client is None:
+            return {"open": False, "requests": self.requests}
+        return {**pool_stats(self._http_client), "requests": self.requests}
+
+    def _build_messages(self, prompt: str, system_prompt: str) -> list:
+        return [
+            {"role": "system", "content": system_prompt},
+            {"role": "user", "content": f"{prompt}\n\nPlease output ONLY valid FreeCAD Python code."}
+        ]
 
+    def _timing(self, usage: Any, started: float, first_token: Optional[float]) -> dict:
+        details = getattr(usage, "prompt_tokens_details", None)
+        if first_token is not None:
+            metrics.llm_ttft_seconds.observe(first_token - started, provider="openai")
+        return {
+            "provider": "openai",
+            "model": self.model,
+            "prompt_tokens": getattr(usage, "prompt_tokens", None),
+            # OpenAI caches long identical prompt prefixes on its side
+            "cached_prompt_tokens": getattr(details, "cached_tokens", None),
+            "completion_tokens": getattr(usage, "completion_tokens", None),
+            "ttft_ms": round((first_token - started) * 1000, 1) if first_token is not None else None,
+            "total_ms": round((time.monotonic() - started) * 1000, 1),
+        }
+
+    async def generate_code(self, prompt: str, system_prompt: str, timing: Optional[dict] = None) -> str:
+        client = self._get_client()
         logger.info(f"Falling back to OpenAI '{self.model}'...")
 
         try:
-            client = AsyncOpenAI(api_key=self.api_key)
-            response = await client.chat.completions.create(
-                model=self.model,
-                messages=[
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": f"{prompt}\n\nPlease output ONLY valid FreeCAD Python code."}
-                ],
-                temperature=0.1,
-                max_tokens=2000,
-            )
+            started = time.monotonic()
+            with self.breaker.guard():
+                response = await client.chat.completions.create(
+                    model=self.model,
+                    messages=self._build_messages(prompt, system_prompt),
+                    temperature=0.1,
+                    max_tokens=2000,
+                )
             raw_response = response.choices[0].message.content or ""
             logger.info(f"OpenAI response received ({len(raw_response)} chars)")
+            if timing is not None:
+                timing.update(self._timing(response.usage, started, None))
+            return _extract_python_code(raw_response)
+
+        except CircuitOpenError:
+            metrics.llm_errors.inc(provider="openai")
+            raise
+        except Exception as e:
+            logger.error(f"OpenAI fallback also failed: {e}", exc_info=True)
+            metrics.llm_errors.inc(provider="openai")
+            raise LLMError(f"OpenAI fallback failed: {str(e)}", details=str(e))
+
+    async def stream_code(
+        self, prompt: str, system_prompt: str, on_token: TokenCallback, timing: Optional[dict] = None
+    ) -> str:
+        client = self._get_client()
+        logger.info(f"Falling back to OpenAI '{self.model}' (streaming)...")
+
+        try:
+            started, first_token, usage = time.monotonic(), None, None
+            chunks = []
+            with self.breaker.guard():
+                stream = await client.chat.completions.create(
+                    model=self.model,
+                    messages=self._build_messages(prompt, system_prompt),
+                    temperature=0.1,
+                    max_tokens=2000,
+                    stream=True,
+                    stream_options={"include_usage": True},
+                )
+                async for chunk in stream:
+                    usage = getattr(chunk, "usage", None) or usage
+                    if not chunk.choices:
+                        continue
+                    fragment = chunk.choices[0].delta.content or ""
+                    if fragment:
+                        if first_token is None:
+                            first_token = time.monotonic()
+                        chunks.append(fragment)
+                        await on_token(fragment)
+            raw_response = "".join(chunks)
+            logger.info(f"OpenAI stream finished ({len(raw_response)} chars)")
+            if timing is not None:
+                timing.update(self._timing(usage, started, first_token))
             return _extract_python_code(raw_response)
 
+        except CircuitOpenError:
+            metrics.llm_errors.inc(provider="openai")
+            raise
         except Exception as e:
             logger.error(f"OpenAI fallback also failed: {e}", exc_info=True)
+            metrics.llm_errors.inc(provider="openai")
             raise LLMError(f"OpenAI fallback failed: {str(e)}", details=str(e))
 
 
@@ -135,24 +409,217 @@ class LLMServiceWithFallback:
     def __init__(self):
         self.primary = OllamaService()
         self.fallback = OpenAIFallbackService()
+        self.speculative_candidates = max(1, settings.SPECULATIVE_CANDIDATES)
+        self.temperatures = [float(t) for t in settings.SPECULATIVE_TEMPERATURES.split(",") if t.strip()] or [0.1]
+        self.race_stats = {
+            "races": 0,
+            "won": 0,
+            "rescued": 0,  # Won by a candidate other than the first, i.e. the first one failed or was slower
+            "failed": 0,
+            "fallback": 0,
+            "duplicates": 0,
+            "cancelled": 0,
+            "wins_by_candidate": [0] * self.speculative_candidates,
+        }
+
+    async def start(self):
+        """Creates the pooled HTTP clients; called from the app lifespan."""
+        await self.primary.start()
+        await self.fallback.start()
+
+    async def close(self):
+        await self.primary.close()
+        await self.fallback.close()
+
+    async def preload(self, system_prompt: Optional[str] = None):
+        await self.primary.preload(system_prompt)
+
+    def get_pool_stats(self) -> dict:
+        return {"ollama": self.primary.get_pool_stats(), "openai": self.fallback.get_pool_stats()}
+
+    def get_timing_stats(self) -> dict:
+        return self.primary.get_timing_stats()
+
+    def get_breaker_stats(self) -> dict:
+        return {"ollama": self.primary.breaker.get_stats(), "openai": self.fallback.breaker.get_stats()}
+
+    def get_speculative_stats(self) -> dict:
+        return {"candidates": self.speculative_candidates, "temperatures": self.temperatures, **self.race_stats}
 
     async def check_health(self) -> bool:
         return await self.primary.check_health()
 
-    async def generate_code(self, prompt: str, system_prompt: str) -> str:
+    async def generate_code(self, prompt: str, system_prompt: str, timing: Optional[dict] = None) -> str:
         try:
             # Try local Ollama first
-            return await self.primary.generate_code(prompt, system_prompt)
+            return await self.primary.generate_code(prompt, system_prompt, timing=timing)
         except LLMError as local_err:
+            metrics.llm_errors.inc(provider="ollama")
             # If OpenAI fallback is configured, try it
             if self.fallback.available:
                 logger.warning(f"Local LLM failed ({local_err.message}). Attempting OpenAI fallback...")
-                return await self.fallback.generate_code(prompt, system_prompt)
+                metrics.llm_fallbacks.inc()
+                return await self.fallback.generate_code(prompt, system_prompt, timing=timing)
             else:
                 # No fallback configured — re-raise the original error
                 logger.error("Local LLM failed and no OpenAI fallback is configured.")
                 raise
 
+    async def stream_code(
+        self, prompt: str, system_prompt: str, on_token: TokenCallback, timing: Optional[dict] = None
+    ) -> str:
+        """
+        Streaming variant of generate_code. Falls back to OpenAI only if Ollama failed
+        before producing any output, so the client never sees two interleaved answers.
+        """
+        streamed = False
+
+        async def forward(fragment: str):
+            nonlocal streamed
+            streamed = True
+            await on_token(fragment)
+
+        try:
+            return await self.primary.stream_code(prompt, system_prompt, forward, timing=timing)
+        except LLMError as local_err:
+            metrics.llm_errors.inc(provider="ollama")
+            if self.fallback.available and not streamed:
+                logger.warning(f"Local LLM failed ({local_err.message}). Attempting OpenAI fallback...")
+                metrics.llm_fallbacks.inc()
+                return await self.fallback.stream_code(prompt, system_prompt, on_token, timing=timing)
+            logger.error("Local LLM stream failed and no fallback could be used.")
+            raise
+
+    def candidate_options(self, count: int) -> List[dict]:
+        """Sampling options per candidate: the temperatures in turn, and a distinct seed each."""
+        return [{"temperature": self.temperatures[i % len(self.temperatures)], "seed": i} for i in range(count)]
+
+    async def race_candidates(
+        self,
+        prompt: str,
+        system_prompt: str,
+        accept: CandidateFn,
+        count: Optional[int] = None,
+        slot: Optional[Callable[[], AsyncContextManager]] = None,
+        on_event: Optional[CandidateEventFn] = None,
+    ) -> Tuple[Any, str, List[dict], dict]:
+        """
+        Speculative generation: asks Ollama for `count` candidates in parallel, with
+        different temperatures and seeds, and passes each to `accept` (validation and
+        execution) as soon as it arrives. The first candidate `accept` returns for wins
+        and the others are cancelled. `slot` wraps each LLM call (the scheduler's llm
+        stage). Returns (accept's result, winning code, per-candidate metrics, the
+        winner's LLM timings).
+
+        If every candidate fails, the OpenAI fallback is tried once when all failures
+        were LLM errors; otherwise the error of the lowest-numbered candidate is raised.
+        """
+        count = max(1, count or self.speculative_candidates)
+        started = time.monotonic()
+        rows = [
+            {"candidate": i, "provider": "ollama", **options, "outcome": "pending", "llm_seconds": None, "seconds": None,
+             "prefill_ms": None, "ttft_ms": None, "error": None}
+            for i, options in enumerate(self.candidate_options(count))
+        ]
+        timings: List[dict] = [{} for _ in rows]
+        seen: Dict[str, int] = {}
+
+        async def notify(index: int, event: str, **data):
+            if on_event is not None:
+                await on_event(index, event, data)
+
+        async def run(index: int) -> Tuple[int, str, Any]:
+            row = rows[index]
+            options = {"temperature": row["temperature"], "seed": row["seed"]}
+            if slot is not None:
+                async with slot():
+                    with metrics.timed("llm"):
+                        code = await self.primary.generate_code(prompt, system_prompt, options, timings[index])
+            else:
+                with metrics.timed("llm"):
+                    code = await self.primary.generate_code(prompt, system_prompt, options, timings[index])
+            row["llm_seconds"] = round(time.monotonic() - started, 3)
+            row["prefill_ms"], row["ttft_ms"] = timings[index].get("prefill_ms"), timings[index].get("ttft_ms")
+            if code.strip() in seen:
+                raise _DuplicateCandidate(f"same code as candidate {seen[code.strip()]}")
+            seen[code.strip()] = index
+            await notify(index, "generated", llm_seconds=row["llm_seconds"], ttft_ms=row["ttft_ms"])
+            return index, code, await accept(index, code)
+
+        self.race_stats["races"] += 1
+        tasks = {asyncio.create_task(run(i)): i for i in range(count)}
+        pending = set(tasks)
+        errors: Dict[int, Exception] = {}
+        winner: Optional[Tuple[int, str, Any]] = None
+        try:
+            while pending and winner is None:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in sorted(done, key=tasks.get):
+                    index, row = tasks[task], rows[tasks[task]]
+                    row["seconds"] = round(time.monotonic() - started, 3)
+                    error = task.exception()
+                    if error is None:
+                        row["outcome"] = "won" if winner is None else "finished"
+                        winner = winner or task.result()
+                    elif isinstance(error, _DuplicateCandidate):
+                        row["outcome"], row["error"] = "duplicate", str(error)
+                        self.race_stats["duplicates"] += 1
+                        await notify(index, "duplicate", error=row["error"])
+                    else:
+                        row["outcome"] = "failed"
+                        row["error"] = getattr(error, "message", None) or str(error)
+                        errors[index] = error
+                        if isinstance(error, LLMError):
+                            metrics.llm_errors.inc(provider="ollama")
+                        await notify(index, "failed", error=row["error"])
+        finally:
+            for task in pending:
+                task.cancel()
+            await asyncio.gather(*pending, return_exceptions=True)
+            for task in pending:
+                rows[tasks[task]]["outcome"] = "cancelled"
+                self.race_stats["cancelled"] += 1
+
+        if winner is not None:
+            index, code, result = winner
+            self.race_stats["won"] += 1
+            self.race_stats["wins_by_candidate"][index] += 1
+            if index > 0:
+                self.race_stats["rescued"] += 1
+            await notify(index, "won", seconds=rows[index]["seconds"])
+            return result, code, rows, timings[index]
+
+        if errors and all(isinstance(e, LLMError) for e in errors.values()) and self.fallback.available:
+            logger.warning("All local LLM candidates failed. Attempting OpenAI fallback...")
+            self.race_stats["fallback"] += 1
+            metrics.llm_fallbacks.inc()
+            index = len(rows)
+            rows.append({"candidate": index, "provider": "openai", "temperature": 0.1, "seed": None,
+                            "outcome": "pending", "llm_seconds": None, "seconds": None,
+                            "prefill_ms": None, "ttft_ms": None, "error": None})
+            timing: dict = {}
+            if slot is not None:
+                async with slot():
+                    with metrics.timed("llm"):
+                        code = await self.fallback.generate_code(prompt, system_prompt, timing)
+            else:
+                with metrics.timed("llm"):
+                    code = await self.fallback.generate_code(prompt, system_prompt, timing)
+            rows[index]["llm_seconds"] = round(time.monotonic() - started, 3)
+            rows[index]["ttft_ms"] = timing.get("ttft_ms")
+            try:
+                result = await accept(index, code)
+            except Exception as e:
+                rows[index]["outcome"], rows[index]["error"] = "failed", getattr(e, "message", None) or str(e)
+                self.race_stats["failed"] += 1
+                raise
+            rows[index]["outcome"], rows[index]["seconds"] = "won", round(time.monotonic() - started, 3)
+            self.race_stats["won"] += 1
+            return result, code, rows, timing
+
+        self.race_stats["failed"] += 1
+        raise errors[min(errors)]
+
 
 # Single service instance used by routes.py
 llm_service = LLMServiceWithFallback()
@@ -0,0 +1,155 @@
+import re
+import time
+import asyncio
+import hashlib
+from collections import OrderedDict
+from typing import Callable, List, Optional, Tuple
+import numpy as np
+from core.config import settings
+from core.logger import setup_logger
+from services.rag import rag_service
+
+logger = setup_logger("cad_copilot.llm_cache")
+
+# Prompts embed almost identically when only a dimension changes ("20mm box" vs "30mm box"),
+# so semantic hits additionally require the exact same numbers in the same order.
+_NUMBER_RE = re.compile(r"\d+(?:\.\d+)?")
+_EMBEDDING_MEMO_SIZE = 64
+
+
+def _sha(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+class LLMResponseCache:
+    """
+    Two-tier cache of LLM-generated code for /generate.
+
+    - Exact tier: keyed on (model, system prompt hash, prompt, RAG context).
+    - Semantic tier: cosine similarity between prompt embeddings, computed with the
+      embedding function already loaded by RAGService. It stays off until
+      `embedding_ready()` is true, so a request never loads (or downloads) the model.
+
+    Callers only `put` code that validated and executed successfully.
+    Entries expire after LLM_CACHE_TTL seconds and are LRU-evicted beyond LLM_CACHE_MAX_ENTRIES.
+    """
+
+    def __init__(self, embedding_fn=None, embedding_ready: Optional[Callable[[], bool]] = None):
+        self.enabled = settings.LLM_CACHE_ENABLED
+        self.max_entries = settings.LLM_CACHE_MAX_ENTRIES
+        self.ttl = settings.LLM_CACHE_TTL
+        self.threshold = settings.LLM_CACHE_SIMILARITY
+        self.embedding_fn = embedding_fn
+        self.embedding_ready = embedding_ready
+        self._entries: "OrderedDict[str, dict]" = OrderedDict()
+        self._embeddings: "OrderedDict[str, np.ndarray]" = OrderedDict()
+        self.stats = {"exact_hits": 0, "semantic_hits": 0, "misses": 0, "stores": 0, "evictions": 0, "expired": 0}
+
+    @property
+    def semantic_enabled(self) -> bool:
+        if not self.enabled or self.embedding_fn is None or self.threshold > 1.0:
+            return False
+        return self.embedding_ready is None or self.embedding_ready()
+
+    def _partition(self, model: str, system_prompt: str) -> str:
+        return f"{model}:{_sha(system_prompt)}"
+
+    def _exact_key(self, partition: str, prompt: str, context: str) -> str:
+        return _sha(f"{partition}\n{prompt}\n{context}")
+
+    def _embed_sync(self, prompt: str) -> Optional[np.ndarray]:
+        vector = np.asarray(self.embedding_fn([prompt])[0], dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else None
+
+    async def _embed(self, prompt: str) -> Optional[np.ndarray]:
+        if prompt in self._embeddings:
+            self._embeddings.move_to_end(prompt)
+            return self._embeddings[prompt]
+        try:
+            vector = await asyncio.to_thread(self._embed_sync, prompt)
+        except Exception as e:
+            logger.warning(f"Prompt embedding failed, semantic cache skipped: {e}")
+            return None
+        self._embeddings[prompt] = vector
+        while len(self._embeddings) > _EMBEDDING_MEMO_SIZE:
+            self._embeddings.popitem(last=False)
+        return vector
+
+    def _expire(self):
+        now = time.monotonic()
+        expired = [k for k, e in self._entries.items() if now - e["created"] > self.ttl]
+        for key in expired:
+            del self._entries[key]
+        self.stats["expired"] += len(expired)
+
+    async def get(self, prompt: str, context: str, system_prompt: str, model: str) -> Tuple[Optional[str], Optional[str]]:
+        """Returns (code, tier) where tier is 'exact' or 'semantic', or (None, None) on a miss."""
+        if not self.enabled:
+            return None, None
+        self._expire()
+
+        partition = self._partition(model, system_prompt)
+        key = self._exact_key(partition, prompt, context)
+        entry = self._entries.get(key)
+        if entry is not None:
+            self._entries.move_to_end(key)
+            self.stats["exact_hits"] += 1
+            return entry["code"], "exact"
+
+        if self.semantic_enabled:
+            numbers = _NUMBER_RE.findall(prompt)
+            candidates: List[Tuple[str, dict]] = [
+                (k, e) for k, e in self._entries.items()
+                if e["partition"] == partition and e["numbers"] == numbers and e["embedding"] is not None
+            ]
+            if candidates:
+                query = await self._embed(prompt)
+                if query is not None:
+                    matrix = np.stack([e["embedding"] for _, e in candidates])
+                    scores = matrix @ query
+                    best = int(np.argmax(scores))
+                    if scores[best] >= self.threshold:
+                        best_key, best_entry = candidates[best]
+                        self._entries.move_to_end(best_key)
+                        self.stats["semantic_hits"] += 1
+                        logger.info(f"Semantic LLM cache hit (similarity {scores[best]:.3f})")
+                        return best_entry["code"], "semantic"
+
+        self.stats["misses"] += 1
+        return None, None
+
+    async def put(self, prompt: str, context: str, system_prompt: str, model: str, code: str):
+        if not self.enabled:
+            return
+        partition = self._partition(model, system_prompt)
+        key = self._exact_key(partition, prompt, context)
+        embedding = await self._embed(prompt) if self.semantic_enabled else None
+        self._entries[key] = {
+            "code": code,
+            "partition": partition,
+            "numbers": _NUMBER_RE.findall(prompt),
+            "embedding": embedding,
+            "created": time.monotonic(),
+        }
+        self._entries.move_to_end(key)
+        self.stats["stores"] += 1
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.stats["evictions"] += 1
+
+    def get_stats(self) -> dict:
+        return {
+            "enabled": self.enabled,
+            "semantic_enabled": self.semantic_enabled,
+            "entries": len(self._entries),
+            **self.stats,
+        }
+
+
+# Reuses the embedding model RAGService loads during warmup; with ENABLE_RAG=false,
+# or until that warmup finishes, only the exact tier is used
+llm_cache = LLMResponseCache(
+    embedding_fn=rag_service.query_embeddings,
+    embedding_ready=lambda: rag_service.embeddings_ready,
+)
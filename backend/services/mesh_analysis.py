@@ -0,0 +1,204 @@
+import os
+import json
+import math
+import time
+from typing import Callable, Iterator, Optional
+import numpy as np
+from core.config import settings
+from core.logger import setup_logger
+
+logger = setup_logger("cad_copilot.mesh_analysis")
+
+_BINARY_HEADER = 84
+# One binary STL facet: normal, three vertices, attribute byte count (50 bytes, unaligned)
+_BINARY_RECORD = np.dtype([("normal", "<f4", (3,)), ("vertices", "<f4", (3, 3)), ("attribute", "<u2")])
+# Triangles converted to float64 at a time; bounds memory whatever the mesh size
+_CHUNK_TRIANGLES = 1 << 16
+# Twice the area below this fraction of the longest edge squared: a needle or a collinear sliver
+_DEGENERATE_RATIO = 1e-10
+# Odd 64-bit constants for hashing vertex coordinates and edges
+_MIX = (np.uint64(0x9E3779B97F4A7C15), np.uint64(0xC2B2AE3D27D4EB4F), np.uint64(0x165667B19E3779F9))
+
+ChunkSource = Callable[[], Iterator[np.ndarray]]
+
+
+def is_binary_stl(path: str) -> bool:
+    """Binary STLs are exactly header + count * 50 bytes; ASCII ones may also start with 'solid'."""
+    size = os.path.getsize(path)
+    if size < _BINARY_HEADER:
+        return False
+    with open(path, "rb") as f:
+        header = f.read(_BINARY_HEADER)
+    return size == _BINARY_HEADER + int.from_bytes(header[80:84], "little") * _BINARY_RECORD.itemsize
+
+
+def _binary_chunks(path: str) -> Iterator[np.ndarray]:
+    count = (os.path.getsize(path) - _BINARY_HEADER) // _BINARY_RECORD.itemsize
+    if count <= 0:
+        return
+    # Memory-mapped: only the pages of the current chunk are resident
+    records = np.memmap(path, dtype=_BINARY_RECORD, mode="r", offset=_BINARY_HEADER, shape=(count,))
+    try:
+        for start in range(0, count, _CHUNK_TRIANGLES):
+            yield records["vertices"][start:start + _CHUNK_TRIANGLES].astype(np.float64)
+    finally:
+        del records
+
+
+def _ascii_chunks(path: str) -> Iterator[np.ndarray]:
+    values = []
+    with open(path, "r", encoding="ascii", errors="replace") as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) == 4 and parts[0] == "vertex":
+                values.extend(parts[1:])
+                if len(values) == 9 * _CHUNK_TRIANGLES:
+                    yield np.array(values, dtype=np.float64).reshape(-1, 3, 3)
+                    values = []
+    usable = len(values) - len(values) % 9
+    if usable:
+        yield np.array(values[:usable], dtype=np.float64).reshape(-1, 3, 3)
+
+
+def _vertex_hashes(triangles: np.ndarray) -> np.ndarray:
+    """
+    (n, 3) 64-bit hashes of the vertices' float32 bit patterns. Writers repeat shared
+    vertices bit for bit, so equal hashes mean a shared vertex. Adding 0.0 folds -0.0 into 0.0.
+    """
+    bits = np.ascontiguousarray(triangles.astype(np.float32) + np.float32(0.0)).view(np.uint32).astype(np.uint64)
+    hashes = bits[..., 0] * _MIX[0] ^ bits[..., 1] * _MIX[1] ^ bits[..., 2] * _MIX[2]
+    return hashes ^ (hashes >> np.uint64(29))
+
+
+def _edge_report(chunks: ChunkSource, triangles: int, max_edges_per_pass: int) -> dict:
+    """
+    Counts how often each undirected edge occurs and in which directions. A closed,
+    consistently oriented mesh has every edge exactly twice, once in each direction.
+    Edges are split into hash partitions, one pass over the mesh each, so at most
+    about `max_edges_per_pass` edge keys are held at once.
+    """
+    passes = max(1, math.ceil(3 * triangles / max(1, max_edges_per_pass)))
+    report = {"boundary_edges": 0, "non_manifold_edges": 0, "misoriented_edges": 0, "edge_passes": passes}
+    for part in range(passes):
+        keys, signs = [], []
+        for chunk in chunks():
+            hashes = _vertex_hashes(chunk)
+            # Triangles with a repeated vertex have no proper edges; they are counted as degenerate
+            proper = (hashes[:, 0] != hashes[:, 1]) & (hashes[:, 1] != hashes[:, 2]) & (hashes[:, 0] != hashes[:, 2])
+            starts = hashes[proper].ravel()
+            ends = np.roll(hashes[proper], -1, axis=1).ravel()
+            low, high = np.minimum(starts, ends), np.maximum(starts, ends)
+            edge_keys = low * _MIX[2] ^ high
+            if passes > 1:
+                mine = edge_keys % np.uint64(passes) == np.uint64(part)
+                edge_keys, starts, ends = edge_keys[mine], starts[mine], ends[mine]
+            keys.append(edge_keys)
+            signs.append(np.where(starts < ends, 1, -1).astype(np.int8))
+        if not keys or not sum(len(k) for k in keys):
+            continue
+        unique_keys, inverse, counts = np.unique(np.concatenate(keys), return_inverse=True, return_counts=True)
+        balance = np.bincount(inverse.ravel(), weights=np.concatenate(signs), minlength=len(unique_keys))
+        report["boundary_edges"] += int(np.count_nonzero(counts == 1))
+        report["non_manifold_edges"] += int(np.count_nonzero(counts > 2))
+        report["misoriented_edges"] += int(np.count_nonzero((counts == 2) & (balance != 0)))
+    return report
+
+
+def analyze_stl(path: str, max_edges_per_pass: Optional[int] = None) -> dict:
+    """
+    Triangle count, bounding box, surface area, signed volume, degenerate triangles
+    and edge manifoldness of a binary (memory-mapped) or ASCII (stream-parsed) STL.
+    Every step works on fixed-size chunks of triangles, so memory stays bounded for
+    meshes with millions of triangles. A negative volume means inward-facing triangles.
+    """
+    started = time.perf_counter()
+    binary = is_binary_stl(path)
+    chunks: ChunkSource = (lambda: _binary_chunks(path)) if binary else (lambda: _ascii_chunks(path))
+
+    triangles = degenerate = 0
+    area = volume = 0.0
+    low, high = np.full(3, np.inf), np.full(3, -np.inf)
+    for chunk in chunks():
+        a, b, c = chunk[:, 0], chunk[:, 1], chunk[:, 2]
+        cross = np.cross(b - a, c - a)
+        doubled_area = np.sqrt(np.einsum("ij,ij->i", cross, cross))
+        longest = np.max([np.einsum("ij,ij->i", e, e) for e in (b - a, c - b, a - c)], axis=0)
+        triangles += len(chunk)
+        area += float(doubled_area.sum()) / 2
+        volume += float(np.einsum("ij,ij->i", a, np.cross(b, c)).sum()) / 6
+        degenerate += int(np.count_nonzero(doubled_area <= _DEGENERATE_RATIO * longest))
+        low = np.minimum(low, chunk.min(axis=(0, 1)))
+        high = np.maximum(high, chunk.max(axis=(0, 1)))
+
+    edges = _edge_report(chunks, triangles, max_edges_per_pass or settings.MESH_ANALYSIS_MAX_EDGES_PER_PASS)
+    empty = triangles == 0
+    return {
+        "format": "binary" if binary else "ascii",
+        "triangles": triangles,
+        "bbox_min": None if empty else [round(float(v), 6) for v in low],
+        "bbox_max": None if empty else [round(float(v), 6) for v in high],
+        "size": None if empty else [round(float(v), 6) for v in high - low],
+        "surface_area": round(area, 6),
+        "volume": round(volume, 6),
+        "degenerate_triangles": degenerate,
+        **edges,
+        "watertight": not empty and edges["boundary_edges"] == 0 and edges["non_manifold_edges"] == 0,
+        "consistently_oriented": edges["misoriented_edges"] == 0,
+        "analysis_ms": round((time.perf_counter() - started) * 1000, 1),
+    }
+
+
+def report_path(stl_path: str) -> str:
+    """`<id>.mesh.json`, kept next to the STL so caches and storage carry it along."""
+    return stl_path[:-len(".stl")] + ".mesh.json"
+
+
+class MeshAnalyzer:
+    """
+    Checks every exported STL after a FreeCAD run without starting FreeCAD again, and
+    keeps the report next to it for GenerationResponse and /api/models/{id}/stats.
+    """
+
+    def __init__(self):
+        self.enabled = settings.MESH_ANALYSIS_ENABLED
+        self.stats = {"analyzed": 0, "not_watertight": 0, "total_triangles": 0, "total_ms": 0.0}
+
+    def analyze(self, stl_path: str) -> dict:
+        """Analyzes an STL and stores the report next to it. Blocking; run in a thread."""
+        report = analyze_stl(stl_path)
+        with open(report_path(stl_path), "w", encoding="utf-8") as f:
+            json.dump(report, f)
+        self.stats["analyzed"] += 1
+        self.stats["total_triangles"] += report["triangles"]
+        self.stats["total_ms"] += report["analysis_ms"]
+        if report["triangles"] and not report["watertight"]:
+            self.stats["not_watertight"] += 1
+            logger.warning(
+                f"Mesh is not watertight: {report['boundary_edges']} boundary and "
+                f"{report['non_manifold_edges']} non-manifold edges ({os.path.basename(stl_path)})"
+            )
+        return report
+
+    def load(self, stl_path: str) -> Optional[dict]:
+        """The stored report of an STL, or None if it was never analyzed."""
+        try:
+            with open(report_path(stl_path), "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def describe(self, stl_relpath: str) -> Optional[dict]:
+        """The stored report of an STL under OUTPUT_DIR, for GenerationResponse.mesh."""
+        return self.load(os.path.join(settings.OUTPUT_DIR, stl_relpath))
+
+    def get_stats(self) -> dict:
+        analyzed = self.stats["analyzed"]
+        return {
+            "enabled": self.enabled,
+            **self.stats,
+            "total_ms": round(self.stats["total_ms"], 1),
+            "avg_ms": round(self.stats["total_ms"] / analyzed, 1) if analyzed else None,
+        }
+
+
+mesh_analyzer = MeshAnalyzer()
@@ -0,0 +1,195 @@
+import ast
+from typing import Optional, Tuple
+from core.config import settings
+from core.logger import setup_logger
+
+logger = setup_logger("cad_copilot.optimizer")
+
+BATCHABLE_OPS = {"cut", "fuse"}
+
+# Inserted at the top of rewritten scripts. One boolean against all tools at once
+# replaces N booleans against a growing solid; if OpenCASCADE rejects the batched
+# operation, or its result is implausible, the tools are applied one at a time
+# exactly like the original loop. The checks only measure the operands and the
+# result, so no boolean runs twice: a cut never grows the shape and removes at
+# most the tools' volume, a fuse covers every operand, adds at most the tools'
+# volume and spans their combined bounding box. `tolerance` is relative to the
+# shape's volume and bounding-box diagonal. Without `verify`, only the volume of
+# the result is compared with the shape's.
+BATCH_HELPER = '''
+def _cad_batched_boolean(shape, op, tools, verify={verify!r}, tolerance={tolerance!r}):
+    if not tools:
+        return shape
+
+    def _apply(result, operand):
+        if op == 'cut':
+            return result.cut(operand)
+        if op == 'fuse':
+            return result.fuse(operand)
+        if op == 'common':
+            return result.common(operand)
+        raise ValueError('unsupported boolean %r' % op)
+
+    def _sequential():
+        result = shape
+        for tool in tools:
+            result = _apply(result, tool)
+        return result
+
+    def _volume(s):
+        try:
+            return s.Volume
+        except Exception:
+            return None
+
+    def _bounds(s):
+        try:
+            b = s.BoundBox
+            return [b.XMin, b.YMin, b.ZMin, b.XMax, b.YMax, b.ZMax]
+        except Exception:
+            return None
+
+    def _plausible(batched):
+        before, after = _volume(shape), _volume(batched)
+        if before is None or after is None:
+            return not verify
+        slack = tolerance * max(before, 1.0)
+        if op == 'cut' and after > before + slack or op == 'fuse' and after < before - slack:
+            return False
+        if not verify:
+            return True
+        volumes = [_volume(tool) for tool in tools]
+        bounds, result = _bounds(shape), _bounds(batched)
+        tool_bounds = [_bounds(tool) for tool in tools]
+        if None in volumes or bounds is None or result is None or None in tool_bounds:
+            return False
+        diagonal = sum((bounds[i + 3] - bounds[i]) ** 2 for i in range(3)) ** 0.5
+        box_slack = tolerance * max(diagonal, 1.0)
+        if op == 'cut':
+            inside = all(result[i] >= bounds[i] - box_slack and result[i + 3] <= bounds[i + 3] + box_slack for i in range(3))
+            return inside and after >= before - sum(volumes) - slack
+        for other in tool_bounds:
+            bounds = [min(bounds[i], other[i]) for i in range(3)] + [max(bounds[i + 3], other[i + 3]) for i in range(3)]
+        spans = max(abs(a - b) for a, b in zip(result, bounds)) <= box_slack
+        return spans and max(volumes) - slack <= after <= before + sum(volumes) + slack
+
+    try:
+        batched = _apply(shape, tools)
+        ok = not batched.isNull() and batched.isValid() and _plausible(batched)
+    except Exception as error:
+        print('batched %s failed, applying tools one by one: %s' % (op, error))
+        return _sequential()
+    if not ok:
+        print('batched %s result is implausible, applying tools one by one' % op)
+        return _sequential()
+    return batched
+'''
+
+
+def _names(node: ast.AST) -> set:
+    return {n.id for n in ast.walk(node) if isinstance(n, ast.Name)}
+
+
+def _accumulator(statement: ast.stmt) -> Optional[Tuple[str, str, ast.expr]]:
+    """Matches `acc = acc.cut(tool)` / `acc = acc.fuse(tool)`; returns (acc, op, tool)."""
+    if not (isinstance(statement, ast.Assign) and len(statement.targets) == 1):
+        return None
+    target, value = statement.targets[0], statement.value
+    if not (isinstance(target, ast.Name) and isinstance(value, ast.Call)):
+        return None
+    func = value.func
+    if not (isinstance(func, ast.Attribute) and func.attr in BATCHABLE_OPS and isinstance(func.value, ast.Name)):
+        return None
+    if func.value.id != target.id or len(value.args) != 1 or value.keywords:
+        return None
+    tool = value.args[0]
+    if isinstance(tool, (ast.List, ast.Tuple, ast.Starred)):
+        return None
+    return target.id, func.attr, tool
+
+
+class BooleanBatchingTransformer(ast.NodeTransformer):
+    """
+    Rewrites accumulator loops
+
+        for ...:
+            <statements building the tool>
+            acc = acc.cut(tool)
+
+    into one collection loop plus a single batched boolean. A loop qualifies only
+    when the accumulator update is its last statement and nothing else in the
+    loop reads or writes the accumulator, so every tool is independent of it.
+    """
+
+    def __init__(self):
+        self.rewrites = 0
+
+    def visit_For(self, node: ast.For):
+        self.generic_visit(node)  # Innermost loops first
+        if node.orelse or not node.body:
+            return node
+        match = _accumulator(node.body[-1])
+        if match is None:
+            return node
+        acc, op, tool = match
+
+        for statement in node.body[:-1]:
+            for child in ast.walk(statement):
+                if isinstance(child, (ast.Break, ast.Continue, ast.Return, ast.Yield, ast.YieldFrom, ast.Global, ast.Nonlocal)):
+                    return node
+        if acc in _names(tool) or acc in _names(node.target) or acc in _names(node.iter):
+            return node
+        if any(acc in _names(statement) for statement in node.body[:-1]):
+            return node
+
+        self.rewrites += 1
+        tools_name = f"_cad_tools_{self.rewrites}"
+        # A tool held in a variable may be the same object mutated on every
+        # iteration (e.g. `hole.translate(...)`): collect a snapshot of it
+        if isinstance(tool, ast.Call):
+            collected = tool
+        else:
+            collected = ast.Call(func=ast.Attribute(value=tool, attr="copy", ctx=ast.Load()), args=[], keywords=[])
+        append = ast.Expr(ast.Call(
+            func=ast.Attribute(value=ast.Name(tools_name, ast.Load()), attr="append", ctx=ast.Load()),
+            args=[collected],
+            keywords=[],
+        ))
+        init = ast.Assign(targets=[ast.Name(tools_name, ast.Store())], value=ast.List(elts=[], ctx=ast.Load()))
+        loop = ast.For(target=node.target, iter=node.iter, body=node.body[:-1] + [append], orelse=[], type_comment=None)
+        combine = ast.Assign(
+            targets=[ast.Name(acc, ast.Store())],
+            value=ast.Call(
+                func=ast.Name("_cad_batched_boolean", ast.Load()),
+                args=[ast.Name(acc, ast.Load()), ast.Constant(op), ast.Name(tools_name, ast.Load())],
+                keywords=[],
+            ),
+        )
+        return [init, loop, combine]
+
+
+def batch_booleans(code: str, verify: Optional[bool] = None) -> Tuple[str, int]:
+    """
+    Returns (script, number of loops rewritten). The script is returned unchanged
+    when nothing qualifies or the code does not parse.
+    """
+    try:
+        tree = ast.parse(code)
+    except SyntaxError:
+        return code, 0
+
+    transformer = BooleanBatchingTransformer()
+    tree = transformer.visit(tree)
+    if not transformer.rewrites:
+        return code, 0
+
+    verify = settings.BOOLEAN_BATCHING_VERIFY if verify is None else verify
+    helper = ast.parse(BATCH_HELPER.format(verify=verify, tolerance=settings.BOOLEAN_BATCHING_TOLERANCE)).body
+    # `from __future__` imports must stay first
+    position = 0
+    while position < len(tree.body) and isinstance(tree.body[position], ast.ImportFrom) and tree.body[position].module == "__future__":
+        position += 1
+    tree.body[position:position] = helper
+    ast.fix_missing_locations(tree)
+    logger.info(f"Batched {transformer.rewrites} boolean accumulator loop(s)")
+    return ast.unparse(tree) + "\n", transformer.rewrites
@@ -1,10 +1,13 @@
 import os
-import chromadb
-from chromadb.config import Settings as ChromaSettings
-from chromadb.utils import embedding_functions
+import time
+import asyncio
+import threading
 from typing import List, Optional
 from core.config import settings
 from core.logger import setup_logger
+from core.metrics import metrics
+from services.rag_ingest import rag_ingestor
+from services.vector_index import EmbeddingLRU, VectorIndex
 
 logger = setup_logger("cad_copilot.rag")
 
@@ -14,17 +17,48 @@ class RAGService:
         self.collection_name = "freecad_docs"
         self._client = None
         self._collection = None
-        # We use a lightweight local embedding model
-        self.embedding_fn = embedding_functions.DefaultEmbeddingFunction()
+        self._embedding_fn = None
+        self._embedding_lock = threading.Lock()
+        # Repeated prompts (history replay, batches, the LLM cache) skip the ONNX model
+        self.query_embeddings = EmbeddingLRU(self._embed_texts, settings.RAG_QUERY_CACHE_SIZE)
         self.initialized = False
+        # Set once warmup has loaded and run the embedding model; requests never load it
+        self.embeddings_ready = False
+        self._index: Optional[VectorIndex] = None
+        self._index_signature = None
+        self._index_lock = threading.Lock()
+        self.index_refreshes = 0
+        self.last_refresh_duration = 0.0
+
+    @property
+    def embedding_fn(self):
+        """
+        The lightweight local embedding model. chromadb (and the ONNX runtime behind
+        it) is imported on first use so it does not slow down process startup.
+        """
+        if self._embedding_fn is None:
+            with self._embedding_lock:
+                if self._embedding_fn is None:
+                    from chromadb.utils import embedding_functions
+                    self._embedding_fn = embedding_functions.DefaultEmbeddingFunction()
+        return self._embedding_fn
+
+    @embedding_fn.setter
+    def embedding_fn(self, fn):
+        self._embedding_fn = fn
+
+    def _embed_texts(self, texts: List[str]):
+        return self.embedding_fn(texts)
 
     def initialize(self):
-        """Lazy load the ChromaDB index to avoid blocking startup."""
+        """Opens the ChromaDB collection and loads the vector index. Blocking; run during warmup."""
         if not self.enabled:
             logger.info("RAG is disabled in configuration.")
             return
 
         try:
+            import chromadb
+
             db_path = os.path.abspath(settings.CHROMA_DB_DIR)
             os.makedirs(db_path, exist_ok=True)
             
@@ -40,18 +74,65 @@ class RAGService:
             count = self._collection.count()
             logger.info(f"RAG initialized successfully. Loaded {count} documents.")
             self.initialized = True
+            self._ensure_index()
         except Exception as e:
             logger.error(f"Failed to initialize RAG index: {e}", exc_info=True)
             self.enabled = False # Disable gracefully if DB is corrupt or missing
             self.initialized = False
 
+    def warm_embeddings(self):
+        """Runs the embedding model once so the first real query does not pay for loading it."""
+        self.embedding_fn(["warmup"])
+        self.embeddings_ready = True
+
+    @property
+    def collection(self):
+        return self._collection
+
+    def _collection_signature(self):
+        """
+        Changes whenever the collection does: every ingestion run (in-process or
+        via the CLI) rewrites the manifest, so its mtime is a cheap version stamp.
+        """
+        try:
+            return os.stat(rag_ingestor.manifest_path).st_mtime_ns
+        except OSError:
+            return None
+
+    def _index_is_fresh(self) -> bool:
+        return self._index is not None and self._index_signature == self._collection_signature()
+
+    def _ensure_index(self) -> Optional[VectorIndex]:
+        """Reloads the in-memory index if the collection changed. Blocking."""
+        if self._index_is_fresh():
+            return self._index
+        with self._index_lock:
+            signature = self._collection_signature()
+            if self._index is not None and self._index_signature == signature:
+                return self._index
+            started = time.monotonic()
+            index = VectorIndex.from_collection(self._collection)
+            self._index, self._index_signature = index, signature
+            self.index_refreshes += 1
+            self.last_refresh_duration = time.monotonic() - started
+            logger.info(f"RAG vector index loaded: {len(index)} chunks in {self.last_refresh_duration:.3f}s")
+            return index
+
     def check_health(self) -> dict:
         status = {
             "enabled": self.enabled,
             "initialized": self.initialized,
+            "embeddings_ready": self.embeddings_ready,
             "document_count": 0,
             "error": None
         }
+        if self._index is not None:
+            status["index"] = {
+                **self._index.get_stats(),
+                "refreshes": self.index_refreshes,
+                "last_refresh_duration": round(self.last_refresh_duration, 4),
+                "query_cache": self.query_embeddings.get_stats(),
+            }
         if self.initialized and self._collection:
             try:
                 status["document_count"] = self._collection.count()
@@ -60,32 +141,41 @@ class RAGService:
                 status["initialized"] = False
         return status
 
-    def retrieve_context(self, query: str, n_results: int = 3) -> str:
+    def _format_context(self, docs: List[str]) -> str:
+        if not docs:
+            return ""
+        formatted_context = "\n\n---\nRELEVANT FREECAD DOCUMENTATION/EXAMPLES:\n"
+        formatted_context += "\n\n".join(docs)
+        formatted_context += "\n---\n"
+        return formatted_context
+
+    def _search(self, index: VectorIndex, query_vector, n_results: int) -> str:
+        return self._format_context([index.documents[row] for row, _ in index.search(query_vector, n_results)])
+
+    def _retrieve_sync(self, query: str, n_results: int) -> str:
+        index = self._ensure_index()
+        if not len(index):
+            return ""
+        query_vector = self.query_embeddings([query])[0]
+        return self._search(index, query_vector, n_results)
+
+    async def retrieve_context(self, query: str, n_results: int = 3) -> str:
         """
         Retrieves relevant FreeCAD examples or API snippets.
         Fails gracefully by returning an empty string.
         """
-        if not self.enabled or not self.initialized or not self._collection:
+        if not self.enabled or not self.initialized or not self._collection or not self.embeddings_ready:
              return ""
-             
-        try:
-            count = self._collection.count()
-            if count == 0:
-                 return ""
-
-            actual_n = min(n_results, count)
-            results = self._collection.query(
-                query_texts=[query],
-                n_results=actual_n
-            )
 
-            if results and results['documents'] and results['documents'][0]:
-                 docs = results['documents'][0]
-                 formatted_context = "\n\n---\nRELEVANT FREECAD DOCUMENTATION/EXAMPLES:\n"
-                 formatted_context += "\n\n".join(docs)
-                 formatted_context += "\n---\n"
-                 return formatted_context
-            return ""
+        try:
+            with metrics.timed("rag"):
+                # Hot path: index current and query embedding cached -> pure NumPy, no thread hop
+                if self._index_is_fresh():
+                    query_vector = self.query_embeddings.peek(query)
+                    if query_vector is not None:
+                        return self._search(self._index, query_vector, n_results)
+                # Embedding the query or reloading the index blocks, keep it off the event loop
+                return await asyncio.to_thread(self._retrieve_sync, query, n_results)
         except Exception as e:
             logger.warning(f"RAG retrieval failed: {e}. Continuing without context.")
             return ""
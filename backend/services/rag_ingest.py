@@ -0,0 +1,205 @@
+"""
+Incremental ingestion of the markdown knowledge base (RAG_DOCS_DIR) into the
+`freecad_docs` Chroma collection.
+
+Markdown is split into one chunk per `## Pattern:` section (one per code block when a
+section has several). A manifest of chunk content hashes lets re-runs embed only
+added or changed chunks and delete removed ones.
+
+CLI: `python -m services.rag_ingest [--full]` from the backend/ directory.
+"""
+import os
+import re
+import sys
+import json
+import time
+import asyncio
+import hashlib
+import threading
+from typing import Dict, List, Optional
+from core.config import settings
+from core.logger import setup_logger
+
+logger = setup_logger("cad_copilot.rag_ingest")
+
+MANIFEST_FILE = "ingest_manifest.json"
+_SECTION_RE = re.compile(r"^##\s+", re.MULTILINE)
+_CODE_BLOCK_RE = re.compile(r"```.*?```", re.DOTALL)
+
+
+def _slug(text: str) -> str:
+    return re.sub(r"[^a-z0-9]+", "-", text.lower()).strip("-")[:80] or "section"
+
+
+def chunk_markdown(text: str, source: str) -> List[dict]:
+    """
+    Splits a markdown document into retrieval chunks.
+    Each chunk is {"id", "text", "metadata"}; ids are stable across runs as long as
+    the section heading and code block position do not change. Repeated headings
+    (or headings with the same slug) get `#2`, `#3`, ... in document order.
+    """
+    chunks = []
+    seen: Dict[str, int] = {}
+    parts = _SECTION_RE.split(text.replace("\r\n", "\n"))
+    # parts[0] is the preamble before the first `##` heading (title, intro)
+    for part in parts[1:]:
+        heading, _, body = part.partition("\n")
+        heading = heading.strip()
+        body = body.strip()
+        if not body:
+            continue
+
+        blocks = _CODE_BLOCK_RE.findall(body)
+        if len(blocks) <= 1:
+            pieces = [body]
+        else:
+            # Keep the section's prose with every code block so each chunk stands alone
+            prose = _CODE_BLOCK_RE.sub("", body).strip()
+            pieces = [f"{prose}\n\n{block}".strip() for block in blocks]
+
+        slug = _slug(heading)
+        seen[slug] = seen.get(slug, 0) + 1
+        base_id = f"{source}::{slug}" if seen[slug] == 1 else f"{source}::{slug}#{seen[slug]}"
+        for index, piece in enumerate(pieces):
+            chunks.append({
+                "id": base_id if len(pieces) == 1 else f"{base_id}::{index}",
+                "text": f"## {heading}\n{piece}",
+                "metadata": {"source": source, "section": heading},
+            })
+    return chunks
+
+
+def _content_hash(chunk: dict) -> str:
+    return hashlib.sha256(chunk["text"].encode("utf-8")).hexdigest()
+
+
+class RAGIngestor:
+    """Diffs the docs directory against the manifest and applies the changes in batches."""
+
+    def __init__(self, docs_dir: Optional[str] = None, manifest_dir: Optional[str] = None):
+        self.docs_dir = os.path.abspath(docs_dir or settings.RAG_DOCS_DIR)
+        self.manifest_path = os.path.join(os.path.abspath(manifest_dir or settings.CHROMA_DB_DIR), MANIFEST_FILE)
+        self.batch_size = max(1, settings.RAG_EMBED_BATCH_SIZE)
+        self._lock = threading.Lock()
+        self._task: Optional[asyncio.Task] = None
+        self.status = {"running": False, "last_run": None, "error": None}
+
+    def _load_manifest(self) -> Dict[str, str]:
+        try:
+            with open(self.manifest_path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {}
+        except Exception as e:
+            logger.warning(f"RAG manifest unreadable, re-indexing everything: {e}")
+            return {}
+
+    def _save_manifest(self, manifest: Dict[str, str]):
+        os.makedirs(os.path.dirname(self.manifest_path), exist_ok=True)
+        tmp_path = self.manifest_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(manifest, f, indent=1, sort_keys=True)
+        os.replace(tmp_path, self.manifest_path)
+
+    def collect_chunks(self) -> List[dict]:
+        chunks = []
+        if not os.path.isdir(self.docs_dir):
+            logger.warning(f"RAG docs directory not found: {self.docs_dir}")
+            return chunks
+        for root, _, files in os.walk(self.docs_dir):
+            for name in sorted(files):
+                if not name.lower().endswith(".md"):
+                    continue
+                path = os.path.join(root, name)
+                source = os.path.relpath(path, self.docs_dir).replace(os.sep, "/")
+                with open(path, "r", encoding="utf-8") as f:
+                    chunks.extend(chunk_markdown(f.read(), source))
+        return chunks
+
+    def run(self, collection, full: bool = False) -> dict:
+        """
+        Synchronizes `collection` with the docs directory. Blocking; call via asyncio.to_thread.
+        With `full=True` the manifest is ignored and every chunk is re-embedded.
+        """
+        if not self._lock.acquire(blocking=False):
+            return {**self.status, "skipped": "ingestion already running"}
+
+        self.status["running"] = True
+        started = time.monotonic()
+        try:
+            manifest = {} if full else self._load_manifest()
+            chunks = self.collect_chunks()
+            current = {chunk["id"]: _content_hash(chunk) for chunk in chunks}
+
+            changed = [c for c in chunks if manifest.get(c["id"]) != current[c["id"]]]
+            removed = [chunk_id for chunk_id in manifest if chunk_id not in current]
+
+            if full:
+                # Stale ids from before the manifest existed are only found by asking Chroma
+                existing = set(collection.get(include=[])["ids"])
+                removed = sorted(existing - set(current))
+
+            if removed:
+                collection.delete(ids=removed)
+
+            for start in range(0, len(changed), self.batch_size):
+                batch = changed[start:start + self.batch_size]
+                collection.upsert(
+                    ids=[c["id"] for c in batch],
+                    documents=[c["text"] for c in batch],
+                    metadatas=[{**c["metadata"], "content_hash": current[c["id"]]} for c in batch],
+                )
+                # Persist progress so an interrupted run resumes where it stopped
+                for c in batch:
+                    manifest[c["id"]] = current[c["id"]]
+                self._save_manifest({k: v for k, v in manifest.items() if k in current})
+
+            self._save_manifest(current)
+            result = {
+                "chunks": len(chunks),
+                "embedded": len(changed),
+                "deleted": len(removed),
+                "unchanged": len(chunks) - len(changed),
+                "duration": round(time.monotonic() - started, 3),
+            }
+            logger.info(f"RAG ingestion finished: {result}")
+            self.status.update(last_run=result, error=None)
+            return result
+        except Exception as e:
+            logger.error(f"RAG ingestion failed: {e}", exc_info=True)
+            self.status["error"] = str(e)
+            raise
+        finally:
+            self.status["running"] = False
+            self._lock.release()
+
+    def start_background(self, collection, full: bool = False) -> bool:
+        """Runs ingestion in a worker thread without blocking request serving."""
+        if self._task is not None and not self._task.done():
+            return False
+
+        def _log_failure(task: asyncio.Task):
+            if not task.cancelled() and task.exception() is not None:
+                logger.warning(f"Background RAG ingestion failed: {task.exception()}")
+
+        self._task = asyncio.create_task(asyncio.to_thread(self.run, collection, full))
+        self._task.add_done_callback(_log_failure)
+        return True
+
+
+rag_ingestor = RAGIngestor()
+
+
+def main(argv: List[str]) -> int:
+    from services.rag import rag_service
+
+    rag_service.initialize()
+    if not rag_service.initialized:
+        logger.error("RAG is disabled or failed to initialize; nothing to ingest.")
+        return 1
+    rag_ingestor.run(rag_service.collection, full="--full" in argv)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,137 @@
+import math
+import time
+import asyncio
+import contextlib
+import contextvars
+from typing import Dict, Optional
+from core.config import settings
+from core.logger import setup_logger
+from core.errors import QueueFullError
+from core.metrics import metrics
+
+logger = setup_logger("cad_copilot.scheduler")
+
+_current_stage: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar("cad_copilot_stage", default=None)
+
+
+def current_stage() -> Optional[str]:
+    """The stage whose slot the current task holds (e.g. "executor_heavy"), or None."""
+    return _current_stage.get()
+
+
+class StageGate:
+    """
+    Concurrency limit for one pipeline stage (LLM or executor) with a bounded
+    wait queue. Callers beyond `max_waiting` are rejected immediately instead
+    of piling up behind a saturated backend.
+    """
+
+    def __init__(self, name: str, limit: int, max_waiting: int):
+        self.name = name
+        self.limit = max(1, limit)
+        self.max_waiting = max(0, max_waiting)
+        self._semaphore = asyncio.Semaphore(self.limit)
+        self.active = 0
+        self.waiting = 0
+        self.completed = 0
+        self.rejected = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+        self.total_service = 0.0
+
+    def retry_after(self) -> int:
+        """Seconds until a slot is likely free, from the average service time."""
+        avg_service = self.total_service / self.completed if self.completed else 5.0
+        return max(1, math.ceil((self.waiting + 1) / self.limit * avg_service))
+
+    @contextlib.asynccontextmanager
+    async def slot(self):
+        if self.waiting >= self.max_waiting and self.active >= self.limit:
+            self.rejected += 1
+            raise QueueFullError(f"The {self.name} queue is full. Try again later.", retry_after=self.retry_after())
+
+        self.waiting += 1
+        queued_at = time.monotonic()
+        try:
+            await self._semaphore.acquire()
+        finally:
+            self.waiting -= 1
+        started_at = time.monotonic()
+        wait = started_at - queued_at
+        self.total_wait += wait
+        self.max_wait = max(self.max_wait, wait)
+        metrics.observe_queue_wait(self.name.replace(" ", "_"), wait)
+        if wait > 1:
+            logger.info(f"Waited {wait:.2f}s for a {self.name} slot")
+
+        self.active += 1
+        try:
+            yield
+        finally:
+            self.active -= 1
+            self.completed += 1
+            self.total_service += time.monotonic() - started_at
+            self._semaphore.release()
+
+    def get_stats(self) -> dict:
+        return {
+            "limit": self.limit,
+            "active": self.active,
+            "waiting": self.waiting,
+            "max_waiting": self.max_waiting,
+            "completed": self.completed,
+            "rejected": self.rejected,
+            "avg_wait": round(self.total_wait / self.completed, 4) if self.completed else 0.0,
+            "max_wait": round(self.max_wait, 4),
+        }
+
+
+class Scheduler:
+    """
+    Separate concurrency limits for the LLM and FreeCAD executor stages.
+
+    Scripts whose estimated cost (services.validator.estimate_cost) reaches
+    COST_HEAVY_THRESHOLD run through their own `executor_heavy` gate, capped at
+    HEAVY_EXECUTOR_MAX_CONCURRENCY, so cheap scripts never queue behind them.
+    The warm worker pool is partitioned the same way (`worker_lanes`): heavy
+    slots get their own reserved workers out of FREECAD_POOL_SIZE, and the cheap
+    gate is capped at the workers left over, so neither lane waits for a worker
+    the other holds.
+    """
+
+    def __init__(self):
+        heavy_limit = max(1, settings.HEAVY_EXECUTOR_MAX_CONCURRENCY)
+        # At least one worker always stays for cheap scripts, so a pool with no
+        # room to reserve grows to heavy_limit + 1 workers
+        self.worker_lanes: Dict[str, int] = {
+            "executor": max(1, settings.FREECAD_POOL_SIZE - heavy_limit),
+            "executor_heavy": heavy_limit,
+        }
+        executor_limit = settings.EXECUTOR_MAX_CONCURRENCY or self.worker_lanes["executor"]
+        self.heavy_threshold = settings.COST_HEAVY_THRESHOLD
+        self.gates: Dict[str, StageGate] = {
+            "llm": StageGate("llm", settings.LLM_MAX_CONCURRENCY, settings.STAGE_MAX_WAITING),
+            "executor": StageGate("executor", executor_limit, settings.STAGE_MAX_WAITING),
+            "executor_heavy": StageGate("heavy executor", heavy_limit, settings.STAGE_MAX_WAITING),
+        }
+
+    @contextlib.asynccontextmanager
+    async def stage(self, name: str):
+        """Async context manager holding a slot of the given stage; current_stage() reports it inside."""
+        async with self.gates[name].slot():
+            token = _current_stage.set(name)
+            try:
+                yield
+            finally:
+                _current_stage.reset(token)
+
+    def executor_stage_for(self, cost_score: Optional[float]) -> str:
+        if cost_score is not None and self.heavy_threshold and cost_score >= self.heavy_threshold:
+            return "executor_heavy"
+        return "executor"
+
+    def get_stats(self) -> dict:
+        return {name: gate.get_stats() for name, gate in self.gates.items()}
+
+
+scheduler = Scheduler()
@@ -0,0 +1,259 @@
+import os
+import time
+import heapq
+import uuid
+import asyncio
+import hashlib
+import contextlib
+from typing import Dict, List, Optional, Tuple
+from core.config import settings
+from core.logger import setup_logger
+
+logger = setup_logger("cad_copilot.storage")
+
+# Subdirectories of OUTPUT_DIR that other services manage themselves
+RESERVED_DIRS = {"cache", "checkpoints"}
+
+
+def shard_for(artifact_id: str) -> str:
+    """Two hex characters of a hash of the id: 256 subdirectories, evenly filled."""
+    return hashlib.sha1(artifact_id.encode("utf-8")).hexdigest()[:2]
+
+
+class OutputStorage:
+    """
+    Index of the executor's artifacts under OUTPUT_DIR.
+
+    Each execution gets an id; its files (`<id>.py`, `<id>.stl`, LOD meshes,
+    precompressed variants, ...) live in a hash-sharded subdirectory `<shard>/`.
+    The index tracks size, last access and a reference count per artifact, so:
+
+    - artifacts expire OUTPUT_TTL seconds after their last access (serving a file
+      through /outputs counts), not after creation;
+    - the total stays under OUTPUT_MAX_BYTES by evicting least recently used first;
+    - pinned artifacts (in use by a request) are never evicted.
+
+    Eviction order comes from a heap of (last_access, id) with lazy invalidation,
+    and a single background sweeper replaces the old per-request directory scan.
+    """
+
+    def __init__(self):
+        self.root = settings.OUTPUT_DIR
+        self.ttl = settings.OUTPUT_TTL
+        self.max_bytes = settings.OUTPUT_MAX_BYTES
+        self.sweep_interval = settings.OUTPUT_SWEEP_INTERVAL
+        self._entries: Dict[str, dict] = {}
+        self._heap: List[Tuple[float, str]] = []
+        self._bytes = 0
+        self._sweeper: Optional[asyncio.Task] = None
+        self.stats = {"registered": 0, "expired": 0, "evicted": 0, "sweeps": 0, "deleted_bytes": 0}
+
+    # Layout
+
+    def new_artifact(self) -> Tuple[str, str]:
+        """Returns (artifact_id, directory) for a new execution; the directory exists."""
+        artifact_id = str(uuid.uuid4())
+        directory = os.path.join(self.root, shard_for(artifact_id))
+        os.makedirs(directory, exist_ok=True)
+        return artifact_id, directory
+
+    def relpath(self, artifact_id: str, suffix: str) -> str:
+        """Path of `<id>.<suffix>` relative to OUTPUT_DIR, with forward slashes (URL-ready)."""
+        entry = self._entries.get(artifact_id)
+        shard = entry["shard"] if entry is not None else shard_for(artifact_id)
+        return f"{shard}/{artifact_id}.{suffix}" if shard else f"{artifact_id}.{suffix}"
+
+    def path(self, artifact_id: str, suffix: str) -> str:
+        return os.path.join(self.root, *self.relpath(artifact_id, suffix).split("/"))
+
+    def files(self, artifact_id: str) -> List[str]:
+        """Absolute paths of the artifact's files as last indexed."""
+        entry = self._entries.get(artifact_id)
+        if entry is None:
+            return []
+        directory = os.path.join(self.root, entry["shard"])
+        return [os.path.join(directory, name) for name in entry["files"]]
+
+    # Index
+
+    def _stat_artifact(self, directory: str, artifact_id: str) -> Tuple[List[str], int]:
+        names, total = [], 0
+        prefix = artifact_id + "."
+        for entry in os.scandir(directory):
+            if entry.name.startswith(prefix) and entry.is_file():
+                names.append(entry.name)
+                total += entry.stat().st_size
+        return names, total
+
+    def _push(self, artifact_id: str, entry: dict):
+        heapq.heappush(self._heap, (entry["last_access"], artifact_id))
+        # Touches leave stale heap items behind; rebuild once they dominate
+        if len(self._heap) > 4 * len(self._entries) + 64:
+            self._heap = [(e["last_access"], aid) for aid, e in self._entries.items()]
+            heapq.heapify(self._heap)
+
+    def _add(self, artifact_id: str, shard: str, files: List[str], size: int, last_access: float):
+        previous = self._entries.get(artifact_id)
+        if previous is not None:
+            self._bytes -= previous["bytes"]
+        entry = {
+            "shard": shard,
+            "files": files,
+            "bytes": size,
+            "last_access": last_access,
+            "refs": previous["refs"] if previous is not None else 0,
+        }
+        self._entries[artifact_id] = entry
+        self._bytes += size
+        self._push(artifact_id, entry)
+
+    async def register(self, artifact_id: str):
+        """Indexes the files of a finished execution and enforces the quota."""
+        shard = shard_for(artifact_id)
+        files, size = await asyncio.to_thread(self._stat_artifact, os.path.join(self.root, shard), artifact_id)
+        self._add(artifact_id, shard, files, size, time.time())
+        self.stats["registered"] += 1
+        await self._evict(over_quota_only=True)
+
+    async def refresh(self, artifact_id: str):
+        """Re-indexes an artifact whose files changed after it was registered (e.g. a new export)."""
+        entry = self._entries.get(artifact_id)
+        if entry is None:
+            return
+        directory = os.path.join(self.root, entry["shard"])
+        files, size = await asyncio.to_thread(self._stat_artifact, directory, artifact_id)
+        self._add(artifact_id, entry["shard"], files, size, time.time())
+        await self._evict(over_quota_only=True)
+
+    def touch(self, artifact_id: str):
+        entry = self._entries.get(artifact_id)
+        if entry is not None:
+            entry["last_access"] = time.time()
+            self._push(artifact_id, entry)
+
+    def touch_path(self, relpath: str):
+        """Records an access to a file served from OUTPUT_DIR (e.g. `ab/<id>.lod0.stl`)."""
+        name = relpath.replace("\\", "/").rsplit("/", 1)[-1]
+        self.touch(name.split(".", 1)[0])
+
+    @contextlib.contextmanager
+    def pin(self, artifact_id: str):
+        """Keeps the artifact from being evicted while the block runs."""
+        entry = self._entries.get(artifact_id)
+        if entry is not None:
+            entry["refs"] += 1
+        try:
+            yield
+        finally:
+            if entry is not None:
+                entry["refs"] -= 1
+                self.touch(artifact_id)
+
+    # Eviction
+
+    def _select_victims(self, over_quota_only: bool) -> List[Tuple[str, dict]]:
+        now = time.time()
+        victims, skipped = [], []
+        while self._heap:
+            last_access, artifact_id = self._heap[0]
+            entry = self._entries.get(artifact_id)
+            if entry is None or entry["last_access"] != last_access:
+                heapq.heappop(self._heap)  # Stale: evicted already or touched since
+                continue
+            expired = not over_quota_only and now - last_access > self.ttl
+            if not expired and self._bytes <= self.max_bytes:
+                break
+            heapq.heappop(self._heap)
+            if entry["refs"] > 0:
+                skipped.append((last_access, artifact_id))
+                continue
+            del self._entries[artifact_id]
+            self._bytes -= entry["bytes"]
+            victims.append((artifact_id, entry))
+            self.stats["expired" if expired else "evicted"] += 1
+        for item in skipped:
+            heapq.heappush(self._heap, item)
+        return victims
+
+    def _delete_files(self, victims: List[Tuple[str, dict]]) -> int:
+        deleted = 0
+        for artifact_id, entry in victims:
+            directory = os.path.join(self.root, entry["shard"])
+            for name in entry["files"]:
+                try:
+                    os.remove(os.path.join(directory, name))
+                    deleted += 1
+                except FileNotFoundError:
+                    pass
+                except Exception as e:
+                    logger.warning(f"Failed to delete {name}: {e}")
+        return deleted
+
+    async def _evict(self, over_quota_only: bool = False):
+        victims = self._select_victims(over_quota_only)
+        if not victims:
+            return
+        self.stats["deleted_bytes"] += sum(entry["bytes"] for _, entry in victims)
+        deleted = await asyncio.to_thread(self._delete_files, victims)
+        logger.info(f"Evicted {len(victims)} artifacts ({deleted} files)")
+
+    # Sweeper
+
+    def _scan(self) -> List[Tuple[str, str, List[str], int, float]]:
+        """Indexes artifacts left by a previous run (sharded and legacy flat layout)."""
+        found: Dict[Tuple[str, str], list] = {}
+        directories = [("", self.root)]
+        for entry in os.scandir(self.root):
+            if entry.is_dir() and entry.name not in RESERVED_DIRS:
+                directories.append((entry.name, entry.path))
+        for shard, directory in directories:
+            for entry in os.scandir(directory):
+                if not entry.is_file():
+                    continue
+                artifact_id = entry.name.split(".", 1)[0]
+                st = entry.stat()
+                item = found.setdefault((shard, artifact_id), [[], 0, 0.0])
+                item[0].append(entry.name)
+                item[1] += st.st_size
+                item[2] = max(item[2], st.st_mtime)
+        return [(aid, shard, files, size, mtime) for (shard, aid), (files, size, mtime) in found.items()]
+
+    async def _sweep_loop(self):
+        try:
+            for artifact_id, shard, files, size, mtime in await asyncio.to_thread(self._scan):
+                if artifact_id not in self._entries:
+                    self._add(artifact_id, shard, files, size, mtime)
+            logger.info(f"Output storage indexed {len(self._entries)} artifacts ({self._bytes} bytes)")
+        except Exception as e:
+            logger.error(f"Failed to index output directory: {e}", exc_info=True)
+
+        while True:
+            try:
+                await self._evict()
+                self.stats["sweeps"] += 1
+            except Exception as e:
+                logger.warning(f"Output sweep failed: {e}")
+            await asyncio.sleep(self.sweep_interval)
+
+    async def start(self):
+        if self._sweeper is None:
+            self._sweeper = asyncio.create_task(self._sweep_loop())
+
+    async def shutdown(self):
+        if self._sweeper is not None:
+            self._sweeper.cancel()
+            await asyncio.gather(self._sweeper, return_exceptions=True)
+            self._sweeper = None
+
+    def get_stats(self) -> dict:
+        return {
+            "artifacts": len(self._entries),
+            "bytes": self._bytes,
+            "max_bytes": self.max_bytes,
+            "ttl": self.ttl,
+            "pinned": sum(1 for e in self._entries.values() if e["refs"] > 0),
+            **self.stats,
+        }
+
+
+output_storage = OutputStorage()
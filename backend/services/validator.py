@@ -1,9 +1,10 @@
 import ast
 import re
-from typing import Set, List
+from typing import Dict, List, Optional, Set, Tuple
 from core.config import settings
 from core.logger import setup_logger
 from core.errors import ValidationError
+from core.metrics import metrics
 
 logger = setup_logger("cad_copilot.validator")
 
@@ -17,12 +18,46 @@ BANNED_IMPORTS = {
     'os', 'sys', 'subprocess', 'shutil', 'socket', 'urllib', 'requests', 'http', 'asyncio', 'threading', 'multiprocessing'
 }
 
+# Names of the helpers the backend injects around scripts (checkpoints, boolean
+# batching, STL export, dry-run hooks); scripts must not reach them
+RESERVED_PREFIXES = ('_cad_', '_dry_')
+
+
+def _identifiers(node: ast.AST) -> List[str]:
+    """Identifiers a node binds or references, plus string constants (e.g. keys into a namespace dict)."""
+    if isinstance(node, ast.Name):
+        return [node.id]
+    if isinstance(node, ast.Attribute):
+        return [node.attr]
+    if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+        return [node.name]
+    if isinstance(node, ast.arg):
+        return [node.arg]
+    if isinstance(node, ast.keyword):
+        return [node.arg]
+    if isinstance(node, ast.ExceptHandler):
+        return [node.name]
+    if isinstance(node, ast.alias):
+        return [node.name.split('.')[-1], node.asname]
+    if isinstance(node, (ast.Global, ast.Nonlocal)):
+        return list(node.names)
+    if isinstance(node, ast.Constant) and isinstance(node.value, str):
+        return [node.value]
+    return []
+
+
 class SecurityNodeVisitor(ast.NodeVisitor):
     def __init__(self):
         self.errors: List[str] = []
         self.found_export = False
         self.has_none_shape = False
 
+    def generic_visit(self, node: ast.AST):
+        for name in _identifiers(node):
+            if name and name.startswith(RESERVED_PREFIXES):
+                self.errors.append(f"Reserved identifier detected: {name}")
+        super().generic_visit(node)
+
     def visit_Import(self, node: ast.Import):
         for alias in node.names:
             if alias.name.split('.')[0] in BANNED_IMPORTS:
@@ -55,11 +90,203 @@ class SecurityNodeVisitor(ast.NodeVisitor):
         self.generic_visit(node)
 
 
-def validate_code(code: str) -> str:
+# Geometric cost model. Weights are rough "one boolean of two primitives" units.
+BOOLEAN_OPS = {'cut', 'fuse', 'common', 'section', 'multiFuse', 'generalFuse', 'slice'}
+FILLET_OPS = {'makeFillet', 'makeChamfer'}
+FEATURE_OPS = {
+    'extrude', 'revolve', 'makeLoft', 'makeSweep', 'makePipe', 'makePipeShell',
+    'makeThickness', 'makeOffsetShape', 'makeHelix', 'removeSplitter', 'refine'
+}
+PRIMITIVES = {
+    'makeBox', 'makeCylinder', 'makeSphere', 'makeCone', 'makeTorus', 'makeWedge',
+    'makePlane', 'makePolygon', 'makeCircle', 'makeLine', 'makeRegularPolygon', 'Face', 'Wire'
+}
+COST_WEIGHTS = {'booleans': 1.0, 'fillet_edges': 0.5, 'features': 2.0, 'primitives': 0.05}
+UNKNOWN_LOOP_TRIPS = 10  # `while` loops and loops over non-literal iterables
+ALL_EDGES_ESTIMATE = 24  # makeFillet(r, shape.Edges): edges of a moderately complex solid
+MAX_LOOP_MULTIPLIER = 1_000_000
+
+
+class ScriptCost:
+    """Static estimate of how much OpenCASCADE work a script will do."""
+
+    def __init__(self):
+        self.booleans = 0
+        self.fillet_edges = 0
+        self.features = 0
+        self.primitives = 0
+        self.max_loop_trips = 0
+        self.unknown_loops = 0
+
+    @property
+    def score(self) -> float:
+        return round(sum(getattr(self, name) * weight for name, weight in COST_WEIGHTS.items()), 2)
+
+    def to_dict(self) -> dict:
+        return {
+            "score": self.score,
+            "booleans": self.booleans,
+            "fillet_edges": self.fillet_edges,
+            "features": self.features,
+            "primitives": self.primitives,
+            "max_loop_trips": self.max_loop_trips,
+            "unknown_loops": self.unknown_loops,
+        }
+
+
+def _literal_int(node: ast.AST, constants: Dict[str, int]) -> Optional[int]:
+    if isinstance(node, ast.Constant) and isinstance(node.value, int) and not isinstance(node.value, bool):
+        return node.value
+    if isinstance(node, ast.UnaryOp) and isinstance(node.op, ast.USub):
+        value = _literal_int(node.operand, constants)
+        return -value if value is not None else None
+    if isinstance(node, ast.Name):
+        return constants.get(node.id)
+    return None
+
+
+def _collect_constants(tree: ast.AST) -> Dict[str, int]:
     """
-    Validates FreeCAD Python script for security, length, syntax, and required logic.
-    Raises ValidationError if any checks fail.
-    Returns the sanitized code if successful.
+    Names bound exactly once to an int literal (`n = 6`) or a literal list/tuple
+    (recorded as its length), so `range(n)` and `for x in steps` have known trip counts.
+    """
+    values: Dict[str, Optional[int]] = {}
+    for node in ast.walk(tree):
+        targets = []
+        if isinstance(node, ast.Assign):
+            targets = node.targets
+        elif isinstance(node, (ast.AugAssign, ast.AnnAssign, ast.For, ast.comprehension)):
+            targets = [node.target]
+        for target in targets:
+            for name in ast.walk(target):
+                if not isinstance(name, ast.Name):
+                    continue
+                value = None
+                if isinstance(node, ast.Assign) and target is name:
+                    if isinstance(node.value, (ast.List, ast.Tuple)):
+                        value = len(node.value.elts)
+                    else:
+                        value = _literal_int(node.value, {})
+                # A second binding makes the value unknowable statically
+                values[name.id] = None if name.id in values else value
+    return {name: value for name, value in values.items() if value is not None}
+
+
+class CostNodeVisitor(ast.NodeVisitor):
+    def __init__(self, constants: Dict[str, int]):
+        self.constants = constants
+        self.cost = ScriptCost()
+        self._multiplier = 1
+
+    def _trip_count(self, iterable: ast.AST) -> Optional[int]:
+        if isinstance(iterable, (ast.List, ast.Tuple, ast.Set)):
+            return len(iterable.elts)
+        if isinstance(iterable, ast.Name) and iterable.id in self.constants:
+            return self.constants[iterable.id]
+        if isinstance(iterable, ast.Call) and isinstance(iterable.func, ast.Name):
+            if iterable.func.id == 'range' and 1 <= len(iterable.args) <= 3:
+                bounds = [_literal_int(arg, self.constants) for arg in iterable.args]
+                if None in bounds:
+                    return None
+                try:
+                    return len(range(*bounds))
+                except ValueError:  # range() step of zero
+                    return None
+            if iterable.func.id in ('enumerate', 'reversed', 'list', 'tuple', 'sorted') and iterable.args:
+                return self._trip_count(iterable.args[0])
+        return None
+
+    def _loop(self, iterables: List[Optional[ast.AST]], body: List[ast.AST]):
+        trips = 1
+        for iterable in iterables:
+            count = self._trip_count(iterable) if iterable is not None else None
+            if count is None:
+                self.cost.unknown_loops += 1
+                count = UNKNOWN_LOOP_TRIPS
+            trips *= max(count, 0)
+        self.cost.max_loop_trips = max(self.cost.max_loop_trips, trips)
+        previous = self._multiplier
+        self._multiplier = min(previous * trips, MAX_LOOP_MULTIPLIER)
+        try:
+            for node in body:
+                self.visit(node)
+        finally:
+            self._multiplier = previous
+
+    def visit_For(self, node: ast.For):
+        self.visit(node.iter)
+        self._loop([node.iter], node.body)
+        for stmt in node.orelse:
+            self.visit(stmt)
+
+    def visit_While(self, node: ast.While):
+        self.visit(node.test)
+        self._loop([None], node.body)
+        for stmt in node.orelse:
+            self.visit(stmt)
+
+    def _comprehension(self, node, elements: List[ast.AST]):
+        for generator in node.generators:
+            self.visit(generator.iter)
+        self._loop([g.iter for g in node.generators], elements)
+
+    def visit_ListComp(self, node: ast.ListComp):
+        self._comprehension(node, [node.elt])
+
+    visit_SetComp = visit_ListComp
+    visit_GeneratorExp = visit_ListComp
+
+    def visit_DictComp(self, node: ast.DictComp):
+        self._comprehension(node, [node.key, node.value])
+
+    def _fillet_edges(self, node: ast.Call) -> int:
+        edges = node.args[1] if len(node.args) > 1 else None
+        if isinstance(edges, (ast.List, ast.Tuple)):
+            return len(edges.elts)
+        if isinstance(edges, ast.Attribute) and edges.attr == 'Edges':
+            return ALL_EDGES_ESTIMATE
+        if isinstance(edges, (ast.ListComp, ast.GeneratorExp)):
+            trips = 1
+            for generator in edges.generators:
+                trips *= self._trip_count(generator.iter) or ALL_EDGES_ESTIMATE
+            return trips
+        return ALL_EDGES_ESTIMATE
+
+    def visit_Call(self, node: ast.Call):
+        name = None
+        if isinstance(node.func, ast.Attribute):
+            name = node.func.attr
+        elif isinstance(node.func, ast.Name):
+            name = node.func.id
+
+        if name in BOOLEAN_OPS:
+            operands = 1
+            if node.args and isinstance(node.args[0], (ast.List, ast.Tuple)):
+                operands = max(1, len(node.args[0].elts))
+            self.cost.booleans += operands * self._multiplier
+        elif name in FILLET_OPS:
+            self.cost.fillet_edges += self._fillet_edges(node) * self._multiplier
+        elif name in FEATURE_OPS:
+            self.cost.features += self._multiplier
+        elif name in PRIMITIVES:
+            self.cost.primitives += self._multiplier
+        self.generic_visit(node)
+
+
+def estimate_cost(tree: ast.AST) -> ScriptCost:
+    """Estimates boolean, fillet, feature and primitive counts with literal loop bounds unrolled."""
+    visitor = CostNodeVisitor(_collect_constants(tree))
+    visitor.visit(tree)
+    return visitor.cost
+
+
+@metrics.timed("validate")
+def validate_script(code: str) -> Tuple[str, ScriptCost]:
+    """
+    Validates FreeCAD Python script for security, length, syntax, and required logic,
+    and estimates its geometric cost.
+    Raises ValidationError if any checks fail or the cost exceeds COST_REJECT_THRESHOLD.
+    Returns the sanitized code and its cost estimate if successful.
     """
     code = code.strip()
 
@@ -93,5 +320,22 @@ def validate_code(code: str) -> str:
     if re.search(r"['\"]([A-Za-z]:\\[^'\"]*|/[^'\"]+)['\"]", code):
         logger.warning("Hardcoded absolute path detected, although might be benign. Allowing but warning.")
 
-    logger.info("Script validation passed successfully.")
-    return code
+    # 5. Admission control: refuse scripts that would only burn a worker until FREECAD_TIMEOUT
+    cost = estimate_cost(tree)
+    if settings.COST_REJECT_THRESHOLD and cost.score > settings.COST_REJECT_THRESHOLD:
+        raise ValidationError(
+            "Script is too expensive to execute.",
+            details=f"Estimated cost {cost.score} exceeds the limit of {settings.COST_REJECT_THRESHOLD} ({cost.to_dict()})",
+        )
+
+    logger.info(f"Script validation passed successfully (cost {cost.score}).")
+    return code, cost
+
+
+def validate_code(code: str) -> str:
+    """
+    Validates FreeCAD Python script for security, length, syntax, and required logic.
+    Raises ValidationError if any checks fail.
+    Returns the sanitized code if successful.
+    """
+    return validate_script(code)[0]
@@ -0,0 +1,109 @@
+import threading
+from collections import OrderedDict
+from typing import List, Optional, Sequence, Tuple
+import numpy as np
+
+
+class VectorIndex:
+    """
+    Immutable in-memory snapshot of a Chroma collection: every chunk embedding in
+    one contiguous float32 matrix, searched with a single matrix-vector product.
+    A refresh builds a new snapshot and swaps the reference, so readers never lock.
+    """
+
+    def __init__(self, ids: List[str], documents: List[str], embeddings, space: str = "l2"):
+        self.ids = ids
+        self.documents = documents
+        self.space = space
+        if ids:
+            matrix = np.asarray(embeddings, dtype=np.float32).reshape(len(ids), -1)
+        else:
+            matrix = np.zeros((0, 0), dtype=np.float32)
+        if space == "cosine" and len(matrix):
+            norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+            matrix = matrix / np.where(norms == 0, 1.0, norms)
+        self.matrix = np.ascontiguousarray(matrix)
+        self.sq_norms = np.einsum("ij,ij->i", self.matrix, self.matrix)
+
+    @classmethod
+    def from_collection(cls, collection) -> "VectorIndex":
+        data = collection.get(include=["embeddings", "documents"])
+        # Rank the same way Chroma's HNSW index does for this collection
+        space = (collection.metadata or {}).get("hnsw:space", "l2")
+        embeddings = data.get("embeddings")
+        return cls(list(data["ids"]), list(data["documents"] or []), embeddings if embeddings is not None else [], space)
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    @property
+    def dimension(self) -> int:
+        return self.matrix.shape[1] if len(self.ids) else 0
+
+    def search(self, query: Sequence[float], k: int) -> List[Tuple[int, float]]:
+        """Returns up to `k` (row, distance) pairs, nearest first."""
+        k = min(k, len(self.ids))
+        if k <= 0:
+            return []
+        q = np.asarray(query, dtype=np.float32)
+        dots = self.matrix @ q
+        if self.space == "cosine":
+            q_norm = float(np.linalg.norm(q)) or 1.0
+            distances = 1.0 - dots / q_norm
+        elif self.space == "ip":
+            distances = 1.0 - dots
+        else:
+            # ||m - q||^2 expanded so the row norms are precomputed once per snapshot
+            distances = self.sq_norms - 2.0 * dots + float(q @ q)
+
+        if k < len(distances):
+            rows = np.argpartition(distances, k - 1)[:k]
+        else:
+            rows = np.arange(len(distances))
+        rows = rows[np.argsort(distances[rows])]
+        return [(int(row), float(distances[row])) for row in rows]
+
+    def get_stats(self) -> dict:
+        return {"size": len(self.ids), "dimension": self.dimension, "space": self.space}
+
+
+class EmbeddingLRU:
+    """Thread-safe LRU of text -> embedding, shared by retrieval and the LLM cache."""
+
+    def __init__(self, embedding_fn, max_entries: int):
+        self.embedding_fn = embedding_fn
+        self.max_entries = max(0, max_entries)
+        self._entries: "OrderedDict[str, np.ndarray]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def peek(self, text: str) -> Optional[np.ndarray]:
+        """Returns the cached embedding without computing it (safe on the event loop)."""
+        with self._lock:
+            vector = self._entries.get(text)
+            if vector is not None:
+                self._entries.move_to_end(text)
+                self.hits += 1
+            return vector
+
+    def __call__(self, texts: List[str]) -> List[np.ndarray]:
+        """Embedding-function compatible: embeds only the texts that are not cached."""
+        results: List[Optional[np.ndarray]] = [self.peek(text) for text in texts]
+        missing = [i for i, vector in enumerate(results) if vector is None]
+        if missing:
+            computed = self.embedding_fn([texts[i] for i in missing])
+            with self._lock:
+                self.misses += len(missing)
+                for i, vector in zip(missing, computed):
+                    vector = np.asarray(vector, dtype=np.float32)
+                    results[i] = vector
+                    if self.max_entries:
+                        self._entries[texts[i]] = vector
+                        self._entries.move_to_end(texts[i])
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+        return results
+
+    def get_stats(self) -> dict:
+        return {"entries": len(self._entries), "max_entries": self.max_entries, "hits": self.hits, "misses": self.misses}
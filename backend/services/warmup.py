@@ -0,0 +1,90 @@
+import time
+import asyncio
+from typing import Awaitable, Callable, Dict, List, Optional
+from core.logger import setup_logger
+
+logger = setup_logger("cad_copilot.warmup")
+
+# A warmup step returns an optional detail string for the readiness report
+WarmupFn = Callable[[], Awaitable[Optional[str]]]
+
+PENDING = "pending"
+WARMING = "warming"
+READY = "ready"
+FAILED = "failed"
+DISABLED = "disabled"
+
+
+class WarmupManager:
+    """
+    Runs slow startup work (embedding model, Chroma, Ollama model preload, FreeCAD
+    workers) as background tasks so the server accepts traffic immediately.
+
+    Every component is best-effort: the pipeline degrades without it (no RAG
+    context, one-shot FreeCAD subprocesses, cold model load). The process is
+    `ready` once every component has finished, and `degraded` if any failed.
+    """
+
+    def __init__(self):
+        self.components: Dict[str, dict] = {}
+        self._steps: Dict[str, WarmupFn] = {}
+        self._tasks: List[asyncio.Task] = []
+        self.started_at = time.monotonic()
+
+    def add(self, name: str, step: WarmupFn):
+        self._steps[name] = step
+        self.components[name] = {"state": PENDING, "duration": None, "detail": None, "error": None}
+
+    def disable(self, name: str, detail: str):
+        self.components[name] = {"state": DISABLED, "duration": None, "detail": detail, "error": None}
+
+    def start(self):
+        self.started_at = time.monotonic()
+        self._tasks = [asyncio.create_task(self._run(name, step)) for name, step in self._steps.items()]
+
+    async def _run(self, name: str, step: WarmupFn):
+        component = self.components[name]
+        component["state"] = WARMING
+        started = time.monotonic()
+        try:
+            component["detail"] = await step()
+            component["state"] = READY
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.warning(f"Warmup of '{name}' failed: {e}")
+            component["state"] = FAILED
+            component["error"] = str(e)
+        finally:
+            component["duration"] = round(time.monotonic() - started, 3)
+        if component["state"] == READY:
+            logger.info(f"Warmup of '{name}' finished in {component['duration']}s")
+
+    async def wait(self):
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+
+    async def shutdown(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+
+    @property
+    def ready(self) -> bool:
+        return all(c["state"] not in (PENDING, WARMING) for c in self.components.values())
+
+    def get_status(self) -> dict:
+        if not self.ready:
+            status = "starting"
+        elif any(c["state"] == FAILED for c in self.components.values()):
+            status = "degraded"
+        else:
+            status = "ready"
+        return {
+            "status": status,
+            "ready": self.ready,
+            "uptime": round(time.monotonic() - self.started_at, 3),
+            "components": self.components,
+        }
+
+
+warmup = WarmupManager()
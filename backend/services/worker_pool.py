@@ -0,0 +1,258 @@
+import os
+import sys
+import json
+import time
+import uuid
+import asyncio
+import subprocess
+from typing import Dict, List, Optional
+from core.logger import setup_logger
+from core.errors import ExecutionError, TimeoutError
+from core.metrics import metrics
+
+logger = setup_logger("cad_copilot.worker_pool")
+
+WORKER_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "freecad_worker.py")
+MARKER = "@@CAD_WORKER@@ "
+# How many non-protocol output lines to keep per job for error reporting
+_TAIL_LINES = 50
+
+
+def build_command(executable: str, script_path: str) -> List[str]:
+    """
+    Builds the argv for running a script under FreeCADCmd.
+    A `.py` executable (e.g. tools/stub_freecadcmd.py) is launched with the current interpreter.
+    """
+    if executable.lower().endswith(".py"):
+        return [sys.executable, executable, script_path]
+    return [executable, script_path]
+
+
+class FreeCADWorker:
+    """A single FreeCADCmd process running the freecad_worker.py job loop."""
+
+    def __init__(self, executable: str):
+        self.executable = executable
+        self.process: Optional[subprocess.Popen] = None
+        self.jobs_done = 0
+
+    @property
+    def alive(self) -> bool:
+        return self.process is not None and self.process.poll() is None
+
+    def _read_reply(self, tail: List[str]) -> Optional[dict]:
+        """Blocks until the next protocol line. Returns None if the worker exited."""
+        while True:
+            line = self.process.stdout.readline()
+            if not line:
+                return None
+            if line.startswith(MARKER):
+                return json.loads(line[len(MARKER):])
+            tail.append(line.rstrip())
+            del tail[:-_TAIL_LINES]
+
+    def _start(self):
+        self.process = subprocess.Popen(
+            build_command(self.executable, WORKER_SCRIPT),
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.STDOUT,
+            text=True,
+            encoding="utf-8",
+            errors="replace",
+            bufsize=1,
+        )
+        tail: List[str] = []
+        reply = self._read_reply(tail)
+        if not reply or not reply.get("ready"):
+            self.kill()
+            raise ExecutionError("FreeCAD worker failed to start.", details="\n".join(tail))
+
+    async def start(self, timeout: float):
+        # Blocking pipe I/O runs in a thread to stay compatible with the Windows selector loop
+        try:
+            await asyncio.wait_for(asyncio.to_thread(self._start), timeout=timeout)
+        except asyncio.TimeoutError:
+            self.kill()
+            raise TimeoutError("FreeCAD worker did not become ready in time.")
+        logger.info(f"FreeCAD worker started (pid {self.process.pid})")
+
+    def _run(self, job: dict) -> dict:
+        self.process.stdin.write(json.dumps(job) + "\n")
+        self.process.stdin.flush()
+        tail: List[str] = []
+        reply = self._read_reply(tail)
+        if reply is None:
+            return {"id": job["id"], "ok": False, "crashed": True, "error": "\n".join(tail)}
+        if not reply.get("ok") and tail:
+            reply["error"] = "\n".join(tail + [reply.get("error") or ""])
+        return reply
+
+    async def run(self, script_path: str, timeout: float) -> dict:
+        job = {"id": str(uuid.uuid4()), "script_path": script_path}
+        try:
+            reply = await asyncio.wait_for(asyncio.to_thread(self._run, job), timeout=timeout)
+        except asyncio.TimeoutError:
+            # On 3.11+ this is the builtin TimeoutError, an OSError subclass; let the pool handle it
+            raise
+        except (BrokenPipeError, OSError) as e:
+            return {"id": job["id"], "ok": False, "crashed": True, "error": str(e)}
+        self.jobs_done += 1
+        return reply
+
+    def kill(self):
+        if self.process is None:
+            return
+        try:
+            if self.process.poll() is None:
+                self.process.kill()
+            self.process.wait(timeout=5)
+        except Exception as e:
+            logger.warning(f"Failed to kill FreeCAD worker: {e}")
+        finally:
+            for stream in (self.process.stdin, self.process.stdout):
+                try:
+                    stream.close()
+                except Exception:
+                    pass
+
+
+class FreeCADWorkerPool:
+    """
+    Pool of warm FreeCADCmd processes. Each worker imports FreeCAD once and then
+    executes scripts sent over its stdin pipe. Workers are recycled after
+    `max_jobs` jobs, after a crash, and after a job exceeds the timeout.
+
+    Workers are partitioned into lanes (`{"executor": 1, "executor_heavy": 1}`),
+    each with its own idle queue, so a job only ever waits for a worker of its
+    own lane: a heavy script cannot hold the worker a cheap one needs.
+    """
+
+    def __init__(self, executable: str, lanes: Dict[str, int], max_jobs: int, timeout: float):
+        self.executable = executable
+        self.lanes = {lane: max(1, size) for lane, size in lanes.items()}
+        self.default_lane = next(iter(self.lanes))
+        self.size = sum(self.lanes.values())
+        self.max_jobs = max(1, max_jobs)
+        self.timeout = timeout
+        self._idle: Dict[str, asyncio.Queue] = {lane: asyncio.Queue() for lane in self.lanes}
+        self._workers: List[FreeCADWorker] = []
+        self._closed = False
+        self.stats = {"jobs": 0, "failures": 0, "timeouts": 0, "crashes": 0, "recycled": 0}
+        self.acquired = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+
+    async def start(self):
+        """Spawns all workers. Workers that fail to start are retried lazily on acquire."""
+        slots = [lane for lane, size in self.lanes.items() for _ in range(size)]
+        results = await asyncio.gather(*(self._spawn() for _ in slots), return_exceptions=True)
+        for lane, result in zip(slots, results):
+            if isinstance(result, FreeCADWorker):
+                self._idle[lane].put_nowait(result)
+            else:
+                logger.warning(f"FreeCAD worker failed to start: {result}")
+                self._idle[lane].put_nowait(None)  # Placeholder slot, spawned on demand
+        logger.info(f"FreeCAD worker pool ready ({self.size} slots: {self.lanes})")
+
+    async def _spawn(self) -> FreeCADWorker:
+        worker = FreeCADWorker(self.executable)
+        await worker.start(self.timeout)
+        self._workers.append(worker)
+        return worker
+
+    def _retire(self, worker: FreeCADWorker):
+        worker.kill()
+        if worker in self._workers:
+            self._workers.remove(worker)
+        self.stats["recycled"] += 1
+
+    async def _acquire(self, lane: str) -> Optional[FreeCADWorker]:
+        """Takes an idle worker of the lane, recording how long the job waited for it."""
+        queued_at = time.monotonic()
+        worker = await self._idle[lane].get()
+        wait = time.monotonic() - queued_at
+        self.acquired += 1
+        self.total_wait += wait
+        self.max_wait = max(self.max_wait, wait)
+        metrics.observe_queue_wait(f"{lane}_worker", wait)
+        if wait > 1:
+            logger.info(f"Waited {wait:.2f}s for a FreeCAD worker ({lane})")
+        return worker
+
+    async def execute(self, script_path: str, lane: Optional[str] = None) -> None:
+        """
+        Runs a script in a warm worker of `lane` (the default lane if None or
+        unknown). Raises ExecutionError on script failure and TimeoutError if the
+        job exceeds the configured timeout.
+        """
+        if self._closed:
+            raise ExecutionError("FreeCAD worker pool is shut down.")
+
+        if lane not in self._idle:
+            lane = self.default_lane
+        worker = await self._acquire(lane)
+        try:
+            if worker is None or not worker.alive:
+                if worker is not None:
+                    self._retire(worker)
+                worker = None
+                worker = await self._spawn()
+
+            self.stats["jobs"] += 1
+            try:
+                reply = await worker.run(script_path, self.timeout)
+            except asyncio.TimeoutError:
+                self.stats["timeouts"] += 1
+                logger.error(f"FreeCAD job exceeded {self.timeout}s; killing worker (pid {worker.process.pid})")
+                self._retire(worker)
+                worker = None
+                raise TimeoutError(f"FreeCAD execution exceeded {self.timeout} seconds.")
+
+            if reply.get("crashed"):
+                self.stats["crashes"] += 1
+                logger.error("FreeCAD worker crashed during job; recycling.")
+                self._retire(worker)
+                worker = None
+                raise ExecutionError("FreeCAD worker crashed during execution.", details=reply.get("error"))
+
+            if worker.jobs_done >= self.max_jobs:
+                logger.info(f"Recycling FreeCAD worker after {worker.jobs_done} jobs")
+                self._retire(worker)
+                worker = None
+
+            if not reply.get("ok"):
+                self.stats["failures"] += 1
+                raise ExecutionError("FreeCAD script execution failed.", details=(reply.get("error") or "").strip())
+        except asyncio.CancelledError:
+            # The thread blocked on the pipe cannot be interrupted; kill the worker to release it
+            if worker is not None:
+                self._retire(worker)
+                worker = None
+            raise
+        finally:
+            self._idle[lane].put_nowait(worker)
+
+    def get_stats(self) -> dict:
+        return {
+            "size": self.size,
+            "alive": sum(1 for w in self._workers if w.alive),
+            "idle": sum(queue.qsize() for queue in self._idle.values()),
+            "lanes": {lane: {"size": size, "idle": self._idle[lane].qsize()} for lane, size in self.lanes.items()},
+            "avg_wait": round(self.total_wait / self.acquired, 4) if self.acquired else 0.0,
+            "max_wait": round(self.max_wait, 4),
+            **self.stats,
+        }
+
+    async def shutdown(self):
+        self._closed = True
+        for worker in list(self._workers):
+            try:
+                if worker.alive:
+                    worker.process.stdin.write(json.dumps({"cmd": "shutdown"}) + "\n")
+                    worker.process.stdin.flush()
+            except Exception:
+                pass
+            await asyncio.to_thread(worker.kill)
+        self._workers.clear()
+        logger.info("FreeCAD worker pool shut down.")
@@ -0,0 +1,74 @@
+"""
+Shared setup for the backend tests.
+
+Settings are read when core.config is first imported, so the environment is set here,
+before any test module imports the app. Generated files go to a temporary directory,
+FREECAD_PATH points at tools/stub_freecadcmd.py, and OLLAMA_BASE_URL at an in-process
+tools/stub_ollama.py. RAG is off.
+
+Run from backend/: `python -m pytest -q`
+"""
+import os
+import sys
+import shutil
+import tempfile
+import threading
+import pytest
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+TOOLS_DIR = os.path.join(BACKEND_DIR, "tools")
+sys.path[:0] = [BACKEND_DIR, TOOLS_DIR]
+
+TMP_DIR = tempfile.mkdtemp(prefix="cad_copilot_tests_")
+
+import stub_ollama  # noqa: E402
+
+# Instant answers: tests that need latency or failures set them on the `ollama` fixture
+_stub = stub_ollama.StubOllama(stub_ollama.build_parser().parse_args(
+    ["--token-rate", "1000000", "--prefill-tps", "1000000000", "--parallel", "16"]
+))
+_server = stub_ollama.ThreadingHTTPServer(("127.0.0.1", 0), stub_ollama.make_handler(_stub))
+_server.daemon_threads = True
+threading.Thread(target=_server.serve_forever, daemon=True).start()
+
+os.environ.update({
+    "OUTPUT_DIR": os.path.join(TMP_DIR, "outputs"),
+    "CHROMA_DB_DIR": os.path.join(TMP_DIR, "chroma_db"),
+    "FREECAD_PATH": os.path.join(TOOLS_DIR, "stub_freecadcmd.py"),
+    "FREECAD_POOL_SIZE": "2",
+    "OLLAMA_BASE_URL": f"http://127.0.0.1:{_server.server_address[1]}",
+    "OPENAI_API_KEY": "",
+    "ENABLE_RAG": "false",
+    "WARMUP_PRELOAD_LLM": "false",
+    "STL_PRECOMPRESS": "gzip",
+    "LLM_RETRIES": "0",
+})
+
+
+@pytest.fixture
+def ollama():
+    """The stub Ollama; latency and error rate are restored after each test."""
+    latency, error_rate = _stub.latency, _stub.error_rate
+    yield _stub
+    _stub.latency, _stub.error_rate = latency, error_rate
+
+
+@pytest.fixture(scope="session")
+def client():
+    """A TestClient with the app's lifespan running (warm worker pool, job queue, storage)."""
+    from fastapi.testclient import TestClient
+    from main import app
+
+    with TestClient(app) as test_client:
+        yield test_client
+
+
+@pytest.fixture(scope="session")
+def portal(client):
+    """Runs coroutines on the app's event loop, where the service singletons live."""
+    return client.portal
+
+
+def pytest_sessionfinish(session, exitstatus):
+    _server.shutdown()
+    shutil.rmtree(TMP_DIR, ignore_errors=True)
@@ -0,0 +1,65 @@
+import time
+from api import routes
+from core.config import settings
+from core.errors import ValidationError
+from test_streaming import stream
+
+
+def test_parameter_sweep_streams_one_item_per_prompt(client, ollama):
+    requests = ollama.requests
+    events = stream(client, "/api/generate/batch", {
+        "template": "batch sweep plate {length}mm by {width}mm",
+        "parameters": {"length": [40, 60], "width": [20, 30]},
+        "prompts": ["batch sweep duplicate", "batch sweep duplicate"],
+    })
+    names = [name for name, _ in events]
+    assert names[0] == "batch_started" and names[-1] == "batch_done"
+    assert events[0][1] == {"items": 6, "distinct": 5}
+    assert events[-1][1] == {"items": 6, "succeeded": 6, "failed": 0}
+
+    items = sorted((data for name, data in events if name == "item"), key=lambda data: data["index"])
+    assert [item["index"] for item in items] == list(range(6))
+    assert items[2]["prompt"] == "batch sweep plate 40mm by 20mm"
+    assert items[5]["prompt"] == "batch sweep plate 60mm by 30mm"
+    # Duplicates share one generation
+    assert items[0]["result"]["stl_url"] == items[1]["result"]["stl_url"]
+    assert ollama.requests - requests == 5
+
+
+def test_failing_item_does_not_abort_the_batch(client, monkeypatch):
+    run_generate = routes._run_generate
+
+    async def flaky(request, emit=None):
+        if "broken" in request.prompt:
+            raise ValidationError("Broken prompt.")
+        return await run_generate(request, emit)
+
+    monkeypatch.setattr(routes, "_run_generate", flaky)
+    events = stream(client, "/api/generate/batch", {"prompts": ["batch broken item", "batch healthy item"]})
+    items = {data["prompt"]: data for name, data in events if name == "item"}
+    assert items["batch broken item"]["status"] == "error"
+    assert items["batch broken item"]["error"]["message"] == "Broken prompt."
+    assert items["batch healthy item"]["status"] == "success"
+    assert events[-1] == ("batch_done", {"items": 2, "succeeded": 1, "failed": 1})
+
+
+def test_invalid_batches_are_rejected_before_streaming(client, monkeypatch):
+    assert client.post("/api/generate/batch", json={}).status_code == 400
+    assert client.post("/api/generate/batch", json={"template": "plate {missing}", "parameters": {"x": [1]}}).status_code == 400
+    monkeypatch.setattr(settings, "BATCH_MAX_ITEMS", 2)
+    assert client.post("/api/generate/batch", json={"prompts": ["a", "b", "c"]}).status_code == 400
+
+
+def test_large_grids_are_rejected_without_expanding(client):
+    grid = {name: list(range(200)) for name in ("a", "b", "c")}
+    started = time.monotonic()
+    response = client.post("/api/generate/batch", json={"template": "plate {a} {b} {c}", "parameters": grid})
+    assert time.monotonic() - started < 1.0
+    assert response.status_code == 400
+    assert response.json()["error"]["details"] == "Got 8000000 items."
+
+
+def test_oversized_lists_are_rejected_by_the_schema(client):
+    too_many = list(range(settings.BATCH_MAX_ITEMS + 1))
+    assert client.post("/api/generate/batch", json={"prompts": [str(i) for i in too_many]}).status_code == 422
+    assert client.post("/api/generate/batch", json={"template": "plate {a}", "parameters": {"a": too_many}}).status_code == 422
@@ -0,0 +1,110 @@
+import os
+import subprocess
+import sys
+import pytest
+
+from core.config import settings
+from core.errors import ValidationError
+from services import executor as executor_module
+from services.checkpoints import CHECKPOINT_PRELUDE, CheckpointStore
+from services.validator import validate_script
+from services.executor import executor
+
+PARENT = """import Part
+from FreeCAD import Vector
+plate = Part.makeBox(40, 20, 5)
+plate = plate.cut(Part.makeCylinder(2, 5, Vector(10, 10, 0)))
+rib = Part.makeBox(4, 20, 10)
+final_shape = plate.fuse(rib)
+"""
+
+# Same statements, reformatted, with the last one changed
+REFINED = """import Part
+from FreeCAD import Vector
+plate = Part.makeBox(40,20,5)   # base
+plate = plate.cut(Part.makeCylinder(2, 5, Vector(10, 10, 0)))
+rib = Part.makeBox(4, 20, 10)
+final_shape = plate.fuse(rib).cut(Part.makeCylinder(2, 5, Vector(30, 10, 0)))
+"""
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    with monkeypatch.context() as patch:
+        patch.setattr(settings, "OUTPUT_DIR", str(tmp_path))
+        store = CheckpointStore()
+    monkeypatch.setattr(executor_module, "checkpoint_store", store)
+    return store
+
+
+def execute(portal, code):
+    return portal.call(executor.execute_script, code)
+
+
+def read(stl):
+    with open(os.path.join(settings.OUTPUT_DIR, stl), "rb") as f:
+        return f.read()
+
+
+def test_short_scripts_are_not_planned(store):
+    assert store.plan("import Part\n") is None
+    assert store.plan("not python (") is None
+
+
+def test_refinement_resumes_from_the_shared_prefix(store, portal):
+    _, reused = execute(portal, PARENT)
+    assert reused is None
+    assert store.get_stats()["saved"] == 3
+
+    stl, reused = execute(portal, REFINED)
+    assert reused["statements"] == 5
+    assert reused["total_statements"] == 6
+    assert store.get_stats()["resumed"] == 1
+
+    # The resumed run produces the same mesh as running the refined script from scratch
+    store.enabled = False
+    full_stl, _ = execute(portal, REFINED)
+    assert read(full_stl) == read(stl)
+    assert store.get_stats()["statements_skipped"] == 5
+
+
+def test_broken_checkpoint_falls_back_to_a_full_run(store, portal):
+    execute(portal, PARENT)
+    plan = store.plan(REFINED)
+    with open(store._path(plan.hashes[plan.resume_at - 1]), "wb") as f:
+        f.write(b"not a pickle")
+
+    stl, reused = execute(portal, REFINED)
+    assert reused is None
+    assert os.path.getsize(os.path.join(settings.OUTPUT_DIR, stl)) > 0
+    assert store.get_stats()["invalidated"] == 1
+
+
+def test_checkpoints_are_evicted_by_size(store, portal):
+    execute(portal, PARENT)
+    sizes = sorted(store._entries.values())
+    store.max_bytes = sizes[-1]
+    store._evict()
+    stats = store.get_stats()
+    assert stats["bytes"] <= store.max_bytes
+    assert stats["evictions"] >= 1
+    assert len(os.listdir(store.directory)) == stats["entries"]
+
+
+def test_prelude_leaves_only_its_two_helpers_in_the_script_globals(tmp_path):
+    script = tmp_path / "prelude.py"
+    script.write_text(CHECKPOINT_PRELUDE.format(protocol=4) + "print('GLOBALS', sorted(k for k in globals() if not k.startswith('__')))\n")
+    output = subprocess.run([sys.executable, settings.FREECAD_PATH, str(script)], capture_output=True, text=True, check=True).stdout
+    assert "GLOBALS ['_cad_checkpoint', '_cad_restore']" in output
+
+
+@pytest.mark.parametrize("line", [
+    "_cad_checkpoint.__globals__",
+    "_cad_restore('/tmp/x.pkl', {})",
+    "table = {}\ntable['_cad_checkpoint']",
+    "from math import pi as _cad_pi",
+    "_dry_iter = iter",
+])
+def test_validator_rejects_injected_helper_names(line):
+    with pytest.raises(ValidationError, match="Security violation"):
+        validate_script("import Part\n" + line + "\nfinal_shape = Part.makeBox(1, 1, 1)\n")
@@ -0,0 +1,150 @@
+import asyncio
+import uuid
+import pytest
+
+from api import routes
+from core.config import settings
+from core.errors import CircuitOpenError, LLMError
+from services.circuit_breaker import CLOSED, HALF_OPEN, OPEN, CircuitBreaker
+from services.health import HealthSupervisor
+from services.llm import LLMServiceWithFallback, OllamaService
+
+
+@pytest.fixture
+def breaker(monkeypatch):
+    monkeypatch.setattr(settings, "LLM_BREAKER_MIN_CALLS", 4)
+    monkeypatch.setattr(settings, "LLM_BREAKER_WINDOW", 4)
+    monkeypatch.setattr(settings, "LLM_BREAKER_ERROR_RATE", 0.5)
+    monkeypatch.setattr(settings, "LLM_BREAKER_SLOW_CALL_SECONDS", 0.05)
+    monkeypatch.setattr(settings, "LLM_BREAKER_OPEN_SECONDS", 0.1)
+    return CircuitBreaker("test")
+
+
+def call(breaker, fail=False, seconds=0.0):
+    try:
+        with breaker.guard():
+            if seconds:
+                asyncio.run(asyncio.sleep(seconds))
+            if fail:
+                raise RuntimeError("backend down")
+    except RuntimeError:
+        pass
+
+
+def test_error_rate_opens_the_circuit_and_short_circuits_calls(breaker):
+    for fail in (False, True, False):
+        call(breaker, fail)
+    assert breaker.state == CLOSED  # Fewer than LLM_BREAKER_MIN_CALLS outcomes
+    call(breaker, fail=True)
+    assert breaker.state == OPEN
+    with pytest.raises(CircuitOpenError) as error:
+        call(breaker)
+    assert error.value.status_code == 503
+    assert error.value.retry_after == 1
+    assert breaker.get_stats()["short_circuited"] == 1
+
+
+def test_slow_calls_open_the_circuit(breaker):
+    breaker.slow_call_rate = 0.75
+    for seconds in (0.06, 0.06, 0.0, 0.06):
+        call(breaker, seconds=seconds)
+    assert breaker.state == OPEN
+    assert "took over" in breaker.reason
+
+
+def test_half_open_lets_one_trial_call_through(breaker):
+    for _ in range(4):
+        call(breaker, fail=True)
+    asyncio.run(asyncio.sleep(0.12))
+
+    with breaker.guard():
+        assert breaker.state == HALF_OPEN
+        with pytest.raises(CircuitOpenError):
+            call(breaker)  # Only one trial at a time
+    assert breaker.state == CLOSED
+    assert breaker.get_stats()["window_calls"] == 0
+
+
+def test_failed_trial_reopens_and_cancelled_trial_frees_the_slot(breaker):
+    for _ in range(4):
+        call(breaker, fail=True)
+    breaker.probe_succeeded()
+    assert breaker.state == HALF_OPEN
+
+    with pytest.raises(asyncio.CancelledError):
+        with breaker.guard():
+            raise asyncio.CancelledError()
+    assert breaker.state == HALF_OPEN
+    call(breaker, fail=True)
+    assert breaker.state == OPEN
+    assert breaker.get_stats()["opened"] == 2
+
+
+def test_probes_feed_the_breaker_and_results_are_cached(breaker):
+    supervisor = HealthSupervisor()
+    probes = []
+
+    async def probe():
+        probes.append(1)
+        if len(probes) == 1:
+            raise OSError("connection refused")
+        return True
+
+    supervisor.add("ollama", probe, breaker)
+
+    async def run():
+        failed = await supervisor.check("ollama")
+        state_after_failure = breaker.state
+        supervisor.interval = 60
+        await supervisor.start()  # Probes once right away
+        await asyncio.sleep(0.01)
+        try:
+            cached = await supervisor.get("ollama")
+            await supervisor.get("ollama")
+        finally:
+            await supervisor.shutdown()
+        return failed, state_after_failure, cached
+
+    failed, state_after_failure, cached = asyncio.run(run())
+    assert failed["ok"] is False and failed["error"] == "connection refused"
+    assert state_after_failure == OPEN
+    assert cached["ok"] is True
+    assert breaker.state == HALF_OPEN
+    assert len(probes) == 2
+
+
+def test_failing_ollama_is_short_circuited(portal, ollama, monkeypatch):
+    monkeypatch.setattr(settings, "LLM_BREAKER_MIN_CALLS", 2)
+    service = OllamaService()
+    ollama.error_rate = 1.0
+
+    async def run():
+        await service.start()
+        try:
+            for _ in range(2):
+                with pytest.raises(LLMError):
+                    await service.generate_code("a box " + uuid.uuid4().hex, "system")
+            before = ollama.requests
+            with pytest.raises(CircuitOpenError):
+                await service.generate_code("a box " + uuid.uuid4().hex, "system")
+            return ollama.requests - before
+        finally:
+            await service.close()
+
+    assert portal.call(run) == 0
+    assert service.breaker.get_stats()["state"] == OPEN
+
+
+def test_open_circuit_returns_503_with_retry_after(client, portal, ollama, monkeypatch):
+    service = LLMServiceWithFallback()
+    portal.call(service.start)
+    monkeypatch.setattr(routes, "llm_service", service)
+    service.primary.breaker._open("test")
+    before = ollama.requests
+    try:
+        response = client.post("/api/generate", json={"prompt": "breaker gear " + uuid.uuid4().hex})
+    finally:
+        portal.call(service.close)
+    assert response.status_code == 503
+    assert int(response.headers["Retry-After"]) >= 1
+    assert ollama.requests == before
@@ -0,0 +1,164 @@
+import asyncio
+import uuid
+import httpx
+import pytest
+
+from services.coalescing import SingleFlight
+from stub_ollama import parse_distribution
+
+
+class Work:
+    """Counts runs; each run waits until released, then returns or raises."""
+
+    def __init__(self, result="done", error=None):
+        self.runs = 0
+        self.result = result
+        self.error = error
+        self.release = asyncio.Event()
+
+    async def __call__(self):
+        self.runs += 1
+        await self.release.wait()
+        if self.error is not None:
+            raise self.error
+        return self.result
+
+
+def test_concurrent_callers_share_one_run():
+    flights = SingleFlight("test")
+    joins = []
+
+    async def run():
+        work = Work()
+
+        async def on_join():
+            joins.append(1)
+
+        calls = [asyncio.create_task(flights.run("key", work, on_join)) for _ in range(4)]
+        await asyncio.sleep(0.01)
+        assert flights.get_stats()["in_flight"] == 1
+        work.release.set()
+        return await asyncio.gather(*calls), work.runs
+
+    results, runs = asyncio.run(run())
+    assert runs == 1
+    assert results == [("done", False)] + [("done", True)] * 3
+    assert len(joins) == 3
+    assert flights.get_stats() == {"enabled": True, "in_flight": 0, "leaders": 1, "coalesced": 3, "takeovers": 0}
+
+
+def test_leader_errors_reach_every_follower():
+    flights = SingleFlight("test")
+
+    async def run():
+        work = Work(error=ValueError("boom"))
+        calls = [asyncio.create_task(flights.run("key", work)) for _ in range(3)]
+        await asyncio.sleep(0.01)
+        work.release.set()
+        return await asyncio.gather(*calls, return_exceptions=True), work.runs
+
+    results, runs = asyncio.run(run())
+    assert runs == 1
+    assert [str(r) for r in results] == ["boom"] * 3
+
+
+def test_follower_takes_over_when_the_leader_is_cancelled():
+    flights = SingleFlight("test")
+
+    async def run():
+        work = Work()
+        leader = asyncio.create_task(flights.run("key", work))
+        await asyncio.sleep(0.01)
+        followers = [asyncio.create_task(flights.run("key", work)) for _ in range(2)]
+        await asyncio.sleep(0.01)
+        leader.cancel()
+        await asyncio.sleep(0.01)
+        # One follower re-ran the work as the new leader, the other joined it
+        assert work.runs == 2
+        work.release.set()
+        return await asyncio.gather(*followers), leader.cancelled()
+
+    results, leader_cancelled = asyncio.run(run())
+    assert leader_cancelled
+    assert sorted(results) == [("done", False), ("done", True)]
+    assert flights.get_stats()["takeovers"] == 1
+    assert flights.get_stats()["in_flight"] == 0
+
+
+def test_cancelled_follower_does_not_affect_the_flight():
+    flights = SingleFlight("test")
+
+    async def run():
+        work = Work()
+        leader = asyncio.create_task(flights.run("key", work))
+        await asyncio.sleep(0.01)
+        quitter = asyncio.create_task(flights.run("key", work))
+        stayer = asyncio.create_task(flights.run("key", work))
+        await asyncio.sleep(0.01)
+        quitter.cancel()
+        await asyncio.sleep(0.01)
+        work.release.set()
+        return await leader, await stayer, work.runs
+
+    assert asyncio.run(run()) == (("done", False), ("done", True), 1)
+
+
+@pytest.mark.parametrize("enabled, key", [(False, "key"), (True, None)])
+def test_uncoalesced_calls_run_separately(enabled, key):
+    flights = SingleFlight("test")
+    flights.enabled = enabled
+
+    async def run():
+        work = Work()
+        work.release.set()
+        return await asyncio.gather(*(flights.run(key, work) for _ in range(3))), work.runs
+
+    results, runs = asyncio.run(run())
+    assert runs == 3
+    assert results == [("done", False)] * 3
+
+
+def test_identical_generate_requests_share_one_llm_call(portal, ollama):
+    from main import app
+
+    ollama.latency = parse_distribution("fixed:300")
+    prompt = "coalesced flange " + uuid.uuid4().hex
+
+    async def run():
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://backend", timeout=60) as client:
+            before = ollama.requests
+            responses = await asyncio.gather(*(client.post("/api/generate", json={"prompt": prompt}) for _ in range(3)))
+            return responses, ollama.requests - before
+
+    responses, llm_calls = portal.call(run)
+    assert [r.status_code for r in responses] == [200] * 3
+    assert llm_calls == 1
+    bodies = [r.json() for r in responses]
+    assert len({b["stl_url"] for b in bodies}) == 1
+    assert sorted(b["coalesced"] or "" for b in bodies) == ["", "generation", "generation"]
+
+
+def test_request_takes_over_from_a_cancelled_job(portal, ollama):
+    from main import app
+    from services.coalescing import generation_flights
+
+    ollama.latency = parse_distribution("fixed:400")
+    prompt = "takeover bracket " + uuid.uuid4().hex
+
+    async def run():
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://backend", timeout=60) as client:
+            takeovers = generation_flights.get_stats()["takeovers"]
+            job = (await client.post("/api/jobs", json={"kind": "generate", "prompt": prompt})).json()
+            await asyncio.sleep(0.1)
+            follower = asyncio.create_task(client.post("/api/generate", json={"prompt": prompt}))
+            await asyncio.sleep(0.1)
+            await client.delete(f"/api/jobs/{job['job_id']}")
+            response = await follower
+            cancelled = await client.get(f"/api/jobs/{job['job_id']}")
+            return cancelled.json(), response, generation_flights.get_stats()["takeovers"] - takeovers
+
+    cancelled, response, takeovers = portal.call(run)
+    assert cancelled["status"] == "cancelled"
+    assert response.status_code == 200, response.text
+    assert response.json()["coalesced"] is None  # It ran the generation itself
+    assert takeovers == 1
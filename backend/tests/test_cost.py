@@ -0,0 +1,61 @@
+import ast
+import pytest
+
+from api import routes
+from core.config import settings
+from core.errors import ValidationError
+from services.scheduler import scheduler
+from services.validator import estimate_cost, validate_script
+
+
+def cost(code):
+    return estimate_cost(ast.parse(code))
+
+
+def test_literal_loops_are_unrolled():
+    result = cost(
+        "n = 6\nholes = [1, 2, 3]\n"
+        "for i in range(n):\n    for h in holes:\n        plate = plate.cut(Part.makeCylinder(1, 5))\n"
+    )
+    assert (result.booleans, result.primitives, result.max_loop_trips, result.unknown_loops) == (18, 18, 6, 0)
+    assert result.score == pytest.approx(18 * 1.0 + 18 * 0.05)
+
+
+def test_unknown_loops_and_rebound_names_use_the_default_trip_count():
+    result = cost("n = 3\nn = 4\nfor i in range(n):\n    a = a.fuse(b)\nwhile a:\n    a = a.cut(b)\n")
+    assert (result.booleans, result.unknown_loops) == (20, 2)
+
+
+def test_fillets_compounds_and_features():
+    result = cost(
+        "s = s.makeFillet(1, s.Edges)\ns = s.makeChamfer(1, [e1, e2, e3])\n"
+        "s = s.cut([a, b, c, d])\nf = face.extrude(v)\n"
+    )
+    assert (result.fillet_edges, result.booleans, result.features) == (27, 4, 1)
+
+
+def test_expensive_script_is_rejected_before_execution(monkeypatch):
+    monkeypatch.setattr(settings, "COST_REJECT_THRESHOLD", 50)
+    code = "import Part\nplate = Part.makeBox(1, 1, 1)\nfor i in range(100):\n    plate = plate.cut(Part.makeBox(1, 1, 1))\nfinal_shape = plate\n"
+    with pytest.raises(ValidationError, match="too expensive"):
+        validate_script(code)
+
+
+def test_heavy_script_runs_in_the_heavy_queue(portal):
+    heavy = (
+        "import Part\nfrom FreeCAD import Vector\nplate = Part.makeBox(200, 200, 5)\n"
+        f"for i in range({int(settings.COST_HEAVY_THRESHOLD)}):\n"
+        "    plate = plate.cut(Part.makeCylinder(1, 5, Vector(i, i, 0)))\nfinal_shape = plate\n"
+    )
+    events = []
+
+    async def emit(event, data):
+        events.append((event, data))
+
+    async def run():
+        return await routes._validate_and_execute(heavy, emit)
+
+    response = portal.call(run)
+    assert response.cost.score >= settings.COST_HEAVY_THRESHOLD
+    assert ("executing", {"queue": "executor_heavy"}) in events
+    assert scheduler.executor_stage_for(1.0) == "executor"
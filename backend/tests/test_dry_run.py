@@ -0,0 +1,130 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+import pytest
+
+from core.errors import ValidationError
+from services.dry_run import DryRunner, FAILED, INCONCLUSIVE, PASSED
+
+BOX = """import FreeCAD
+import Part
+import math
+from FreeCAD import Vector
+plate = Part.makeBox(40, 20, 5)
+for i in range(3):
+    hole = Part.makeCylinder(2, 5)
+    hole.translate(Vector(10 * i + 8, 10, 0))
+    plate = plate.cut(hole)
+final_shape = plate.fuse(Part.makeBox(4, 20, 4 + math.sqrt(4)))
+"""
+
+
+@pytest.fixture
+def runner():
+    return DryRunner()
+
+
+def test_valid_script_passes(runner):
+    result = runner.run(BOX)
+    assert result.status == PASSED, result.message
+    assert result.shape_type == "Solid"
+
+
+@pytest.mark.parametrize("code, message", [
+    ("import Part\nfinal_shape = Part.makeBox(10, 10)\n", "makeBox"),
+    ("import Part\nfinal_shape = Part.makeBox(10, 0, 10)\n", "makeBox"),
+    ("import Part\nfinal_shape = Part.makeCylindr(5, 10)\n", "makeCylinder"),
+    ("import Part\nbox = Part.makeBox(1, 1, 1)\n", "final_shape"),
+    ("import Part\nfinal_shape = Part.makeBox(1, 1, 1)\nprint(undefined_name)\n", "undefined_name"),
+])
+def test_certain_failures_fail(runner, code, message):
+    result = runner.run(code)
+    assert result.status == FAILED
+    assert message in result.message
+
+
+def test_unmodelled_module_is_inconclusive(runner):
+    result = runner.run("import Draft\nimport Part\nfinal_shape = Part.makeBox(1, 1, 1)\n")
+    assert result.status == INCONCLUSIVE
+
+
+def test_runaway_loop_is_inconclusive(runner):
+    runner.max_iterations = 1000
+    result = runner.run("import Part\nwhile True:\n    pass\nfinal_shape = Part.makeBox(1, 1, 1)\n")
+    assert result.status == INCONCLUSIVE
+
+
+def test_concurrent_runs_keep_their_own_modules(runner):
+    # Runs share the instance and execute in threads, as check() does through asyncio.to_thread.
+    # Work before the imports lets other runs finish while this one has not imported yet.
+    slow_box = "total = 0\nfor i in range(20000):\n    total += i\n" + BOX
+    with ThreadPoolExecutor(max_workers=16) as pool:
+        results = list(pool.map(runner.run, [slow_box] * 64))
+    assert [r.status for r in results] == [PASSED] * 64, {r.message for r in results}
+
+
+def test_check_raises_on_failure(runner):
+    with pytest.raises(ValidationError):
+        asyncio.run(runner.check("import Part\nfinal_shape = Part.makeBox(10, 10)\n"))
+    assert runner.get_stats()[FAILED] == 1
+
+
+# Isolation: check() runs scripts in a worker process, and the worker's namespace
+# offers no path back to os, sys or the dry-run module
+
+def check_in_worker(runner, code):
+    async def run():
+        try:
+            return await runner.check(code)
+        finally:
+            await runner.shutdown()
+    return asyncio.run(run())
+
+
+def test_check_runs_outside_the_server_process(runner):
+    result = check_in_worker(runner, BOX)
+    assert result.status == PASSED
+    assert runner.get_stats()["worker_restarts"] == 0
+
+
+@pytest.mark.parametrize("escape", [
+    "import random\nrandom._os.system('touch {marker}')",
+    "import typing\ntyping.sys.modules['os'].system('touch {marker}')",
+    "import collections\ncollections._sys.modules['os'].system('touch {marker}')",
+    "import operator\nimport random\noperator.attrgetter('_os')(random).system('touch {marker}')",
+    "import string\nimport random\nstring.Formatter().get_field('0._os', [random], {{}})[0].system('touch {marker}')",
+    "g = _dry_iter([1])\nnext(g)\ng.gi_frame.f_globals['importlib'].import_module('os').system('touch {marker}')",
+    "def gen():\n    yield 1\ng = gen()\ng.gi_frame.f_builtins",
+])
+def test_escapes_do_not_run(runner, tmp_path, escape):
+    marker = tmp_path / "escaped"
+    code = "import Part\n" + escape.format(marker=marker) + "\nfinal_shape = Part.makeBox(1, 1, 1)\n"
+    assert runner.run(code).status != PASSED
+    try:
+        check_in_worker(runner, code)
+    except ValidationError:
+        pass
+    assert not marker.exists()
+
+
+def test_allowlisted_module_members_still_work(runner):
+    code = (
+        "import math\nimport random\nimport Part\nfrom collections import namedtuple\n"
+        "random.seed(1)\nSize = namedtuple('Size', 'x y z')\n"
+        "s = Size(random.uniform(5, 10), math.sqrt(16), math.pi)\n"
+        "final_shape = Part.makeBox(s.x, s.y, s.z)\n"
+    )
+    assert runner.run(code).status == PASSED
+
+
+def test_worker_environment_is_stripped(runner, monkeypatch):
+    monkeypatch.setenv("OPENAI_API_KEY", "sk-secret")
+    process = __import__("services.dry_run", fromlist=["DryRunProcess"]).DryRunProcess()
+    process.start()
+    try:
+        import os
+        with open(f"/proc/{process.process.pid}/environ", "rb") as f:
+            environ = f.read()
+        assert b"sk-secret" not in environ
+        assert process.process.pid != os.getpid()
+    finally:
+        process.kill()
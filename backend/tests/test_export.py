@@ -0,0 +1,72 @@
+import asyncio
+import io
+import os
+import uuid
+import zipfile
+import httpx
+import pytest
+
+from services.exporter import model_exporter
+from services.geometry_cache import model_file
+
+
+@pytest.fixture
+def model_id(client):
+    response = client.post("/api/generate", json={"prompt": "export bracket " + uuid.uuid4().hex})
+    assert response.status_code == 200, response.text
+    return response.json()["model_id"]
+
+
+def test_formats_are_converted_once_without_the_llm(client, model_id, ollama):
+    before = ollama.requests
+    for fmt, check in [
+        ("step", lambda body: body.startswith(b"ISO-10303-21;")),
+        ("obj", lambda body: body.count(b"\nf ") == 12),
+        ("glb", lambda body: body[:4] == b"glTF"),
+        ("3mf", lambda body: "3D/3dmodel.model" in zipfile.ZipFile(io.BytesIO(body)).namelist()),
+        ("brep", lambda body: body.startswith(b"STUB-BREP")),
+    ]:
+        first = client.get(f"/api/models/{model_id}/export", params={"format": fmt})
+        assert first.status_code == 200, first.text
+        assert check(first.content), fmt
+        assert first.headers["X-Export-Cache"] == ("hit" if fmt == "brep" else "miss")
+        assert f"model-{model_id[:8]}.{fmt}" in first.headers["content-disposition"]
+
+        again = client.get(f"/api/models/{model_id}/export", params={"format": fmt})
+        assert again.headers["X-Export-Cache"] == "hit"
+        assert again.content == first.content
+    assert ollama.requests == before
+    # No conversion scripts or partial files are left next to the model
+    leftovers = [name for name in os.listdir(os.path.dirname(model_file(model_id, "brep")))
+                 if name.startswith(model_id) and name.endswith((".py", ".part"))]
+    assert leftovers == []
+
+
+def test_concurrent_exports_share_one_conversion(portal, model_id):
+    from main import app
+
+    async def run():
+        conversions = model_exporter.get_stats()["conversions"]
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://backend") as client:
+            responses = await asyncio.gather(*(
+                client.get(f"/api/models/{model_id}/export", params={"format": "step"}) for _ in range(3)
+            ))
+        return responses, model_exporter.get_stats()["conversions"] - conversions
+
+    responses, conversions = portal.call(run)
+    assert [r.status_code for r in responses] == [200] * 3
+    assert conversions == 1
+
+
+def test_failed_conversion_leaves_nothing_behind(client, model_id):
+    with open(model_file(model_id, "brep"), "w") as f:
+        f.write("not a brep")
+    response = client.get(f"/api/models/{model_id}/export", params={"format": "obj"})
+    assert response.status_code == 500
+    directory = os.path.dirname(model_file(model_id, "brep"))
+    assert not [name for name in os.listdir(directory) if name.startswith(f"{model_id}.obj")]
+
+
+def test_unknown_models_and_formats_are_rejected(client, model_id):
+    assert client.get("/api/models/not-a-model/export").status_code == 404
+    assert client.get(f"/api/models/{model_id}/export", params={"format": "dwg"}).status_code == 422
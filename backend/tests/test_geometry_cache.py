@@ -0,0 +1,64 @@
+import os
+
+from api import routes
+from core.config import settings
+from services.geometry_cache import GeometryCache, canonical_key, geometry_cache
+
+
+def box(x):
+    return f"import Part\nfinal_shape = Part.makeBox({x}, 10, 10)\n"
+
+
+def run(portal, code):
+    return portal.call(routes._validate_and_execute, code)
+
+
+def test_canonical_key_ignores_formatting():
+    original = "import Part\nfinal_shape = Part.makeBox(1, 2, 3)\n"
+    reformatted = "import Part  # the API\n\n\nfinal_shape = Part.makeBox(1,2,  3)\r\n"
+    assert canonical_key(original) == canonical_key(reformatted)
+    assert canonical_key(original) != canonical_key(original.replace("3", "4"))
+    assert canonical_key("final_shape = (") is None
+
+
+def test_identical_script_is_served_from_cache(portal):
+    first = run(portal, box(11))
+    hits = geometry_cache.hits
+    second = run(portal, "# same geometry\n" + box(11))
+    assert geometry_cache.hits == hits + 1
+    assert second.stl_url == first.stl_url
+    assert first.stl_url.startswith("/outputs/cache/")
+    assert os.path.exists(os.path.join(settings.OUTPUT_DIR, first.stl_url[len("/outputs/"):]))
+
+
+def test_lru_entry_is_evicted_beyond_max_bytes(portal, monkeypatch):
+    first = run(portal, box(12))
+    key = canonical_key(box(12))
+    entry_bytes = geometry_cache._entries[key]["bytes"]
+    # Room for one entry only: storing the next one evicts every older entry
+    monkeypatch.setattr(geometry_cache, "max_bytes", entry_bytes + entry_bytes // 2)
+    evictions = geometry_cache.evictions
+    run(portal, box(13))
+    assert geometry_cache.evictions > evictions
+    assert geometry_cache.lookup(key) is None
+    assert not os.path.exists(os.path.join(settings.OUTPUT_DIR, first.stl_url[len("/outputs/"):]))
+    assert geometry_cache.lookup(canonical_key(box(13))) is not None
+
+
+def test_index_survives_restart(portal):
+    run(portal, box(14))
+    reloaded = GeometryCache()
+    assert reloaded.lookup(canonical_key(box(14))) == geometry_cache.lookup(canonical_key(box(14)))
+
+
+def test_hit_defers_index_write_to_shutdown(portal):
+    run(portal, box(15))
+    run(portal, box(16))
+    index = os.path.join(geometry_cache.cache_dir, "index.json")
+    mtime = os.stat(index).st_mtime_ns
+    assert geometry_cache.lookup(canonical_key(box(15))) is not None
+    assert os.stat(index).st_mtime_ns == mtime
+
+    portal.call(geometry_cache.shutdown)
+    assert not geometry_cache._dirty
+    assert list(GeometryCache()._entries)[-1] == canonical_key(box(15))
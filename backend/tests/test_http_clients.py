@@ -0,0 +1,40 @@
+import asyncio
+
+from core.config import settings
+from services.http_clients import build_async_client, pool_stats
+from services.llm import OllamaService
+
+
+def test_client_uses_configured_limits_and_timeouts():
+    async def build():
+        client = build_async_client(read_timeout=42)
+        try:
+            return client.timeout, pool_stats(client)
+        finally:
+            await client.aclose()
+
+    timeout, stats = asyncio.run(build())
+    assert timeout.read == 42
+    assert timeout.connect == settings.HTTP_CONNECT_TIMEOUT
+    assert stats == {"open": True, "connections": 0, "idle": 0, "active": 0}
+
+
+def test_ollama_calls_reuse_one_keep_alive_connection():
+    service = OllamaService()
+
+    async def run():
+        await service.start()
+        client = service._get_client()
+        try:
+            for i in range(3):
+                code = await service.generate_code(f"keep-alive test {i}", "system")
+                assert "final_shape" in code
+            assert service._get_client() is client
+            return service.get_pool_stats()
+        finally:
+            await service.close()
+
+    stats = asyncio.run(run())
+    assert stats["requests"] == 3
+    assert stats["connections"] == 1 and stats["idle"] == 1
+    assert service.get_pool_stats() == {"open": False, "requests": 3}
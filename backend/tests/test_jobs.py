@@ -0,0 +1,128 @@
+import asyncio
+import time
+import pytest
+
+from core.errors import ExecutionError, QueueFullError
+from services.jobs import CANCELLED, FAILED, QUEUED, RUNNING, SUCCEEDED, JobManager
+
+
+def manager(workers=1, max_queued=10):
+    jobs = JobManager()
+    jobs.worker_count, jobs.max_queued = workers, max_queued
+    return jobs
+
+
+def with_manager(jobs, body):
+    async def run():
+        await jobs.start()
+        try:
+            return await body(jobs)
+        finally:
+            await jobs.shutdown()
+    return asyncio.run(run())
+
+
+def blocking(release: asyncio.Event, ran: list, name: str):
+    async def run(emit):
+        ran.append(name)
+        await emit("started", {})
+        await release.wait()
+        return {"name": name}
+    return run
+
+
+async def settle():
+    for _ in range(5):
+        await asyncio.sleep(0)
+
+
+def test_cancel_queued_and_running_jobs():
+    ran = []
+
+    async def body(jobs):
+        release = asyncio.Event()
+        first = await jobs.submit("generate", blocking(release, ran, "first"))
+        second = await jobs.submit("generate", blocking(release, ran, "second"))
+        third = await jobs.submit("generate", blocking(release, ran, "third"))
+        await settle()
+        assert (first.status, first.stage, second.status) == (RUNNING, "started", QUEUED)
+
+        jobs.cancel(second.id)  # Queued: skipped by the worker
+        jobs.cancel(first.id)  # Running: its task is cancelled, the worker moves on
+        await settle()
+        release.set()
+        await settle()
+        return first, second, third, jobs.get_stats()
+
+    first, second, third, stats = with_manager(manager(), body)
+    assert (first.status, second.status, third.status) == (CANCELLED, CANCELLED, SUCCEEDED)
+    assert ran == ["first", "third"]
+    assert third.result == {"name": "third"}
+    assert stats["cancelled"] == 2 and stats["succeeded"] == 1
+
+
+def test_shutdown_stops_workers_with_a_job_running():
+    jobs = manager(workers=2)
+
+    async def run():
+        await jobs.start()
+        job = await jobs.submit("generate", blocking(asyncio.Event(), [], "running"))
+        await settle()
+        workers = list(jobs._workers)
+        await asyncio.wait_for(jobs.shutdown(), timeout=5)
+        return job, workers
+
+    job, workers = asyncio.run(run())
+    assert job.status == CANCELLED
+    assert all(worker.cancelled() for worker in workers)
+
+
+def test_full_queue_rejects_with_retry_after():
+    async def body(jobs):
+        release = asyncio.Event()
+        await jobs.submit("generate", blocking(release, [], "running"))
+        await settle()
+        await jobs.submit("generate", blocking(release, [], "queued"))
+        with pytest.raises(QueueFullError) as error:
+            await jobs.submit("generate", blocking(release, [], "rejected"))
+        release.set()
+        return error.value
+
+    error = with_manager(manager(max_queued=1), body)
+    assert error.status_code == 429 and error.retry_after >= 1
+
+
+def test_failed_job_keeps_error_body():
+    async def failing(emit):
+        raise ExecutionError("FreeCAD script execution failed.", details="boom")
+
+    async def body(jobs):
+        job = await jobs.submit("generate", failing)
+        await settle()
+        return job
+
+    job = with_manager(manager(), body)
+    assert job.status == FAILED
+    assert job.error == {"type": "execution_error", "message": "FreeCAD script execution failed.", "details": "boom"}
+
+
+def test_job_api_runs_generate_pipeline(client):
+    response = client.post("/api/jobs", json={"kind": "generate", "prompt": "job api test flange"})
+    assert response.status_code == 202
+    job_id = response.json()["job_id"]
+
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        job = client.get(f"/api/jobs/{job_id}").json()
+        if job["status"] not in (QUEUED, RUNNING):
+            break
+        time.sleep(0.05)
+    assert job["status"] == SUCCEEDED, job["error"]
+    assert job["result"]["stl_url"].startswith("/outputs/")
+    assert job["queue_wait"] is not None
+
+
+def test_job_api_validates_and_reports_unknown_jobs(client):
+    assert client.post("/api/jobs", json={"kind": "refine", "instruction": "taller"}).status_code == 400
+    assert client.get("/api/jobs/not-a-job").status_code == 404
+    assert client.delete("/api/jobs/not-a-job").status_code == 404
@@ -0,0 +1,58 @@
+import asyncio
+import hashlib
+import numpy as np
+
+from services.llm_cache import LLMResponseCache, llm_cache
+from services.rag import RAGService
+
+SYSTEM = "system prompt"
+MODEL = "stub-model"
+CODE = "import Part\nfinal_shape = Part.makeBox(20, 20, 20)\n"
+
+
+def word_embedding(texts):
+    vectors = []
+    for text in texts:
+        vector = np.zeros(64, dtype=np.float32)
+        for word in text.lower().split():
+            vector[hashlib.sha256(word.encode()).digest()[0] % 64] += 1.0
+        vectors.append(vector)
+    return vectors
+
+
+def rag_backed_cache():
+    rag = RAGService()
+    cache = LLMResponseCache(embedding_fn=rag.query_embeddings, embedding_ready=lambda: rag.embeddings_ready)
+    cache.threshold = 0.8
+    return rag, cache
+
+
+def test_exact_hit_and_miss():
+    cache = LLMResponseCache()
+    asyncio.run(cache.put("a 20mm box", "", SYSTEM, MODEL, CODE))
+    assert asyncio.run(cache.get("a 20mm box", "", SYSTEM, MODEL)) == (CODE, "exact")
+    assert asyncio.run(cache.get("a 20mm box", "", SYSTEM, "other-model")) == (None, None)
+
+
+def test_semantic_tier_off_without_rag():
+    # conftest runs the app with ENABLE_RAG=false
+    assert llm_cache.get_stats()["semantic_enabled"] is False
+
+
+def test_requests_never_load_the_embedding_model():
+    rag, cache = rag_backed_cache()
+    asyncio.run(cache.put("please make a 20mm cube box", "", SYSTEM, MODEL, CODE))
+    assert asyncio.run(cache.get("make a 20mm cube box", "", SYSTEM, MODEL)) == (None, None)
+    assert not cache.semantic_enabled
+    assert rag._embedding_fn is None  # DefaultEmbeddingFunction was never built
+
+
+def test_semantic_hit_once_embeddings_are_warm():
+    rag, cache = rag_backed_cache()
+    rag.embedding_fn = word_embedding
+    rag.warm_embeddings()
+    assert cache.semantic_enabled
+    asyncio.run(cache.put("please make a 20mm cube box", "", SYSTEM, MODEL, CODE))
+    assert asyncio.run(cache.get("make a 20mm cube box", "", SYSTEM, MODEL)) == (CODE, "semantic")
+    # Same wording, different dimension: never a hit
+    assert asyncio.run(cache.get("make a 30mm cube box", "", SYSTEM, MODEL)) == (None, None)
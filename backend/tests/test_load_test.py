@@ -0,0 +1,91 @@
+import json
+import os
+import subprocess
+import sys
+import time
+import httpx
+import pytest
+
+import load_test
+from conftest import TOOLS_DIR
+
+
+def test_percentile_uses_nearest_rank():
+    values = list(range(1, 101))
+    assert load_test.percentile(values, 50) == 50
+    assert load_test.percentile(values, 99) == 99
+    assert load_test.percentile([7.0], 99) == 7.0
+    assert load_test.percentile([], 50) is None
+
+
+def test_parse_server_timing():
+    header = 'llm;dur=120.5;desc="LLM", freecad;dur=30, total;dur=bad, app'
+    assert load_test.parse_server_timing(header) == {"llm": 120.5, "freecad": 30.0}
+
+
+def test_plan_is_fixed_by_the_seed_and_namespaced_per_level():
+    plan = load_test.build_plan(4, 30, 5, 0.3, seed=1)
+    assert plan == load_test.build_plan(4, 30, 5, 0.3, seed=1)
+    assert plan[0]["kind"] == "generate"
+    assert len({item["prompt"] for item in plan}) <= 5
+    assert {item["kind"] for item in plan} == {"generate", "refine"}
+    other_level = {item["prompt"] for item in load_test.build_plan(8, 30, 5, 0.3, seed=1)}
+    assert not other_level & {item["prompt"] for item in plan}
+
+
+def test_summary_reports_errors_and_percentiles():
+    rows = [
+        {"kind": "generate", "ok": True, "latency_ms": 100.0, "stages": {"llm": 60.0}, "error": None},
+        {"kind": "refine", "ok": True, "latency_ms": 300.0, "stages": {"llm": 80.0}, "error": None},
+        {"kind": "generate", "ok": False, "latency_ms": 5.0, "stages": {}, "error": "HTTP_503"},
+    ]
+    summary = load_test.summarize(2, rows, duration=2.0)
+    assert summary["error_rate"] == pytest.approx(1 / 3, abs=1e-4)
+    assert summary["errors"] == {"HTTP_503": 1}
+    assert summary["throughput_rps"] == 1.0
+    assert summary["latency_ms"]["p50"] == 100.0
+    assert summary["by_kind"]["refine"]["p99"] == 300.0
+    assert summary["stages_ms"] == {"llm": 70.0}
+
+
+def test_run_level_drives_generate_and_refine(portal):
+    from main import app
+
+    plan = load_test.build_plan(2, 6, 2, 0.5, seed=7)
+
+    async def run():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, timeout=60) as client:
+            return await load_test.run_level(client, "http://backend", 2, plan)
+
+    summary = portal.call(run)
+    assert summary["ok"] == summary["requests"] == 6, summary["errors"]
+    assert summary["by_kind"]["refine"]["requests"] == sum(1 for item in plan if item["kind"] == "refine")
+    assert "freecad" in summary["stages_ms"]
+
+
+def test_stub_freecadcmd_writes_an_stl_after_the_delay(tmp_path):
+    stl = tmp_path / "out.stl"
+    script = tmp_path / "script.py"
+    script.write_text(f"import Part\nPart.makeBox(10, 20, 30).exportStl({str(stl)!r})\n")
+    env = {**os.environ, "STUB_FREECAD_DELAY": "0.3", "STUB_FREECAD_JITTER": "0"}
+    started = time.monotonic()
+    subprocess.run([sys.executable, os.path.join(TOOLS_DIR, "stub_freecadcmd.py"), str(script)], env=env, check=True)
+    assert time.monotonic() - started >= 0.3
+    text = stl.read_text()
+    assert text.startswith("solid") and text.count("facet normal") == 12
+
+
+def test_harness_reports_json_comparable_across_runs(tmp_path, capsys):
+    report_path = tmp_path / "report.json"
+    args = ["--levels", "1,2", "--requests", "3", "--unique-prompts", "2", "--warmup", "0",
+            "--latency", "fixed:0", "--freecad-delay", "0", "--freecad-jitter", "0", "--max-error-rate", "0"]
+    assert load_test.main(args + ["--json", str(report_path)]) == 0
+    report = json.loads(report_path.read_text())
+    assert [level["concurrency"] for level in report["levels"]] == [1, 2]
+    assert all(level["error_rate"] == 0 for level in report["levels"])
+    assert report["meta"]["args"]["seed"] == 1
+    assert "scheduler" in report["server"]
+
+    load_test.compare(report, report)
+    assert "+0.0%" in capsys.readouterr().out
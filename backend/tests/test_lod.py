@@ -0,0 +1,42 @@
+import math
+import os
+import pytest
+
+from core.config import settings
+from services.executor import executor
+
+# The stub tessellates every box into 12 triangles, whatever the tolerance
+BOX_DIAGONAL = math.sqrt(30 ** 2 + 20 ** 2 + 10 ** 2)
+
+
+def lods(portal, x=30):
+    stl_relpath, _ = portal.call(executor.execute_script, f"import Part\nfinal_shape = Part.makeBox({x}, 20, 10)\n")
+    return stl_relpath, executor.describe_lods(stl_relpath)
+
+
+def test_one_mesh_per_level_coarse_to_fine(client, portal):
+    stl_relpath, levels = lods(portal)
+    relative = [float(v) for v in settings.STL_LOD_LEVELS.split(",")]
+    assert [lod["level"] for lod in levels] == list(range(len(relative)))
+    for lod, fraction in zip(levels, relative):
+        assert lod["tolerance"] == pytest.approx(max(fraction * BOX_DIAGONAL, settings.STL_MESH_TOLERANCE))
+        assert lod["triangles"] == 12
+        assert client.get(lod["url"]).status_code == 200
+    # The finest level is the model's own STL
+    assert levels[-1]["url"] == f"/outputs/{stl_relpath}"
+    assert all(os.path.exists(os.path.join(settings.OUTPUT_DIR, lod["url"][len("/outputs/"):])) for lod in levels)
+
+
+def test_level_over_budget_is_coarsened(portal, monkeypatch):
+    monkeypatch.setattr(settings, "STL_LOD_LEVELS", "0.01")
+    monkeypatch.setattr(settings, "STL_LOD_TRIANGLE_BUDGETS", "5")
+    _, levels = lods(portal, x=31)
+    diagonal = math.sqrt(31 ** 2 + 20 ** 2 + 10 ** 2)
+    # Doubled at most 8 times, then kept even though still over budget
+    assert [lod["tolerance"] for lod in levels] == [pytest.approx(0.01 * diagonal * 2 ** 8)]
+
+
+def test_tolerance_never_below_minimum(portal, monkeypatch):
+    monkeypatch.setattr(settings, "STL_LOD_LEVELS", "0.0000001")
+    _, levels = lods(portal, x=32)
+    assert [lod["tolerance"] for lod in levels] == [settings.STL_MESH_TOLERANCE]
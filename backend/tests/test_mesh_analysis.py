@@ -0,0 +1,94 @@
+import os
+import struct
+import uuid
+import pytest
+
+from services.geometry_cache import model_file
+from services.mesh_analysis import analyze_stl, is_binary_stl, report_path
+
+CORNERS = [(0, 0, 0), (1, 0, 0), (1, 1, 0), (0, 1, 0), (0, 0, 1), (1, 0, 1), (1, 1, 1), (0, 1, 1)]
+# Outward-facing quads of the unit cube, split into two triangles each
+QUADS = [(0, 3, 2, 1), (4, 5, 6, 7), (0, 1, 5, 4), (1, 2, 6, 5), (2, 3, 7, 6), (3, 0, 4, 7)]
+CUBE = [tri for a, b, c, d in QUADS for tri in ((a, b, c), (a, c, d))]
+
+
+def write_stl(path, triangles, binary=True):
+    points = [[CORNERS[i] for i in tri] for tri in triangles]
+    if binary:
+        with open(path, "wb") as f:
+            f.write(b"test".ljust(80, b" ") + struct.pack("<I", len(points)))
+            for tri in points:
+                f.write(struct.pack("<12fH", 0, 0, 0, *(v for p in tri for v in p), 0))
+    else:
+        lines = ["solid test"]
+        for tri in points:
+            lines += [" facet normal 0 0 0", "  outer loop"] + [f"   vertex {x} {y} {z}" for x, y, z in tri]
+            lines += ["  endloop", " endfacet"]
+        with open(path, "w") as f:
+            f.write("\n".join(lines + ["endsolid test"]) + "\n")
+    return str(path)
+
+
+@pytest.mark.parametrize("binary", [True, False])
+def test_closed_cube(tmp_path, binary):
+    path = write_stl(tmp_path / "cube.stl", CUBE, binary)
+    assert is_binary_stl(path) == binary
+    report = analyze_stl(path)
+    assert report["format"] == ("binary" if binary else "ascii")
+    assert report["triangles"] == 12
+    assert report["surface_area"] == pytest.approx(6.0)
+    assert report["volume"] == pytest.approx(1.0)
+    assert (report["bbox_min"], report["bbox_max"]) == ([0, 0, 0], [1, 1, 1])
+    assert report["watertight"] and report["consistently_oriented"]
+    assert report["degenerate_triangles"] == 0
+
+
+@pytest.mark.parametrize("triangles, field, expected", [
+    (CUBE[1:], "boundary_edges", 3),
+    (CUBE + [CUBE[0]], "non_manifold_edges", 3),
+    ([CUBE[0][::-1]] + CUBE[1:], "misoriented_edges", 3),
+    (CUBE + [(0, 1, 1)], "degenerate_triangles", 1),
+])
+def test_defects_are_counted(tmp_path, triangles, field, expected):
+    report = analyze_stl(write_stl(tmp_path / "broken.stl", triangles))
+    assert report[field] == expected
+    if field in ("boundary_edges", "non_manifold_edges"):
+        assert not report["watertight"]
+    if field == "misoriented_edges":
+        assert not report["consistently_oriented"]
+
+
+def test_edge_check_in_several_passes_matches_one_pass(tmp_path):
+    path = write_stl(tmp_path / "open.stl", CUBE[2:])
+    single = analyze_stl(path)
+    multi = analyze_stl(path, max_edges_per_pass=5)
+    assert multi["edge_passes"] > 1 and single["edge_passes"] == 1
+    for field in ("boundary_edges", "non_manifold_edges", "misoriented_edges"):
+        assert multi[field] == single[field]
+
+
+def test_empty_mesh_is_not_watertight(tmp_path):
+    report = analyze_stl(write_stl(tmp_path / "empty.stl", []))
+    assert report["triangles"] == 0
+    assert report["bbox_min"] is None
+    assert not report["watertight"]
+
+
+def test_generated_model_reports_mesh_stats(client):
+    response = client.post("/api/generate", json={"prompt": "analyzed block " + uuid.uuid4().hex})
+    assert response.status_code == 200, response.text
+    body = response.json()
+    mesh = body["mesh"]
+    assert mesh["triangles"] == 12  # The stub FreeCADCmd meshes every shape as its bounding box
+    assert mesh["watertight"] and mesh["consistently_oriented"]
+    assert mesh["volume"] > 0
+
+    stats = client.get(f"/api/models/{body['model_id']}/stats")
+    assert stats.status_code == 200
+    assert stats.json() == mesh
+
+    # Models without a stored report are analyzed on request
+    os.remove(report_path(model_file(body["model_id"], "stl")))
+    recomputed = client.get(f"/api/models/{body['model_id']}/stats").json()
+    assert recomputed["volume"] == mesh["volume"]
+    assert client.get("/api/models/not-a-model/stats").status_code == 404
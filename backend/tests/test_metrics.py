@@ -0,0 +1,29 @@
+from core.metrics import RequestTrace, bind_trace, metrics, unbind_trace
+
+
+def test_timed_records_stage_in_trace_and_histogram():
+    trace = RequestTrace("test-trace")
+    token = bind_trace(trace)
+    try:
+        with metrics.timed("unit_test_stage"):
+            pass
+    finally:
+        unbind_trace(token)
+    assert "unit_test_stage" in trace.server_timing()
+    assert 'cad_copilot_stage_seconds_count{stage="unit_test_stage"} 1' in metrics.render()
+
+
+def test_generate_response_carries_trace_id_and_server_timing(client):
+    response = client.post("/api/generate", json={"prompt": "metrics test plate"}, headers={"X-Request-ID": "test-request-1"})
+    assert response.status_code == 200
+    assert response.headers["X-Request-ID"] == "test-request-1"
+    timing = response.headers["Server-Timing"]
+    for stage in ("llm", "validate", "freecad"):
+        assert stage in timing
+
+
+def test_metrics_endpoint_renders_prometheus_text(client):
+    client.get("/api/status")
+    body = client.get("/api/metrics").text
+    assert "# TYPE cad_copilot_stage_seconds histogram" in body
+    assert 'cad_copilot_http_requests_total{method="GET",route="/api/status",status="200"}' in body
@@ -0,0 +1,114 @@
+import ast
+import subprocess
+import sys
+import pytest
+
+from core.config import settings
+from services.optimizer import BATCH_HELPER, batch_booleans
+
+PLATE = """import Part
+from FreeCAD import Vector
+plate = Part.makeBox(60, 20, 5)
+for i in range(4):
+    hole = Part.makeCylinder(2, 5)
+    hole.translate(Vector(10 * i + 8, 10, 0))
+    plate = plate.cut(hole)
+for i in range(3):
+    plate = plate.fuse(Part.makeBox(4, 4, 10, Vector(15 * i, 0, 0)))
+final_shape = plate
+"""
+
+
+class Box:
+    def __init__(self, XMin, YMin, ZMin, XMax, YMax, ZMax):
+        self.XMin, self.YMin, self.ZMin, self.XMax, self.YMax, self.ZMax = XMin, YMin, ZMin, XMax, YMax, ZMax
+
+
+class FakeShape:
+    """Booleans with a list return `batched`; one tool at a time, each cut removes 1 and each fuse adds 1."""
+
+    sequential_calls = 0
+
+    def __init__(self, volume, bounds, batched=None):
+        self.Volume, self.BoundBox, self.batched = volume, Box(*bounds), batched
+
+    def _apply(self, tools, change):
+        if isinstance(tools, list):
+            return self.batched
+        FakeShape.sequential_calls += 1
+        return FakeShape(self.Volume + change, (0, 0, 0, 10, 10, 10))
+
+    def cut(self, tools):
+        return self._apply(tools, -1)
+
+    def fuse(self, tools):
+        return self._apply(tools, 1)
+
+    def isNull(self):
+        return False
+
+    def isValid(self):
+        return True
+
+
+def helper(verify):
+    namespace = {}
+    exec(BATCH_HELPER.format(verify=verify, tolerance=1e-6), namespace)
+    return namespace["_cad_batched_boolean"]
+
+
+def tools(count=2, bounds=(2, 2, 0, 4, 4, 10)):
+    return [FakeShape(1, bounds) for _ in range(count)]
+
+
+def test_loops_are_rewritten_with_verification_by_default():
+    code, loops = batch_booleans(PLATE)
+    assert loops == 2
+    assert "verify=True" in code
+    ast.parse(code)
+
+
+def test_unbatchable_code_is_unchanged():
+    code = "import Part\nfinal_shape = Part.makeBox(1, 1, 1)\n"
+    assert batch_booleans(code) == (code, 0)
+
+
+def test_helper_does_not_use_getattr():
+    assert "getattr" not in BATCH_HELPER
+
+
+@pytest.mark.parametrize("op, verify, batched, keeps_batched", [
+    ("cut", True, (998, (0, 0, 0, 10, 10, 10)), True),
+    ("cut", True, (998, (0, 0, 0, 10, 10, 12)), False),  # Grew outside the shape
+    ("cut", True, (990, (0, 0, 0, 10, 10, 10)), False),  # Removed more than the tools' volume
+    ("cut", False, (990, (0, 0, 0, 10, 10, 12)), True),  # Only the volume sanity check without verify
+    ("cut", False, (1001, (0, 0, 0, 10, 10, 10)), False),
+    ("fuse", True, (1002, (0, 0, 0, 10, 10, 10)), True),
+    ("fuse", True, (1002, (0, 0, 0, 10, 10, 11)), False),  # Larger than the operands' combined box
+    ("fuse", True, (1005, (0, 0, 0, 10, 10, 10)), False),  # Added more than the tools' volume
+])
+def test_batched_result_is_checked_without_rerunning_booleans(op, verify, batched, keeps_batched):
+    batched = FakeShape(*batched)
+    shape = FakeShape(1000, (0, 0, 0, 10, 10, 10), batched=batched)
+    calls = FakeShape.sequential_calls
+    result = helper(verify)(shape, op, tools())
+    assert (result is batched) == keeps_batched
+    # A plausible batched result costs no sequential booleans; an implausible one falls back to them
+    assert FakeShape.sequential_calls - calls == (0 if keeps_batched else 2)
+
+
+def test_unmeasurable_tools_fall_back_when_verifying():
+    shape = FakeShape(1000, (0, 0, 0, 10, 10, 10), batched=FakeShape(998, (0, 0, 0, 10, 10, 10)))
+    assert helper(True)(shape, "cut", [object(), object()]) is not shape.batched
+    assert helper(False)(shape, "cut", [object(), object()]) is shape.batched
+
+
+def test_batched_script_matches_original_in_stub_freecad(tmp_path):
+    def volume(code):
+        script = tmp_path / "script.py"
+        script.write_text(code + "print('VOLUME', final_shape.Volume, final_shape.BoundBox.XMax)\n")
+        output = subprocess.run([sys.executable, settings.FREECAD_PATH, str(script)], capture_output=True, text=True, check=True).stdout
+        return [line for line in output.splitlines() if line.startswith("VOLUME")]
+
+    batched, _ = batch_booleans(PLATE)
+    assert volume(batched) == volume(PLATE)
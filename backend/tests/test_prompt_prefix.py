@@ -0,0 +1,50 @@
+import uuid
+
+from api.routes import SYSTEM_PROMPT
+from core.config import settings
+from services.llm import OllamaService, llm_service
+from stub_ollama import CHARS_PER_TOKEN
+
+
+def test_system_message_is_byte_identical_across_requests():
+    service = OllamaService()
+    generate = service._build_payload("a box", SYSTEM_PROMPT, stream=False)
+    refine = service._build_payload("PREVIOUS CODE ... Instruction: add a hole", SYSTEM_PROMPT, stream=True,
+                                    options={"seed": 1})
+    assert generate["messages"][0] == refine["messages"][0] == {"role": "system", "content": SYSTEM_PROMPT}
+    assert generate["keep_alive"] == refine["keep_alive"] == settings.OLLAMA_KEEP_ALIVE
+    # A varying context size would reload the model
+    assert generate["options"]["num_ctx"] == refine["options"]["num_ctx"] == settings.OLLAMA_NUM_CTX
+    assert refine["options"]["seed"] == 1
+
+
+def test_preload_prefills_the_system_prompt(portal):
+    service = OllamaService()
+
+    async def run():
+        await service.start()
+        try:
+            await service.preload(SYSTEM_PROMPT)
+            timing = {}
+            await service.generate_code("a cube " + uuid.uuid4().hex, SYSTEM_PROMPT, timing=timing)
+            return timing
+        finally:
+            await service.close()
+
+    timing = portal.call(run)
+    # Only the user message is evaluated; the system prompt comes from the cached prefix
+    assert timing["prompt_tokens"] < len(SYSTEM_PROMPT) // CHARS_PER_TOKEN // 4
+    assert timing["prefill_ms"] is not None and timing["ttft_ms"] is not None
+
+
+def test_refine_reuses_the_generate_prefix_and_reports_timing(client):
+    generated = client.post("/api/generate", json={"prompt": "prefix bracket " + uuid.uuid4().hex}).json()
+    original_code = "import FreeCAD\nimport Part\nfinal_shape = Part.makeBox(10, 20, 30)\n"
+    response = client.post("/api/refine", json={"original_code": original_code, "instruction": "add a foot"})
+    assert response.status_code == 200, response.text
+    for body in (generated, response.json()):
+        llm = body["llm"]
+        assert llm["provider"] == "ollama"
+        assert llm["prompt_tokens"] < len(SYSTEM_PROMPT) // CHARS_PER_TOKEN // 4
+        assert llm["ttft_ms"] is not None
+    assert llm_service.get_timing_stats()["keep_alive"] == settings.OLLAMA_KEEP_ALIVE
@@ -0,0 +1,93 @@
+import asyncio
+import hashlib
+import numpy as np
+import pytest
+from chromadb.api.types import EmbeddingFunction
+
+from core.config import settings
+from services.rag import RAGService
+
+DOCS = {
+    "box": "## Pattern: Box\nfinal_shape = Part.makeBox(10, 10, 10)",
+    "cylinder": "## Pattern: Cylinder\nfinal_shape = Part.makeCylinder(5, 20)",
+    "fillet": "## Pattern: Fillet\nfinal_shape = shape.makeFillet(1, shape.Edges)",
+}
+
+
+class WordEmbedding(EmbeddingFunction):
+    """Bag-of-words vectors: deterministic, offline, and close for texts sharing words."""
+
+    def __init__(self):
+        self.calls = 0
+
+    def __call__(self, input):
+        self.calls += 1
+        vectors = []
+        for text in input:
+            vector = np.zeros(64, dtype=np.float32)
+            for word in text.lower().replace("(", " ").replace(".", " ").split():
+                vector[hashlib.sha256(word.encode()).digest()[0] % 64] += 1.0
+            vectors.append(vector / (np.linalg.norm(vector) or 1.0))
+        return vectors
+
+    @staticmethod
+    def name():
+        return "test-words"
+
+    def get_config(self):
+        return {}
+
+    @staticmethod
+    def build_from_config(config):
+        return WordEmbedding()
+
+
+@pytest.fixture
+def seeded_rag(tmp_path, monkeypatch):
+    import chromadb
+
+    monkeypatch.setattr(settings, "CHROMA_DB_DIR", str(tmp_path))
+    embed = WordEmbedding()
+    collection = chromadb.PersistentClient(path=str(tmp_path)).get_or_create_collection(
+        name="freecad_docs", embedding_function=embed
+    )
+    collection.add(ids=list(DOCS), documents=list(DOCS.values()))
+
+    service = RAGService()
+    service.enabled = True
+    service.embedding_fn = embed
+    service.initialize()
+    service.warm_embeddings()
+    assert service.initialized
+    return service, embed
+
+
+def test_retrieve_context_returns_seeded_documents(seeded_rag):
+    service, _ = seeded_rag
+    context = asyncio.run(service.retrieve_context("make a cylinder", n_results=1))
+    assert "RELEVANT FREECAD DOCUMENTATION" in context
+    assert "makeCylinder" in context
+    assert "makeBox" not in context
+
+
+def test_repeated_query_reuses_cached_embedding(seeded_rag):
+    service, embed = seeded_rag
+    first = asyncio.run(service.retrieve_context("a box please", n_results=2))
+    calls = embed.calls
+    assert asyncio.run(service.retrieve_context("a box please", n_results=2)) == first
+    assert embed.calls == calls
+    assert service.query_embeddings.get_stats()["hits"] >= 1
+
+
+def test_retrieval_waits_for_warm_embeddings(seeded_rag):
+    service, embed = seeded_rag
+    service.embeddings_ready = False
+    calls = embed.calls
+    assert asyncio.run(service.retrieve_context("make a cylinder")) == ""
+    assert embed.calls == calls
+
+
+def test_disabled_service_returns_empty_context():
+    service = RAGService()
+    service.enabled = False
+    assert asyncio.run(service.retrieve_context("box")) == ""
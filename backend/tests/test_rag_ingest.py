@@ -0,0 +1,87 @@
+import chromadb
+import pytest
+
+from services.rag_ingest import RAGIngestor, chunk_markdown
+from test_rag import WordEmbedding
+
+BRACKETS = """# Brackets
+Intro text that is not a chunk.
+
+## Pattern: L-Bracket
+Two boxes fused.
+```python
+final_shape = base.fuse(wall)
+```
+
+## Pattern: Holes
+Cut holes one way or another.
+```python
+plate = plate.cut(hole)
+```
+```python
+plate = plate.cut(Part.makeCompound(holes))
+```
+"""
+
+SHAFTS = "## Pattern: Shaft\n```python\nfinal_shape = Part.makeCylinder(5, 50)\n```\n"
+
+
+def test_chunks_split_sections_and_code_blocks():
+    chunks = chunk_markdown(BRACKETS, "brackets.md")
+    assert [c["id"] for c in chunks] == ["brackets.md::pattern-l-bracket", "brackets.md::pattern-holes::0", "brackets.md::pattern-holes::1"]
+    # Each code block keeps the section's heading and prose
+    assert chunks[2]["text"].startswith("## Pattern: Holes\nCut holes one way or another.")
+    assert "makeCompound" in chunks[2]["text"] and "makeCompound" not in chunks[1]["text"]
+    assert chunks[0]["metadata"] == {"source": "brackets.md", "section": "Pattern: L-Bracket"}
+
+
+def test_repeated_headings_get_unique_ids():
+    ids = [c["id"] for c in chunk_markdown("## A\nx\n## A\ny\n## a!\nz\n", "d.md")]
+    assert ids == ["d.md::a", "d.md::a#2", "d.md::a#3"]
+
+
+@pytest.fixture
+def docs(tmp_path):
+    docs_dir = tmp_path / "docs"
+    docs_dir.mkdir()
+    (docs_dir / "brackets.md").write_text(BRACKETS)
+    (docs_dir / "shafts.md").write_text(SHAFTS)
+    embed = WordEmbedding()
+    collection = chromadb.PersistentClient(path=str(tmp_path / "db")).get_or_create_collection(
+        name="ingest_test", embedding_function=embed
+    )
+    return docs_dir, RAGIngestor(str(docs_dir), str(tmp_path / "db")), collection, embed
+
+
+def test_only_changed_chunks_are_embedded(docs):
+    docs_dir, ingestor, collection, embed = docs
+    assert ingestor.run(collection)["embedded"] == 4
+    assert collection.count() == 4
+
+    calls = embed.calls
+    result = ingestor.run(collection)
+    assert (result["embedded"], result["unchanged"], result["deleted"]) == (0, 4, 0)
+    assert embed.calls == calls
+
+    (docs_dir / "shafts.md").write_text(SHAFTS.replace("50", "80"))
+    (docs_dir / "brackets.md").write_text(BRACKETS.split("## Pattern: Holes")[0])
+    result = ingestor.run(collection)
+    assert (result["embedded"], result["deleted"]) == (1, 2)
+    assert sorted(collection.get(include=[])["ids"]) == ["brackets.md::pattern-l-bracket", "shafts.md::pattern-shaft"]
+    assert "80" in collection.get(ids=["shafts.md::pattern-shaft"])["documents"][0]
+
+
+def test_repeated_headings_are_all_ingested(docs):
+    docs_dir, ingestor, collection, _ = docs
+    (docs_dir / "notes.md").write_text("## Tip\nFillet after booleans.\n## Tip\nKeep radii small.\n")
+    assert ingestor.run(collection)["embedded"] == 6
+    assert {"notes.md::tip", "notes.md::tip#2"} <= set(collection.get()["ids"])
+
+
+def test_full_run_removes_ids_unknown_to_the_manifest(docs):
+    _, ingestor, collection, _ = docs
+    collection.add(ids=["legacy"], documents=["added before the manifest existed"])
+    assert ingestor.run(collection)["deleted"] == 0
+    result = ingestor.run(collection, full=True)
+    assert (result["embedded"], result["deleted"]) == (4, 1)
+    assert "legacy" not in collection.get(include=[])["ids"]
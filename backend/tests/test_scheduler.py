@@ -0,0 +1,94 @@
+import asyncio
+import time
+import pytest
+
+from core.config import settings
+from core.metrics import RequestTrace, bind_trace, metrics, unbind_trace
+from services.scheduler import Scheduler, current_stage
+from services.worker_pool import FreeCADWorkerPool
+
+
+@pytest.fixture
+def scripts(tmp_path):
+    def write(name, source):
+        path = tmp_path / f"{name}.py"
+        path.write_text(source)
+        return str(path)
+    return write
+
+
+def run_with_pool(lanes, body):
+    async def run():
+        pool = FreeCADWorkerPool(settings.FREECAD_PATH, lanes=lanes, max_jobs=50, timeout=10)
+        await pool.start()
+        try:
+            return await body(pool)
+        finally:
+            await pool.shutdown()
+    return asyncio.run(run())
+
+
+@pytest.mark.parametrize("pool_size, lanes", [
+    (2, {"executor": 1, "executor_heavy": 1}),
+    (1, {"executor": 1, "executor_heavy": 1}),
+    (5, {"executor": 4, "executor_heavy": 1}),
+])
+def test_heavy_workers_are_reserved_out_of_the_pool(monkeypatch, pool_size, lanes):
+    monkeypatch.setattr(settings, "FREECAD_POOL_SIZE", pool_size)
+    scheduler = Scheduler()
+    assert scheduler.worker_lanes == lanes
+    # The cheap gate never admits more runs than its lane has workers
+    assert scheduler.gates["executor"].limit == lanes["executor"]
+    assert scheduler.gates["executor_heavy"].limit == lanes["executor_heavy"]
+
+
+def test_stage_reports_the_held_slot():
+    scheduler = Scheduler()
+
+    async def run():
+        async with scheduler.stage("executor_heavy"):
+            inside = current_stage()
+        return inside, current_stage()
+
+    assert asyncio.run(run()) == ("executor_heavy", None)
+
+
+def test_cheap_script_does_not_wait_for_a_heavy_one(scripts):
+    slow = scripts("slow", "import time\ntime.sleep(1.5)\n")
+    cheap = scripts("cheap", "x = 1\n")
+
+    async def body(pool):
+        heavy = asyncio.create_task(pool.execute(slow, lane="executor_heavy"))
+        await asyncio.sleep(0.2)
+        started = time.monotonic()
+        await pool.execute(cheap, lane="executor")
+        cheap_seconds = time.monotonic() - started
+        heavy_running = not heavy.done()
+        await heavy
+        return cheap_seconds, heavy_running
+
+    cheap_seconds, heavy_running = run_with_pool({"executor": 1, "executor_heavy": 1}, body)
+    assert heavy_running
+    assert cheap_seconds < 1.0
+
+
+def test_worker_wait_is_recorded(scripts):
+    slow = scripts("slow", "import time\ntime.sleep(0.5)\n")
+    trace = RequestTrace("worker-wait")
+
+    async def body(pool):
+        first = asyncio.create_task(pool.execute(slow))
+        await asyncio.sleep(0.05)
+        token = bind_trace(trace)
+        try:
+            await pool.execute(slow, lane="unknown")  # Unknown lanes use the default one
+        finally:
+            unbind_trace(token)
+        await first
+        return pool.get_stats()
+
+    stats = run_with_pool({"executor": 1}, body)
+    assert stats["max_wait"] >= 0.3
+    assert stats["lanes"] == {"executor": {"size": 1, "idle": 1}}
+    assert "executor_worker_wait" in trace.server_timing()
+    assert 'cad_copilot_queue_wait_seconds_count{stage="executor_worker"}' in metrics.render()
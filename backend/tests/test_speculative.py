@@ -0,0 +1,73 @@
+import asyncio
+import uuid
+import pytest
+
+from api import routes
+from core.config import settings
+from core.errors import ValidationError
+from services.llm import LLMServiceWithFallback
+
+
+@pytest.fixture
+def service(portal, monkeypatch):
+    monkeypatch.setattr(settings, "SPECULATIVE_CANDIDATES", 3)
+    service = LLMServiceWithFallback()
+    portal.call(service.start)
+    yield service
+    portal.call(service.close)
+
+
+def race(portal, service, accept, **kwargs):
+    async def run():
+        return await service.race_candidates("a bracket " + uuid.uuid4().hex, "system", accept, **kwargs)
+    return portal.call(run)
+
+
+def test_candidates_use_distinct_sampling_options(service):
+    options = service.candidate_options(4)
+    assert [o["seed"] for o in options] == [0, 1, 2, 3]
+    assert [o["temperature"] for o in options] == [0.1, 0.4, 0.7, 0.1]
+
+
+def test_first_success_wins_and_the_rest_are_cancelled(portal, service):
+    async def accept(index, code):
+        if index == 0:
+            raise ValidationError("bad candidate")
+        await asyncio.sleep(0.05 if index == 1 else 10)
+        return f"stl-{index}"
+
+    result, code, rows, _ = race(portal, service, accept)
+    assert result == "stl-1"
+    assert "final_shape" in code
+    assert [row["outcome"] for row in rows] == ["failed", "won", "cancelled"]
+    assert rows[0]["error"] == "bad candidate"
+    assert all(row["llm_seconds"] is not None for row in rows)
+    stats = service.get_speculative_stats()
+    assert (stats["won"], stats["rescued"], stats["cancelled"]) == (1, 1, 1)
+    assert stats["wins_by_candidate"] == [0, 1, 0]
+
+
+def test_duplicate_code_is_not_executed_twice(portal, service, monkeypatch):
+    monkeypatch.setattr(service, "candidate_options", lambda count: [{"temperature": 0.1, "seed": 0}] * count)
+    accepted = []
+
+    async def accept(index, code):
+        accepted.append(index)
+        raise ValidationError("bad candidate")
+
+    with pytest.raises(ValidationError):
+        race(portal, service, accept)
+    assert len(accepted) == 1
+    assert service.get_speculative_stats()["duplicates"] == 2
+    assert service.get_speculative_stats()["failed"] == 1
+
+
+def test_generate_races_candidates_through_the_executor(client, portal, service, monkeypatch):
+    monkeypatch.setattr(routes, "llm_service", service)
+    response = client.post("/api/generate", json={"prompt": "speculative plate " + uuid.uuid4().hex})
+    assert response.status_code == 200, response.text
+    body = response.json()
+    assert body["stl_url"].endswith(".stl")
+    outcomes = [c["outcome"] for c in body["candidates"]]
+    assert outcomes.count("won") == 1
+    assert len(outcomes) == 3
@@ -0,0 +1,52 @@
+import gzip
+import os
+import pytest
+
+from core.config import settings
+
+BODY = b"solid test\nendsolid test\n" * 20
+
+
+@pytest.fixture
+def stl(client):
+    path = os.path.join(settings.OUTPUT_DIR, "static_test.stl")
+    with open(path, "wb") as f:
+        f.write(BODY)
+    with open(path + ".gz", "wb") as f:
+        f.write(gzip.compress(BODY))
+    yield "/outputs/static_test.stl"
+    for suffix in ("", ".gz"):
+        os.remove(path + suffix)
+
+
+def get(client, url, encoding, etag=None):
+    headers = {"Accept-Encoding": encoding}
+    if etag:
+        headers["If-None-Match"] = etag
+    return client.get(url, headers=headers)
+
+
+def test_precompressed_variant_is_served(client, stl):
+    response = get(client, stl, "gzip")
+    assert response.status_code == 200
+    assert response.headers["Content-Encoding"] == "gzip"
+    assert "Accept-Encoding" in response.headers["Vary"]
+    assert response.headers["Content-Type"] == "model/stl"
+    assert response.content == BODY
+
+
+def test_conditional_request_uses_the_served_variant(client, stl):
+    gzip_etag = get(client, stl, "gzip").headers["ETag"]
+    identity_etag = get(client, stl, "identity").headers["ETag"]
+    assert gzip_etag != identity_etag
+
+    revalidated = get(client, stl, "gzip", gzip_etag)
+    assert revalidated.status_code == 304
+    assert revalidated.headers["ETag"] == gzip_etag
+
+    # A validator for one variant never matches the other
+    assert get(client, stl, "identity", gzip_etag).status_code == 200
+    changed = get(client, stl, "gzip", identity_etag)
+    assert changed.status_code == 200
+    assert changed.headers["Content-Encoding"] == "gzip"
+    assert get(client, stl, "identity", identity_etag).status_code == 304
@@ -0,0 +1,40 @@
+import gzip
+import os
+import struct
+
+from core.config import settings
+from services.executor import executor
+
+
+def execute(portal, code):
+    stl_relpath, _ = portal.call(executor.execute_script, code)
+    return os.path.join(settings.OUTPUT_DIR, stl_relpath)
+
+
+def test_stl_is_binary_with_gzip_variant(portal):
+    path = execute(portal, "import Part\nfinal_shape = Part.makeBox(21, 11, 7)\n")
+    with open(path, "rb") as f:
+        data = f.read()
+    (triangles,) = struct.unpack_from("<I", data, 80)
+    assert triangles > 0
+    assert len(data) == 84 + 50 * triangles
+    with open(path + ".gz", "rb") as f:
+        assert gzip.decompress(f.read()) == data
+
+
+def test_ascii_export_when_binary_is_off(portal, monkeypatch):
+    monkeypatch.setattr(settings, "STL_BINARY", False)
+    path = execute(portal, "import Part\nfinal_shape = Part.makeBox(22, 11, 7)\n")
+    with open(path, "rb") as f:
+        assert f.read(5) == b"solid"
+
+
+def test_download_negotiates_the_precompressed_file(client, portal):
+    path = execute(portal, "import Part\nfinal_shape = Part.makeBox(23, 11, 7)\n")
+    url = "/outputs/" + os.path.relpath(path, settings.OUTPUT_DIR).replace(os.sep, "/")
+    compressed = client.get(url, headers={"Accept-Encoding": "gzip"})
+    plain = client.get(url, headers={"Accept-Encoding": "identity"})
+    assert compressed.headers["Content-Encoding"] == "gzip"
+    assert "Content-Encoding" not in plain.headers
+    assert int(compressed.headers["Content-Length"]) < int(plain.headers["Content-Length"])
+    assert compressed.content == plain.content
@@ -0,0 +1,88 @@
+import asyncio
+import os
+import pytest
+
+from services import storage as storage_module
+from services.storage import OutputStorage, shard_for
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def time(self):
+        self.now += 1
+        return self.now
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    monkeypatch.setattr(storage_module, "time", Clock())
+    storage = OutputStorage()
+    storage.root, storage.max_bytes, storage.ttl = str(tmp_path), 250, 3600
+    return storage
+
+
+def artifact(storage, size=100):
+    artifact_id, directory = storage.new_artifact()
+    for suffix, data in (("py", b"x"), ("stl", b"s" * (size - 1))):
+        with open(os.path.join(directory, f"{artifact_id}.{suffix}"), "wb") as f:
+            f.write(data)
+    asyncio.run(storage.register(artifact_id))
+    return artifact_id
+
+
+def exists(storage, artifact_id):
+    return os.path.exists(storage.path(artifact_id, "stl"))
+
+
+def test_artifacts_are_sharded_and_indexed(store):
+    a = artifact(store)
+    assert store.relpath(a, "stl") == f"{shard_for(a)}/{a}.stl"
+    assert sorted(os.path.basename(p) for p in store.files(a)) == [f"{a}.py", f"{a}.stl"]
+    assert store.get_stats()["bytes"] == 100
+
+
+def test_least_recently_used_is_evicted_over_quota(store):
+    a, b = artifact(store), artifact(store)
+    store.touch_path(store.relpath(a, "lod0.stl"))  # A served since: B is now the oldest
+    c = artifact(store)
+    assert [exists(store, x) for x in (a, b, c)] == [True, False, True]
+    assert store.get_stats()["evicted"] == 1 and store.files(b) == []
+
+
+def test_pinned_artifact_survives_until_released(store):
+    a = artifact(store)
+    with store.pin(a):
+        b, c = artifact(store), artifact(store)
+        assert exists(store, a) and store.get_stats()["pinned"] == 1
+        assert not exists(store, b)
+    # Unpinning counts as an access, so C is evicted first after that
+    artifact(store)
+    assert exists(store, a) and not exists(store, c)
+
+
+def test_expired_artifacts_are_swept(store):
+    a = artifact(store)
+    store.ttl = 0
+    asyncio.run(store._evict())
+    assert not exists(store, a)
+    assert store.get_stats()["expired"] == 1
+
+
+def test_startup_scan_indexes_existing_files(store, tmp_path):
+    (tmp_path / "legacy.stl").write_bytes(b"l" * 10)
+    (tmp_path / "ab").mkdir()
+    (tmp_path / "ab" / "sharded.stl").write_bytes(b"s" * 20)
+    (tmp_path / "cache").mkdir()
+    (tmp_path / "cache" / "key.stl").write_bytes(b"c" * 30)
+
+    async def scan():
+        await store.start()
+        await asyncio.sleep(0.1)
+        await store.shutdown()
+
+    asyncio.run(scan())
+    assert sorted(store._entries) == ["legacy", "sharded"]
+    assert store.relpath("legacy", "stl") == "legacy.stl"
+    assert store.get_stats()["bytes"] == 30
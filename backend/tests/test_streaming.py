@@ -0,0 +1,53 @@
+import json
+
+from api import routes
+from core.errors import ValidationError
+
+
+def stream(client, path, payload):
+    """POSTs to an SSE endpoint; returns the (event, data) pairs in order."""
+    events = []
+    with client.stream("POST", path, json=payload) as response:
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/event-stream")
+        body = "".join(response.iter_text())
+    for block in body.split("\n\n"):
+        lines = dict(line.split(": ", 1) for line in block.splitlines() if not line.startswith(":"))
+        if "event" in lines:
+            events.append((lines["event"], json.loads(lines["data"])))
+    return events
+
+
+def test_generate_stream_reports_every_stage(client):
+    events = stream(client, "/api/generate/stream", {"prompt": "streaming test bracket"})
+    names = [name for name, _ in events]
+    assert names[0] == "rag_done"
+    assert names[-1] == "stl_ready"
+    stages = [name for name in names if name != "token"]
+    assert stages == ["rag_done", "code_complete", "validated", "executing", "stl_ready"]
+
+    tokens = "".join(data["text"] for name, data in events if name == "token")
+    code = dict(events)["code_complete"]["code"]
+    assert code in tokens
+    final = dict(events)["stl_ready"]
+    assert final["status"] == "success" and final["stl_url"].startswith("/outputs/")
+
+
+def test_refine_stream_ends_with_the_refined_model(client):
+    original = "import FreeCAD\nimport Part\nfinal_shape = Part.makeBox(30, 20, 10)\n"
+    events = stream(client, "/api/refine/stream", {"original_code": original, "instruction": "add a foot"})
+    name, final = events[-1]
+    assert name == "stl_ready"
+    assert "Refinement: add a foot" in final["code"]
+
+
+def test_stream_errors_are_sent_as_error_event(client, monkeypatch):
+    async def failing_context(prompt):
+        raise ValidationError("Context rejected.")
+
+    monkeypatch.setattr(routes.rag_service, "retrieve_context", failing_context)
+    events = stream(client, "/api/generate/stream", {"prompt": "streaming error test"})
+    assert events == [("error", {
+        "status": "error", "code": "ERR_VALIDATION", "stl_url": None,
+        "error": {"type": "validation_error", "message": "Context rejected.", "details": None},
+    })]
@@ -0,0 +1,64 @@
+import chromadb
+import numpy as np
+import pytest
+
+from services.vector_index import EmbeddingLRU, VectorIndex
+from test_rag import WordEmbedding
+
+
+def brute_force(matrix, query, space):
+    if space == "cosine":
+        m = matrix / np.linalg.norm(matrix, axis=1, keepdims=True)
+        return 1.0 - m @ query / np.linalg.norm(query)
+    if space == "ip":
+        return 1.0 - matrix @ query
+    return ((matrix - query) ** 2).sum(axis=1)
+
+
+@pytest.mark.parametrize("space", ["l2", "cosine", "ip"])
+def test_search_matches_brute_force(space):
+    rng = np.random.default_rng(0)
+    matrix = rng.normal(size=(200, 16)).astype(np.float32)
+    query = rng.normal(size=16).astype(np.float32)
+    index = VectorIndex([str(i) for i in range(200)], ["doc"] * 200, matrix, space)
+
+    expected = brute_force(matrix, query, space)
+    results = index.search(query, 5)
+    assert [row for row, _ in results] == list(np.argsort(expected)[:5])
+    assert [d for _, d in results] == pytest.approx(sorted(expected)[:5], rel=1e-4, abs=1e-4)
+
+
+def test_search_bounds():
+    assert VectorIndex([], [], []).search([1.0, 0.0], 3) == []
+    index = VectorIndex(["a", "b"], ["A", "B"], [[0.0, 0.0], [1.0, 1.0]])
+    assert [row for row, _ in index.search([0.9, 0.9], 10)] == [1, 0]
+    assert index.get_stats() == {"size": 2, "dimension": 2, "space": "l2"}
+
+
+def test_index_ranks_like_chroma(tmp_path):
+    embed = WordEmbedding()
+    collection = chromadb.PersistentClient(path=str(tmp_path)).get_or_create_collection(name="rank_test", embedding_function=embed)
+    texts = [f"pattern {word} with part {word} and vector" for word in ("box", "cylinder", "fillet", "chamfer", "sweep", "loft")]
+    collection.add(ids=[str(i) for i in range(len(texts))], documents=texts)
+
+    index = VectorIndex.from_collection(collection)
+    query = "cylinder part"
+    chroma_ids = collection.query(query_texts=[query], n_results=3)["ids"][0]
+    assert [index.ids[row] for row, _ in index.search(embed([query])[0], 3)] == chroma_ids
+
+
+def test_embedding_lru_computes_only_misses():
+    computed = []
+
+    def embed(texts):
+        computed.extend(texts)
+        return [[float(len(t)), 1.0] for t in texts]
+
+    cache = EmbeddingLRU(embed, max_entries=2)
+    cache(["a", "bb"])
+    vectors = cache(["bb", "ccc"])
+    assert computed == ["a", "bb", "ccc"]
+    assert vectors[0].tolist() == [2.0, 1.0]
+    # "a" was least recently used and is gone
+    assert cache.peek("a") is None and cache.peek("ccc") is not None
+    assert cache.get_stats() == {"entries": 2, "max_entries": 2, "hits": 2, "misses": 3}
@@ -0,0 +1,54 @@
+import asyncio
+import time
+
+from import_profile import FORBIDDEN, profile
+from services.warmup import DISABLED, FAILED, READY, WarmupManager
+
+
+def test_status_moves_from_starting_to_ready_or_degraded():
+    async def run():
+        manager = WarmupManager()
+        release = asyncio.Event()
+
+        async def slow():
+            await release.wait()
+            return "loaded"
+
+        async def broken():
+            raise RuntimeError("no model")
+
+        manager.add("slow", slow)
+        manager.add("broken", broken)
+        manager.disable("off", "disabled in config")
+        manager.start()
+        await asyncio.sleep(0)
+        starting = manager.get_status()
+        release.set()
+        await manager.wait()
+        return starting, manager.get_status()
+
+    starting, finished = asyncio.run(run())
+    assert (starting["status"], starting["ready"]) == ("starting", False)
+    assert (finished["status"], finished["ready"]) == ("degraded", True)
+    components = finished["components"]
+    assert (components["slow"]["state"], components["slow"]["detail"]) == (READY, "loaded")
+    assert (components["broken"]["state"], components["broken"]["error"]) == (FAILED, "no model")
+    assert components["off"]["state"] == DISABLED
+
+
+def test_ready_endpoint_reports_components(client):
+    assert client.get("/api/live").json() == {"status": "alive"}
+    deadline = time.monotonic() + 30
+    response = client.get("/api/ready")
+    while response.status_code == 503 and time.monotonic() < deadline:
+        time.sleep(0.05)
+        response = client.get("/api/ready")
+    report = response.json()
+    assert response.status_code == 200 and report["status"] == "ready"
+    assert report["components"]["executor"]["state"] == READY
+    assert report["components"]["rag"] == {"state": DISABLED, "duration": None, "detail": "ENABLE_RAG is false", "error": None}
+
+
+def test_startup_imports_stay_lazy():
+    eager = sorted({name for name, *_ in profile("main") if name.split(".")[0] in FORBIDDEN})
+    assert eager == []
@@ -0,0 +1,102 @@
+import asyncio
+import pytest
+
+from core.config import settings
+from core.errors import ExecutionError, TimeoutError
+from services.worker_pool import FreeCADWorkerPool
+
+PID = "import os\nopen({out!r}, 'a').write(str(os.getpid()) + '\\n')\n"
+
+
+@pytest.fixture
+def script(tmp_path):
+    def write(source, name="job"):
+        path = tmp_path / f"{name}.py"
+        path.write_text(source)
+        return str(path)
+    return write
+
+
+def with_pool(body, max_jobs=50, timeout=10):
+    async def run():
+        pool = FreeCADWorkerPool(settings.FREECAD_PATH, lanes={"executor": 1}, max_jobs=max_jobs, timeout=timeout)
+        await pool.start()
+        try:
+            await body(pool)
+            return pool.get_stats()
+        finally:
+            await pool.shutdown()
+    return asyncio.run(run())
+
+
+def pids(tmp_path):
+    return (tmp_path / "pids").read_text().split()
+
+
+def test_jobs_reuse_one_warm_process(script, tmp_path):
+    job = script(PID.format(out=str(tmp_path / "pids")))
+
+    async def body(pool):
+        for _ in range(3):
+            await pool.execute(job)
+
+    stats = with_pool(body)
+    assert len(set(pids(tmp_path))) == 1
+    assert stats["jobs"] == 3 and stats["alive"] == 1
+
+
+def test_failing_script_reports_error_and_keeps_worker(script, tmp_path):
+    failing = script("raise ValueError('broken script')\n", "failing")
+    exiting = script("import sys\nsys.exit(3)\n", "exiting")
+    job = script(PID.format(out=str(tmp_path / "pids")))
+
+    async def body(pool):
+        await pool.execute(job)
+        with pytest.raises(ExecutionError) as error:
+            await pool.execute(failing)
+        assert "broken script" in error.value.details
+        with pytest.raises(ExecutionError):
+            await pool.execute(exiting)
+        await pool.execute(job)
+
+    stats = with_pool(body)
+    assert len(set(pids(tmp_path))) == 1
+    assert stats["failures"] == 2 and stats["recycled"] == 0
+
+
+def test_crashed_worker_is_replaced(script, tmp_path):
+    crash = script("import os\nos._exit(1)\n", "crash")
+    job = script(PID.format(out=str(tmp_path / "pids")))
+
+    async def body(pool):
+        with pytest.raises(ExecutionError, match="crashed"):
+            await pool.execute(crash)
+        await pool.execute(job)
+
+    stats = with_pool(body)
+    assert stats["crashes"] == 1 and stats["alive"] == 1
+
+
+def test_timeout_kills_the_worker(script):
+    slow = script("import time\ntime.sleep(30)\n", "slow")
+    quick = script("x = 1\n", "quick")
+
+    async def body(pool):
+        with pytest.raises(TimeoutError):
+            await pool.execute(slow)
+        await pool.execute(quick)
+
+    stats = with_pool(body, timeout=1)
+    assert stats["timeouts"] == 1 and stats["recycled"] == 1
+
+
+def test_worker_is_recycled_after_max_jobs(script, tmp_path):
+    job = script(PID.format(out=str(tmp_path / "pids")))
+
+    async def body(pool):
+        for _ in range(3):
+            await pool.execute(job)
+
+    stats = with_pool(body, max_jobs=2)
+    assert len(set(pids(tmp_path))) == 2
+    assert stats["recycled"] == 1
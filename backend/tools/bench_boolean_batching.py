@@ -0,0 +1,149 @@
+"""
+Benchmark of the boolean batching optimizer on the pattern-library examples.
+
+Usage (from backend/): `python tools/bench_boolean_batching.py [--repeat 5] [--grid 64] [--no-verify] [--json out.json]`
+
+Collects the example scripts from rag_docs/*.md (```python blocks) and the
+"EXAMPLE N" sections of the system prompt, keeps those the optimizer rewrites,
+and times the original and the rewritten script side by side inside a single
+FreeCADCmd run (FREECAD_PATH; tools/stub_freecadcmd.py works too, but only
+real FreeCAD gives meaningful timings). The rewrite is the one the backend runs,
+checks included as BOOLEAN_BATCHING_VERIFY configures them; `--no-verify` times
+it without them. `--grid N` adds a synthetic plate with
+an N-hole grid, where batching matters most. Volumes of both results are
+compared and any mismatch fails the run.
+"""
+import argparse
+import glob
+import json
+import os
+import re
+import subprocess
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.config import settings  # noqa: E402
+from services.optimizer import batch_booleans  # noqa: E402
+from services.worker_pool import build_command  # noqa: E402
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RESULT_MARKER = "BENCH_RESULT "
+
+_CODE_BLOCK_RE = re.compile(r"```python\n(.*?)```", re.S)
+_EXAMPLE_RE = re.compile(r"═+\n\s+EXAMPLE \d+ — ([^\n]*)\n═+\n(.*?)(?=\n═|\Z)", re.S)
+
+# Runs inside FreeCADCmd: each case is exec'd in a fresh namespace
+RUNNER = """
+import json, time
+cases = json.loads({cases!r})
+results = []
+for case in cases:
+    row = {{"name": case["name"]}}
+    for variant in ("original", "batched"):
+        timings, volume = [], None
+        for _ in range({repeat}):
+            namespace = {{"__name__": "__main__"}}
+            started = time.perf_counter()
+            exec(compile(case[variant], case["name"], "exec"), namespace)
+            timings.append(time.perf_counter() - started)
+            volume = namespace["final_shape"].Volume
+        row[variant] = {{"best_ms": min(timings) * 1000, "mean_ms": sum(timings) / len(timings) * 1000, "volume": volume}}
+    results.append(row)
+print({marker!r} + json.dumps(results))
+"""
+
+GRID_TEMPLATE = """import FreeCAD
+import Part
+from FreeCAD import Vector
+side = {side}
+pitch = 10
+plate = Part.makeBox(side * pitch, side * pitch, 5)
+result = plate
+for i in range(side):
+    for j in range(side):
+        hole = Part.makeCylinder(2, 5)
+        hole.translate(Vector(i * pitch + pitch / 2, j * pitch + pitch / 2, 0))
+        result = result.cut(hole)
+final_shape = result
+"""
+
+
+def collect_examples(grid: int = 0) -> list:
+    """Returns (name, code) pairs from the RAG docs and the system prompt."""
+    examples = []
+    for path in sorted(glob.glob(os.path.join(BACKEND_DIR, "rag_docs", "*.md"))):
+        with open(path, "r", encoding="utf-8") as f:
+            blocks = _CODE_BLOCK_RE.findall(f.read())
+        examples += [(f"{os.path.basename(path)}#{i + 1}", code) for i, code in enumerate(blocks)]
+
+    from api.routes import SYSTEM_PROMPT
+    examples += [(f"prompt: {title.strip()}", code) for title, code in _EXAMPLE_RE.findall(SYSTEM_PROMPT)]
+
+    if grid > 0:
+        side = max(1, int(round(grid ** 0.5)))
+        examples.append((f"grid: {side * side} holes", GRID_TEMPLATE.format(side=side)))
+    return examples
+
+
+def run(cases: list, repeat: int) -> list:
+    executable = (settings.FREECAD_PATH or "").strip("'\"")
+    if not executable or not os.path.exists(executable):
+        raise SystemExit(f"FreeCAD executable not found: {executable!r} (set FREECAD_PATH)")
+
+    script = RUNNER.format(cases=json.dumps(cases), repeat=repeat, marker=RESULT_MARKER)
+    with tempfile.NamedTemporaryFile("w", suffix=".py", delete=False, encoding="utf-8") as f:
+        f.write(script)
+    try:
+        process = subprocess.run(build_command(executable, f.name), capture_output=True, text=True)
+    finally:
+        os.remove(f.name)
+
+    for line in process.stdout.splitlines():
+        if line.startswith(RESULT_MARKER):
+            return json.loads(line[len(RESULT_MARKER):])
+    raise SystemExit(f"Benchmark run failed (exit {process.returncode}):\n{(process.stderr or process.stdout)[-2000:]}")
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--grid", type=int, default=0, help="add a synthetic plate with this many holes")
+    parser.add_argument("--json", default=None, help="also write the results to this file")
+    parser.add_argument("--no-verify", action="store_true", help="time batching without the BOOLEAN_BATCHING_VERIFY checks")
+    args = parser.parse_args(argv)
+
+    cases = []
+    for name, code in collect_examples(args.grid):
+        batched, rewrites = batch_booleans(code, verify=False if args.no_verify else None)
+        if rewrites:
+            cases.append({"name": name, "original": code, "batched": batched, "loops": rewrites})
+    if not cases:
+        print("No example contains a batchable boolean loop.")
+        return 0
+
+    results = run(cases, max(1, args.repeat))
+
+    status = 0
+    print(f"{'example':<40} {'original ms':>12} {'batched ms':>11} {'speedup':>8}  volume")
+    for case, row in zip(cases, results):
+        row["loops"] = case["loops"]
+        original, batched = row["original"], row["batched"]
+        row["speedup"] = original["best_ms"] / batched["best_ms"] if batched["best_ms"] else None
+        tolerance = 1e-6 * max(abs(original["volume"]), 1.0)
+        row["volume_match"] = abs(original["volume"] - batched["volume"]) <= tolerance
+        if not row["volume_match"]:
+            status = 1
+        speedup = f"{row['speedup']:.2f}x" if row["speedup"] else "-"
+        print(f"{row['name'][:40]:<40} {original['best_ms']:12.2f} {batched['best_ms']:11.2f} {speedup:>8}  "
+              f"{'ok' if row['volume_match'] else 'MISMATCH'}")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+    return status
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,71 @@
+"""
+Import-time profile of the backend, to catch heavy imports creeping back into startup.
+
+Usage (from backend/): `python tools/import_profile.py [--module main] [--top 20] [--budget-ms 600]`
+
+Imports the module in a fresh interpreter with `-X importtime` and prints the
+slowest imports by cumulative time. With `--budget-ms`, exits with status 1
+when the module's total import time exceeds the budget. Modules that must stay
+lazy (see FORBIDDEN) fail the run if they show up at all.
+"""
+import argparse
+import os
+import re
+import subprocess
+import sys
+
+# Loaded on demand (RAG warmup, OpenAI fallback, dev server); importing them eagerly is a regression
+FORBIDDEN = ("chromadb", "onnxruntime", "sentence_transformers", "openai", "uvicorn")
+
+_LINE_RE = re.compile(r"^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)$")
+
+
+def profile(module: str) -> list:
+    """Returns (module, self_us, cumulative_us, depth) tuples in import order."""
+    backend_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=backend_dir,
+        capture_output=True,
+        text=True,
+    )
+    if result.returncode != 0:
+        raise SystemExit(f"Importing {module} failed:\n{result.stderr[-2000:]}")
+
+    rows = []
+    for line in result.stderr.splitlines():
+        match = _LINE_RE.match(line)
+        if match:
+            self_us, cumulative_us, indent, name = match.groups()
+            rows.append((name, int(self_us), int(cumulative_us), len(indent) // 2))
+    return rows
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--module", default="main")
+    parser.add_argument("--top", type=int, default=20)
+    parser.add_argument("--budget-ms", type=float, default=None)
+    args = parser.parse_args(argv)
+
+    rows = profile(args.module)
+    total_ms = next((cum for name, _, cum, _ in rows if name == args.module), 0) / 1000
+
+    print(f"{'cumulative ms':>14} {'self ms':>9}  module")
+    for name, self_us, cumulative_us, depth in sorted(rows, key=lambda r: r[2], reverse=True)[:args.top]:
+        print(f"{cumulative_us / 1000:14.1f} {self_us / 1000:9.1f}  {'  ' * depth}{name}")
+    print(f"\nimport {args.module}: {total_ms:.1f} ms")
+
+    status = 0
+    eager = sorted({name for name, *_ in rows if name.split(".")[0] in FORBIDDEN})
+    if eager:
+        print(f"FAIL: lazily-loaded modules imported at startup: {', '.join(eager)}")
+        status = 1
+    if args.budget_ms is not None and total_ms > args.budget_ms:
+        print(f"FAIL: import time {total_ms:.1f} ms exceeds budget of {args.budget_ms:.1f} ms")
+        status = 1
+    return status
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,356 @@
+"""
+Offline end-to-end load test: throughput, latency percentiles and error rates.
+
+Usage (from backend/): `python tools/load_test.py [--levels 1,2,4,8] [--requests 40] [--json out.json] [--compare base.json]`
+
+Starts tools/stub_ollama.py and the backend (uvicorn, fresh temporary
+OUTPUT_DIR, FREECAD_PATH pointing at tools/stub_freecadcmd.py), then drives
+/api/generate and /api/refine with a closed loop of N concurrent clients for
+each level. No GPU, FreeCAD or network is needed, and the request plan is
+fixed by --seed, so runs on different commits are comparable. Differences then
+come from the backend itself (scheduler, caches, ...). Backend settings can be
+overridden with `--env KEY=VALUE`. `--url` targets an already running backend
+instead.
+
+Each level reports throughput, latency percentiles, errors by code and the mean
+per-stage time taken from the Server-Timing headers. `--compare` prints the
+change against an earlier --json report; `--max-error-rate` makes the run fail
+when any level exceeds it.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Dict, List, Optional
+
+import httpx
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+TOOLS_DIR = os.path.join(BACKEND_DIR, "tools")
+
+SHAPES = ["box", "cylinder", "mounting plate", "L bracket", "spacer", "flange", "enclosure lid", "shaft collar"]
+REFINEMENTS = ["make it taller", "add a base plate", "make the walls thicker", "add mounting holes", "round the edges"]
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def percentile(values: List[float], q: float) -> Optional[float]:
+    """Nearest-rank percentile (q in 0..100)."""
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = max(1, min(len(ordered), int(-(-q * len(ordered) // 100))))
+    return ordered[rank - 1]
+
+
+def parse_server_timing(header: str) -> Dict[str, float]:
+    stages = {}
+    for entry in header.split(","):
+        name, _, params = entry.strip().partition(";")
+        for param in params.split(";"):
+            key, _, value = param.strip().partition("=")
+            if key == "dur" and name:
+                try:
+                    stages[name] = float(value)
+                except ValueError:
+                    pass
+    return stages
+
+
+def build_plan(level: int, count: int, unique: int, refine_ratio: float, seed: int) -> List[dict]:
+    """
+    The requests of one level, fixed by the seed. Prompts are drawn from a pool of
+    `unique` prompts (smaller pools mean more cache hits), namespaced per level so
+    levels do not warm each other's caches.
+    """
+    rng = random.Random(f"{seed}:{level}")
+    pool = [f"{rng.choice(SHAPES)} {20 + rng.randrange(80)} mm (run {seed}.{level}.{i})" for i in range(max(1, unique))]
+    plan = []
+    for _ in range(count):
+        if plan and rng.random() < refine_ratio:
+            plan.append({"kind": "refine", "instruction": rng.choice(REFINEMENTS), "prompt": rng.choice(pool)})
+        else:
+            plan.append({"kind": "generate", "prompt": rng.choice(pool)})
+    return plan
+
+
+async def run_level(client: httpx.AsyncClient, base_url: str, concurrency: int, plan: List[dict]) -> dict:
+    queue: asyncio.Queue = asyncio.Queue()
+    for item in plan:
+        queue.put_nowait(item)
+    results: List[dict] = []
+    codes: Dict[str, str] = {}  # prompt -> code of its last successful generation, for refines
+
+    async def worker():
+        while True:
+            try:
+                item = queue.get_nowait()
+            except asyncio.QueueEmpty:
+                return
+            if item["kind"] == "refine":
+                original = codes.get(item["prompt"]) or "import FreeCAD\nimport Part\nfinal_shape = Part.makeBox(10, 10, 10)\n"
+                path, body = "/api/refine", {"original_code": original, "instruction": item["instruction"]}
+            else:
+                path, body = "/api/generate", {"prompt": item["prompt"]}
+            started = time.perf_counter()
+            row = {"kind": item["kind"], "ok": False, "status": None, "error": None, "stages": {}}
+            try:
+                response = await client.post(base_url + path, json=body)
+                row["status"] = response.status_code
+                row["stages"] = parse_server_timing(response.headers.get("server-timing", ""))
+                try:
+                    payload = response.json()
+                except ValueError:
+                    payload = {}
+                if response.status_code == 200:
+                    row["ok"] = True
+                    if item["kind"] == "generate":
+                        codes[item["prompt"]] = payload.get("code", "")
+                else:
+                    row["error"] = payload.get("code") or f"HTTP_{response.status_code}"
+            except Exception as e:
+                row["error"] = type(e).__name__
+            row["latency_ms"] = (time.perf_counter() - started) * 1000
+            results.append(row)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return summarize(concurrency, results, time.perf_counter() - started)
+
+
+def _latency_summary(rows: List[dict]) -> dict:
+    latencies = [r["latency_ms"] for r in rows if r["ok"]]
+    if not latencies:
+        return {"mean": None, "p50": None, "p90": None, "p99": None, "max": None}
+    return {
+        "mean": round(sum(latencies) / len(latencies), 1),
+        "p50": round(percentile(latencies, 50), 1),
+        "p90": round(percentile(latencies, 90), 1),
+        "p99": round(percentile(latencies, 99), 1),
+        "max": round(max(latencies), 1),
+    }
+
+
+def summarize(concurrency: int, rows: List[dict], duration: float) -> dict:
+    ok = [r for r in rows if r["ok"]]
+    errors: Dict[str, int] = {}
+    for r in rows:
+        if not r["ok"]:
+            errors[r["error"]] = errors.get(r["error"], 0) + 1
+    stage_totals: Dict[str, float] = {}
+    for r in ok:
+        for stage, ms in r["stages"].items():
+            stage_totals[stage] = stage_totals.get(stage, 0.0) + ms
+    return {
+        "concurrency": concurrency,
+        "requests": len(rows),
+        "ok": len(ok),
+        "errors": errors,
+        "error_rate": round(1 - len(ok) / len(rows), 4) if rows else 0.0,
+        "duration_s": round(duration, 3),
+        "throughput_rps": round(len(ok) / duration, 3) if duration > 0 else None,
+        "latency_ms": _latency_summary(rows),
+        "by_kind": {
+            kind: {"requests": sum(1 for r in rows if r["kind"] == kind), **_latency_summary([r for r in rows if r["kind"] == kind])}
+            for kind in ("generate", "refine")
+        },
+        "stages_ms": {stage: round(total / len(ok), 1) for stage, total in sorted(stage_totals.items())},
+    }
+
+
+def git_revision() -> Optional[str]:
+    try:
+        revision = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=BACKEND_DIR, capture_output=True, text=True, check=True).stdout.strip()
+        dirty = subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"], cwd=BACKEND_DIR, capture_output=True, text=True).stdout.strip()
+        return revision + ("-dirty" if dirty else "")
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+class Harness:
+    """Owns the stub Ollama and backend processes of one run."""
+
+    def __init__(self, args: argparse.Namespace):
+        self.args = args
+        self.processes: List[subprocess.Popen] = []
+        self.workdir = tempfile.mkdtemp(prefix="cad_load_")
+        self.base_url = args.url.rstrip("/") if args.url else None
+        self.backend_env: Dict[str, str] = {}
+
+    def _spawn(self, command: List[str], env: Dict[str, str], name: str) -> subprocess.Popen:
+        log = open(os.path.join(self.workdir, f"{name}.log"), "w", encoding="utf-8")
+        process = subprocess.Popen(command, cwd=BACKEND_DIR, env=env, stdout=log, stderr=subprocess.STDOUT)
+        self.processes.append(process)
+        return process
+
+    async def _wait_until(self, url: str, timeout: float, ready_status: int = 200):
+        deadline = time.monotonic() + timeout
+        async with httpx.AsyncClient(timeout=2) as client:
+            while time.monotonic() < deadline:
+                if any(p.poll() is not None for p in self.processes):
+                    raise SystemExit(f"A harness process exited early; see the logs in {self.workdir}")
+                try:
+                    if (await client.get(url)).status_code == ready_status:
+                        return
+                except httpx.HTTPError:
+                    pass
+                await asyncio.sleep(0.2)
+        raise SystemExit(f"Timed out waiting for {url}; see the logs in {self.workdir}")
+
+    async def start(self):
+        if self.base_url:
+            return
+        args = self.args
+        ollama_port, api_port = free_port(), free_port()
+        self._spawn([
+            sys.executable, os.path.join(TOOLS_DIR, "stub_ollama.py"), "--port", str(ollama_port),
+            "--token-rate", str(args.token_rate), "--prefill-tps", str(args.prefill_tps), "--latency", args.latency,
+            "--load-ms", str(args.load_ms), "--parallel", str(args.ollama_parallel), "--error-rate", str(args.error_rate),
+            "--seed", str(args.seed),
+        ], dict(os.environ), "stub_ollama")
+        await self._wait_until(f"http://127.0.0.1:{ollama_port}/", 10)
+
+        self.backend_env = {
+            "OLLAMA_BASE_URL": f"http://127.0.0.1:{ollama_port}",
+            "FREECAD_PATH": os.path.join(TOOLS_DIR, "stub_freecadcmd.py"),
+            "STUB_FREECAD_DELAY": str(args.freecad_delay),
+            "STUB_FREECAD_JITTER": str(args.freecad_jitter),
+            "OUTPUT_DIR": os.path.join(self.workdir, "outputs"),
+            "CHROMA_DB_DIR": os.path.join(self.workdir, "chroma"),
+            "ENABLE_RAG": "false",
+            "OPENAI_API_KEY": "",
+            "LOG_LEVEL": "WARNING",
+        }
+        for item in args.env:
+            key, _, value = item.partition("=")
+            self.backend_env[key] = value
+        self._spawn(
+            [sys.executable, "-m", "uvicorn", "main:app", "--host", "127.0.0.1", "--port", str(api_port), "--log-level", "warning"],
+            {**os.environ, **self.backend_env},
+            "backend",
+        )
+        self.base_url = f"http://127.0.0.1:{api_port}"
+        await self._wait_until(f"{self.base_url}/api/ready", 120)
+
+    def stop(self, keep_workdir: bool):
+        for process in self.processes:
+            process.terminate()
+        for process in self.processes:
+            try:
+                process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                process.kill()
+        if not keep_workdir:
+            shutil.rmtree(self.workdir, ignore_errors=True)
+
+
+async def run(args: argparse.Namespace) -> dict:
+    harness = Harness(args)
+    report = {
+        "meta": {
+            "revision": git_revision(),
+            "started_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": sys.version.split()[0],
+            "args": {k: v for k, v in vars(args).items() if k not in ("json", "compare")},
+        },
+        "levels": [],
+    }
+    failed = True
+    try:
+        await harness.start()
+        report["meta"]["backend_env"] = harness.backend_env
+        limits = httpx.Limits(max_connections=max(args.levels) + 4, max_keepalive_connections=max(args.levels) + 4)
+        async with httpx.AsyncClient(timeout=args.timeout, limits=limits) as client:
+            if args.warmup:
+                await run_level(client, harness.base_url, 1, build_plan(0, args.warmup, args.warmup, 0.0, args.seed))
+            for level in args.levels:
+                plan = build_plan(level, args.requests, args.unique_prompts, args.refine_ratio, args.seed)
+                result = await run_level(client, harness.base_url, level, plan)
+                report["levels"].append(result)
+                latency = result["latency_ms"]
+                print(f"concurrency {level:>3}: {result['throughput_rps'] or 0:7.2f} req/s  "
+                      f"p50 {latency['p50'] or 0:8.1f} ms  p99 {latency['p99'] or 0:8.1f} ms  "
+                      f"errors {result['error_rate']:.1%}", flush=True)
+            status = (await client.get(f"{harness.base_url}/api/status")).json()
+            report["server"] = {key: status.get(key) for key in ("scheduler", "llm_cache", "geometry_cache", "checkpoints", "llm_timing")}
+        failed = False
+    finally:
+        # Logs and outputs stay behind for debugging when the run broke
+        harness.stop(keep_workdir=failed or args.keep_workdir)
+    return report
+
+
+def _change(new: Optional[float], old: Optional[float]) -> str:
+    if new is None or not old:
+        return "-"
+    return f"{(new - old) / old:+.1%}"
+
+
+def compare(report: dict, baseline: dict):
+    old_levels = {level["concurrency"]: level for level in baseline.get("levels", [])}
+    print(f"\nvs {baseline.get('meta', {}).get('revision') or 'baseline'}:")
+    print(f"{'concurrency':>11} {'throughput':>11} {'p50':>8} {'p99':>8} {'errors':>14}")
+    for level in report["levels"]:
+        old = old_levels.get(level["concurrency"])
+        if old is None:
+            continue
+        errors = f"{old['error_rate']:.1%} -> {level['error_rate']:.1%}"
+        print(f"{level['concurrency']:>11} {_change(level['throughput_rps'], old['throughput_rps']):>11} "
+              f"{_change(level['latency_ms']['p50'], old['latency_ms']['p50']):>8} "
+              f"{_change(level['latency_ms']['p99'], old['latency_ms']['p99']):>8} {errors:>14}")
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--levels", default="1,2,4,8", help="comma-separated concurrency levels")
+    parser.add_argument("--requests", type=int, default=40, help="requests per level")
+    parser.add_argument("--unique-prompts", type=int, default=20, help="distinct prompts per level (fewer = more cache hits)")
+    parser.add_argument("--refine-ratio", type=float, default=0.25, help="fraction of requests that are refines")
+    parser.add_argument("--warmup", type=int, default=2, help="sequential requests before the first level")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--timeout", type=float, default=300.0, help="per-request timeout (s)")
+    parser.add_argument("--url", default=None, help="use this running backend instead of starting one")
+    parser.add_argument("--env", action="append", default=[], metavar="KEY=VALUE", help="backend setting override (repeatable)")
+    stub = parser.add_argument_group("stub Ollama")
+    stub.add_argument("--token-rate", type=float, default=200.0, help="generated tokens per second")
+    stub.add_argument("--prefill-tps", type=float, default=4000.0, help="prompt tokens evaluated per second")
+    stub.add_argument("--latency", default="lognormal:50:0.5", help="extra per-request latency distribution (ms)")
+    stub.add_argument("--load-ms", type=float, default=0.0, help="model load time on the first request")
+    stub.add_argument("--ollama-parallel", type=int, default=4, help="requests the stub processes at once")
+    stub.add_argument("--error-rate", type=float, default=0.0, help="fraction of LLM calls failing with HTTP 500")
+    freecad = parser.add_argument_group("stub FreeCADCmd")
+    freecad.add_argument("--freecad-delay", type=float, default=0.2, help="seconds of simulated work per script")
+    freecad.add_argument("--freecad-jitter", type=float, default=0.1, help="extra random seconds per script, up to this")
+    parser.add_argument("--json", default=None, help="write the report to this file")
+    parser.add_argument("--compare", default=None, help="earlier --json report to compare against")
+    parser.add_argument("--keep-workdir", action="store_true", help="keep the temporary outputs and process logs")
+    parser.add_argument("--max-error-rate", type=float, default=None, help="exit with status 1 if a level exceeds this")
+    args = parser.parse_args(argv)
+    args.levels = [int(level) for level in args.levels.split(",") if level.strip()]
+
+    report = asyncio.run(run(args))
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            compare(report, json.load(f))
+    if args.max_error_rate is not None and any(level["error_rate"] > args.max_error_rate for level in report["levels"]):
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
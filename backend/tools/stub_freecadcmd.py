@@ -0,0 +1,299 @@
+"""
+Stand-in for FreeCADCmd on machines without FreeCAD.
+
+Usage mirrors the real binary: `python tools/stub_freecadcmd.py script.py`.
+Point FREECAD_PATH at this file (the executor launches `.py` paths with the
+current interpreter) to exercise the executor and the warm worker pool without
+a CAD install. `FreeCAD` and `Part` are replaced with minimal fakes whose shapes
+only track a bounding box; `exportStl` writes that box as a valid STL, and
+`exportBrep` / `read` / `exportStep` round-trip it through text files.
+
+Environment:
+    STUB_FREECAD_DELAY    seconds of simulated meshing work per exported shape (default 0)
+    STUB_FREECAD_JITTER   extra seconds, drawn uniformly from [0, jitter], added to each delay (default 0)
+"""
+import math
+import os
+import random
+import runpy
+import sys
+import time
+import types
+
+
+class Vector:
+    def __init__(self, x=0.0, y=0.0, z=0.0):
+        self.x, self.y, self.z = float(x), float(y), float(z)
+
+    def __add__(self, other):
+        return Vector(self.x + other.x, self.y + other.y, self.z + other.z)
+
+    def __sub__(self, other):
+        return Vector(self.x - other.x, self.y - other.y, self.z - other.z)
+
+    def __mul__(self, k):
+        return Vector(self.x * k, self.y * k, self.z * k)
+
+    __rmul__ = __mul__
+
+    def __iter__(self):
+        return iter((self.x, self.y, self.z))
+
+    def __repr__(self):
+        return f"Vector ({self.x}, {self.y}, {self.z})"
+
+
+class BoundBox:
+    def __init__(self, xmin, ymin, zmin, xmax, ymax, zmax):
+        self.XMin, self.YMin, self.ZMin = xmin, ymin, zmin
+        self.XMax, self.YMax, self.ZMax = xmax, ymax, zmax
+
+    @property
+    def XLength(self):
+        return self.XMax - self.XMin
+
+    @property
+    def YLength(self):
+        return self.YMax - self.YMin
+
+    @property
+    def ZLength(self):
+        return self.ZMax - self.ZMin
+
+    @property
+    def DiagonalLength(self):
+        return math.sqrt(self.XLength ** 2 + self.YLength ** 2 + self.ZLength ** 2)
+
+    def united(self, other):
+        return BoundBox(
+            min(self.XMin, other.XMin), min(self.YMin, other.YMin), min(self.ZMin, other.ZMin),
+            max(self.XMax, other.XMax), max(self.YMax, other.YMax), max(self.ZMax, other.ZMax),
+        )
+
+
+class Shape:
+    def __init__(self, bbox=None):
+        self.BoundBox = bbox or BoundBox(0, 0, 0, 0, 0, 0)
+        self.Edges = [self] * 12
+        self.Faces = [self] * 6
+        self.Vertexes = [self] * 8
+
+    def _copy(self, bbox=None):
+        return Shape(bbox or BoundBox(*_box_tuple(self.BoundBox)))
+
+    def fuse(self, other):
+        others = other if isinstance(other, (list, tuple)) else [other]
+        bbox = self.BoundBox
+        for o in others:
+            bbox = bbox.united(o.BoundBox)
+        return self._copy(bbox)
+
+    def cut(self, other):
+        return self._copy()
+
+    @property
+    def Volume(self):
+        b = self.BoundBox
+        return b.XLength * b.YLength * b.ZLength
+
+    def isValid(self):
+        return True
+
+    def common(self, other):
+        return self._copy()
+
+    def copy(self):
+        clone = self._copy()
+        # The exporter meshes copies of final_shape once per LOD; the delay applies once per original
+        clone._origin = getattr(self, "_origin", self)
+        return clone
+
+    def translate(self, v):
+        b = self.BoundBox
+        self.BoundBox = BoundBox(b.XMin + v.x, b.YMin + v.y, b.ZMin + v.z,
+                                 b.XMax + v.x, b.YMax + v.y, b.ZMax + v.z)
+
+    def rotate(self, *args):
+        pass
+
+    def transformShape(self, *args):
+        pass
+
+    def makeFillet(self, *args):
+        return self._copy()
+
+    def makeChamfer(self, *args):
+        return self._copy()
+
+    def extrude(self, v):
+        b = self.BoundBox
+        return Shape(BoundBox(b.XMin, b.YMin, b.ZMin,
+                              b.XMax + v.x, b.YMax + v.y, b.ZMax + v.z))
+
+    def revolve(self, *args):
+        return self._copy()
+
+    def isNull(self):
+        return False
+
+    def exportBrepToString(self):
+        return "STUB-BREP " + " ".join(repr(v) for v in _box_tuple(self.BoundBox))
+
+    def importBrepFromString(self, text):
+        self.BoundBox = BoundBox(*(float(v) for v in text.split()[1:]))
+
+    def exportBrep(self, path):
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(self.exportBrepToString())
+
+    def exportStep(self, path):
+        x0, y0, z0, x1, y1, z1 = _box_tuple(self.BoundBox)
+        with open(path, "w", encoding="utf-8") as f:
+            f.write("ISO-10303-21;\nHEADER;\nFILE_DESCRIPTION(('stub box'),'2;1');\nENDSEC;\nDATA;\n")
+            f.write("#1=CARTESIAN_POINT('',(%r,%r,%r));\n#2=CARTESIAN_POINT('',(%r,%r,%r));\n" % (x0, y0, z0, x1, y1, z1))
+            f.write("ENDSEC;\nEND-ISO-10303-21;\n")
+
+    def read(self, path):
+        with open(path, "r", encoding="utf-8") as f:
+            self.importBrepFromString(f.read())
+
+    def tessellate(self, tolerance=0.1):
+        _simulate_work(getattr(self, "_origin", self))
+        points, facets = [], []
+        for tri in _box_triangles(self.BoundBox):
+            base = len(points)
+            points.extend(Vector(*v) for v in tri)
+            facets.append((base, base + 1, base + 2))
+        return points, facets
+
+    def exportStl(self, path):
+        _simulate_work(self)
+        _write_box_stl(path, self.BoundBox)
+
+
+def _simulate_work(shape):
+    """Sleeps STUB_FREECAD_DELAY (+ jitter) the first time a shape is meshed."""
+    if getattr(shape, "_meshed", False):
+        return
+    shape._meshed = True
+    delay = float(os.environ.get("STUB_FREECAD_DELAY", "0") or 0)
+    jitter = float(os.environ.get("STUB_FREECAD_JITTER", "0") or 0)
+    if jitter > 0:
+        delay += random.uniform(0, jitter)
+    if delay > 0:
+        time.sleep(delay)
+
+
+def _box_tuple(b):
+    return (b.XMin, b.YMin, b.ZMin, b.XMax, b.YMax, b.ZMax)
+
+
+def _box_triangles(b):
+    x0, y0, z0, x1, y1, z1 = _box_tuple(b)
+    p = [(x0, y0, z0), (x1, y0, z0), (x1, y1, z0), (x0, y1, z0),
+         (x0, y0, z1), (x1, y0, z1), (x1, y1, z1), (x0, y1, z1)]
+    quads = [(0, 3, 2, 1), (4, 5, 6, 7), (0, 1, 5, 4), (1, 2, 6, 5), (2, 3, 7, 6), (3, 0, 4, 7)]
+    for a, b_, c, d in quads:
+        yield p[a], p[b_], p[c]
+        yield p[a], p[c], p[d]
+
+
+def _write_box_stl(path, bbox):
+    lines = ["solid stub"]
+    for tri in _box_triangles(bbox):
+        lines.append(" facet normal 0 0 0")
+        lines.append("  outer loop")
+        for v in tri:
+            lines.append("   vertex %e %e %e" % v)
+        lines.append("  endloop")
+        lines.append(" endfacet")
+    lines.append("endsolid stub")
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("\n".join(lines) + "\n")
+
+
+def _make_box(length, width, height, pnt=None, *args):
+    p = pnt or Vector()
+    return Shape(BoundBox(p.x, p.y, p.z, p.x + length, p.y + width, p.z + height))
+
+
+def _make_cylinder(radius, height, pnt=None, *args):
+    p = pnt or Vector()
+    return Shape(BoundBox(p.x - radius, p.y - radius, p.z, p.x + radius, p.y + radius, p.z + height))
+
+
+def _make_sphere(radius, pnt=None, *args):
+    p = pnt or Vector()
+    return Shape(BoundBox(p.x - radius, p.y - radius, p.z - radius, p.x + radius, p.y + radius, p.z + radius))
+
+
+def _make_cone(radius1, radius2, height, pnt=None, *args):
+    r = max(radius1, radius2)
+    return _make_cylinder(r, height, pnt)
+
+
+def _make_torus(major, minor, pnt=None, *args):
+    p = pnt or Vector()
+    r = major + minor
+    return Shape(BoundBox(p.x - r, p.y - r, p.z - minor, p.x + r, p.y + r, p.z + minor))
+
+
+def _from_points(points):
+    pts = list(points)
+    return Shape(BoundBox(min(v.x for v in pts), min(v.y for v in pts), min(v.z for v in pts),
+                          max(v.x for v in pts), max(v.y for v in pts), max(v.z for v in pts)))
+
+
+def _make_line(a, b):
+    return _from_points([a, b])
+
+
+def _united(shapes):
+    shapes = list(shapes)
+    bbox = shapes[0].BoundBox
+    for s in shapes[1:]:
+        bbox = bbox.united(s.BoundBox)
+    return Shape(bbox)
+
+
+def _install_fakes():
+    freecad = types.ModuleType("FreeCAD")
+    # Pickled values must resolve to the fake modules, not this script's __main__
+    for cls in (Vector, BoundBox):
+        cls.__module__ = "FreeCAD"
+    freecad.BoundBox = BoundBox
+    freecad.Vector = Vector
+    freecad.Version = lambda: ["0", "0", "stub"]
+    sys.modules["FreeCAD"] = freecad
+    sys.modules["App"] = freecad
+
+    part = types.ModuleType("Part")
+    Shape.__module__ = "Part"
+    part.Shape = Shape
+    part.makeBox = _make_box
+    part.makeCylinder = _make_cylinder
+    part.makeSphere = _make_sphere
+    part.makeCone = _make_cone
+    part.makeTorus = _make_torus
+    part.makeLine = _make_line
+    part.makePolygon = _from_points
+    part.makeCompound = _united
+    part.Wire = lambda edges: _united(edges)
+    part.Face = lambda wire: wire._copy()
+    part.Solid = lambda shell: shell._copy()
+    sys.modules["Part"] = part
+
+
+def main():
+    if len(sys.argv) < 2:
+        sys.stderr.write("usage: stub_freecadcmd.py script.py\n")
+        return 2
+    _install_fakes()
+    script = sys.argv[1]
+    sys.argv = sys.argv[1:]
+    runpy.run_path(script, run_name="__main__")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,319 @@
+"""
+Stand-in for the Ollama HTTP API, for load tests without a GPU or network.
+
+Usage: `python tools/stub_ollama.py [--port 11435] [--token-rate 40] [--latency lognormal:300:0.5] ...`
+then point OLLAMA_BASE_URL at it. tools/load_test.py starts it automatically.
+
+Serves `/api/chat` (streaming and not) and `/api/generate` like Ollama does, and
+answers with valid FreeCAD scripts derived from a hash of the request, so equal
+prompts get equal code and the backend's caches behave as in production. Refine
+requests (the previous code in the user message) get that code plus one change.
+
+Timing model, all configurable:
+    --latency      extra per-request latency distribution in ms: fixed:MS,
+                   uniform:LO:HI, normal:MEAN:SD, lognormal:MEDIAN:SIGMA or exp:MEAN
+    --load-ms      one-off model load time on the first request
+    --prefill-tps  prompt tokens evaluated per second (~4 characters per token);
+                   the longest prefix shared with the previous prompt in the same
+                   slot is free, like Ollama's KV-cache reuse
+    --token-rate   generated tokens per second
+    --parallel     requests processed at once (OLLAMA_NUM_PARALLEL); others queue
+    --error-rate   fraction of requests answered with HTTP 500
+"""
+import argparse
+import hashlib
+import json
+import os
+import random
+import re
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, List, Optional, Tuple
+
+CHARS_PER_TOKEN = 4
+
+TEMPLATES = [
+    """import FreeCAD
+import Part
+
+length = {a}
+width = {b}
+height = {c}
+final_shape = Part.makeBox(length, width, height)
+""",
+    """import FreeCAD
+import Part
+
+radius = {r}
+height = {c}
+final_shape = Part.makeCylinder(radius, height)
+""",
+    """import FreeCAD
+import Part
+from FreeCAD import Vector
+
+plate = Part.makeBox({plate_length}, {b}, 5)
+result = plate
+for i in range({n}):
+    hole = Part.makeCylinder(2, 5)
+    hole.translate(Vector(10 * i + 6, {b} / 2, 0))
+    result = result.cut(hole)
+final_shape = result
+""",
+    """import FreeCAD
+import Part
+from FreeCAD import Vector
+
+base = Part.makeBox({a}, {b}, 4)
+wall = Part.makeBox(4, {b}, {c})
+wall.translate(Vector({a} - 4, 0, 0))
+final_shape = base.fuse(wall)
+""",
+]
+
+_PREVIOUS_CODE_RE = re.compile(r"PREVIOUS CODE.*?```python\n(.*?)```", re.S)
+_INSTRUCTION_RE = re.compile(r"Instruction: (.*?)(?:\n\nPlease output|$)", re.S)
+
+
+def parse_distribution(spec: str) -> Callable[[random.Random], float]:
+    """Parses a latency spec (see the module docstring) into a sampler returning milliseconds."""
+    kind, _, rest = spec.partition(":")
+    params = [float(p) for p in rest.split(":") if p]
+    samplers = {
+        "fixed": (1, lambda rng, p: p[0]),
+        "uniform": (2, lambda rng, p: rng.uniform(p[0], p[1])),
+        "normal": (2, lambda rng, p: rng.gauss(p[0], p[1])),
+        "lognormal": (2, lambda rng, p: rng.lognormvariate(0.0, p[1]) * p[0]),
+        "exp": (1, lambda rng, p: rng.expovariate(1.0 / p[0]) if p[0] > 0 else 0.0),
+    }
+    if kind not in samplers or len(params) != samplers[kind][0]:
+        raise ValueError(f"Invalid latency spec {spec!r}; expected e.g. fixed:50, uniform:20:80, lognormal:300:0.5")
+    sample = samplers[kind][1]
+    return lambda rng: max(0.0, sample(rng, params))
+
+
+def fake_code(user_text: str, seed: Optional[int] = None) -> str:
+    """A valid FreeCAD script determined by the request text and, like sampling, the seed option."""
+    key = user_text if seed is None else f"{user_text}\nseed={seed}"
+    digest = hashlib.sha256(key.encode("utf-8")).digest()
+    previous = _PREVIOUS_CODE_RE.search(user_text)
+    if previous:
+        instruction = _INSTRUCTION_RE.search(user_text)
+        note = " ".join((instruction.group(1) if instruction else "refine").split())[:80]
+        thickness = 1 + digest[0] % 4
+        return (
+            previous.group(1).rstrip()
+            + f"\n\n# Refinement: {note}\n"
+            + f"final_shape = final_shape.fuse(Part.makeBox(10, 10, {thickness}, FreeCAD.Vector(0, 0, -{thickness})))\n"
+        )
+    n = 2 + digest[4] % 5
+    values = {
+        "a": 20 + digest[1] % 60,
+        "b": 20 + digest[2] % 40,
+        "c": 10 + digest[3] % 40,
+        "r": 5 + digest[5] % 20,
+        "n": n,
+        "plate_length": 10 * n + 12,
+    }
+    return TEMPLATES[digest[6] % len(TEMPLATES)].format(**values)
+
+
+class StubOllama:
+    """Shared state of the stub: slots with their cached prompt, RNG and counters."""
+
+    def __init__(self, args: argparse.Namespace):
+        self.model = args.model
+        self.token_rate = max(args.token_rate, 1e-6)
+        self.prefill_tps = max(args.prefill_tps, 1e-6)
+        self.load_ms = args.load_ms
+        self.error_rate = args.error_rate
+        self.latency = parse_distribution(args.latency)
+        self.rng = random.Random(args.seed)
+        self.lock = threading.Lock()
+        self.slots_free = threading.Semaphore(max(1, args.parallel))
+        self.slot_prompts: List[Optional[str]] = [None] * max(1, args.parallel)
+        self.slot_busy = [False] * max(1, args.parallel)
+        self.loaded = False
+        self.requests = 0
+
+    def draw(self) -> Tuple[float, bool]:
+        """Returns (extra latency in seconds, whether to fail this request)."""
+        with self.lock:
+            self.requests += 1
+            return self.latency(self.rng) / 1000, self.rng.random() < self.error_rate
+
+    def acquire_slot(self, prompt: str) -> Tuple[int, int, float]:
+        """Blocks for a free slot; returns (slot, prompt tokens to evaluate, load seconds)."""
+        self.slots_free.acquire()
+        with self.lock:
+            # Like Ollama: prefer the free slot whose cached prompt shares the longest prefix
+            best, best_common = None, -1
+            for slot, cached in enumerate(self.slot_prompts):
+                if self.slot_busy[slot]:
+                    continue
+                common = _common_prefix(cached or "", prompt)
+                if common > best_common:
+                    best, best_common = slot, common
+            self.slot_busy[best] = True
+            self.slot_prompts[best] = prompt
+            load = 0.0 if self.loaded else self.load_ms / 1000
+            self.loaded = True
+        tokens = max(1, (len(prompt) - best_common) // CHARS_PER_TOKEN)
+        return best, tokens, load
+
+    def release_slot(self, slot: int):
+        with self.lock:
+            self.slot_busy[slot] = False
+        self.slots_free.release()
+
+
+def _common_prefix(a: str, b: str) -> int:
+    return len(os.path.commonprefix([a, b]))
+
+
+def make_handler(stub: StubOllama):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, *args):
+            pass
+
+        def _send_json(self, status: int, payload: dict):
+            body = json.dumps(payload).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def _write_chunk(self, payload: dict):
+            data = (json.dumps(payload) + "\n").encode("utf-8")
+            self.wfile.write(f"{len(data):x}\r\n".encode("ascii") + data + b"\r\n")
+            self.wfile.flush()
+
+        def do_GET(self):
+            if self.path == "/api/tags":
+                self._send_json(200, {"models": [{"name": stub.model, "model": stub.model}]})
+                return
+            body = b"Ollama is running"
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_POST(self):
+            length = int(self.headers.get("Content-Length") or 0)
+            request = json.loads(self.rfile.read(length) or b"{}")
+            chat = self.path == "/api/chat"
+            if not chat and self.path != "/api/generate":
+                self._send_json(404, {"error": f"unknown endpoint {self.path}"})
+                return
+
+            messages = request.get("messages") or []
+            if chat:
+                prompt = "\n".join(m.get("content", "") for m in messages)
+                user_text = next((m.get("content", "") for m in reversed(messages) if m.get("role") == "user"), "")
+            else:
+                prompt = user_text = request.get("prompt", "")
+            # Load / prefill requests (the backend's warmup) are never delayed or failed, and generate nothing
+            warmup = not user_text.strip() or request.get("options", {}).get("num_predict") == 1
+            if not warmup:
+                delay, fail = stub.draw()
+                time.sleep(delay)
+                if fail:
+                    self._send_json(500, {"error": "stub failure (--error-rate)"})
+                    return
+
+            slot, prompt_tokens, load = stub.acquire_slot(prompt)
+            try:
+                time.sleep(load)
+                prefill = prompt_tokens / stub.prefill_tps
+                time.sleep(prefill)
+                text = "" if warmup else f"```python\n{fake_code(user_text, request.get('options', {}).get('seed'))}```"
+                pieces = [text[i:i + CHARS_PER_TOKEN] for i in range(0, len(text), CHARS_PER_TOKEN)]
+                per_token = 1.0 / stub.token_rate
+                started = time.monotonic()
+
+                if not request.get("stream", True):
+                    time.sleep(per_token * len(pieces))
+                    final = self._final(chat, text, prompt_tokens, prefill, len(pieces), time.monotonic() - started, load)
+                    self._send_json(200, final)
+                    return
+
+                self.send_response(200)
+                self.send_header("Content-Type", "application/x-ndjson")
+                self.send_header("Transfer-Encoding", "chunked")
+                self.end_headers()
+                for piece in pieces:
+                    time.sleep(per_token)
+                    if chat:
+                        self._write_chunk({"model": stub.model, "message": {"role": "assistant", "content": piece}, "done": False})
+                    else:
+                        self._write_chunk({"model": stub.model, "response": piece, "done": False})
+                self._write_chunk(self._final(chat, "", prompt_tokens, prefill, len(pieces), time.monotonic() - started, load))
+                self.wfile.write(b"0\r\n\r\n")
+            except (BrokenPipeError, ConnectionResetError):
+                pass  # Client cancelled (e.g. a losing speculative candidate)
+            finally:
+                stub.release_slot(slot)
+
+        def _final(self, chat: bool, text: str, prompt_tokens: int, prefill: float, tokens: int, generation: float, load: float) -> dict:
+            payload = {
+                "model": stub.model,
+                "done": True,
+                "done_reason": "stop",
+                "load_duration": int(load * 1e9),
+                "prompt_eval_count": prompt_tokens,
+                "prompt_eval_duration": int(prefill * 1e9),
+                "eval_count": tokens,
+                "eval_duration": int(generation * 1e9),
+                "total_duration": int((load + prefill + generation) * 1e9),
+            }
+            if chat:
+                payload["message"] = {"role": "assistant", "content": text}
+            else:
+                payload["response"] = text
+            return payload
+
+    return Handler
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=11435)
+    parser.add_argument("--model", default="mistral")
+    parser.add_argument("--token-rate", type=float, default=40.0, help="generated tokens per second")
+    parser.add_argument("--prefill-tps", type=float, default=2000.0, help="prompt tokens evaluated per second")
+    parser.add_argument("--latency", default="fixed:0", help="extra per-request latency distribution (ms)")
+    parser.add_argument("--load-ms", type=float, default=0.0, help="model load time on the first request")
+    parser.add_argument("--parallel", type=int, default=4, help="requests processed at once")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of requests failing with HTTP 500")
+    parser.add_argument("--seed", type=int, default=0)
+    return parser
+
+
+def serve(args: argparse.Namespace) -> ThreadingHTTPServer:
+    """Creates the server (not yet serving); `serve_forever()` runs it."""
+    server = ThreadingHTTPServer((args.host, args.port), make_handler(StubOllama(args)))
+    server.daemon_threads = True
+    return server
+
+
+def main(argv=None) -> int:
+    args = build_parser().parse_args(argv)
+    parse_distribution(args.latency)  # Fail fast on a bad spec
+    server = serve(args)
+    print(f"Stub Ollama listening on http://{args.host}:{server.server_address[1]}", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
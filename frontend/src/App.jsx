@@ -9,6 +9,7 @@ import { History, Code2, AlertTriangle, PlayCircle } from 'lucide-react';
 export default function App() {
   const [pipelineState, setPipelineState] = useState('idle'); // idle, generating, error, success
   const [stlUrl, setStlUrl] = useState(null);
+  const [lodUrls, setLodUrls] = useState([]);
   const [code, setCode] = useState(null);
   const [errorMsg, setErrorMsg] = useState('');
 
@@ -36,6 +37,7 @@ export default function App() {
     setErrorMsg('');
     setErrorMsg(null);
     setStlUrl(null);
+    setLodUrls([]);
 
     const endpoint = isRefinement ? '/api/refine' : '/api/generate';
     const body = isRefinement
@@ -58,6 +60,7 @@ export default function App() {
       }
 
       setStlUrl(data.stl_url);
+      setLodUrls((data.lods || []).map((lod) => lod.url));
       setCode(data.code);
       setPipelineState('success');
       updateHistory(prompt, 'success');
@@ -134,6 +137,7 @@ export default function App() {
         <div className="flex-1 h-full min-w-0 z-0">
           <Viewer3D
             stlUrl={stlUrl}
+            lodUrls={lodUrls}
             wireframe={wireframe}
             onToggleWireframe={() => setWireframe(!wireframe)}
           />
@@ -24,7 +24,20 @@ function Model({ url, wireframe }) {
     );
 }
 
-export default function Viewer3D({ stlUrl, wireframe, onToggleWireframe }) {
+// Renders the finest mesh; while a level is still loading, the next coarser one is shown instead.
+// `urls` is ordered coarse → fine, so the small coarse mesh appears first.
+function LodModel({ urls, wireframe }) {
+    return urls.reduce(
+        (fallback, url) => (
+            <Suspense key={url} fallback={fallback}>
+                <Model url={url} wireframe={wireframe} />
+            </Suspense>
+        ),
+        null
+    );
+}
+
+export default function Viewer3D({ stlUrl, lodUrls, wireframe, onToggleWireframe }) {
     const controlsRef = useRef();
 
     const handleResetCamera = () => {
@@ -69,7 +82,7 @@ export default function Viewer3D({ stlUrl, wireframe, onToggleWireframe }) {
 
                 <Suspense fallback={null}>
                     <Bounds fit clip observe margin={1.2}>
-                        {stlUrl && <Model url={stlUrl} wireframe={wireframe} />}
+                        {stlUrl && <LodModel urls={lodUrls && lodUrls.length ? lodUrls : [stlUrl]} wireframe={wireframe} />}
                     </Bounds>
                 </Suspense>
 